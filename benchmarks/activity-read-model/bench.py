@@ -0,0 +1,178 @@
+"""
+Compare the pages of V2MeActivityView read with OFFSET vs with a keyset cursor over the activity read model.
+
+It builds a table shaped like RecentActivity, with the same indexes, in a sqlite database and measures the latency of
+reading a page at several depths. If GOOGLE_APPLICATION_CREDENTIALS and BIGQUERY_DATASET are set it also measures the
+same pages read from BigQuery, the path used for the activities older than the read model.
+"""
+
+import os
+import random
+import sqlite3
+import statistics
+import uuid
+from datetime import datetime, timedelta, timezone
+from timeit import default_timer as timer
+
+random.seed(42)
+
+USERS = 50
+ACTIVITIES_PER_USER = 20_000
+LIMIT = 100
+DEPTHS = [1, 10, 50, 100, 190]
+REPEAT = 50
+KINDS = ["login", "open_syllabus_module", "read_assignment", "assignment_status_updated", "nps_answered"]
+
+
+def setup():
+    db = sqlite3.connect(":memory:")
+    db.execute(
+        """
+        CREATE TABLE activity_recentactivity (
+            id varchar(36) PRIMARY KEY,
+            user_id integer NOT NULL,
+            kind varchar(50) NOT NULL,
+            timestamp datetime NOT NULL,
+            academy_id integer NULL,
+            cohort varchar(150) NULL,
+            meta text NOT NULL
+        )
+        """
+    )
+    db.execute("CREATE INDEX user_timestamp ON activity_recentactivity (user_id, timestamp DESC, id DESC)")
+    db.execute(
+        "CREATE INDEX academy_user_timestamp ON activity_recentactivity "
+        "(academy_id, user_id, timestamp DESC, id DESC)"
+    )
+    db.execute("CREATE INDEX timestamp ON activity_recentactivity (timestamp)")
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for user_id in range(1, USERS + 1):
+        for _ in range(ACTIVITIES_PER_USER):
+            timestamp = now - timedelta(seconds=random.randint(0, 30 * 24 * 60 * 60))
+            rows.append(
+                (uuid.uuid4().hex, user_id, random.choice(KINDS), timestamp.isoformat(), 1, "1", '{"academy": 1}')
+            )
+
+    db.executemany("INSERT INTO activity_recentactivity VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    db.commit()
+    return db
+
+
+def offset_page(db, user_id, page):
+    return db.execute(
+        "SELECT * FROM activity_recentactivity WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+        (user_id, LIMIT, (page - 1) * LIMIT),
+    ).fetchall()
+
+
+def keyset_page(db, user_id, cursor):
+    if cursor is None:
+        return db.execute(
+            "SELECT * FROM activity_recentactivity WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (user_id, LIMIT),
+        ).fetchall()
+
+    return db.execute(
+        "SELECT * FROM activity_recentactivity WHERE user_id = ? AND timestamp <= ? "
+        "AND (timestamp < ? OR (timestamp = ? AND id < ?)) ORDER BY timestamp DESC, id DESC LIMIT ?",
+        (user_id, cursor[0], cursor[0], cursor[0], cursor[1], LIMIT),
+    ).fetchall()
+
+
+def cursors(db, user_id):
+    """Get the cursor that opens each page, like the X-Next-Cursor header returned by the previous one."""
+
+    res = {1: None}
+    cursor = None
+    for page in range(1, max(DEPTHS)):
+        rows = keyset_page(db, user_id, cursor)
+        cursor = (rows[-1][3], rows[-1][0])
+        res[page + 1] = cursor
+
+    return res
+
+
+def measure(fn):
+    times = []
+    for _ in range(REPEAT):
+        start = timer()
+        fn()
+        times.append((timer() - start) * 1000)
+
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95) - 1]
+
+
+def bigquery():
+    if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS") or not os.getenv("BIGQUERY_DATASET"):
+        return
+
+    from google.cloud import bigquery as bq
+
+    client = bq.Client()
+    table = f"{client.project}.{os.getenv('BIGQUERY_DATASET')}.activity"
+    user_id = int(os.getenv("BIGQUERY_USER_ID", "1"))
+
+    print()
+    print("| depth | BigQuery OFFSET p50 | BigQuery keyset p50 |")
+    print("| --- | --- | --- |")
+
+    for depth in DEPTHS:
+        offset = [
+            bq.ScalarQueryParameter("user_id", "INT64", user_id),
+            bq.ScalarQueryParameter("offset", "INT64", (depth - 1) * LIMIT),
+        ]
+        job_config = bq.QueryJobConfig(query_parameters=offset, use_query_cache=False)
+        query = (
+            f"SELECT * FROM `{table}` WHERE user_id = @user_id ORDER BY timestamp DESC, id DESC "
+            f"LIMIT {LIMIT} OFFSET @offset"
+        )
+        rows = []
+        offset_p50, _ = measure(lambda: rows.extend(client.query(query, job_config=job_config).result()))
+
+        keyset_p50 = 0
+        if rows:
+            last = rows[-1]
+            params = [
+                bq.ScalarQueryParameter("user_id", "INT64", user_id),
+                bq.ScalarQueryParameter("cursor_timestamp", "TIMESTAMP", last.timestamp),
+                bq.ScalarQueryParameter("cursor_id", "STRING", last.id),
+            ]
+            job_config = bq.QueryJobConfig(query_parameters=params, use_query_cache=False)
+            query = (
+                f"SELECT * FROM `{table}` WHERE user_id = @user_id AND (timestamp < @cursor_timestamp OR "
+                "(timestamp = @cursor_timestamp AND id < @cursor_id)) "
+                f"ORDER BY timestamp DESC, id DESC LIMIT {LIMIT}"
+            )
+            keyset_p50, _ = measure(lambda: client.query(query, job_config=job_config).result())
+
+        print(f"| {depth} | {offset_p50:.2f}ms | {keyset_p50:.2f}ms |")
+
+
+def main():
+    db = setup()
+    user_ids = random.sample(range(1, USERS + 1), 10)
+    pages = {user_id: cursors(db, user_id) for user_id in user_ids}
+
+    print(f"{USERS * ACTIVITIES_PER_USER} activities, {USERS} users, {LIMIT} activities per page")
+    print()
+    print("| depth | OFFSET p50 | OFFSET p95 | keyset p50 | keyset p95 |")
+    print("| --- | --- | --- | --- | --- |")
+
+    for depth in DEPTHS:
+        offset_p50, offset_p95 = measure(lambda: [offset_page(db, x, depth) for x in user_ids])
+        keyset_p50, keyset_p95 = measure(lambda: [keyset_page(db, x, pages[x][depth]) for x in user_ids])
+
+        # the time of one page
+        print(
+            f"| {depth} | {offset_p50 / len(user_ids):.3f}ms | {offset_p95 / len(user_ids):.3f}ms "
+            f"| {keyset_p50 / len(user_ids):.3f}ms | {keyset_p95 / len(user_ids):.3f}ms |"
+        )
+
+    bigquery()
+
+
+if __name__ == "__main__":
+    main()
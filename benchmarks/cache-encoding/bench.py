@@ -0,0 +1,227 @@
+"""
+Compare the cache of CacheExtension storing one response per encoding vs one canonical zstd response.
+
+It simulates a Redis with `maxmemory-policy allkeys-lru` using payloads shaped like the responses of AssetView and
+AcademyEventView, the requests follow a zipf distribution and a mix of Accept-Encoding headers.
+"""
+
+import gzip
+import json
+import random
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from timeit import default_timer as timer
+
+import brotli
+import zstandard
+
+random.seed(42)
+
+URLS = 400
+REQUESTS = 40_000
+# bytes, like a maxmemory of a small Redis instance
+MEMORY_LIMITS = [2 * 1024 * 1024, 8 * 1024 * 1024, 32 * 1024 * 1024]
+ACCEPT_ENCODINGS = [
+    ("gzip, deflate, br, zstd", 0.55),
+    ("gzip, deflate, br", 0.30),
+    ("gzip, deflate", 0.10),
+    ("", 0.05),
+]
+WORDS = "python react flask django html css javascript data project exercise lesson quiz learn build test".split()
+
+
+def sentence(n):
+    return " ".join(random.choice(WORDS) for _ in range(n))
+
+
+def asset(i):
+    return {
+        "id": i,
+        "slug": f"{random.choice(WORDS)}-{random.choice(WORDS)}-{i}",
+        "title": sentence(6).title(),
+        "lang": random.choice(["us", "es"]),
+        "asset_type": random.choice(["PROJECT", "EXERCISE", "LESSON", "QUIZ"]),
+        "visibility": "PUBLIC",
+        "url": f"https://github.com/4GeeksAcademy/{i}",
+        "readme_url": f"https://github.com/4GeeksAcademy/{i}/blob/master/README.md",
+        "difficulty": random.choice(["BEGINNER", "EASY", "INTERMEDIATE", "HARD"]),
+        "duration": random.randint(1, 10),
+        "description": sentence(40),
+        "status": "PUBLISHED",
+        "graded": random.choice([True, False]),
+        "interactive": random.choice([True, False]),
+        "technologies": [{"slug": random.choice(WORDS), "title": random.choice(WORDS)} for _ in range(4)],
+        "category": {"id": random.randint(1, 20), "slug": random.choice(WORDS), "title": sentence(2)},
+        "published_at": (datetime(2024, 1, 1) + timedelta(days=i)).isoformat() + "Z",
+    }
+
+
+def event(i):
+    return {
+        "id": i,
+        "slug": f"event-{i}",
+        "title": sentence(8).title(),
+        "description": sentence(60),
+        "excerpt": sentence(20),
+        "lang": random.choice(["en", "es"]),
+        "url": f"https://4geeks.com/workshops/event-{i}",
+        "banner": f"https://storage.googleapis.com/banners/{i}.png",
+        "starting_at": (datetime(2024, 1, 1) + timedelta(hours=i)).isoformat() + "Z",
+        "ending_at": (datetime(2024, 1, 1) + timedelta(hours=i + 2)).isoformat() + "Z",
+        "status": random.choice(["ACTIVE", "DRAFT"]),
+        "online_event": True,
+        "venue": None,
+        "event_type": {"id": random.randint(1, 10), "slug": random.choice(WORDS), "name": sentence(3)},
+        "academy": {"id": random.randint(1, 5), "slug": random.choice(WORDS), "name": sentence(2)},
+    }
+
+
+def build_responses():
+    responses = []
+    for i in range(URLS):
+        limit = random.choice([1, 10, 20, 50])
+        factory = asset if i % 2 == 0 else event
+        data = factory(i) if limit == 1 else [factory(i * 100 + j) for j in range(limit)]
+        responses.append(json.dumps(data).encode("utf-8"))
+
+    return responses
+
+
+def compress(data, encoding, fast=False):
+    if encoding == "zstd":
+        return zstandard.compress(data)
+
+    if encoding == "br":
+        return brotli.compress(data, quality=5) if fast else brotli.compress(data)
+
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6) if fast else gzip.compress(data)
+
+    if encoding == "deflate":
+        return zlib.compress(data)
+
+    return data
+
+
+def before_encoding(accept):
+    # CacheExtension._get_encoding before this change
+    if "br" in accept or "*" in accept:
+        return "br"
+
+    if "zstd" in accept:
+        return "zstd"
+
+    if "deflate" in accept:
+        return "deflate"
+
+    if "gzip" in accept:
+        return "gzip"
+
+
+def after_encoding(accept):
+    if "zstd" in accept:
+        return "zstd"
+
+    return before_encoding(accept)
+
+
+class LRU:
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.items = OrderedDict()
+
+    def get(self, key):
+        if key not in self.items:
+            return None
+
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def set(self, key, value):
+        self.items[key] = value
+        self.used += len(value)
+
+        while self.used > self.limit:
+            _, evicted = self.items.popitem(last=False)
+            self.used -= len(evicted)
+
+
+def trace():
+    weights = [1 / (i + 1) for i in range(URLS)]
+    urls = random.choices(range(URLS), weights=weights, k=REQUESTS)
+    encodings = random.choices([x for x, _ in ACCEPT_ENCODINGS], weights=[x for _, x in ACCEPT_ENCODINGS], k=REQUESTS)
+    return list(zip(urls, encodings))
+
+
+def run_before(responses, requests, limit):
+    lru = LRU(limit)
+    hits, cpu = 0, 0.0
+    for url, accept in requests:
+        encoding = before_encoding(accept)
+        key = (url, encoding)
+        if lru.get(key) is not None:
+            hits += 1
+            continue
+
+        t1 = timer()
+        lru.set(key, compress(responses[url], encoding))
+        cpu += timer() - t1
+
+    return hits / len(requests), lru.used, cpu
+
+
+def run_after(responses, requests, limit):
+    lru = LRU(limit)
+    hits, cpu = 0, 0.0
+    for url, accept in requests:
+        encoding = after_encoding(accept)
+        stored = lru.get(url)
+        t1 = timer()
+
+        if stored is not None:
+            hits += 1
+            if encoding != "zstd":
+                compress(zstandard.decompress(stored), encoding, fast=True)
+
+        else:
+            lru.set(url, compress(responses[url], "zstd"))
+            if encoding != "zstd":
+                compress(responses[url], encoding, fast=True)
+
+        cpu += timer() - t1
+
+    return hits / len(requests), lru.used, cpu
+
+
+def main():
+    responses = build_responses()
+    requests = trace()
+
+    print(f"{URLS} urls, {REQUESTS} requests, {sum(len(x) for x in responses) / 1024 / 1024:.2f}MB of raw json")
+    print()
+    print("| maxmemory | strategy | hit rate | memory used | compression cpu |")
+    print("| --- | --- | --- | --- | --- |")
+
+    for limit in MEMORY_LIMITS:
+        for name, fn in [("per encoding", run_before), ("canonical zstd", run_after)]:
+            hit_rate, used, cpu = fn(responses, requests, limit)
+            print(
+                f"| {limit / 1024 / 1024:.0f}MB | {name} | {hit_rate * 100:.1f}% | {used / 1024 / 1024:.2f}MB "
+                f"| {cpu:.2f}s |"
+            )
+
+    unbounded = 1024 * 1024 * 1024
+    _, before, _ = run_before(responses, requests, unbounded)
+    _, after, _ = run_after(responses, requests, unbounded)
+
+    print()
+    print(
+        f"Memory to keep every response: per encoding {before / 1024 / 1024:.2f}MB, canonical {after / 1024 / 1024:.2f}MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measure the requests of the checkout flow, they price the plans for the country of the buyer.
+
+It runs inside the test suite of the project, to compare two trees run it in each of them:
+
+    python -m pytest benchmarks/checkout-quotes/bench.py -q -s --nomigrations -p no:cacheprovider
+
+Scenarios:
+- plan: GET /v1/payments/plan/<slug>?country_code=ve, a plan with add-ons priced for a country.
+- plans: GET /v1/payments/plan?country_code=ve, a page of plans priced for a country.
+- coupons: GET /v1/payments/coupon?plan=<slug>, the coupons available for a plan, with an auto coupon.
+- checking: PUT /v1/payments/checking, a preview bag of a plan priced for a country.
+"""
+
+import statistics
+from timeit import default_timer as timer
+
+import pytest
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from rest_framework.test import APIClient
+
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+REQUESTS = 200
+PLANS = 20
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch):
+    monkeypatch.setattr("breathecode.payments.tasks.update_service_stock_schedulers.delay", lambda *args: None)
+    monkeypatch.setattr("breathecode.payments.actions.GENERAL_PRICING_RATIOS", {"ve": {"pricing_ratio": 0.8}})
+    yield
+
+
+def report(name, fn):
+    times, queries = [], []
+    for _ in range(REQUESTS):
+        # the log of queries is bounded, a full log can not be captured
+        reset_queries()
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = timer()
+            fn()
+            times.append((timer() - start) * 1000)
+
+        queries.append(len(ctx.captured_queries))
+
+    times.sort()
+    print(
+        f"| {name} | {statistics.median(times):.2f}ms | {times[int(len(times) * 0.95) - 1]:.2f}ms "
+        f"| {statistics.mean(queries):.1f} |"
+    )
+
+
+def test_bench(bc: Breathecode):
+    plan = {
+        "price_per_month": 100,
+        "price_per_quarter": 270,
+        "price_per_half": 500,
+        "price_per_year": 900,
+        "is_renewable": True,
+        "time_of_life": 0,
+        "time_of_life_unit": None,
+        "trial_duration": 0,
+        "pricing_ratio_exceptions": {"ar": {"price_per_month": 40, "currency": "USD"}},
+    }
+    model = bc.database.create(
+        user=1,
+        academy={"available_as_saas": True},
+        currency={"code": "USD"},
+        plan=(PLANS, plan),
+        financing_option={"how_many_months": 1, "monthly_price": 1000},
+        coupon={"auto": True, "discount_type": "PERCENT_OFF", "discount_value": 0.1, "how_many_offers": -1},
+    )
+
+    for x in model.plan:
+        x.financing_options.set([model.financing_option])
+        x.plan_addons.set(model.plan[1:4])
+
+    print()
+    print("| scenario | p50 | p95 | queries per request |")
+    print("| --- | --- | --- | --- |")
+
+    client = APIClient()
+    client.force_authenticate(model.user)
+    slug = model.plan[0].slug
+
+    def get_plan():
+        response = client.get(reverse_lazy("payments:plan_slug", kwargs={"plan_slug": slug}) + "?country_code=ve")
+        assert response.status_code == 200, response.content
+
+    report("plan", get_plan)
+
+    def get_plans():
+        response = client.get(reverse_lazy("payments:plan") + "?country_code=ve")
+        assert response.status_code == 200, response.content
+
+    report("plans", get_plans)
+
+    def get_coupons():
+        response = client.get(reverse_lazy("payments:coupon") + f"?plan={slug}")
+        assert response.status_code == 200, response.content
+
+    report("coupons", get_coupons)
+
+    def checking():
+        data = {"academy": 1, "type": "PREVIEW", "plans": [slug], "country_code": "ve"}
+        response = client.put(reverse_lazy("payments:checking"), data, format="json")
+        assert response.status_code in (200, 201), response.content
+
+    report("checking", checking)
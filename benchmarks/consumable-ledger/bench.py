@@ -0,0 +1,150 @@
+"""
+Measure the requests that consume a service through the @consume decorator and ConsumeView.
+
+It runs inside the test suite of the project, to compare two trees run it in each of them:
+
+    python -m pytest benchmarks/consumable-ledger/bench.py -q -s --nomigrations -p no:cacheprovider
+
+Scenarios:
+- consume view: PUT /v1/payments/me/service/<slug>/consumptionsession, each request opens a consumption session.
+- join mentorship without credits: a view with @consume("join_mentorship") for a user without units left.
+- consume one unit: a view with @consume(<service>) that discounts one unit per request.
+- concurrent consumptions: threads consuming the same consumable, it shows the units lost by the decrements.
+"""
+
+import statistics
+import threading
+from timeit import default_timer as timer
+
+import pytest
+from django.db import connection, connections, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from breathecode.mentorship.permissions.consumers import mentorship_service_by_url_param
+from breathecode.payments import signals
+from breathecode.payments.models import Consumable
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+from breathecode.utils.decorators import consume
+
+REQUESTS = 200
+THREADS = 8
+
+
+class JoinMentorshipView(APIView):
+
+    @consume("join_mentorship", consumer=mentorship_service_by_url_param)
+    def get(self, request, mentor_profile, mentorship_service):
+        return Response({"ok": True})
+
+
+class ConsumeOneUnitView(APIView):
+
+    @consume("mentorships")
+    def get(self, request):
+        return Response({"ok": True})
+
+
+@pytest.fixture(autouse=True)
+def setup(db, enable_signals, monkeypatch):
+    monkeypatch.setattr("breathecode.payments.tasks.process_auto_recharge.delay", lambda *args, **kwargs: None)
+    enable_signals()
+    yield
+
+
+def report(name, fn):
+    times, queries = [], []
+    for _ in range(REQUESTS):
+        # the log of queries is bounded, a full log can not be captured
+        reset_queries()
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = timer()
+            fn()
+            times.append((timer() - start) * 1000)
+
+        queries.append(len(ctx.captured_queries))
+
+    times.sort()
+    print(
+        f"| {name} | {statistics.median(times):.2f}ms | {times[int(len(times) * 0.95) - 1]:.2f}ms "
+        f"| {statistics.mean(queries):.1f} |"
+    )
+
+
+def test_bench(bc: Breathecode):
+    model = bc.database.create(
+        user=2,
+        academy={"available_as_saas": True},
+        service={"slug": "mentorships", "type": "VOID", "consumer": "JOIN_MENTORSHIP"},
+        mentorship_service={"slug": "mentorship", "max_duration": "00:30:00"},
+        mentorship_service_set=1,
+        mentor_profile={"slug": "mentor", "user_id": 2},
+        consumable={"how_many": 10_000_000, "user_id": 1},
+    )
+    without_credits = bc.database.create(user=1).user
+
+    print()
+    print("| scenario | p50 | p95 | queries per request |")
+    print("| --- | --- | --- | --- |")
+
+    client = APIClient()
+    client.force_authenticate(model.user[0])
+    url = reverse_lazy("payments:me_service_slug_consumptionsession", kwargs={"service_slug": "mentorships"})
+
+    def consume_view():
+        response = client.put(url)
+        assert response.status_code == 201, response.content
+
+    report("consume view", consume_view)
+
+    factory = APIRequestFactory()
+    view = JoinMentorshipView.as_view()
+
+    def join_mentorship():
+        request = factory.get("/mentor/mentor/service/mentorship")
+        force_authenticate(request, user=without_credits)
+        response = view(request, mentor_slug="mentor", service_slug="mentorship")
+        assert response.status_code == 402
+
+    report("join mentorship without credits", join_mentorship)
+
+    view = ConsumeOneUnitView.as_view()
+
+    def consume_one_unit():
+        request = factory.get("/consume")
+        force_authenticate(request, user=model.user[0])
+        response = view(request)
+        assert response.status_code == 200
+
+    report("consume one unit", consume_one_unit)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_consumptions(bc: Breathecode):
+    if connection.vendor == "sqlite":
+        pytest.skip("sqlite serializes the writes, run it against postgres")
+
+    model = bc.database.create(consumable={"how_many": 10_000})
+    consumed = REQUESTS * THREADS
+
+    def worker():
+        for _ in range(REQUESTS):
+            instance = Consumable.objects.get(id=model.consumable.id)
+            signals.consume_service.send(sender=Consumable, instance=instance, how_many=1)
+
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    model.consumable.refresh_from_db()
+    print()
+    print(f"{consumed} units consumed, {model.consumable.how_many - (10_000 - consumed)} units lost")
@@ -0,0 +1,117 @@
+"""
+Measure the overhead of @has_permission on a view that does nothing.
+
+It runs inside the test suite of the project, to compare two trees run it in each of them:
+
+    python -m pytest benchmarks/permissions/bench.py -q -s --nomigrations -p no:cacheprovider
+
+Scenarios:
+- direct: a sync view, the user has the permission directly.
+- group: a sync view, the user has the permission through one of its groups.
+- denied: a sync view, the user does not have the permission.
+- async: an async view, the user has the permission through one of its groups.
+"""
+
+import inspect
+import statistics
+from timeit import default_timer as timer
+
+import pytest
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+from breathecode.utils.decorators import has_permission
+
+REQUESTS = 2000
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@has_permission("read_kenny")
+def direct_view(request):
+    return Response(None)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@has_permission("kill_kenny")
+def group_view(request):
+    return Response(None)
+
+
+@async_api_view(["GET"])
+@permission_classes([AllowAny])
+@has_permission("kill_kenny")
+async def async_view(request):
+    return Response(None)
+
+
+async def resolve(response):
+    return await response
+
+
+def report(name, fn):
+    times, queries = [], []
+    for _ in range(REQUESTS):
+        # the log of queries is bounded, a full log can not be captured
+        reset_queries()
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = timer()
+            fn()
+            times.append((timer() - start) * 1000)
+
+        queries.append(len(ctx.captured_queries))
+
+    times.sort()
+    print(
+        f"| {name} | {statistics.median(times):.3f}ms | {times[int(len(times) * 0.95) - 1]:.3f}ms "
+        f"| {statistics.mean(queries):.1f} |"
+    )
+
+
+def test_bench(bc: Breathecode):
+    model = bc.database.create(user=2, group=1)
+    content_type = ContentType.objects.get_for_model(Group)
+
+    for codename in ["read_kenny", "kill_kenny", "save_kenny"]:
+        Permission.objects.create(codename=codename, name=codename, content_type=content_type)
+
+    model.user[0].user_permissions.add(Permission.objects.get(codename="read_kenny"))
+    model.group.permissions.add(Permission.objects.get(codename="kill_kenny"))
+    model.group.user_set.set([model.user[0]])
+
+    print()
+    print("| scenario | p50 | p95 | queries per request |")
+    print("| --- | --- | --- | --- |")
+
+    factory = APIRequestFactory()
+
+    def call(view, user, status=200):
+        request = factory.get("/kenny")
+        force_authenticate(request, user=user)
+
+        response = view(request)
+        if inspect.isawaitable(response):
+            response = async_to_sync(resolve)(response)
+
+        assert response.status_code == status, response.data
+
+    report("direct", lambda: call(direct_view, model.user[0]))
+    report("group", lambda: call(group_view, model.user[0]))
+    report("denied", lambda: call(group_view, model.user[1], 403))
+    report("async", lambda: call(async_view, model.user[0]))
@@ -1,13 +1,27 @@
+import base64
 import functools
+import json
+import logging
 import os
-from datetime import datetime
-from typing import Any, Optional, TypedDict
+import pickle
+import re
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Any, Callable, Iterable, Optional, TypedDict
 
+from capyc.rest_framework.exceptions import ValidationException
 from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django_redis import get_redis_connection
+from google.cloud import bigquery
 from task_manager.core.exceptions import AbortTask, RetryTask
 from breathecode.assignments.models import Task
 
 
+logger = logging.getLogger(__name__)
+
 ALLOWED_TYPES = {
     "auth.UserInvite": [
         "invite_created",
@@ -65,7 +79,17 @@ ENGAGEMENT_POINTS: dict[tuple[str, str], dict[str, float]] = {
 }
 
 
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ") if value else None
+
+
 class FillActivityMeta:
+    """
+    Build the meta of the activities.
+
+    Each related type has a queryset, with the relations that the meta uses already joined, and a serializer, the
+    per-row methods and `bulk` share them.
+    """
 
     @staticmethod
     def _get_query(related_id: Optional[str | int] = None, related_slug: Optional[str] = None) -> dict[str, Any]:
@@ -80,17 +104,97 @@ class FillActivityMeta:
         return kwargs
 
     @classmethod
-    def user_invite(
-        cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
+    def _get_handlers(cls) -> dict[str, tuple[str, Callable[[], QuerySet], Callable[[Any], dict[str, Any]]]]:
+        return {
+            "auth.UserInvite": ("UserInvite", cls._user_invites, cls._serialize_user_invite),
+            "feedback.Answer": ("Answer", cls._answers, cls._serialize_answer),
+            "auth.User": ("User", cls._users, cls._serialize_user),
+            "admissions.Cohort": ("Cohort", cls._cohorts, cls._serialize_cohort),
+            "admissions.CohortUser": ("CohortUser", cls._cohort_users, cls._serialize_cohort_user),
+            "assignments.Task": ("Task", cls._tasks, cls._serialize_task),
+            "events.EventCheckin": ("EventCheckin", cls._event_checkins, cls._serialize_event_checkin),
+            "mentorship.MentorshipSession": (
+                "MentorshipSession",
+                cls._mentorship_sessions,
+                cls._serialize_mentorship_session,
+            ),
+            "payments.Invoice": ("Invoice", cls._invoices, cls._serialize_invoice),
+            "payments.Bag": ("Bag", cls._bags, cls._serialize_bag),
+            "payments.Subscription": ("Subscription", cls._subscriptions, cls._serialize_subscription),
+            "payments.PlanFinancing": ("PlanFinancing", cls._plan_financings, cls._serialize_plan_financing),
+        }
+
+    @classmethod
+    def _fill(
+        cls, related_type: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.authenticate.models import UserInvite
+        name, get_queryset, serialize = cls._get_handlers()[related_type]
 
         kwargs = cls._get_query(related_id, related_slug)
-        instance = UserInvite.objects.filter(**kwargs).first()
+        instance = get_queryset().filter(**kwargs).first()
 
         if not instance:
-            raise RetryTask(f"UserInvite {related_id or related_slug} not found")
+            raise RetryTask(f"{name} {related_id or related_slug} not found")
+
+        return serialize(instance)
+
+    @classmethod
+    def has_slug(cls, related_type: str) -> bool:
+        _, get_queryset, _ = cls._get_handlers()[related_type]
+
+        try:
+            get_queryset().model._meta.get_field("slug")
+            return True
+
+        except FieldDoesNotExist:
+            return False
+
+    @classmethod
+    def bulk(
+        cls, related_type: str, ids: Iterable[str | int] = (), slugs: Iterable[str] = ()
+    ) -> tuple[dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+        """
+        Build the meta of many instances of a related type with one query.
 
+        It returns the meta mapped by id, as string, and by slug, the instances that were not found are missing, as
+        well as the ids that are not integers and the slugs of the types without a slug.
+        """
+
+        _, get_queryset, serialize = cls._get_handlers()[related_type]
+        ids = {x for x in (_to_int(x) for x in ids) if x is not None}
+        slugs = set(slugs) if cls.has_slug(related_type) else set()
+
+        query = Q()
+        if ids:
+            query |= Q(pk__in=ids)
+
+        if slugs:
+            query |= Q(slug__in=slugs)
+
+        by_id = {}
+        by_slug = {}
+
+        if not ids and not slugs:
+            return by_id, by_slug
+
+        for instance in get_queryset().filter(query):
+            meta = serialize(instance)
+            by_id[str(instance.pk)] = meta
+
+            slug = getattr(instance, "slug", None)
+            if slug:
+                by_slug[slug] = meta
+
+        return by_id, by_slug
+
+    @staticmethod
+    def _user_invites() -> QuerySet:
+        from breathecode.authenticate.models import UserInvite
+
+        return UserInvite.objects.select_related("author", "user", "role")
+
+    @staticmethod
+    def _serialize_user_invite(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "email": instance.email,
@@ -114,26 +218,28 @@ class FillActivityMeta:
         if instance.role:
             obj["role"] = instance.role.slug
 
-        if instance.academy:
-            obj["academy"] = instance.academy.id
+        if instance.academy_id:
+            obj["academy"] = instance.academy_id
 
-        if instance.cohort:
-            obj["cohort"] = instance.cohort.id
+        if instance.cohort_id:
+            obj["cohort"] = instance.cohort_id
 
         return obj
 
     @classmethod
-    def answer(
+    def user_invite(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.feedback.models import Answer
+        return cls._fill("auth.UserInvite", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = Answer.objects.filter(**kwargs).first()
+    @staticmethod
+    def _answers() -> QuerySet:
+        from breathecode.feedback.models import Answer
 
-        if not instance:
-            raise RetryTask(f"Answer {related_id or related_slug} not found")
+        return Answer.objects.select_related("user", "mentor", "mentorship_session", "event")
 
+    @staticmethod
+    def _serialize_answer(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "title": instance.title,
@@ -157,14 +263,14 @@ class FillActivityMeta:
             obj["mentor_first_name"] = instance.mentor.first_name
             obj["mentor_last_name"] = instance.mentor.last_name
 
-        if instance.academy:
-            obj["academy"] = instance.academy.id
+        if instance.academy_id:
+            obj["academy"] = instance.academy_id
 
-        if instance.cohort:
-            obj["cohort"] = instance.cohort.id
+        if instance.cohort_id:
+            obj["cohort"] = instance.cohort_id
 
-        if instance.survey:
-            obj["survey"] = instance.survey.id
+        if instance.survey_id:
+            obj["survey"] = instance.survey_id
 
         if instance.mentorship_session:
             obj["mentorship_session"] = instance.mentorship_session.name
@@ -173,25 +279,27 @@ class FillActivityMeta:
             obj["event"] = instance.event.slug
 
         if instance.opened_at:
-            obj["opened_at"] = instance.opened_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["opened_at"] = _isoformat(instance.opened_at)
 
         if instance.sent_at:
-            obj["sent_at"] = instance.sent_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["sent_at"] = _isoformat(instance.sent_at)
 
         return obj
 
     @classmethod
-    def user(
+    def answer(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.authenticate.models import User
+        return cls._fill("feedback.Answer", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = User.objects.filter(**kwargs).first()
+    @staticmethod
+    def _users() -> QuerySet:
+        from breathecode.authenticate.models import User
 
-        if not instance:
-            raise RetryTask(f"User {related_id or related_slug} not found")
+        return User.objects.all()
 
+    @staticmethod
+    def _serialize_user(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "email": instance.email,
@@ -201,17 +309,19 @@ class FillActivityMeta:
         return obj
 
     @classmethod
-    def cohort(
+    def user(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.admissions.models import Cohort
+        return cls._fill("auth.User", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = Cohort.objects.filter(**kwargs).first()
+    @staticmethod
+    def _cohorts() -> QuerySet:
+        from breathecode.admissions.models import Cohort
 
-        if not instance:
-            raise RetryTask(f"Cohort {related_id or related_slug} not found")
+        return Cohort.objects.select_related("syllabus_version__syllabus", "schedule")
 
+    @staticmethod
+    def _serialize_cohort(instance) -> dict[str, Any]:
         syllabus = (
             f"{instance.syllabus_version.syllabus.slug}.v{instance.syllabus_version.version}"
             if instance.syllabus_version
@@ -237,67 +347,60 @@ class FillActivityMeta:
             "language": instance.language,
         }
 
-        if instance.academy:
-            obj["academy"] = instance.academy.id
+        if instance.academy_id:
+            obj["academy"] = instance.academy_id
 
         if instance.schedule:
             obj["schedule"] = instance.schedule.name
 
         if instance.kickoff_date:
-            obj["kickoff_date"] = instance.kickoff_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["kickoff_date"] = _isoformat(instance.kickoff_date)
 
         if instance.ending_date:
-            obj["ending_date"] = instance.ending_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["ending_date"] = _isoformat(instance.ending_date)
 
         return obj
 
     @classmethod
-    def cohort_user(
+    def cohort(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
+        return cls._fill("admissions.Cohort", related_id, related_slug)
+
+    @staticmethod
+    def _cohort_users() -> QuerySet:
         from breathecode.admissions.models import CohortUser
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = CohortUser.objects.filter(**kwargs).first()
+        return CohortUser.objects.select_related("user", "cohort")
 
-        if not instance:
-            raise RetryTask(f"CohortUser {related_id or related_slug} not found")
-
-        # syllabus = (
-        #     f'{instance.cohort.syllabus_version.syllabus.slug}.v{instance.cohort.syllabus_version.version}'
-        #     if instance.cohort.syllabus_version else None)
+    @staticmethod
+    def _serialize_cohort_user(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "user_first_name": instance.user.first_name,
             "user_last_name": instance.user.last_name,
-            "cohort": instance.cohort.id,
-            # 'available_as_saas': instance.cohort.available_as_saas,
-            # 'syllabus': syllabus,
-            # 'user_id': instance.user.id,
-            # 'watching': instance.watching,
-            # 'finantial_status': instance.finantial_status,
-            # 'educational_status': instance.educational_status,
-            # 'created_at': instance.created_at,
-            # 'updated_at': instance.updated_at,
+            "cohort": instance.cohort_id,
         }
 
-        if instance.cohort.academy:
-            obj["academy"] = instance.cohort.academy.id
+        if instance.cohort.academy_id:
+            obj["academy"] = instance.cohort.academy_id
 
         return obj
 
     @classmethod
-    def task(
+    def cohort_user(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.assignments.models import Task
+        return cls._fill("admissions.CohortUser", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = Task.objects.filter(**kwargs).first()
+    @staticmethod
+    def _tasks() -> QuerySet:
+        from breathecode.assignments.models import Task
 
-        if not instance:
-            raise RetryTask(f"Task {related_id or related_slug} not found")
+        return Task.objects.select_related("user", "cohort")
 
+    @staticmethod
+    def _serialize_task(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "associated_slug": instance.associated_slug,
@@ -317,25 +420,27 @@ class FillActivityMeta:
 
         if instance.cohort:
             obj["cohort"] = instance.cohort.id
-            obj["academy"] = instance.cohort.academy.id
+            obj["academy"] = instance.cohort.academy_id
 
         if instance.opened_at:
-            obj["opened_at"] = instance.opened_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["opened_at"] = _isoformat(instance.opened_at)
 
         return obj
 
     @classmethod
-    def event_checkin(
+    def task(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.events.models import EventCheckin
+        return cls._fill("assignments.Task", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = EventCheckin.objects.filter(**kwargs).first()
+    @staticmethod
+    def _event_checkins() -> QuerySet:
+        from breathecode.events.models import EventCheckin
 
-        if not instance:
-            raise RetryTask(f"EventCheckin {related_id or related_slug} not found")
+        return EventCheckin.objects.select_related("event", "attendee")
 
+    @staticmethod
+    def _serialize_event_checkin(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "email": instance.email,
@@ -351,22 +456,24 @@ class FillActivityMeta:
             obj["attendee_last_name"] = instance.attendee.last_name
 
         if instance.attended_at:
-            obj["attended_at"] = instance.attended_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["attended_at"] = _isoformat(instance.attended_at)
 
         return obj
 
     @classmethod
-    def mentorship_session(
+    def event_checkin(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
+        return cls._fill("events.EventCheckin", related_id, related_slug)
+
+    @staticmethod
+    def _mentorship_sessions() -> QuerySet:
         from breathecode.mentorship.models import MentorshipSession
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = MentorshipSession.objects.filter(**kwargs).first()
-
-        if not instance:
-            raise RetryTask(f"MentorshipSession {related_id or related_slug} not found")
+        return MentorshipSession.objects.select_related("mentor", "mentee", "service")
 
+    @staticmethod
+    def _serialize_mentorship_session(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "name": instance.name,
@@ -394,53 +501,46 @@ class FillActivityMeta:
 
         if instance.service:
             obj["service"] = instance.service.slug
-            obj["academy"] = instance.service.academy.id
-
-        if instance.bill:
-            obj["bill"] = instance.bill.id
-
-        if instance.starts_at:
-            obj["starts_at"] = instance.starts_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if instance.ends_at:
-            obj["ends_at"] = instance.ends_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if instance.started_at:
-            obj["started_at"] = instance.started_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if instance.ended_at:
-            obj["ended_at"] = instance.ended_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if instance.mentor_joined_at:
-            obj["mentor_joined_at"] = instance.mentor_joined_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if instance.mentor_left_at:
-            obj["mentor_left_at"] = instance.mentor_left_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if instance.mentee_left_at:
-            obj["mentee_left_at"] = instance.mentee_left_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["academy"] = instance.service.academy_id
+
+        if instance.bill_id:
+            obj["bill"] = instance.bill_id
+
+        for key in [
+            "starts_at",
+            "ends_at",
+            "started_at",
+            "ended_at",
+            "mentor_joined_at",
+            "mentor_left_at",
+            "mentee_left_at",
+        ]:
+            if value := getattr(instance, key):
+                obj[key] = _isoformat(value)
 
         return obj
 
     @classmethod
-    def invoice(
+    def mentorship_session(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.payments.models import Invoice
+        return cls._fill("mentorship.MentorshipSession", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = Invoice.objects.filter(**kwargs).first()
+    @staticmethod
+    def _invoices() -> QuerySet:
+        from breathecode.payments.models import Invoice
 
-        if not instance:
-            raise RetryTask(f"Invoice {related_id or related_slug} not found")
+        return Invoice.objects.select_related("currency", "user")
 
+    @staticmethod
+    def _serialize_invoice(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "amount": instance.amount,
             "currency": instance.currency.code,
             "status": instance.status,
-            "bag": instance.bag.id,
-            "academy": instance.academy.id,
+            "bag": instance.bag_id,
+            "academy": instance.academy_id,
             "user_email": instance.user.email,
             "user_username": instance.user.username,
             "user_first_name": instance.user.first_name,
@@ -448,32 +548,34 @@ class FillActivityMeta:
         }
 
         if instance.paid_at:
-            obj["paid_at"] = instance.paid_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["paid_at"] = _isoformat(instance.paid_at)
 
         if instance.refunded_at:
-            obj["refunded_at"] = instance.refunded_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["refunded_at"] = _isoformat(instance.refunded_at)
 
         return obj
 
     @classmethod
-    def bag(
+    def invoice(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.payments.models import Bag
+        return cls._fill("payments.Invoice", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = Bag.objects.filter(**kwargs).first()
+    @staticmethod
+    def _bags() -> QuerySet:
+        from breathecode.payments.models import Bag
 
-        if not instance:
-            raise RetryTask(f"Bag {related_id or related_slug} not found")
+        return Bag.objects.select_related("user")
 
+    @staticmethod
+    def _serialize_bag(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "status": instance.status,
             "type": instance.type,
             "chosen_period": instance.chosen_period,
             "how_many_installments": instance.how_many_installments,
-            "academy": instance.academy.id,
+            "academy": instance.academy_id,
             "user_email": instance.user.email,
             "user_username": instance.user.username,
             "user_first_name": instance.user.first_name,
@@ -483,22 +585,26 @@ class FillActivityMeta:
         }
 
         if instance.expires_at:
-            obj["expires_at"] = instance.expires_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["expires_at"] = _isoformat(instance.expires_at)
 
         return obj
 
     @classmethod
-    def subscription(
+    def bag(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.payments.models import Subscription
+        return cls._fill("payments.Bag", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = Subscription.objects.filter(**kwargs).first()
+    @staticmethod
+    def _subscriptions() -> QuerySet:
+        from breathecode.payments.models import Subscription
 
-        if not instance:
-            raise RetryTask(f"Subscription {related_id or related_slug} not found")
+        return Subscription.objects.select_related(
+            "user", "selected_cohort_set", "selected_mentorship_service_set", "selected_event_type_set"
+        )
 
+    @staticmethod
+    def _serialize_subscription(instance) -> dict[str, Any]:
         obj = {
             "id": instance.id,
             "status": instance.status,
@@ -506,7 +612,7 @@ class FillActivityMeta:
             "user_username": instance.user.username,
             "user_first_name": instance.user.first_name,
             "user_last_name": instance.user.last_name,
-            "academy": instance.academy.id,
+            "academy": instance.academy_id,
             "is_refundable": instance.is_refundable,
             "pay_every": instance.pay_every,
             "pay_every_unit": instance.pay_every_unit,
@@ -522,28 +628,32 @@ class FillActivityMeta:
             obj["selected_event_type_set"] = instance.selected_event_type_set.slug
 
         if instance.paid_at:
-            obj["paid_at"] = instance.paid_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["paid_at"] = _isoformat(instance.paid_at)
 
         if instance.next_payment_at:
-            obj["next_payment_at"] = instance.next_payment_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["next_payment_at"] = _isoformat(instance.next_payment_at)
 
         if instance.valid_until:
-            obj["valid_until"] = instance.valid_until.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["valid_until"] = _isoformat(instance.valid_until)
 
         return obj
 
     @classmethod
-    def plan_financing(
+    def subscription(
         cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
     ) -> dict[str, Any]:
-        from breathecode.payments.models import PlanFinancing
+        return cls._fill("payments.Subscription", related_id, related_slug)
 
-        kwargs = cls._get_query(related_id, related_slug)
-        instance = PlanFinancing.objects.filter(**kwargs).first()
+    @staticmethod
+    def _plan_financings() -> QuerySet:
+        from breathecode.payments.models import PlanFinancing
 
-        if not instance:
-            raise RetryTask(f"PlanFinancing {related_id or related_slug} not found")
+        return PlanFinancing.objects.select_related(
+            "user", "selected_cohort_set", "selected_mentorship_service_set", "selected_event_type_set"
+        )
 
+    @staticmethod
+    def _serialize_plan_financing(instance) -> dict[str, Any]:
         selected_mentorship_service_set = (
             instance.selected_mentorship_service_set.slug if instance.selected_mentorship_service_set else None
         )
@@ -556,7 +666,7 @@ class FillActivityMeta:
             "user_username": instance.user.username,
             "user_first_name": instance.user.first_name,
             "user_last_name": instance.user.last_name,
-            "academy": instance.academy.id,
+            "academy": instance.academy_id,
             "selected_mentorship_service_set": selected_mentorship_service_set,
             "selected_event_type_set": selected_event_type_set,
             "monthly_price": instance.monthly_price,
@@ -566,26 +676,33 @@ class FillActivityMeta:
             obj["selected_cohort_set"] = instance.selected_cohort_set.slug
 
         if instance.next_payment_at:
-            obj["next_payment_at"] = instance.next_payment_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["next_payment_at"] = _isoformat(instance.next_payment_at)
 
         if instance.valid_until:
-            obj["valid_until"] = instance.valid_until.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["valid_until"] = _isoformat(instance.valid_until)
 
         if instance.plan_expires_at:
-            obj["plan_expires_at"] = instance.plan_expires_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            obj["plan_expires_at"] = _isoformat(instance.plan_expires_at)
 
         return obj
 
+    @classmethod
+    def plan_financing(
+        cls, kind: str, related_id: Optional[str | int] = None, related_slug: Optional[str] = None
+    ) -> dict[str, Any]:
+        return cls._fill("payments.PlanFinancing", related_id, related_slug)
+
 
-def get_activity_meta(
+def check_activity_meta(
     kind: str,
     related_type: Optional[str] = None,
     related_id: Optional[str | int] = None,
     related_slug: Optional[str] = None,
-) -> dict[str, Any]:
+) -> bool:
+    """Check that the meta of an activity can be filled, it returns False if the activity has no meta."""
 
     if not related_type:
-        return {}
+        return False
 
     if related_type and not related_id and not related_slug:
         raise AbortTask("related_id or related_slug must be present")
@@ -593,6 +710,29 @@ def get_activity_meta(
     if related_type not in ALLOWED_TYPES:
         raise AbortTask(f"{related_type} is not supported yet")
 
+    if kind not in ALLOWED_TYPES[related_type]:
+        raise AbortTask(f"kind {kind} is not supported by {related_type} yet")
+
+    # the activities are filled in bulk, a bad lookup would break the whole batch
+    if related_id and _to_int(related_id) is None:
+        raise AbortTask(f"related_id {related_id} must be an integer")
+
+    if related_slug and not FillActivityMeta.has_slug(related_type):
+        raise AbortTask(f"{related_type} does not support related_slug")
+
+    return True
+
+
+def get_activity_meta(
+    kind: str,
+    related_type: Optional[str] = None,
+    related_id: Optional[str | int] = None,
+    related_slug: Optional[str] = None,
+) -> dict[str, Any]:
+
+    if check_activity_meta(kind, related_type, related_id, related_slug) is False:
+        return {}
+
     args = (kind, related_id, related_slug)
 
     if related_type == "auth.UserInvite" and kind in ALLOWED_TYPES["auth.UserInvite"]:
@@ -634,6 +774,71 @@ def get_activity_meta(
     raise AbortTask(f"kind {kind} is not supported by {related_type} yet")
 
 
+MAX_FILL_META_ATTEMPTS = 3
+
+
+def fill_activities_meta(activities: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Fill the meta of the buffered activities in bulk, with one query per related type.
+
+    It returns the activities ready to be uploaded and the ones whose related instance was not found yet, these must be
+    buffered again like add_activity did retrying the task, after some attempts they are uploaded without meta.
+    """
+
+    pending: dict[str, list[dict[str, Any]]] = {}
+
+    for activity in activities:
+        if activity.get("fill_meta"):
+            pending.setdefault(activity["data"]["related"]["type"], []).append(activity)
+
+    meta_by_activity: dict[int, Optional[dict[str, Any]]] = {}
+
+    for related_type, items in pending.items():
+        related = [x["data"]["related"] for x in items]
+
+        # a failing type is retried like the not found instances, it must not block the rest of the batch
+        try:
+            by_id, by_slug = FillActivityMeta.bulk(
+                related_type,
+                ids=[x["id"] for x in related if x["id"]],
+                slugs=[x["slug"] for x in related if x["slug"]],
+            )
+
+        except Exception:
+            logger.exception(f"Could not fill the meta of {related_type}")
+            by_id, by_slug = {}, {}
+
+        for activity in items:
+            x = activity["data"]["related"]
+            meta_by_activity[id(activity)] = by_id.get(str(_to_int(x["id"]))) if x["id"] else by_slug.get(x["slug"])
+
+    ready = []
+    retry = []
+
+    for activity in activities:
+        if not activity.get("fill_meta"):
+            ready.append(activity)
+            continue
+
+        data = activity["data"]
+        meta = meta_by_activity[id(activity)]
+
+        if meta is not None:
+            ready.append({"data": {**data, "meta": {**meta}}})
+            continue
+
+        attempts = activity.get("attempts", 0) + 1
+        if attempts < MAX_FILL_META_ATTEMPTS:
+            retry.append({**activity, "attempts": attempts})
+            continue
+
+        related = data["related"]
+        logger.error(f"{related['type']} {related['id'] or related['slug']} not found, uploading it without meta")
+        ready.append({"data": data})
+
+    return ready, retry
+
+
 @functools.lru_cache(maxsize=1)
 def get_workers_amount():
     dynos = int(os.getenv("CELERY_DYNOS") or 1)
@@ -679,6 +884,381 @@ def get_current_worker_number() -> int:
     return 0
 
 
+ACTIVITY_BUFFER_KEY = "activity:buffer"
+
+IS_DJANGO_REDIS = hasattr(cache, "fake") is False
+
+
+@functools.lru_cache(maxsize=1)
+def get_activity_upload_batch_size() -> int:
+    return int(os.getenv("ACTIVITY_UPLOAD_BATCH_SIZE", "10000"))
+
+
+def push_activity(activity: dict[str, Any]) -> None:
+    """
+    Append an activity to the buffer.
+
+    It is an append-only list shared by all the workers, adding an activity does not read the buffer nor take a lock.
+    """
+
+    data = pickle.dumps(activity, protocol=pickle.HIGHEST_PROTOCOL)
+
+    if IS_DJANGO_REDIS:
+        get_redis_connection("default").rpush(ACTIVITY_BUFFER_KEY, data)
+        return
+
+    cache.set(ACTIVITY_BUFFER_KEY, [*(cache.get(ACTIVITY_BUFFER_KEY) or []), data], timeout=None)
+
+
+def pop_activities(limit: Optional[int] = None) -> list[dict[str, Any]]:
+    """Remove and return up to `limit` activities from the head of the buffer."""
+
+    if limit is None:
+        limit = get_activity_upload_batch_size()
+
+    if IS_DJANGO_REDIS:
+        with get_redis_connection("default").pipeline(transaction=True) as pipe:
+            pipe.lrange(ACTIVITY_BUFFER_KEY, 0, limit - 1)
+            pipe.ltrim(ACTIVITY_BUFFER_KEY, limit, -1)
+            data, _ = pipe.execute()
+
+    else:
+        buffer = cache.get(ACTIVITY_BUFFER_KEY) or []
+        data = buffer[:limit]
+        cache.set(ACTIVITY_BUFFER_KEY, buffer[limit:], timeout=None)
+
+    return [pickle.loads(x) for x in data]
+
+
+ISO_STRING_PATTERN = re.compile(
+    r"^\d{4}-(0[1-9]|1[0-2])-([12]\d|0[1-9]|3[01])T([01]\d|2[0-3]):([0-5]\d):([0-5]\d)\.\d{6}(Z|\+\d{2}:\d{2})?$"
+)
+
+ACTIVITY_SCHEMA = [
+    bigquery.SchemaField("user_id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
+    bigquery.SchemaField("kind", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
+    bigquery.SchemaField("timestamp", bigquery.enums.SqlTypeNames.TIMESTAMP, "NULLABLE"),
+    bigquery.SchemaField(
+        "related",
+        bigquery.enums.SqlTypeNames.STRUCT,
+        "NULLABLE",
+        fields=[
+            bigquery.SchemaField("type", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
+            bigquery.SchemaField("id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
+            bigquery.SchemaField("slug", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
+        ],
+    ),
+]
+
+
+def get_meta_field_type(value: Any) -> str:
+    # keep it adobe than the date conditional
+    if isinstance(value, datetime) or (isinstance(value, str) and ISO_STRING_PATTERN.match(value)):
+        return bigquery.enums.SqlTypeNames.TIMESTAMP
+
+    if isinstance(value, date):
+        return bigquery.enums.SqlTypeNames.DATE
+
+    if isinstance(value, str):
+        return bigquery.enums.SqlTypeNames.STRING
+
+    if isinstance(value, bool):
+        return bigquery.enums.SqlTypeNames.BOOL
+
+    if isinstance(value, int):
+        return bigquery.enums.SqlTypeNames.INT64
+
+    if isinstance(value, float):
+        return bigquery.enums.SqlTypeNames.FLOAT64
+
+    return bigquery.enums.SqlTypeNames.STRING
+
+
+def get_activity_schema(activities: list[dict[str, Any]]) -> list[bigquery.SchemaField]:
+    """
+    Infer the schema of a batch of activities.
+
+    The meta of the activities of a kind share their fields, so each field is inferred once per kind instead of once
+    per activity, activities buffered by previous versions carry their own schema and it is reused.
+    """
+
+    schemas = []
+    meta_by_kind: dict[str, dict[str, bigquery.SchemaField]] = {}
+
+    for activity in activities:
+        if "schema" in activity:
+            schemas.append(activity["schema"])
+            continue
+
+        data = activity["data"]
+        fields = meta_by_kind.setdefault(data["kind"], {})
+
+        for key, value in data["meta"].items():
+            if key not in fields:
+                fields[key] = bigquery.SchemaField(key, get_meta_field_type(value))
+
+    for fields in meta_by_kind.values():
+        meta_field = bigquery.SchemaField(
+            "meta", bigquery.enums.SqlTypeNames.STRUCT, "NULLABLE", fields=list(fields.values())
+        )
+        schemas.append([*ACTIVITY_SCHEMA, meta_field])
+
+    from breathecode.services.google_cloud.big_query import BigQuery
+
+    return list(BigQuery.join_schemas(*schemas))
+
+
+READ_MODEL_SINCE_KEY = "activity:read-model:since"
+
+
+@functools.lru_cache(maxsize=1)
+def get_read_model_days() -> int:
+    return int(os.getenv("ACTIVITY_READ_MODEL_DAYS", "30"))
+
+
+def get_read_model_start() -> Optional[datetime]:
+    """Get the oldest timestamp covered by the read model, None if it was not populated yet."""
+
+    since = cache.get(READ_MODEL_SINCE_KEY)
+    if since is None:
+        return None
+
+    return max(since, timezone.now() - timedelta(days=get_read_model_days()))
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+
+    except (TypeError, ValueError):
+        return None
+
+
+def save_recent_activities(rows: list[dict[str, Any]]) -> None:
+    """Save the activities uploaded to BigQuery into the read model and remove the ones that left the window."""
+
+    from .models import RecentActivity
+
+    activities = []
+    for row in rows:
+        meta = row.get("meta") or {}
+        related = row.get("related") or {}
+        timestamp = row["timestamp"]
+
+        activities.append(
+            RecentActivity(
+                id=row["id"],
+                user_id=row["user_id"],
+                kind=row["kind"],
+                timestamp=parse_activity_timestamp(timestamp),
+                related_type=related.get("type"),
+                related_id=_to_int(related.get("id")),
+                related_slug=related.get("slug"),
+                academy_id=_to_int(meta.get("academy")),
+                cohort=str(meta["cohort"]) if meta.get("cohort") is not None else None,
+                meta=meta,
+            )
+        )
+
+    RecentActivity.objects.bulk_create(activities, batch_size=1000, ignore_conflicts=True)
+
+    # the read model only covers the activities uploaded from its first batch on
+    if activities and cache.get(READ_MODEL_SINCE_KEY) is None:
+        cache.set(READ_MODEL_SINCE_KEY, min(x.timestamp for x in activities), timeout=None)
+
+    RecentActivity.objects.filter(timestamp__lt=timezone.now() - timedelta(days=get_read_model_days())).delete()
+
+
+def skip_recent_activities(rows: list[dict[str, Any]]) -> None:
+    """
+    Move the start of the read model after some activities that could not be saved into it.
+
+    These activities are already in BigQuery, it serves everything before the start of the read model.
+    """
+
+    timestamps = [parse_activity_timestamp(x["timestamp"]) for x in rows]
+    if not timestamps:
+        return
+
+    since = max(timestamps) + timedelta(microseconds=1)
+    current = cache.get(READ_MODEL_SINCE_KEY)
+    if current is None or current < since:
+        cache.set(READ_MODEL_SINCE_KEY, since, timeout=None)
+
+
+def parse_activity_timestamp(value: str | datetime, slug: str = "invalid-timestamp") -> datetime:
+    """Parse a timestamp, the ones without timezone are in UTC like in BigQuery."""
+
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+
+        except ValueError:
+            raise ValidationException(f"Invalid timestamp {value}", slug=slug)
+
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+
+    return value
+
+
+def encode_activity_cursor(timestamp: datetime, activity_id: str) -> str:
+    data = json.dumps([timestamp.isoformat(), activity_id]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_activity_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        timestamp, activity_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return parse_activity_timestamp(timestamp), str(activity_id)
+
+    except Exception:
+        raise ValidationException("Invalid cursor", slug="invalid-cursor")
+
+
+def list_activities(
+    user_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    academy_id: Optional[int] = None,
+    kind: Optional[str] = None,
+    cohort: Optional[str | int] = None,
+    date_start: Optional[datetime] = None,
+    date_end: Optional[datetime] = None,
+) -> tuple[list[Any], Optional[str]]:
+    """
+    List the activities of a user from the newest to the oldest with keyset pagination.
+
+    The activities covered by the read model are read from it, BigQuery is only queried to complete the page with
+    older activities. It returns the activities and the cursor of the next page.
+    """
+
+    from breathecode.services.google_cloud.big_query import BigQuery
+
+    from .models import RecentActivity
+
+    if date_start:
+        date_start = parse_activity_timestamp(date_start, slug="invalid-date-start")
+
+    if date_end:
+        date_end = parse_activity_timestamp(date_end, slug="invalid-date-end")
+
+    position = decode_activity_cursor(cursor) if cursor else None
+    start = get_read_model_start()
+    res = []
+
+    if start and (date_end is None or date_end >= start) and (position is None or position[0] >= start):
+        qs = RecentActivity.objects.filter(user_id=user_id, timestamp__gte=start)
+
+        if academy_id is not None:
+            qs = qs.filter(academy_id=academy_id)
+
+        if kind:
+            qs = qs.filter(kind=kind)
+
+        if cohort:
+            qs = qs.filter(cohort=str(cohort))
+
+        if date_start:
+            qs = qs.filter(timestamp__gte=date_start)
+
+        if date_end:
+            qs = qs.filter(timestamp__lte=date_end)
+
+        if position:
+            # the redundant bound lets the database scan the index as a range
+            qs = qs.filter(timestamp__lte=position[0]).filter(
+                Q(timestamp__lt=position[0]) | Q(timestamp=position[0], id__lt=position[1])
+            )
+
+        res = list(qs.order_by("-timestamp", "-id")[:limit])
+
+    if len(res) < limit and (start is None or date_start is None or date_start < start):
+        client, project_id, dataset = BigQuery.client()
+        cohort_id = _to_int(cohort)
+
+        # the cursor only applies to BigQuery if the previous page ended there
+        if position and start and position[0] >= start:
+            position = None
+
+        query = f"""
+            SELECT *
+            FROM `{project_id}.{dataset}.activity`
+            WHERE user_id = @user_id
+                {'AND meta.academy = @academy_id' if academy_id is not None else ''}
+                {'AND kind = @kind' if kind else ''}
+                {'AND timestamp >= @date_start' if date_start else ''}
+                {'AND timestamp <= @date_end' if date_end else ''}
+                {'AND meta.cohort = @cohort_id' if cohort and cohort_id is not None else ''}
+                {'AND meta.cohort = @cohort_slug' if cohort and cohort_id is None else ''}
+                {'AND timestamp < @read_model_start' if start else ''}
+                {'AND timestamp <= @cursor_timestamp' if position else ''}
+                {'AND (timestamp < @cursor_timestamp OR (timestamp = @cursor_timestamp AND id < @cursor_id))' if position else ''}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT @limit
+        """
+
+        params = [
+            bigquery.ScalarQueryParameter("user_id", "INT64", user_id),
+            bigquery.ScalarQueryParameter("limit", "INT64", limit - len(res)),
+        ]
+
+        if academy_id is not None:
+            params.append(bigquery.ScalarQueryParameter("academy_id", "INT64", int(academy_id)))
+
+        if kind:
+            params.append(bigquery.ScalarQueryParameter("kind", "STRING", kind))
+
+        if date_start:
+            params.append(bigquery.ScalarQueryParameter("date_start", "TIMESTAMP", date_start))
+
+        if date_end:
+            params.append(bigquery.ScalarQueryParameter("date_end", "TIMESTAMP", date_end))
+
+        if cohort and cohort_id is not None:
+            params.append(bigquery.ScalarQueryParameter("cohort_id", "INT64", cohort_id))
+
+        elif cohort:
+            params.append(bigquery.ScalarQueryParameter("cohort_slug", "STRING", str(cohort)))
+
+        if start:
+            params.append(bigquery.ScalarQueryParameter("read_model_start", "TIMESTAMP", start))
+
+        if position:
+            params.append(bigquery.ScalarQueryParameter("cursor_timestamp", "TIMESTAMP", position[0]))
+            params.append(bigquery.ScalarQueryParameter("cursor_id", "STRING", position[1]))
+
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        res += list(client.query(query, job_config=job_config).result())
+
+    next_cursor = None
+    if res and len(res) == limit:
+        last = res[-1]
+        timestamp = last.timestamp
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+
+        next_cursor = encode_activity_cursor(timestamp, last.id)
+
+    return res, next_cursor
+
+
+def get_recent_activity(activity_id: str, user_id: int, academy_id: Optional[int] = None):
+    """Get an activity from the read model, None if it is not there."""
+
+    from .models import RecentActivity
+
+    start = get_read_model_start()
+    if start is None:
+        return None
+
+    qs = RecentActivity.objects.filter(id=activity_id, user_id=user_id, timestamp__gte=start)
+    if academy_id is not None:
+        qs = qs.filter(academy_id=academy_id)
+
+    return qs.first()
+
+
 def get_engagement_points(related_type: str, kind: str, related_id: Optional[int] = None) -> float:
     """
     Get engagement points for a specific activity.
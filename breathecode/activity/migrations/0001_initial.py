@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:13
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="RecentActivity",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        help_text="Id of the activity in BigQuery", max_length=36, primary_key=True, serialize=False
+                    ),
+                ),
+                ("user_id", models.IntegerField()),
+                ("kind", models.CharField(max_length=100)),
+                ("timestamp", models.DateTimeField()),
+                ("related_type", models.CharField(blank=True, default=None, max_length=100, null=True)),
+                ("related_id", models.BigIntegerField(blank=True, default=None, null=True)),
+                ("related_slug", models.CharField(blank=True, default=None, max_length=150, null=True)),
+                (
+                    "academy_id",
+                    models.IntegerField(blank=True, default=None, help_text="Copied from meta.academy", null=True),
+                ),
+                (
+                    "cohort",
+                    models.CharField(
+                        blank=True,
+                        default=None,
+                        help_text="Copied from meta.cohort, it's an id or a slug",
+                        max_length=150,
+                        null=True,
+                    ),
+                ),
+                (
+                    "meta",
+                    models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["user_id", "-timestamp", "-id"], name="activity_re_user_id_5c60d0_idx"),
+                    models.Index(
+                        fields=["academy_id", "user_id", "-timestamp", "-id"], name="activity_re_academy_cc1be4_idx"
+                    ),
+                    models.Index(fields=["timestamp"], name="activity_re_timesta_a0df3b_idx"),
+                ],
+            },
+        ),
+    ]
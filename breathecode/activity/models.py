@@ -1,5 +1,7 @@
 import os
 
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
 from google.cloud import bigquery, ndb
 
 
@@ -52,3 +54,40 @@ ACTIVITY = [
     ),
     bigquery.SchemaField("timestamp", "TIMESTAMP", mode="REQUIRED"),
 ]
+
+
+class RecentActivity(models.Model):
+    """
+    Read model with the activities of the last days, it is populated by `upload_activities`.
+
+    The activity endpoints read it with keyset pagination and only query BigQuery for older activities.
+    """
+
+    id = models.CharField(max_length=36, primary_key=True, help_text="Id of the activity in BigQuery")
+    user_id = models.IntegerField()
+    kind = models.CharField(max_length=100)
+    timestamp = models.DateTimeField()
+
+    related_type = models.CharField(max_length=100, null=True, blank=True, default=None)
+    related_id = models.BigIntegerField(null=True, blank=True, default=None)
+    related_slug = models.CharField(max_length=150, null=True, blank=True, default=None)
+
+    academy_id = models.IntegerField(null=True, blank=True, default=None, help_text="Copied from meta.academy")
+    cohort = models.CharField(
+        max_length=150, null=True, blank=True, default=None, help_text="Copied from meta.cohort, it's an id or a slug"
+    )
+    meta = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "-timestamp", "-id"]),
+            models.Index(fields=["academy_id", "user_id", "-timestamp", "-id"]),
+            models.Index(fields=["timestamp"]),
+        ]
+
+    @property
+    def related(self):
+        return {"type": self.related_type, "id": self.related_id, "slug": self.related_slug}
+
+    def __str__(self):
+        return f"{self.kind} ({self.id})"
@@ -2,9 +2,8 @@ import functools
 import logging
 import os
 import pickle
-import re
 import uuid
-from datetime import date, datetime, timedelta
+from datetime import timedelta
 from typing import Optional
 
 import zstandard
@@ -13,7 +12,6 @@ from celery import shared_task
 from django.core.cache import cache
 from django.utils import timezone
 from django_redis import get_redis_connection
-from google.cloud import bigquery
 from redis.exceptions import LockError
 from task_manager.core.exceptions import AbortTask, RetryTask
 from task_manager.django.decorators import task
@@ -38,16 +36,22 @@ def get_activity_sampling_rate():
     return 60
 
 
+ENABLE_LIST_OPTIONS = ["true", "1", "yes", "y"]
+
+
+@functools.lru_cache(maxsize=1)
+def should_drain_worker_buffers():
+    """Whether the legacy per worker buffers are still read, add_activity does not write them anymore."""
+
+    return os.getenv("ACTIVITY_DRAIN_WORKER_BUFFERS", "1").lower() in ENABLE_LIST_OPTIONS
+
+
 IS_DJANGO_REDIS = hasattr(cache, "fake") is False
 
 API_URL = os.getenv("API_URL", "")
 
 logger = logging.getLogger(__name__)
 
-ISO_STRING_PATTERN = re.compile(
-    r"^\d{4}-(0[1-9]|1[0-2])-([12]\d|0[1-9]|3[01])T([01]\d|2[0-3]):([0-5]\d):([0-5]\d)\.\d{6}(Z|\+\d{2}:\d{2})?$"
-)
-
 
 @shared_task(bind=True, priority=TaskPriority.ACADEMY.value)
 def get_attendancy_log(self, cohort_id: int):
@@ -171,7 +175,7 @@ def get_attendancy_log_per_cohort_user(cohort_user_id: int):
 @task(bind=True, priority=TaskPriority.ACTIVITY.value)
 def upload_activities(self, task_manager_id: int, **_):
 
-    def extract_data():
+    def extract_legacy_data():
         nonlocal worker, res
 
         client = None
@@ -200,6 +204,38 @@ def upload_activities(self, task_manager_id: int, **_):
 
             worker += 1
 
+    def extract_data():
+        nonlocal res
+
+        # the activities are removed from the buffer, from here they only exist in this task or in its backup
+        activities = actions.pop_activities()
+
+        try:
+            activities, retry = actions.fill_activities_meta(activities)
+
+        except Exception:
+            for activity in activities:
+                actions.push_activity(activity)
+
+            raise
+
+        # their related instances were not found yet, they will be filled in the next upload
+        for activity in retry:
+            actions.push_activity(activity)
+
+        # the legacy buffers are drained once the meta was filled, so a failure above keeps them in the cache
+        if should_drain_worker_buffers():
+            try:
+                extract_legacy_data()
+
+            except Exception:
+                for activity in activities:
+                    actions.push_activity(activity)
+
+                raise
+
+        res += activities
+
     if feature.is_enabled("activity.logs") is False:
         raise AbortTask("Activity is disabled")
 
@@ -247,27 +283,41 @@ def upload_activities(self, task_manager_id: int, **_):
         raise AbortTask("No data to upload")
 
     table = BigQuery.table("activity")
-    schema = table.schema()
 
-    rows = [x["data"] for x in res]
-    new_schema = BigQuery.join_schemas(*[x["schema"] for x in res])
+    try:
+        schema = table.cached_schema()
 
-    diff = BigQuery.schema_difference(schema, new_schema)
+        rows = [x["data"] for x in res]
+        new_schema = actions.get_activity_schema(res)
 
-    try:
-        if diff:
-            merged_schema = BigQuery.merge_schema(diff, schema)
-            table.update_schema(merged_schema)
+        if BigQuery.has_new_fields(schema, new_schema):
+            # the cached schema could be outdated, the new fields are merged into the current one
+            schema = table.schema()
 
-        table.bulk_insert(rows)
+            if BigQuery.has_new_fields(schema, new_schema):
+                diff = BigQuery.schema_difference(schema, new_schema)
+                merged_schema = BigQuery.merge_schema(diff, schema)
+                table.update_schema(merged_schema)
+                schema = merged_schema
+
+        table.bulk_insert(rows, schema=schema)
 
     except Exception as e:
         data = pickle.dumps(res)
         data = zstandard.compress(data)
 
         cache.set(backup_key, data)
+        table.clear_schema_cache()
         raise e
 
+    # the activities were uploaded, the read model must not trigger a backup
+    try:
+        actions.save_recent_activities(rows)
+
+    except Exception:
+        logger.exception("Could not save the activities into the read model, they will be read from BigQuery")
+        actions.skip_recent_activities(rows)
+
 
 @task(priority=TaskPriority.BACKGROUND.value)
 def add_activity(
@@ -296,93 +346,25 @@ def add_activity(
     if not related_type and (related_id or related_slug):
         raise AbortTask("If related_type is not provided, both related_id and related_slug must also be absent.")
 
-    client = None
-    if IS_DJANGO_REDIS:
-        client = get_redis_connection("default")
-
-    worker = actions.get_current_worker_number()
-
-    try:
-        with Lock(client, f"lock:activity:worker-{worker}", timeout=30, blocking_timeout=30):
-            worker_storage_key = f"activity:worker-{worker}"
-            data = cache.get(worker_storage_key)
-
-            if data:
-                data = zstandard.decompress(data)
-                data = pickle.loads(data)
-
-            else:
-                data = []
-
-            res = {
-                "schema": [
-                    bigquery.SchemaField("user_id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                    bigquery.SchemaField("kind", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                    bigquery.SchemaField("timestamp", bigquery.enums.SqlTypeNames.TIMESTAMP, "NULLABLE"),
-                    bigquery.SchemaField(
-                        "related",
-                        bigquery.enums.SqlTypeNames.STRUCT,
-                        "NULLABLE",
-                        fields=[
-                            bigquery.SchemaField("type", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                            bigquery.SchemaField("id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                            bigquery.SchemaField("slug", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                        ],
-                    ),
-                ],
-                "data": {
-                    "id": uuid.uuid4().hex,
-                    "user_id": user_id,
-                    "kind": kind,
-                    "timestamp": timestamp,
-                    "related": {
-                        "type": related_type,
-                        "id": related_id,
-                        "slug": related_slug,
-                    },
-                    "meta": {},
-                },
-            }
-
-            fields = []
-
-            meta = actions.get_activity_meta(kind, related_type, related_id, related_slug)
-
-            for key in meta:
-                t = bigquery.enums.SqlTypeNames.STRING
-
-                # keep it adobe than the date conditional
-                if isinstance(meta[key], datetime) or (
-                    isinstance(meta[key], str) and ISO_STRING_PATTERN.match(meta[key])
-                ):
-                    t = bigquery.enums.SqlTypeNames.TIMESTAMP
-                elif isinstance(meta[key], date):
-                    t = bigquery.enums.SqlTypeNames.DATE
-                elif isinstance(meta[key], str):
-                    pass
-                elif isinstance(meta[key], bool):
-                    t = bigquery.enums.SqlTypeNames.BOOL
-                elif isinstance(meta[key], int):
-                    t = bigquery.enums.SqlTypeNames.INT64
-                elif isinstance(meta[key], float):
-                    t = bigquery.enums.SqlTypeNames.FLOAT64
-
-                # res['data'].append(serialize_field(key, meta[key], t))
-                # res.append(serialize_field(key, meta[key], t, struct='meta'))
-
-                fields.append(bigquery.SchemaField(key, t))
-                res["data"]["meta"][key] = meta[key]
-
-            meta_field = bigquery.SchemaField("meta", bigquery.enums.SqlTypeNames.STRUCT, "NULLABLE", fields=fields)
-            # meta_field = bigquery.SchemaField('meta', 'STRUCT', 'NULLABLE', fields=fields)
-            res["schema"].append(meta_field)
-            # res['schema']['meta'] = meta_field
-
-            data.append(res)
-            data = pickle.dumps(data)
-            data = zstandard.compress(data)
-
-            cache.set(worker_storage_key, data)
-
-    except LockError:
-        raise RetryTask("Could not acquire lock for activity, operation timed out.")
+    # the meta is filled in bulk by upload_activities and the schema is inferred there, only the row is buffered
+    fill_meta = actions.check_activity_meta(kind, related_type, related_id, related_slug)
+
+    res = {
+        "data": {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "kind": kind,
+            "timestamp": timestamp,
+            "related": {
+                "type": related_type,
+                "id": related_id,
+                "slug": related_slug,
+            },
+            "meta": {},
+        },
+    }
+
+    if fill_meta:
+        res["fill_meta"] = True
+
+    actions.push_activity(res)
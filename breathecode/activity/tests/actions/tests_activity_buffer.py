@@ -0,0 +1,53 @@
+import pickle
+from unittest.mock import MagicMock, call
+
+import pytest
+from django.core.cache import cache
+
+from breathecode.activity import actions
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch):
+    conn = MagicMock()
+    pipe = conn.pipeline.return_value.__enter__.return_value
+
+    monkeypatch.setattr("breathecode.activity.actions.IS_DJANGO_REDIS", True)
+    monkeypatch.setattr("breathecode.activity.actions.get_redis_connection", lambda *args, **kwargs: conn)
+
+    yield conn, pipe
+
+
+def test_push_and_pop():
+    actions.push_activity({"data": 1})
+    actions.push_activity({"data": 2})
+    actions.push_activity({"data": 3})
+
+    assert actions.pop_activities(2) == [{"data": 1}, {"data": 2}]
+    assert actions.pop_activities(2) == [{"data": 3}]
+    assert actions.pop_activities(2) == []
+    assert cache.get("activity:buffer") == []
+
+
+def test_push_in_redis(redis):
+    conn, _ = redis
+
+    actions.push_activity({"data": 1})
+
+    assert conn.rpush.call_args_list == [call("activity:buffer", pickle.dumps({"data": 1}, pickle.HIGHEST_PROTOCOL))]
+
+
+def test_pop_in_redis(redis):
+    conn, pipe = redis
+    pipe.execute.return_value = [[pickle.dumps({"data": 1}), pickle.dumps({"data": 2})], True]
+
+    assert actions.pop_activities(100) == [{"data": 1}, {"data": 2}]
+
+    assert conn.pipeline.call_args_list == [call(transaction=True)]
+    assert pipe.lrange.call_args_list == [call("activity:buffer", 0, 99)]
+    assert pipe.ltrim.call_args_list == [call("activity:buffer", 100, -1)]
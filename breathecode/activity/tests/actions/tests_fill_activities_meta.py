@@ -0,0 +1,119 @@
+import logging
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from breathecode.activity import actions
+from breathecode.activity.actions import FillActivityMeta, fill_activities_meta
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("logging.Logger.error", MagicMock())
+    yield
+
+
+def get_activity(related_type, related_id=None, related_slug=None, **kwargs):
+    return {
+        "data": {
+            "id": "1",
+            "user_id": 1,
+            "kind": "login",
+            "timestamp": "2024-01-01T00:00:00.000000Z",
+            "related": {"type": related_type, "id": related_id, "slug": related_slug},
+            "meta": {},
+        },
+        "fill_meta": True,
+        **kwargs,
+    }
+
+
+def test_bulk_with_one_query(bc: Breathecode, django_assert_num_queries):
+    model = bc.database.create(user=3)
+
+    with django_assert_num_queries(1):
+        by_id, by_slug = FillActivityMeta.bulk("auth.User", ids=[x.id for x in model.user] + [4])
+
+    assert by_id == {str(x.id): {"id": x.id, "email": x.email, "username": x.username} for x in model.user}
+    assert by_slug == {}
+
+
+def test_bulk_matches_the_per_row_meta(bc: Breathecode):
+    model = bc.database.create(cohort_user=2, task=2)
+
+    for related_type, method, instances in [
+        ("admissions.CohortUser", FillActivityMeta.cohort_user, model.cohort_user),
+        ("assignments.Task", FillActivityMeta.task, model.task),
+    ]:
+        by_id, _ = FillActivityMeta.bulk(related_type, ids=[x.id for x in instances])
+        assert by_id == {str(x.id): method("kind", x.id, None) for x in instances}
+
+
+def test_fill_activities_meta(bc: Breathecode, django_assert_num_queries):
+    model = bc.database.create(user=2, cohort_user=1)
+    legacy = {"data": get_activity("auth.User", 1)["data"], "schema": []}
+
+    activities = [
+        get_activity("auth.User", model.user[0].id),
+        get_activity("auth.User", model.user[1].id),
+        get_activity("admissions.CohortUser", model.cohort_user.id),
+        get_activity(None, fill_meta=False),
+        legacy,
+    ]
+
+    with django_assert_num_queries(2):
+        ready, retry = fill_activities_meta(activities)
+
+    assert retry == []
+    assert [x["data"]["meta"] for x in ready] == [
+        FillActivityMeta.user("login", model.user[0].id),
+        FillActivityMeta.user("login", model.user[1].id),
+        FillActivityMeta.cohort_user("login", model.cohort_user.id),
+        {},
+        {},
+    ]
+    assert all("fill_meta" not in x for x in ready[:3])
+
+
+def test_fill_activities_meta__not_found():
+    ready, retry = fill_activities_meta([get_activity("auth.User", 1), get_activity("auth.User", 2, attempts=2)])
+
+    assert retry == [get_activity("auth.User", 1, attempts=1)]
+    assert ready == [{"data": get_activity("auth.User", 2)["data"]}]
+
+    assert logging.Logger.error.call_args_list == [call("auth.User 2 not found, uploading it without meta")]
+
+
+def test_bulk_ignores_bad_ids_and_slugs_of_types_without_slug(bc: Breathecode, django_assert_num_queries):
+    model = bc.database.create(user=1)
+
+    with django_assert_num_queries(1):
+        by_id, by_slug = FillActivityMeta.bulk("auth.User", ids=[model.user.id, "abc"], slugs=["my-user"])
+
+    assert by_id == {str(model.user.id): FillActivityMeta.user("login", model.user.id)}
+    assert by_slug == {}
+
+
+def test_fill_activities_meta__a_failing_type_does_not_block_the_batch(
+    bc: Breathecode, monkeypatch: pytest.MonkeyPatch
+):
+    model = bc.database.create(user=1)
+    bulk = FillActivityMeta.bulk
+
+    def fail_with_tasks(related_type, *args, **kwargs):
+        if related_type == "assignments.Task":
+            raise Exception("boom")
+
+        return bulk(related_type, *args, **kwargs)
+
+    monkeypatch.setattr(FillActivityMeta, "bulk", fail_with_tasks)
+    monkeypatch.setattr("logging.Logger.exception", MagicMock())
+
+    ready, retry = fill_activities_meta([get_activity("auth.User", model.user.id), get_activity("assignments.Task", 1)])
+
+    data = get_activity("auth.User", model.user.id)["data"]
+
+    assert ready == [{"data": {**data, "meta": FillActivityMeta.user("login", model.user.id)}}]
+    assert retry == [get_activity("assignments.Task", 1, attempts=1)]
+    assert logging.Logger.exception.call_args_list == [call("Could not fill the meta of assignments.Task")]
@@ -97,3 +97,11 @@ class MediaTestSuite(MediaTestCase):
 
                 self.bc.check.calls(mock.call_args_list, [call(kind, 1, None)])
                 self.assertEqual(meta, obj)
+
+    def test_related_id_is_not_an_integer(self):
+        with self.assertRaisesMessage(AbortTask, "related_id abc must be an integer"):
+            get_activity_meta("login", related_type="auth.User", related_id="abc")
+
+    def test_related_slug_of_a_type_without_slug(self):
+        with self.assertRaisesMessage(AbortTask, "auth.User does not support related_slug"):
+            get_activity_meta("login", related_type="auth.User", related_slug="my-user")
@@ -0,0 +1,68 @@
+from google.cloud import bigquery
+
+from breathecode.activity import actions
+
+
+def get_data(kind, meta):
+    return {
+        "data": {
+            "id": "1",
+            "user_id": 1,
+            "kind": kind,
+            "timestamp": "2024-01-01T00:00:00.000000Z",
+            "related": {"type": None, "id": None, "slug": None},
+            "meta": meta,
+        },
+    }
+
+
+def get_meta(schema):
+    meta = [x for x in schema if x.name == "meta"][0]
+    return {x.name: x.field_type for x in meta.fields}
+
+
+def test_base_fields():
+    schema = actions.get_activity_schema([get_data("login", {})])
+
+    assert sorted([x.name for x in schema]) == ["kind", "meta", "related", "timestamp", "user_id"]
+    assert get_meta(schema) == {}
+
+
+def test_meta_fields_are_joined_across_kinds():
+    schema = actions.get_activity_schema(
+        [
+            get_data("login", {"email": "a@b.c", "attempts": 1}),
+            get_data("login", {"email": "d@e.f", "attempts": 2}),
+            get_data(
+                "joined_cohort",
+                {"cohort": "web-dev", "score": 1.5, "is_active": True, "starts_at": "2024-01-01T00:00:00.000000Z"},
+            ),
+        ]
+    )
+
+    assert get_meta(schema) == {
+        "email": "STRING",
+        "attempts": "INTEGER",
+        "cohort": "STRING",
+        "score": "FLOAT",
+        "is_active": "BOOLEAN",
+        "starts_at": "TIMESTAMP",
+    }
+
+
+def test_activities_with_their_own_schema():
+    legacy = {
+        **get_data("login", {"email": "a@b.c"}),
+        "schema": [
+            bigquery.SchemaField(
+                "meta",
+                bigquery.enums.SqlTypeNames.STRUCT,
+                "NULLABLE",
+                fields=[bigquery.SchemaField("email", bigquery.enums.SqlTypeNames.STRING)],
+            ),
+        ],
+    }
+
+    schema = actions.get_activity_schema([legacy, get_data("joined_cohort", {"cohort": "web-dev"})])
+
+    assert get_meta(schema) == {"email": "STRING", "cohort": "STRING"}
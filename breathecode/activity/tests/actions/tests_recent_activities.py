@@ -0,0 +1,174 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from capyc.rest_framework.exceptions import ValidationException
+from django.core.cache import cache
+from django.utils import timezone
+
+from breathecode.activity import actions
+from breathecode.activity.models import RecentActivity
+from breathecode.utils.attr_dict import AttrDict
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    yield
+
+
+@pytest.fixture
+def bigquery(monkeypatch: pytest.MonkeyPatch):
+    client = MagicMock()
+    client.query.return_value.result.return_value = []
+
+    monkeypatch.setattr(
+        "breathecode.services.google_cloud.big_query.BigQuery.client",
+        MagicMock(return_value=(client, "test", "4geeks")),
+    )
+
+    yield client
+
+
+def get_row(n, minutes, user_id=1, **meta):
+    return {
+        "id": f"{n:032}",
+        "user_id": user_id,
+        "kind": "login",
+        "timestamp": (UTC_NOW - timedelta(minutes=minutes)).isoformat(),
+        "related": {"type": "auth.User", "id": user_id, "slug": None},
+        "meta": meta,
+    }
+
+
+def normalize(query):
+    return " ".join(query.split())
+
+
+def test_save_recent_activities():
+    rows = [
+        get_row(1, 1, academy=1, cohort=2),
+        get_row(2, 2),
+        get_row(3, 60 * 24 * 31),
+    ]
+
+    actions.save_recent_activities(rows)
+    actions.save_recent_activities(rows[:1])
+
+    assert cache.get(actions.READ_MODEL_SINCE_KEY) == UTC_NOW - timedelta(days=31)
+    assert actions.get_read_model_start() == UTC_NOW - timedelta(days=30)
+    assert [(x.id, x.academy_id, x.cohort, x.related_id, x.meta) for x in RecentActivity.objects.order_by("id")] == [
+        (rows[0]["id"], 1, "2", 1, {"academy": 1, "cohort": 2}),
+        (rows[1]["id"], None, None, 1, {}),
+    ]
+
+
+def test_skip_recent_activities():
+    actions.save_recent_activities([get_row(1, 5)])
+    actions.skip_recent_activities([get_row(2, 2), get_row(3, 3)])
+
+    # the skipped activities are served by BigQuery
+    assert actions.get_read_model_start() == UTC_NOW - timedelta(minutes=2) + timedelta(microseconds=1)
+
+    actions.skip_recent_activities([get_row(4, 4)])
+
+    assert actions.get_read_model_start() == UTC_NOW - timedelta(minutes=2) + timedelta(microseconds=1)
+
+
+def test_list_with_bad_dates(bigquery):
+    with pytest.raises(ValidationException, match="invalid-date-start"):
+        actions.list_activities(1, limit=1, date_start="yesterday")
+
+    with pytest.raises(ValidationException, match="invalid-date-end"):
+        actions.list_activities(1, limit=1, date_end="2024-13-01")
+
+
+def test_list_with_naive_dates(bigquery):
+    actions.save_recent_activities([get_row(1, 1)])
+    date_start = (UTC_NOW - timedelta(minutes=2)).replace(tzinfo=None).isoformat()
+
+    res, _ = actions.list_activities(1, limit=1, date_start=date_start)
+
+    assert [x.id for x in res] == [get_row(1, 1)["id"]]
+
+
+def test_cursor():
+    cursor = actions.encode_activity_cursor(UTC_NOW, "abc")
+
+    assert actions.decode_activity_cursor(cursor) == (UTC_NOW, "abc")
+
+    with pytest.raises(ValidationException, match="invalid-cursor"):
+        actions.decode_activity_cursor("not-a-cursor")
+
+
+def test_list_from_bigquery_if_the_read_model_was_not_populated(bigquery):
+    row = AttrDict(**get_row(1, 1))
+    bigquery.query.return_value.result.return_value = [row]
+
+    res, cursor = actions.list_activities(1, limit=1)
+
+    assert res == [row]
+    assert cursor == actions.encode_activity_cursor(UTC_NOW - timedelta(minutes=1), row.id)
+    assert "OFFSET" not in bigquery.query.call_args[0][0]
+    assert "timestamp < @read_model_start" not in bigquery.query.call_args[0][0]
+
+
+def test_list_from_the_read_model(bigquery, django_assert_num_queries):
+    actions.save_recent_activities([get_row(n, n, academy=1) for n in range(1, 6)] + [get_row(6, 1, user_id=2)])
+
+    with django_assert_num_queries(1):
+        res, cursor = actions.list_activities(1, limit=2, academy_id=1)
+
+    assert [x.id for x in res] == [get_row(1, 1)["id"], get_row(2, 2)["id"]]
+
+    res, cursor = actions.list_activities(1, limit=2, cursor=cursor, academy_id=1)
+
+    assert [x.id for x in res] == [get_row(3, 3)["id"], get_row(4, 4)["id"]]
+    assert bigquery.query.call_count == 0
+
+
+def test_list_falls_back_to_bigquery_for_the_older_activities(bigquery):
+    cache.set(actions.READ_MODEL_SINCE_KEY, UTC_NOW - timedelta(minutes=10), timeout=None)
+    actions.save_recent_activities([get_row(1, 1), get_row(2, 2)])
+
+    older = AttrDict(**get_row(3, 20))
+    bigquery.query.return_value.result.return_value = [older]
+
+    res, cursor = actions.list_activities(1, limit=3, kind="login")
+
+    assert [x.id for x in res] == [get_row(1, 1)["id"], get_row(2, 2)["id"], older.id]
+    assert normalize(bigquery.query.call_args[0][0]) == " ".join(
+        [
+            "SELECT *",
+            "FROM `test.4geeks.activity`",
+            "WHERE user_id = @user_id",
+            "AND kind = @kind",
+            "AND timestamp < @read_model_start",
+            "ORDER BY timestamp DESC, id DESC",
+            "LIMIT @limit",
+        ]
+    )
+
+    params = {x.name: x.value for x in bigquery.query.call_args[1]["job_config"].query_parameters}
+    assert params == {
+        "user_id": 1,
+        "limit": 1,
+        "kind": "login",
+        "read_model_start": UTC_NOW - timedelta(minutes=10),
+    }
+
+    # the next page is read from BigQuery only
+    res, _ = actions.list_activities(1, limit=3, cursor=cursor)
+
+    assert "id < @cursor_id" in bigquery.query.call_args[0][0]
+    assert RecentActivity.objects.count() == 2
+
+
+def test_get_recent_activity():
+    actions.save_recent_activities([get_row(1, 1, academy=1)])
+
+    assert actions.get_recent_activity(get_row(1, 1)["id"], 1).id == get_row(1, 1)["id"]
+    assert actions.get_recent_activity(get_row(1, 1)["id"], 1, academy_id=2) is None
+    assert actions.get_recent_activity(get_row(1, 1)["id"], 2) is None
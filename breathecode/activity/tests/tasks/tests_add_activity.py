@@ -6,7 +6,6 @@ from typing import Optional
 from unittest.mock import MagicMock, call
 
 import pytest
-import zstandard
 from django.core.cache import cache
 from django.utils import timezone
 from google.cloud import bigquery
@@ -49,12 +48,12 @@ def apply_patch(db, monkeypatch):
 
     m1 = MagicMock()
     m2 = MagicMock()
-    m3 = MagicMock(return_value={})
+    m3 = MagicMock(side_effect=lambda kind, related_type, *args: bool(related_type))
 
     monkeypatch.setattr("logging.Logger.info", m1)
     monkeypatch.setattr("logging.Logger.error", m2)
     # monkeypatch.setattr('breathecode.services.google_cloud.credentials.resolve_credentials', lambda: None)
-    monkeypatch.setattr("breathecode.activity.actions.get_activity_meta", m3)
+    monkeypatch.setattr("breathecode.activity.actions.check_activity_meta", m3)
     monkeypatch.setattr("django.utils.timezone.now", lambda: UTC_NOW)
     monkeypatch.setattr("uuid.uuid4", uuid4)
     monkeypatch.setattr("breathecode.activity.actions.get_workers_amount", lambda: 2)
@@ -69,22 +68,19 @@ def set_activity_meta(monkeypatch):
         if exc:
             m3 = MagicMock(side_effect=Exception(exc))
         else:
-            m3 = MagicMock(return_value=meta)
+            m3 = MagicMock(return_value=True)
 
-        monkeypatch.setattr("breathecode.activity.actions.get_activity_meta", m3)
+        monkeypatch.setattr("breathecode.activity.actions.check_activity_meta", m3)
         return m3
 
     yield wrapper
 
 
 @pytest.fixture
-def decompress_and_parse():
+def get_buffer():
 
-    def wrapper(data: str):
-        data = zstandard.decompress(data)
-        data = pickle.loads(data)
-
-        return data
+    def wrapper():
+        return [pickle.loads(x) for x in cache.get("activity:buffer") or []]
 
     yield wrapper
 
@@ -117,9 +113,9 @@ def test_type_and_no_id_or_slug(bc: Breathecode):
             exc_info=True,
         ),
     ]
-    assert actions.get_activity_meta.call_args_list == []
+    assert actions.check_activity_meta.call_args_list == []
 
-    assert cache.get("activity:worker-0") is None
+    assert cache.get("activity:buffer") is None
 
 
 def test_type_with_id_and_slug(bc: Breathecode):
@@ -139,12 +135,12 @@ def test_type_with_id_and_slug(bc: Breathecode):
     assert logging.Logger.error.call_args_list == [
         call("If related_type is not provided, both related_id and related_slug must also be absent.", exc_info=True),
     ]
-    assert actions.get_activity_meta.call_args_list == []
+    assert actions.check_activity_meta.call_args_list == []
 
-    assert cache.get("activity:worker-0") is None
+    assert cache.get("activity:buffer") is None
 
 
-def test_adding_the_resource_with_id_and_no_meta(bc: Breathecode, decompress_and_parse):
+def test_adding_the_resource_with_id_and_no_meta(bc: Breathecode, get_buffer):
     kind = bc.fake.slug()
 
     logging.Logger.info.call_args_list = []
@@ -162,9 +158,9 @@ def test_adding_the_resource_with_id_and_no_meta(bc: Breathecode, decompress_and
     assert logging.Logger.info.call_args_list == [call(f"Executing add_activity related to {kind}")]
     assert logging.Logger.error.call_args_list == []
 
-    assert actions.get_activity_meta.call_args_list == [call(kind, "auth.User", 1, None)]
+    assert actions.check_activity_meta.call_args_list == [call(kind, "auth.User", 1, None)]
 
-    assert decompress_and_parse(cache.get("activity:worker-0")) == [
+    assert get_buffer() == [
         {
             "data": {
                 "id": "c5d8cbc54a894dd0983caae1b8507091",
@@ -178,27 +174,12 @@ def test_adding_the_resource_with_id_and_no_meta(bc: Breathecode, decompress_and
                 },
                 "meta": {},
             },
-            "schema": [
-                bigquery.SchemaField("user_id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                bigquery.SchemaField("kind", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                bigquery.SchemaField("timestamp", bigquery.enums.SqlTypeNames.TIMESTAMP, "NULLABLE"),
-                bigquery.SchemaField(
-                    "related",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[
-                        bigquery.SchemaField("type", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                        bigquery.SchemaField("id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                        bigquery.SchemaField("slug", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                    ],
-                ),
-                bigquery.SchemaField("meta", bigquery.enums.SqlTypeNames.STRUCT, "NULLABLE", fields=[]),
-            ],
+            "fill_meta": True,
         },
     ]
 
 
-def test_adding_the_resource_with_slug_and_no_meta(bc: Breathecode, decompress_and_parse):
+def test_adding_the_resource_with_slug_and_no_meta(bc: Breathecode, get_buffer):
     kind = bc.fake.slug()
 
     logging.Logger.info.call_args_list = []
@@ -218,9 +199,9 @@ def test_adding_the_resource_with_slug_and_no_meta(bc: Breathecode, decompress_a
     assert logging.Logger.info.call_args_list == [call(f"Executing add_activity related to {kind}")]
     assert logging.Logger.error.call_args_list == []
 
-    assert actions.get_activity_meta.call_args_list == [call(kind, "auth.User", None, related_slug)]
+    assert actions.check_activity_meta.call_args_list == [call(kind, "auth.User", None, related_slug)]
 
-    assert decompress_and_parse(cache.get("activity:worker-0")) == [
+    assert get_buffer() == [
         {
             "data": {
                 "id": "c5d8cbc54a894dd0983caae1b8507091",
@@ -234,27 +215,12 @@ def test_adding_the_resource_with_slug_and_no_meta(bc: Breathecode, decompress_a
                 },
                 "meta": {},
             },
-            "schema": [
-                bigquery.SchemaField("user_id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                bigquery.SchemaField("kind", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                bigquery.SchemaField("timestamp", bigquery.enums.SqlTypeNames.TIMESTAMP, "NULLABLE"),
-                bigquery.SchemaField(
-                    "related",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[
-                        bigquery.SchemaField("type", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                        bigquery.SchemaField("id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                        bigquery.SchemaField("slug", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                    ],
-                ),
-                bigquery.SchemaField("meta", bigquery.enums.SqlTypeNames.STRUCT, "NULLABLE", fields=[]),
-            ],
+            "fill_meta": True,
         },
     ]
 
 
-def test_adding_the_resource_with_meta(bc: Breathecode, set_activity_meta, decompress_and_parse):
+def test_adding_the_resource_with_meta(bc: Breathecode, set_activity_meta, get_buffer):
     kind = bc.fake.slug()
 
     meta = {
@@ -277,14 +243,14 @@ def test_adding_the_resource_with_meta(bc: Breathecode, set_activity_meta, decom
 
     add_activity.delay(1, kind, related_type="auth.User", related_id=1)
 
-    assert actions.get_activity_meta.call_args_list == [
+    assert actions.check_activity_meta.call_args_list == [
         call(kind, "auth.User", 1, None),
     ]
 
     assert logging.Logger.info.call_args_list == [call(f"Executing add_activity related to {kind}")]
     assert logging.Logger.error.call_args_list == []
 
-    assert decompress_and_parse(cache.get("activity:worker-0")) == [
+    assert get_buffer() == [
         {
             "data": {
                 "id": "c5d8cbc54a894dd0983caae1b8507091",
@@ -296,29 +262,9 @@ def test_adding_the_resource_with_meta(bc: Breathecode, set_activity_meta, decom
                     "slug": None,
                     "id": 1,
                 },
-                "meta": meta,
+                "meta": {},
             },
-            "schema": [
-                bigquery.SchemaField("user_id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                bigquery.SchemaField("kind", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                bigquery.SchemaField("timestamp", bigquery.enums.SqlTypeNames.TIMESTAMP, "NULLABLE"),
-                bigquery.SchemaField(
-                    "related",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[
-                        bigquery.SchemaField("type", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                        bigquery.SchemaField("id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                        bigquery.SchemaField("slug", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                    ],
-                ),
-                bigquery.SchemaField(
-                    "meta",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[bigquery.SchemaField(x, bigquery.enums.SqlTypeNames.STRING, "NULLABLE") for x in meta],
-                ),
-            ],
+            "fill_meta": True,
         },
     ]
 
@@ -342,19 +288,17 @@ def test_adding_the_resource_with_meta__it_fails(bc: Breathecode, set_activity_m
 
     add_activity.delay(1, kind, related_type="auth.User", related_id=1)
 
-    assert actions.get_activity_meta.call_args_list == [
+    assert actions.check_activity_meta.call_args_list == [
         call(kind, "auth.User", 1, None),
     ]
 
     assert logging.Logger.info.call_args_list == [call(f"Executing add_activity related to {kind}")]
     assert logging.Logger.error.call_args_list == [call(exc, exc_info=True)]
 
-    assert cache.get("activity:worker-0") is None
+    assert cache.get("activity:buffer") is None
 
 
-def test_adding_the_resource_with_meta__called_two_times(
-    bc: Breathecode, monkeypatch, set_activity_meta, decompress_and_parse
-):
+def test_adding_the_resource_with_meta__called_two_times(bc: Breathecode, monkeypatch, set_activity_meta, get_buffer):
     kind = bc.fake.slug()
 
     meta = {
@@ -387,7 +331,7 @@ def test_adding_the_resource_with_meta__called_two_times(
     add_activity.delay(1, kind, related_type="auth.User", related_id=1)
     assert logging.Logger.error.call_args_list == []
 
-    assert actions.get_activity_meta.call_args_list == [
+    assert actions.check_activity_meta.call_args_list == [
         call(kind, "auth.User", 1, None),
         call(kind, "auth.User", 1, None),
     ]
@@ -398,7 +342,7 @@ def test_adding_the_resource_with_meta__called_two_times(
     ]
     assert logging.Logger.error.call_args_list == []
 
-    assert decompress_and_parse(cache.get("activity:worker-0")) == [
+    assert get_buffer() == [
         {
             "data": {
                 "id": "c5d8cbc54a894dd0983caae1b8507091",
@@ -410,33 +354,10 @@ def test_adding_the_resource_with_meta__called_two_times(
                     "slug": None,
                     "id": 1,
                 },
-                "meta": meta,
+                "meta": {},
             },
-            "schema": [
-                bigquery.SchemaField("user_id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                bigquery.SchemaField("kind", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                bigquery.SchemaField("timestamp", bigquery.enums.SqlTypeNames.TIMESTAMP, "NULLABLE"),
-                bigquery.SchemaField(
-                    "related",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[
-                        bigquery.SchemaField("type", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                        bigquery.SchemaField("id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                        bigquery.SchemaField("slug", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                    ],
-                ),
-                bigquery.SchemaField(
-                    "meta",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[bigquery.SchemaField(x, bigquery.enums.SqlTypeNames.STRING, "NULLABLE") for x in meta],
-                ),
-            ],
+            "fill_meta": True,
         },
-    ]
-
-    assert decompress_and_parse(cache.get("activity:worker-1")) == [
         {
             "data": {
                 "id": "c5d8cbc54a894dd0983caae1b8507092",
@@ -448,28 +369,8 @@ def test_adding_the_resource_with_meta__called_two_times(
                     "slug": None,
                     "id": 1,
                 },
-                "meta": meta,
+                "meta": {},
             },
-            "schema": [
-                bigquery.SchemaField("user_id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                bigquery.SchemaField("kind", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                bigquery.SchemaField("timestamp", bigquery.enums.SqlTypeNames.TIMESTAMP, "NULLABLE"),
-                bigquery.SchemaField(
-                    "related",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[
-                        bigquery.SchemaField("type", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                        bigquery.SchemaField("id", bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                        bigquery.SchemaField("slug", bigquery.enums.SqlTypeNames.STRING, "NULLABLE"),
-                    ],
-                ),
-                bigquery.SchemaField(
-                    "meta",
-                    bigquery.enums.SqlTypeNames.STRUCT,
-                    "NULLABLE",
-                    fields=[bigquery.SchemaField(x, bigquery.enums.SqlTypeNames.STRING, "NULLABLE") for x in meta],
-                ),
-            ],
+            "fill_meta": True,
         },
     ]
@@ -287,12 +287,12 @@ def test_with_data_in_both_workers(bc: Breathecode, fake, apply_patch, get_schem
                             "RECORD",
                             "NULLABLE",
                             fields=(
-                                # bigquery.SchemaField(attr1, bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
+                                bigquery.SchemaField(attr1, bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
                                 bigquery.SchemaField(attr2, bigquery.enums.SqlTypeNames.BOOL, "NULLABLE"),
                                 bigquery.SchemaField(attr3, bigquery.enums.SqlTypeNames.FLOAT64, "NULLABLE"),
                                 bigquery.SchemaField(attr4, bigquery.enums.SqlTypeNames.INT64, "NULLABLE"),
-                                # bigquery.SchemaField("knife", "BOOL", "NULLABLE"),
-                                # bigquery.SchemaField("pistol", "FLOAT64", "NULLABLE"),
+                                bigquery.SchemaField("knife", "BOOL", "NULLABLE"),
+                                bigquery.SchemaField("pistol", "FLOAT64", "NULLABLE"),
                             ),
                         ),
                         bigquery.SchemaField(
@@ -300,9 +300,9 @@ def test_with_data_in_both_workers(bc: Breathecode, fake, apply_patch, get_schem
                             "RECORD",
                             "NULLABLE",
                             fields=(
-                                # bigquery.SchemaField("amount", "INT64", "NULLABLE"),
+                                bigquery.SchemaField("amount", "INT64", "NULLABLE"),
                                 bigquery.SchemaField("id", "INTEGER", "NULLABLE"),
-                                # bigquery.SchemaField("name", "STRING", "NULLABLE"),
+                                bigquery.SchemaField("name", "STRING", "NULLABLE"),
                                 bigquery.SchemaField("type", "STRING", "NULLABLE"),
                                 bigquery.SchemaField("slug", "STRING", "NULLABLE"),
                             ),
@@ -314,3 +314,158 @@ def test_with_data_in_both_workers(bc: Breathecode, fake, apply_patch, get_schem
         ],
     )
     assert insert_rows_mock.call_args_list == [call(get_table_mock.return_value, [data1, data2, data3])]
+
+
+def test_with_data_in_the_buffer(bc: Breathecode, apply_patch, get_data):
+    from breathecode.activity import actions
+
+    info_mock, error_mock, get_table_mock, update_table_mock, insert_rows_mock = apply_patch
+
+    data1 = get_data()
+    data2 = get_data()
+
+    actions.push_activity({"data": data1})
+    actions.push_activity({"data": data2})
+
+    upload_activities.delay()
+
+    assert info_mock.call_args_list == []
+    assert error_mock.call_args_list == []
+
+    assert cache.get("activity:buffer") == []
+
+    task = bc.database.get("task_manager.TaskManager", 1, dict=False)
+
+    assert get_cache(f"activity:backup:{task.id}") == None
+    assert insert_rows_mock.call_args_list == [call(get_table_mock.return_value, [data1, data2])]
+
+
+def test_with_data_in_the_buffer__it_fails(bc: Breathecode, apply_patch, get_data):
+    from breathecode.activity import actions
+
+    info_mock, error_mock, get_table_mock, update_table_mock, insert_rows_mock = apply_patch
+    insert_rows_mock.side_effect = Exception("BigQuery is down")
+
+    activity = {"data": get_data()}
+
+    actions.push_activity(activity)
+
+    upload_activities.delay()
+
+    assert error_mock.call_args_list == [call("BigQuery is down", exc_info=True)]
+    assert cache.get("activity:buffer") == []
+
+    task = bc.database.get("task_manager.TaskManager", 1, dict=False)
+
+    # the activities are kept in the backup of the task to be uploaded in the next attempt
+    assert get_cache(f"activity:backup:{task.id}") == [activity]
+
+
+def test_with_data_in_the_buffer__the_meta_fails(bc: Breathecode, apply_patch, get_data, monkeypatch):
+    from breathecode.activity import actions
+
+    info_mock, error_mock, get_table_mock, update_table_mock, insert_rows_mock = apply_patch
+    monkeypatch.setattr(actions, "fill_activities_meta", MagicMock(side_effect=Exception("The meta failed")))
+
+    legacy = [{"data": get_data(), "schema": []}]
+    set_cache("activity:worker-0", legacy)
+
+    activity = {"data": get_data()}
+    actions.push_activity(activity)
+
+    upload_activities.delay()
+
+    # nothing was drained, the next upload finds the activities where they were
+    assert get_cache("activity:worker-0") == legacy
+    assert actions.pop_activities() == [activity]
+    assert insert_rows_mock.call_args_list == []
+
+
+def test_with_the_schema_cached(bc: Breathecode, apply_patch, get_data):
+    from breathecode.activity import actions
+
+    info_mock, error_mock, get_table_mock, update_table_mock, insert_rows_mock = apply_patch
+
+    schema = [
+        *actions.ACTIVITY_SCHEMA,
+        bigquery.SchemaField(
+            "meta",
+            bigquery.enums.SqlTypeNames.STRUCT,
+            "NULLABLE",
+            fields=[bigquery.SchemaField("knife", bigquery.enums.SqlTypeNames.BOOL, "NULLABLE")],
+        ),
+    ]
+    cache.set(
+        "bigquery:schema:project.dataset.activity",
+        {"schema": [x.to_api_repr() for x in schema]},
+    )
+
+    data = get_data({"meta": {"knife": True}})
+    actions.push_activity({"data": data})
+
+    upload_activities.delay()
+
+    assert error_mock.call_args_list == []
+
+    # the metadata of the table is not fetched and the schema is not updated
+    assert get_table_mock.call_args_list == []
+    assert update_table_mock.call_args_list == []
+
+    assert len(insert_rows_mock.call_args_list) == 1
+    args, kwargs = insert_rows_mock.call_args_list[0]
+
+    assert args == ("dataset.activity", [data])
+    assert [x.to_api_repr() for x in kwargs["selected_fields"]] == [x.to_api_repr() for x in schema]
+
+
+def test_with_the_schema_cached__new_field(bc: Breathecode, apply_patch, get_data):
+    from breathecode.activity import actions
+
+    info_mock, error_mock, get_table_mock, update_table_mock, insert_rows_mock = apply_patch
+
+    cache.set(
+        "bigquery:schema:project.dataset.activity",
+        {"schema": [x.to_api_repr() for x in get_table_mock.return_value.schema]},
+    )
+
+    data = get_data({"meta": {"axe": 1}})
+    actions.push_activity({"data": data})
+
+    upload_activities.delay()
+
+    assert error_mock.call_args_list == []
+
+    # the current schema is fetched before updating it
+    assert get_table_mock.call_args_list == [call("dataset.activity")]
+    assert len(update_table_mock.call_args_list) == 1
+
+    meta = [x for x in update_table_mock.call_args_list[0].args[0].schema if x.name == "meta"][0]
+    assert sorted([x.name for x in meta.fields]) == ["axe", "knife", "pistol"]
+
+    assert insert_rows_mock.call_args_list == [call(get_table_mock.return_value, [data])]
+
+
+def test_with_meta_to_fill(bc: Breathecode, apply_patch, get_data):
+    from breathecode.activity import actions
+
+    info_mock, error_mock, get_table_mock, update_table_mock, insert_rows_mock = apply_patch
+
+    model = bc.database.create(user=1)
+
+    found = get_data({"related": {"type": "auth.User", "id": model.user.id, "slug": None}})
+    not_found = get_data({"related": {"type": "auth.User", "id": model.user.id + 1, "slug": None}})
+
+    actions.push_activity({"data": found, "fill_meta": True})
+    actions.push_activity({"data": not_found, "fill_meta": True})
+
+    upload_activities.delay()
+
+    assert error_mock.call_args_list == []
+
+    meta = {"id": model.user.id, "email": model.user.email, "username": model.user.username}
+    assert insert_rows_mock.call_args_list == [call(get_table_mock.return_value, [{**found, "meta": meta}])]
+
+    # it is uploaded in the next run, when the user could exist
+    assert [pickle.loads(x) for x in cache.get("activity:buffer")] == [
+        {"data": not_found, "fill_meta": True, "attempts": 1},
+    ]
@@ -18,6 +18,10 @@ from ...mixins import MediaTestCase
 UTC_NOW = timezone.now()
 
 
+def normalize(query):
+    return " ".join(query.split())
+
+
 def bigquery_client_mock(self, n=1, user_id=1, kind=None, date_start=None, date_end=None):
     rows_to_insert = [
         {
@@ -48,18 +52,19 @@ def bigquery_client_mock(self, n=1, user_id=1, kind=None, date_start=None, date_
     project_id = "test"
     dataset = "4geeks"
 
-    query = f"""
-            SELECT *
-            FROM `{project_id}.{dataset}.activity`
-            WHERE user_id = @user_id
-                AND meta.academy = @academy_id
-                {'AND kind = @kind' if kind else ''}
-                {'AND timestamp >= @date_start' if date_start else ''}
-                {'AND timestamp <= @date_end' if date_end else ''}
-            ORDER BY timestamp DESC
-            LIMIT @limit
-            OFFSET @offset
-        """
+    query = " ".join(
+        [
+            "SELECT *",
+            f"FROM `{project_id}.{dataset}.activity`",
+            "WHERE user_id = @user_id",
+            "AND meta.academy = @academy_id",
+            *(["AND kind = @kind"] if kind else []),
+            *(["AND timestamp >= @date_start"] if date_start else []),
+            *(["AND timestamp <= @date_end"] if date_end else []),
+            "ORDER BY timestamp DESC, id DESC",
+            "LIMIT @limit",
+        ]
+    )
 
     return (client_mock, result_mock, query, project_id, dataset, rows_to_insert)
 
@@ -90,7 +95,7 @@ class MediaTestSuite(MediaTestCase):
             json = response.json()
 
             self.bc.check.calls(BigQuery.client.call_args_list, [call()])
-            assert client_mock.query.call_args[0][0] == query
+            assert normalize(client_mock.query.call_args[0][0]) == query
             assert "AND meta.kind = @kind" not in query
             self.bc.check.calls(result_mock.result.call_args_list, [call()])
 
@@ -117,7 +122,7 @@ class MediaTestSuite(MediaTestCase):
             json = response.json()
 
             self.bc.check.calls(BigQuery.client.call_args_list, [call()])
-            assert client_mock.query.call_args[0][0] == query
+            assert normalize(client_mock.query.call_args[0][0]) == query
             assert "AND kind = @kind" in query
             self.bc.check.calls(result_mock.result.call_args_list, [call()])
 
@@ -10,6 +10,7 @@ from django.urls.base import reverse_lazy
 from django.utils import timezone
 from rest_framework import status
 
+from breathecode.activity import actions
 from breathecode.services.google_cloud.big_query import BigQuery
 from breathecode.utils.attr_dict import AttrDict
 
@@ -18,6 +19,10 @@ from ...mixins import MediaTestCase
 UTC_NOW = timezone.now()
 
 
+def normalize(query):
+    return " ".join(query.split())
+
+
 def bigquery_client_mock(self, n=1, user_id=1, kind=None):
     rows_to_insert = [
         {
@@ -48,15 +53,16 @@ def bigquery_client_mock(self, n=1, user_id=1, kind=None):
     project_id = "test"
     dataset = "4geeks"
 
-    query = f"""
-            SELECT *
-            FROM `{project_id}.{dataset}.activity`
-            WHERE user_id = @user_id
-                {'AND kind = @kind' if kind else ''}
-            ORDER BY timestamp DESC
-            LIMIT @limit
-            OFFSET @offset
-        """
+    query = " ".join(
+        [
+            "SELECT *",
+            f"FROM `{project_id}.{dataset}.activity`",
+            "WHERE user_id = @user_id",
+            *(["AND kind = @kind"] if kind else []),
+            "ORDER BY timestamp DESC, id DESC",
+            "LIMIT @limit",
+        ]
+    )
 
     return (client_mock, result_mock, query, project_id, dataset, rows_to_insert)
 
@@ -83,7 +89,7 @@ class MediaTestSuite(MediaTestCase):
             json = response.json()
 
             self.bc.check.calls(BigQuery.client.call_args_list, [call()])
-            assert client_mock.query.call_args[0][0] == query
+            assert normalize(client_mock.query.call_args[0][0]) == query
             self.bc.check.calls(result_mock.result.call_args_list, [call()])
 
         self.assertEqual(json, expected)
@@ -107,9 +113,49 @@ class MediaTestSuite(MediaTestCase):
             json = response.json()
 
             self.bc.check.calls(BigQuery.client.call_args_list, [call()])
-            assert client_mock.query.call_args[0][0] == query
+            assert normalize(client_mock.query.call_args[0][0]) == query
             assert "AND kind = @kind" in query
             self.bc.check.calls(result_mock.result.call_args_list, [call()])
 
         self.assertEqual(json, expected)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    def test_get_with_page__uses_offset(self):
+        url = reverse_lazy("v2:activity:me_activity") + "?page=2&limit=2"
+        self.generate_models(authenticate=True)
+
+        val = bigquery_client_mock(self, n=2, user_id=1)
+        (client_mock, result_mock, _, project_id, dataset, expected) = val
+
+        with patch("breathecode.services.google_cloud.big_query.BigQuery.client") as mock:
+            mock.return_value = (client_mock, project_id, dataset)
+            response = self.client.get(url)
+            json = response.json()
+
+            assert "OFFSET @offset" in client_mock.query.call_args[0][0]
+
+        self.assertEqual(json, expected)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        assert "X-Next-Cursor" not in response.headers
+
+    @patch("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    def test_get_from_the_read_model(self):
+        url = reverse_lazy("v2:activity:me_activity") + "?limit=1"
+        self.generate_models(authenticate=True)
+
+        val = bigquery_client_mock(self, n=2, user_id=1)
+        (client_mock, _, _, project_id, dataset, expected) = val
+        actions.save_recent_activities(expected)
+
+        with patch("breathecode.services.google_cloud.big_query.BigQuery.client") as mock:
+            mock.return_value = (client_mock, project_id, dataset)
+            response = self.client.get(url)
+            json = response.json()
+
+            self.bc.check.calls(BigQuery.client.call_args_list, [])
+
+        latest = max(expected, key=lambda x: x["id"])
+        self.assertEqual(json, [{**latest, "timestamp": UTC_NOW.isoformat().replace("+00:00", "Z")}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        assert actions.decode_activity_cursor(response.headers["X-Next-Cursor"]) == (UTC_NOW, latest["id"])
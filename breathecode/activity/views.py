@@ -10,6 +10,7 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from breathecode.activity import actions
 from breathecode.activity.models import StudentActivity
 from breathecode.activity.serializers import ActivitySerializer
 from breathecode.admissions.models import Cohort, CohortUser
@@ -523,6 +524,23 @@ class V2MeActivityView(APIView):
 
     def get(self, request, activity_id=None):
         lang = get_user_language(request)
+
+        if activity_id and (result := actions.get_recent_activity(activity_id, request.user.id)):
+            serializer = ActivitySerializer(result, many=False)
+            return Response(serializer.data)
+
+        if activity_id is None and "page" not in request.GET:
+            results, next_cursor = actions.list_activities(
+                request.user.id,
+                limit=int(request.GET.get("limit", 100)),
+                cursor=request.GET.get("cursor", None),
+                kind=request.GET.get("kind", None),
+                cohort=request.GET.get("cohort", None),
+            )
+
+            serializer = ActivitySerializer(results, many=True)
+            return Response(serializer.data, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
         client, project_id, dataset = BigQuery.client()
 
         if activity_id:
@@ -607,12 +625,32 @@ class V2AcademyActivityView(APIView):
     @capable_of("read_activity")
     def get(self, request, activity_id=None, academy_id=None):
         lang = get_user_language(request)
-        client, project_id, dataset = BigQuery.client()
 
         user_id = request.GET.get("user_id", None)
         if user_id is None:
             user_id = request.user.id
 
+        if activity_id and (result := actions.get_recent_activity(activity_id, user_id, academy_id=int(academy_id))):
+            serializer = ActivitySerializer(result, many=False)
+            return Response(serializer.data)
+
+        if activity_id is None and "page" not in request.GET:
+            results, next_cursor = actions.list_activities(
+                int(user_id),
+                limit=int(request.GET.get("limit", 100)),
+                cursor=request.GET.get("cursor", None),
+                academy_id=int(academy_id),
+                kind=request.GET.get("kind", None),
+                cohort=request.GET.get("cohort_id", None),
+                date_start=request.GET.get("date_start", None),
+                date_end=request.GET.get("date_end", None),
+            )
+
+            serializer = ActivitySerializer(results, many=True)
+            return Response(serializer.data, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+        client, project_id, dataset = BigQuery.client()
+
         if activity_id:
             # Define a query
             query = f"""
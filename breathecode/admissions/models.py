@@ -92,6 +92,7 @@ class Academy(models.Model):
     def __init__(self, *args, **kwargs):
         super(Academy, self).__init__(*args, **kwargs)
         self.__old_slug = self.slug
+        self.__old_status = self.status
 
     slug = models.SlugField(max_length=100, unique=True, db_index=True)
     name = models.CharField(max_length=150, db_index=True)
@@ -215,7 +216,7 @@ class Academy(models.Model):
 
     def save(self, *args, **kwargs):
         from .actions import get_bucket_object
-        from .signals import academy_saved
+        from .signals import academy_saved, academy_status_updated
 
         self.full_clean()
         created = not self.id
@@ -233,6 +234,11 @@ class Academy(models.Model):
         if created:
             self.__old_slug = self.slug
 
+        elif self.__old_status != self.status:
+            academy_status_updated.send_robust(instance=self, sender=self.__class__)
+
+        self.__old_status = self.status
+
         academy_saved.send_robust(instance=self, sender=self.__class__, created=created)
 
 
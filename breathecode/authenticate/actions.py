@@ -4,16 +4,20 @@ import os
 import random
 import re
 import string
+import time
 import urllib.parse
+from functools import lru_cache
 from random import randint
-from typing import Any
+from typing import Any, Iterable, Optional, TypedDict
 
 import aiohttp
 from adrf.requests import AsyncRequest
+import newrelic.agent
 from asgiref.sync import sync_to_async
 from capyc.core.i18n import translation
 from capyc.rest_framework.exceptions import ValidationException
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.handlers.wsgi import WSGIRequest
 from django.db.models import Q
 from django.utils import timezone
@@ -23,6 +27,7 @@ from breathecode.admissions.models import Academy, CohortUser
 from breathecode.authenticate.models import CredentialsDiscord
 from breathecode.services.github import Github
 
+from .authentication import invalidate_cached_tokens
 from .models import (
     AcademyAuthSettings,
     CredentialsGithub,
@@ -114,9 +119,62 @@ def delete_tokens(users=None, status="expired"):
     if status == "expired":
         tokens = Token.objects.filter(expires_at__lt=now)
 
-    count = len(tokens)
+    keys = list(tokens.values_list("key", flat=True))
     tokens.delete()
-    return count
+    invalidate_cached_tokens(*keys)
+    return len(keys)
+
+
+class TokenPurge(TypedDict):
+    deleted: int
+    batches: int
+    seconds: float
+
+
+def purge_expired_tokens(batch_size: int = 1000, sleep: float = 0.1, max_batches: Optional[int] = None) -> TokenPurge:
+    """
+    Delete the expired tokens in batches walking the primary key, so each delete only locks a few rows.
+
+    It waits `sleep` seconds between batches to let the authentication reads go through, and it reports the
+    amount of deleted tokens, the duration and the rate to New Relic.
+    """
+
+    utc_now = timezone.now()
+    started_at = time.monotonic()
+    last_id = 0
+    deleted = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            Token.objects.filter(expires_at__lt=utc_now, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+
+        deleted += Token.purge(Token.objects.filter(id__in=ids))
+        batches += 1
+        last_id = ids[-1]
+
+        if len(ids) < batch_size:
+            break
+
+        if sleep:
+            time.sleep(sleep)
+
+    seconds = time.monotonic() - started_at
+
+    newrelic.agent.record_custom_metric("Custom/Authenticate/ExpiredTokens/Deleted", deleted)
+    newrelic.agent.record_custom_metric("Custom/Authenticate/ExpiredTokens/Batches", batches)
+    newrelic.agent.record_custom_metric("Custom/Authenticate/ExpiredTokens/Duration", seconds)
+    newrelic.agent.record_custom_metric(
+        "Custom/Authenticate/ExpiredTokens/Rate", deleted / seconds if seconds else deleted
+    )
+
+    logger.info(f"{deleted} expired tokens were deleted in {batches} batches and {seconds:.2f}s")
+    return {"deleted": deleted, "batches": batches, "seconds": seconds}
 
 
 def reset_password(users=None, extra=None, academy=None):
@@ -212,7 +270,10 @@ def generate_academy_token(academy_id, force=False):
         profile_academy.save()
 
     if force:
-        Token.objects.filter(user=academy_user).delete()
+        tokens = Token.objects.filter(user=academy_user)
+        keys = list(tokens.values_list("key", flat=True))
+        tokens.delete()
+        invalidate_cached_tokens(*keys)
 
     token = Token.objects.filter(user=academy_user).first()
     if token is None:
@@ -435,12 +496,89 @@ def aget_user_settings(user_id: int) -> UserSetting:
     return get_user_settings(user_id)
 
 
+USER_LANGUAGE_CACHE_KEY = "authenticate:lang:{user_id}"
+
+
+@lru_cache(maxsize=1)
+def get_user_language_cache_ttl() -> int:
+    return int(os.getenv("USER_LANGUAGE_CACHE_TTL", "86400"))
+
+
+@lru_cache(maxsize=1)
+def get_pending_user_language_cache_ttl() -> int:
+    return int(os.getenv("PENDING_USER_LANGUAGE_CACHE_TTL", "60"))
+
+
+def cache_user_language(user_id: int, lang: str) -> None:
+    cache.set(USER_LANGUAGE_CACHE_KEY.format(user_id=user_id), lang, timeout=get_user_language_cache_ttl())
+
+
+def invalidate_user_language(user_id: int) -> None:
+    cache.delete(USER_LANGUAGE_CACHE_KEY.format(user_id=user_id))
+
+
+def get_user_languages(user_ids: Iterable[int]) -> dict[int, str]:
+    """
+    Get the languages of many users at once, it makes one query at most.
+
+    The users without settings get the default language while their settings are built in background.
+    """
+
+    from . import tasks
+
+    user_ids = list(dict.fromkeys(x for x in user_ids if x))
+    if not user_ids:
+        return {}
+
+    keys = {USER_LANGUAGE_CACHE_KEY.format(user_id=x): x for x in user_ids}
+    result = {keys[key]: lang for key, lang in cache.get_many(list(keys)).items() if lang}
+
+    missing = [x for x in user_ids if x not in result]
+    if not missing:
+        return result
+
+    found = dict(UserSetting.objects.filter(user__id__in=missing).values_list("user__id", "lang"))
+    cache.set_many(
+        {USER_LANGUAGE_CACHE_KEY.format(user_id=x): lang for x, lang in found.items()},
+        timeout=get_user_language_cache_ttl(),
+    )
+    result.update(found)
+
+    pending = [x for x in missing if x not in found]
+    if pending:
+        # the default language is kept for a while to avoid scheduling the same users again
+        cache.set_many(
+            {USER_LANGUAGE_CACHE_KEY.format(user_id=x): "en" for x in pending},
+            timeout=get_pending_user_language_cache_ttl(),
+        )
+        tasks.async_build_user_settings.delay(pending)
+        result.update({x: "en" for x in pending})
+
+    return result
+
+
+async def aget_user_languages(user_ids: Iterable[int]) -> dict[int, str]:
+    """Async version of `get_user_languages`."""
+
+    user_ids = list(dict.fromkeys(x for x in user_ids if x))
+    if not user_ids:
+        return {}
+
+    keys = {USER_LANGUAGE_CACHE_KEY.format(user_id=x): x for x in user_ids}
+    result = {keys[key]: lang for key, lang in (await cache.aget_many(list(keys))).items() if lang}
+
+    # the cache misses are rare, the sync version resolves them
+    if len(result) < len(user_ids):
+        result.update(await sync_to_async(get_user_languages)([x for x in user_ids if x not in result]))
+
+    return result
+
+
 def get_user_language(request: WSGIRequest | AsyncRequest) -> str:
     lang = request.META.get("HTTP_ACCEPT_LANGUAGE")
 
     if not lang and request.user.id:
-        settings = get_user_settings(request.user.id)
-        lang = settings.lang
+        lang = get_user_languages([request.user.id])[request.user.id]
 
     if not lang:
         lang = "en"
@@ -448,9 +586,19 @@ def get_user_language(request: WSGIRequest | AsyncRequest) -> str:
     return lang
 
 
-@sync_to_async
-def aget_user_language(request: AsyncRequest) -> str:
-    return get_user_language(request)
+async def aget_user_language(request: AsyncRequest) -> str:
+    lang = request.META.get("HTTP_ACCEPT_LANGUAGE")
+
+    # the async views authenticate the request before calling the handler
+    user = request._user if hasattr(request, "_user") else await sync_to_async(lambda: request.user)()
+
+    if not lang and user.id:
+        lang = (await aget_user_languages([user.id]))[user.id]
+
+    if not lang:
+        lang = "en"
+
+    return lang
 
 
 def add_to_organization(cohort_id, user_id):
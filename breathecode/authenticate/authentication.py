@@ -1,12 +1,111 @@
 # authentication.py
 
-from asgiref.sync import sync_to_async
+import os
+from functools import lru_cache
+from typing import Any, Optional, TypedDict
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from breathecode.utils.local_cache import LocalCache
+
 HTTP_HEADER_ENCODING = "iso-8859-1"
+TOKEN_CACHE_KEY = "authenticate:token:{key}"
+
+# the password hash is never cached, it is loaded on demand as a deferred field
+USER_CACHED_FIELDS = [x.attname for x in User._meta.concrete_fields if x.attname != "password"]
+
+
+class CachedToken(TypedDict):
+    # concrete fields of the token and its user
+    token: dict[str, Any]
+    user: dict[str, Any]
+
+
+@lru_cache(maxsize=1)
+def get_token_cache_ttl() -> int:
+    return int(os.getenv("TOKEN_CACHE_TTL", "60"))
+
+
+@lru_cache(maxsize=1)
+def get_local_token_cache_ttl() -> int:
+    return int(os.getenv("LOCAL_TOKEN_CACHE_TTL", "5"))
+
+
+@lru_cache(maxsize=1)
+def get_local_token_cache_size() -> int:
+    return int(os.getenv("LOCAL_TOKEN_CACHE_SIZE", "1024"))
+
+
+local_token_cache = LocalCache(get_local_token_cache_ttl, get_local_token_cache_size)
+
+
+def serialize_token(token) -> CachedToken:
+    return {
+        "token": {x.attname: getattr(token, x.attname) for x in token._meta.concrete_fields},
+        "user": {x: getattr(token.user, x) for x in USER_CACHED_FIELDS},
+    }
+
+
+def deserialize_token(entry: CachedToken):
+    """Rebuild the token and its user without hitting the database, every call returns new instances."""
+
+    from .models import Token
+
+    token = Token.from_db(DEFAULT_DB_ALIAS, list(entry["token"]), list(entry["token"].values()))
+    token.user = User.from_db(DEFAULT_DB_ALIAS, list(entry["user"]), list(entry["user"].values()))
+    return token
+
+
+def cache_token(token) -> CachedToken:
+    entry = serialize_token(token)
+    local_token_cache.set(token.key, entry)
+    cache.set(TOKEN_CACHE_KEY.format(key=token.key), entry, timeout=get_token_cache_ttl())
+    return entry
+
+
+async def acache_token(token) -> CachedToken:
+    entry = serialize_token(token)
+    local_token_cache.set(token.key, entry)
+    await cache.aset(TOKEN_CACHE_KEY.format(key=token.key), entry, timeout=get_token_cache_ttl())
+    return entry
+
+
+def get_cached_token(key: str) -> Optional[CachedToken]:
+    if entry := local_token_cache.get(key):
+        return entry
+
+    if entry := cache.get(TOKEN_CACHE_KEY.format(key=key)):
+        local_token_cache.set(key, entry)
+
+    return entry
+
+
+async def aget_cached_token(key: str) -> Optional[CachedToken]:
+    if entry := local_token_cache.get(key):
+        return entry
+
+    if entry := await cache.aget(TOKEN_CACHE_KEY.format(key=key)):
+        local_token_cache.set(key, entry)
+
+    return entry
+
+
+def invalidate_cached_tokens(*keys: str) -> None:
+    """Discard the tokens, it must be called when a token is deleted or rotated, or its user is changed."""
+
+    if not keys:
+        return
+
+    for key in keys:
+        local_token_cache.delete(key)
+
+    cache.delete_many([TOKEN_CACHE_KEY.format(key=key) for key in keys])
 
 
 def get_authorization_header(request):
@@ -33,10 +132,32 @@ class ExpiringTokenAuthentication(TokenAuthentication):
     def authenticate_credentials(self, key, request=None):
         from .models import Token
 
-        token = Token.objects.select_related("user").filter(key=key).first()
-        if token is None:
-            raise AuthenticationFailed({"error": "Invalid or Inactive Token", "is_authenticated": False})
+        entry = get_cached_token(key)
+        if entry is None:
+            token = Token.objects.select_related("user").filter(key=key).first()
+            if token is None:
+                raise AuthenticationFailed({"error": "Invalid or Inactive Token", "is_authenticated": False})
+
+            entry = cache_token(token)
+
+        return self.check_token(deserialize_token(entry))
+
+    async def aauthenticate_credentials(self, key, request=None):
+        from .models import Token
+
+        entry = await aget_cached_token(key)
+        if entry is None:
+            try:
+                token = await Token.objects.select_related("user").aget(key=key)
+
+            except Token.DoesNotExist:
+                raise AuthenticationFailed({"error": "Invalid or Inactive Token", "is_authenticated": False})
+
+            entry = await acache_token(token)
+
+        return self.check_token(deserialize_token(entry))
 
+    def check_token(self, token):
         if not token.user.is_active:
             raise AuthenticationFailed({"error": "Invalid or inactive user", "is_authenticated": False})
 
@@ -76,4 +197,4 @@ class AsyncExpiringTokenAuthentication(ExpiringTokenAuthentication):
             msg = _("Invalid token header. Token string should not contain invalid characters.")
             raise AuthenticationFailed(msg)
 
-        return await sync_to_async(self.authenticate_credentials)(token)
+        return await self.aauthenticate_credentials(token)
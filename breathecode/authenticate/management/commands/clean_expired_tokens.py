@@ -1,11 +1,31 @@
 from django.core.management.base import BaseCommand
 
-from ...actions import delete_tokens
+from ...actions import purge_expired_tokens
+from ...tasks import async_purge_expired_tokens
 
 
 class Command(BaseCommand):
-    help = "Delete expired temporal and login tokens"
+    help = "Delete expired temporal and login tokens in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Tokens deleted per batch")
+        parser.add_argument("--sleep", type=float, default=0.1, help="Seconds to wait between batches")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this amount of batches")
+        parser.add_argument("--schedule", action="store_true", help="Run the purge in a worker")
 
     def handle(self, *args, **options):
-        count = delete_tokens()
-        print(f"{count} tokens were deleted")
+        kwargs = {
+            "batch_size": options["batch_size"],
+            "sleep": options["sleep"],
+            "max_batches": options["max_batches"],
+        }
+
+        if options["schedule"]:
+            async_purge_expired_tokens.delay(**kwargs)
+            self.stdout.write("The purge of the expired tokens was scheduled")
+            return
+
+        result = purge_expired_tokens(**kwargs)
+        self.stdout.write(
+            f"{result['deleted']} tokens were deleted in {result['batches']} batches and {result['seconds']:.2f}s"
+        )
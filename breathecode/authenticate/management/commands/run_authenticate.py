@@ -1,7 +1,7 @@
 import os, re, logging
 from random import randint
 from django.core.management.base import BaseCommand
-from ...actions import delete_tokens
+from ...actions import purge_expired_tokens
 from ...models import Profile
 
 logger = logging.getLogger(__name__)
@@ -38,7 +38,7 @@ class Command(BaseCommand):
         func(options)
 
     def clean_expired_tokens(self, options):
-        count = delete_tokens()
+        count = purge_expired_tokens()["deleted"]
         print(f"{count} tokens were deleted")
 
     def sanitize_profiles(self, options):
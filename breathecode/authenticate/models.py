@@ -1,4 +1,6 @@
+import os
 from datetime import datetime
+from functools import lru_cache
 from typing import Tuple, TypedDict, Unpack
 
 import rest_framework.authtoken.models
@@ -10,7 +12,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import MultipleObjectsReturned
 from django.core.validators import RegexValidator
 from django.db import models
-from django.db.models import Q
+from django.db.models import Q, QuerySet
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -50,6 +52,14 @@ __all__ = [
 TOKEN_TYPE = ["login", "one_time", "temporal", "permanent"]
 LOGIN_TOKEN_LIFETIME = timezone.timedelta(days=7)
 TEMPORAL_TOKEN_LIFETIME = timezone.timedelta(minutes=10)
+ENABLE_LIST_OPTIONS = ["true", "1", "yes", "y"]
+
+
+@lru_cache(maxsize=1)
+def is_inline_token_purge_enabled() -> bool:
+    """If disabled, the expired tokens of other users are left to the purge_expired_tokens task."""
+
+    return os.getenv("INLINE_TOKEN_PURGE", "1").lower() in ENABLE_LIST_OPTIONS
 
 
 class UserProxy(User):
@@ -693,17 +703,48 @@ class Token(rest_framework.authtoken.models.Token):
         super().save(*args, **kwargs)
 
     @staticmethod
-    def delete_expired_tokens() -> None:
-        """Delete expired tokens."""
+    def delete_expired_tokens(user: User | None = None) -> None:
+        """Delete expired tokens, only the ones of the user if it is provided."""
         utc_now = timezone.now()
-        Token.objects.filter(expires_at__lt=utc_now).delete()
+        tokens = Token.objects.filter(expires_at__lt=utc_now)
+        if user is not None:
+            tokens = tokens.filter(user=user)
+
+        Token.purge(tokens)
+
+    @staticmethod
+    def purge(tokens: QuerySet["Token"]) -> int:
+        """
+        Delete the tokens without loading them nor sending signals, it returns the amount of deleted tokens.
+
+        The cached tokens are not discarded, so it must only be used with expired tokens, that are rejected anyway.
+        """
+
+        relations = [x for x in Token._meta.related_objects if x.on_delete is not models.DO_NOTHING]
+        if any(x.on_delete is not models.SET_NULL for x in relations):
+            return tokens.delete()[0]
+
+        for relation in relations:
+            relation.related_model._base_manager.filter(**{f"{relation.field.name}__in": tokens}).update(
+                **{relation.field.name: None}
+            )
+
+        return tokens._raw_delete(tokens.db)
+
+    def delete(self, *args, **kwargs):
+        from .authentication import invalidate_cached_tokens
+
+        res = super().delete(*args, **kwargs)
+        invalidate_cached_tokens(self.key)
+        return res
 
     @classmethod
     def get_or_create(cls, user, token_type: str, **kwargs: Unpack[TokenGetOrCreateArgs]) -> Tuple["Token", bool]:
         utc_now = timezone.now()
         kwargs["token_type"] = token_type
 
-        cls.delete_expired_tokens()
+        # an expired token of the user must not be returned
+        cls.delete_expired_tokens(None if is_inline_token_purge_enabled() else user)
 
         if token_type not in TOKEN_TYPE:
             raise InvalidTokenType(f'Invalid token_type, correct values are {", ".join(TOKEN_TYPE)}')
@@ -749,7 +790,8 @@ class Token(rest_framework.authtoken.models.Token):
     @classmethod
     def get_valid(cls, token: str, async_mode: bool = False, **kwargs: Unpack[TokenFilterArgs]) -> "Token | None":
         utc_now = timezone.now()
-        cls.delete_expired_tokens()
+        if is_inline_token_purge_enabled():
+            cls.delete_expired_tokens()
 
         qs = Token.objects.filter(Q(expires_at__gt=utc_now) | Q(expires_at__isnull=True), key=token, **kwargs)
         if async_mode:
@@ -1,16 +1,18 @@
 import logging
-from typing import Type
+from typing import Optional, Type
 
 from django.contrib.auth.models import Group, User
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.signals import post_delete, post_save, pre_delete
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from task_manager.django.actions import schedule_task
 
-from breathecode.admissions.models import CohortUser
-from breathecode.admissions.signals import student_edu_status_updated
+from breathecode.admissions.models import Academy, CohortUser
+from breathecode.admissions.signals import academy_status_updated, student_edu_status_updated
 from breathecode.authenticate import tasks
-from breathecode.authenticate.models import ProfileAcademy, UserInvite
+from breathecode.authenticate.actions import cache_user_language, invalidate_user_language
+from breathecode.authenticate.authentication import invalidate_cached_tokens
+from breathecode.authenticate.models import Capability, Permission, ProfileAcademy, Role, Token, UserInvite, UserSetting
 from breathecode.authenticate.signals import (
     cohort_user_deleted,
     invite_status_updated,
@@ -21,12 +23,104 @@ from breathecode.authenticate.signals import (
 )
 from breathecode.mentorship.models import MentorProfile
 from breathecode.payments.models import SubscriptionSeat
+from breathecode.utils.decorators.capable_of import invalidate_academy_capabilities, invalidate_academy_status
+from breathecode.utils.decorators.has_permission import invalidate_permissions, invalidate_user_permissions
 
 from .tasks import async_add_to_organization, async_remove_from_organization
 
 logger = logging.getLogger(__name__)
 
 
+@receiver(pre_save, sender=Token)
+def invalidate_rotated_token(sender, instance: Token, **_):
+    if instance.pk is None:
+        return
+
+    key = Token.objects.filter(pk=instance.pk).values_list("key", flat=True).first()
+    if key and key != instance.key:
+        invalidate_cached_tokens(key)
+
+
+# the deleted tokens are discarded by Token.delete and where they are deleted in bulk, a post_delete receiver would
+# disable the fast deletes of the expired tokens
+@receiver(post_save, sender=Token)
+def invalidate_cached_token(sender, instance: Token, **_):
+    invalidate_cached_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def invalidate_user_tokens(sender, instance: User, **_):
+    # the cached tokens carry the user, like its is_active flag
+    invalidate_cached_tokens(*Token.objects.filter(user=instance).values_list("key", flat=True))
+
+
+@receiver(post_save, sender=ProfileAcademy)
+@receiver(post_delete, sender=ProfileAcademy)
+def invalidate_profile_academy_capabilities(sender, instance: ProfileAcademy, **_):
+    if instance.user_id:
+        invalidate_academy_capabilities((instance.user_id, instance.academy_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Capability)
+@receiver(post_delete, sender=Capability)
+def invalidate_role_capabilities(sender, **_):
+    # the roles are shared by every academy, so all the cached capabilities are discarded
+    invalidate_academy_capabilities()
+
+
+@receiver(m2m_changed, sender=Role.capabilities.through)
+def invalidate_changed_role_capabilities(sender, action: str, **_):
+    if action in ["post_add", "post_remove", "post_clear"]:
+        invalidate_academy_capabilities()
+
+
+@receiver(academy_status_updated, sender=Academy)
+def invalidate_academy_status_capabilities(sender, instance: Academy, **_):
+    invalidate_academy_status(instance.id)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_changed_user_permissions(sender, instance, action: str, reverse: bool, pk_set: Optional[set[int]], **_):
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+
+    if not reverse:
+        invalidate_user_permissions(instance.id)
+
+    # the users of a group or a permission were cleared, they are unknown at this point
+    elif pk_set is None:
+        invalidate_permissions()
+
+    else:
+        invalidate_user_permissions(*pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_changed_group_permissions(sender, action: str, **_):
+    if action in ["post_add", "post_remove", "post_clear"]:
+        invalidate_permissions()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_deleted_permissions(sender, **_):
+    invalidate_permissions()
+
+
+@receiver(post_save, sender=UserSetting)
+def cache_saved_user_language(sender, instance: UserSetting, **_):
+    cache_user_language(instance.user_id, instance.lang)
+
+
+@receiver(post_delete, sender=UserSetting)
+def invalidate_deleted_user_language(sender, instance: UserSetting, **_):
+    invalidate_user_language(instance.user_id)
+
+
 @receiver(post_save, sender=[User, ProfileAcademy, MentorProfile, SubscriptionSeat])
 def update_user_group(sender, instance, created: bool, **_):
     # redirect to other signal to be able to mock it
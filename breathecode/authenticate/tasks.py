@@ -21,6 +21,7 @@ from breathecode.utils.decorators import TaskPriority
 from .actions import (
     add_to_organization,
     get_user_settings,
+    purge_expired_tokens,
     remove_from_organization,
     revoke_user_discord_permissions,
     set_gitpod_user_expiration,
@@ -78,6 +79,20 @@ def async_remove_from_organization(cohort_id, user_id, force=False):
     return remove_from_organization(cohort_id, user_id, force=force)
 
 
+@task(priority=TaskPriority.BACKGROUND.value)
+def async_purge_expired_tokens(batch_size: int = 1000, sleep: float = 0.1, max_batches: int | None = None, **_):
+    purge_expired_tokens(batch_size=batch_size, sleep=sleep, max_batches=max_batches)
+
+
+@task(priority=TaskPriority.BACKGROUND.value)
+def async_build_user_settings(user_ids: list[int], **_):
+    logger.info(f"Building the settings of {len(user_ids)} users")
+
+    # the language of the new settings is guessed from the activity of the user
+    for user_id in User.objects.filter(id__in=user_ids).values_list("id", flat=True):
+        get_user_settings(user_id)
+
+
 @shared_task(priority=TaskPriority.TWO_FACTOR_AUTH.value)
 def join_user_to_discord_guild(
     user_id,
@@ -0,0 +1,71 @@
+from unittest.mock import MagicMock, call
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from breathecode.authenticate import tasks
+from breathecode.authenticate.actions import (
+    USER_LANGUAGE_CACHE_KEY,
+    aget_user_language,
+    get_user_language,
+    get_user_languages,
+)
+from breathecode.authenticate.models import UserSetting
+from breathecode.tests.mixins.breathecode_mixin import Breathecode
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+def build_request(user, **headers):
+    request = APIRequestFactory().get("/kenny", headers=headers)
+    force_authenticate(request, user=user)
+
+    return APIView().initialize_request(request)
+
+
+def test_languages_are_cached(bc: Breathecode, django_assert_num_queries, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(tasks.async_build_user_settings, "delay", MagicMock())
+    model = bc.database.create(user=3, user_setting=[{"user_id": 1, "lang": "es"}, {"user_id": 2, "lang": "en"}])
+    cache.set(USER_LANGUAGE_CACHE_KEY.format(user_id=2), "es")
+
+    with django_assert_num_queries(1):
+        assert get_user_languages([1, 2, 3, None, 1]) == {1: "es", 2: "es", 3: "en"}
+
+    # the users without settings have them built in background
+    assert tasks.async_build_user_settings.delay.call_args_list == [call([3])]
+
+    with django_assert_num_queries(0):
+        assert get_user_languages([1, 2, 3]) == {1: "es", 2: "es", 3: "en"}
+        assert get_user_language(build_request(model.user[0])) == "es"
+        assert async_to_sync(aget_user_language)(build_request(model.user[0])) == "es"
+
+    assert tasks.async_build_user_settings.delay.call_count == 1
+
+
+def test_header_is_preferred(bc: Breathecode, django_assert_num_queries):
+    model = bc.database.create(user=1, user_setting={"lang": "es"})
+    request = build_request(model.user, **{"Accept-Language": "en"})
+
+    with django_assert_num_queries(0):
+        assert get_user_language(request) == "en"
+        assert async_to_sync(aget_user_language)(request) == "en"
+
+
+def test_settings_are_built_in_background(bc: Breathecode, enable_signals):
+    enable_signals()
+    model = bc.database.create(user=1, cohort={"language": "es"}, cohort_user=1)
+
+    # the task runs inline in the tests
+    assert get_user_language(build_request(model.user)) == "en"
+
+    assert UserSetting.objects.get(user=model.user).lang == "es"
+    assert get_user_language(build_request(model.user)) == "es"
+
+    UserSetting.objects.filter(user=model.user).delete()
+    assert cache.get(USER_LANGUAGE_CACHE_KEY.format(user_id=1)) is None
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from breathecode.authenticate.authentication import (
+    TOKEN_CACHE_KEY,
+    AsyncExpiringTokenAuthentication,
+    ExpiringTokenAuthentication,
+    local_token_cache,
+)
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    yield
+
+
+def create_token(bc: Breathecode, **token):
+    return bc.database.create(
+        user={"email": "john@doe.com", "is_active": True},
+        token={"key": "abc", "token_type": "login", "expires_at": UTC_NOW + timedelta(days=1), **token},
+    )
+
+
+def test_token_is_cached(bc: Breathecode, django_assert_num_queries):
+    model = create_token(bc)
+    auth = ExpiringTokenAuthentication()
+
+    with django_assert_num_queries(1):
+        user, token = auth.authenticate_credentials("abc")
+
+    assert (user, token) == (model.user, model.token)
+
+    with django_assert_num_queries(0):
+        user, token = auth.authenticate_credentials("abc")
+
+    assert (user, token) == (model.user, model.token)
+    assert (user.email, token.expires_at) == ("john@doe.com", model.token.expires_at)
+
+    # the entry is shared with the other processes through redis
+    local_token_cache.clear()
+
+    with django_assert_num_queries(0):
+        assert auth.authenticate_credentials("abc") == (model.user, model.token)
+
+    # the password is not cached
+    assert "password" not in cache.get(TOKEN_CACHE_KEY.format(key="abc"))["user"]
+
+    with django_assert_num_queries(1):
+        assert user.password == model.user.password
+
+
+@pytest.mark.parametrize(
+    "user, token, error",
+    [
+        ({"is_active": False}, {}, "Invalid or inactive user"),
+        ({}, {"expires_at": UTC_NOW - timedelta(seconds=1)}, "Token expired at "),
+        ({}, {"key": "xyz"}, "Invalid or Inactive Token"),
+    ],
+)
+def test_rejected_tokens(bc: Breathecode, user, token, error):
+    bc.database.create(
+        user={"is_active": True, **user},
+        token={"key": "abc", "token_type": "login", "expires_at": UTC_NOW + timedelta(days=1), **token},
+    )
+    auth = ExpiringTokenAuthentication()
+
+    for _ in range(2):
+        with pytest.raises(AuthenticationFailed) as e:
+            auth.authenticate_credentials("abc")
+
+        assert e.value.detail["error"].startswith(error)
+
+
+def test_cache_is_invalidated(bc: Breathecode, enable_signals):
+    enable_signals()
+    model = create_token(bc)
+    auth = ExpiringTokenAuthentication()
+
+    auth.authenticate_credentials("abc")
+
+    model.user.is_active = False
+    model.user.save()
+
+    with pytest.raises(AuthenticationFailed):
+        auth.authenticate_credentials("abc")
+
+    model.user.is_active = True
+    model.user.save()
+    auth.authenticate_credentials("abc")
+
+    # rotated
+    model.token.key = "def"
+    model.token.save()
+
+    with pytest.raises(AuthenticationFailed):
+        auth.authenticate_credentials("abc")
+
+    assert auth.authenticate_credentials("def")[1].key == "def"
+
+    model.token.delete()
+
+    with pytest.raises(AuthenticationFailed):
+        auth.authenticate_credentials("def")
+
+
+def test_async_path(bc: Breathecode, django_assert_num_queries):
+    model = create_token(bc)
+    auth = AsyncExpiringTokenAuthentication()
+
+    with django_assert_num_queries(1):
+        assert async_to_sync(auth.aauthenticate_credentials)("abc") == (model.user, model.token)
+
+    with django_assert_num_queries(0):
+        assert async_to_sync(auth.aauthenticate_credentials)("abc") == (model.user, model.token)
+
+    with pytest.raises(AuthenticationFailed):
+        async_to_sync(auth.aauthenticate_credentials)("xyz")
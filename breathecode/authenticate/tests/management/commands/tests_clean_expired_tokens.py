@@ -0,0 +1,76 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock, call
+
+import newrelic.agent
+import pytest
+from django.utils import timezone
+
+from breathecode.authenticate.management.commands import clean_expired_tokens
+from breathecode.authenticate.management.commands.clean_expired_tokens import Command
+from breathecode.authenticate.models import Token
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    monkeypatch.setattr("time.sleep", MagicMock())
+    monkeypatch.setattr("newrelic.agent.record_custom_metric", MagicMock())
+    yield
+
+
+def create_tokens(bc: Breathecode, expired: int, valid: int):
+    token = {"token_type": "login"}
+    bc.database.create(
+        user=1,
+        token=[{**token, "expires_at": UTC_NOW - timedelta(hours=1)} for _ in range(expired)]
+        + [{**token, "expires_at": UTC_NOW + timedelta(hours=1)} for _ in range(valid)],
+    )
+
+
+def run(*args):
+    out = StringIO()
+    command = Command(stdout=out)
+    options = command.create_parser("manage.py", "clean_expired_tokens").parse_args(args)
+    command.handle(**vars(options))
+    return out.getvalue()
+
+
+def test_expired_tokens_are_deleted_in_batches(bc: Breathecode):
+    create_tokens(bc, expired=5, valid=2)
+
+    out = run("--batch-size", "2", "--sleep", "0.5")
+
+    assert out.startswith("5 tokens were deleted in 3 batches and ")
+    assert Token.objects.filter(expires_at__lt=UTC_NOW).count() == 0
+    assert Token.objects.count() == 2
+
+    assert time.sleep.call_args_list == [call(0.5), call(0.5)]
+    assert [x.args[:2] for x in newrelic.agent.record_custom_metric.call_args_list[:2]] == [
+        ("Custom/Authenticate/ExpiredTokens/Deleted", 5),
+        ("Custom/Authenticate/ExpiredTokens/Batches", 3),
+    ]
+
+
+def test_max_batches(bc: Breathecode):
+    create_tokens(bc, expired=5, valid=0)
+
+    out = run("--batch-size", "2", "--max-batches", "1")
+
+    assert out.startswith("2 tokens were deleted in 1 batches and ")
+    assert Token.objects.count() == 3
+
+
+def test_schedule(bc: Breathecode, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(clean_expired_tokens, "async_purge_expired_tokens", MagicMock())
+    create_tokens(bc, expired=1, valid=0)
+
+    assert run("--schedule") == "The purge of the expired tokens was scheduled\n"
+    assert clean_expired_tokens.async_purge_expired_tokens.delay.call_args_list == [
+        call(batch_size=1000, sleep=0.1, max_batches=None)
+    ]
+    assert Token.objects.count() == 1
@@ -4,6 +4,7 @@ Test cases for /academy/:id/member/:id
 
 from datetime import timedelta
 from time import sleep
+from unittest.mock import MagicMock, patch
 from django.utils import timezone
 from breathecode.services import datetime_to_iso_format
 from django.urls.base import reverse_lazy
@@ -527,6 +528,27 @@ class TokenTestSuite(AuthTestCase):
 
         self.assertEqual(db, [{"id": 3, "token_type": "temporal", "user_id": 1}])
 
+    """
+    🔽🔽🔽 get_or_create without the inline purge
+    """
+
+    @patch("breathecode.authenticate.models.is_inline_token_purge_enabled", MagicMock(return_value=False))
+    def test_get_or_create__without_inline_purge__only_the_expired_tokens_of_the_user_are_deleted(self):
+        expires_at = timezone.now() - timedelta(days=1, seconds=1)
+        token_kwargs = {"expires_at": expires_at, "token_type": "login"}
+        base = self.generate_models(user=True)
+        other = self.generate_models(user=True, token=True, token_kwargs=token_kwargs)
+        self.generate_models(token=True, token_kwargs=token_kwargs, models=base)
+
+        token, created = Token.get_or_create(base.user, token_type="login")
+
+        self.assertTrue(created)
+        self.assertGreater(token.expires_at, timezone.now())
+        self.assertEqual(
+            [(x["id"], x["user_id"]) for x in self.all_token_dict()],
+            [(other.token.id, other.user.id), (token.id, base.user.id)],
+        )
+
     """
     🔽🔽🔽 validate_and_destroy bad arguments
     """
@@ -685,3 +707,23 @@ class TokenTestSuite(AuthTestCase):
 
         self.assertEqual(result, None)
         self.assertEqual(self.all_token_dict(), [self.model_to_dict(model, "token")])
+
+    """
+    🔽🔽🔽 purge
+    """
+
+    def test_purge__without_signals_and_the_answers_lose_their_token(self):
+        expires_at = timezone.now() - timedelta(days=1)
+        model = self.bc.database.create(token={"expires_at": expires_at, "token_type": "login"}, answer=1)
+
+        with patch("django.db.models.signals.post_delete.send") as mock:
+            with self.assertNumQueries(2):
+                result = Token.purge(Token.objects.filter(expires_at__lt=timezone.now()))
+
+        self.assertEqual(result, 1)
+        self.assertEqual(mock.call_args_list, [])
+        self.assertEqual(self.all_token_dict(), [])
+        self.assertEqual(
+            self.bc.database.list_of("feedback.Answer"),
+            [{**self.bc.format.to_dict(model.answer), "token_id": None}],
+        )
@@ -78,7 +78,7 @@ from .actions import (
     sync_organization_members,
     update_gitpod_users,
 )
-from .authentication import ExpiringTokenAuthentication
+from .authentication import ExpiringTokenAuthentication, invalidate_cached_tokens
 from .forms import (
     InviteForm,
     LoginForm,
@@ -235,7 +235,10 @@ class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        Token.objects.filter(token_type="login").delete()
+        tokens = Token.objects.filter(token_type="login")
+        keys = list(tokens.values_list("key", flat=True))
+        tokens.delete()
+        invalidate_cached_tokens(*keys)
         request.auth.delete()
         return Response(
             {
@@ -1,16 +1,20 @@
 import functools
 import logging
 import os
+import threading
+import weakref
+from typing import Optional
 
+from django.db import transaction
 from django_redis import get_redis_connection
 from redis.lock import Lock
 
 from breathecode.utils import Cache
-from breathecode.utils.cache import CACHE_DEPENDENCIES, CACHE_DESCRIPTORS
+from breathecode.utils.cache import CACHE_DEPENDENCIES, CACHE_DESCRIPTORS, IS_DJANGO_REDIS
 
 logger = logging.getLogger(__name__)
 
-__all__ = ["clean_cache"]
+__all__ = ["clean_cache", "get_invalidation_metrics"]
 
 
 def is_test():
@@ -28,9 +32,156 @@ def is_output_enable():
     return os.getenv("HIDE_CACHE_LOG", "0") in ["0", "false", "False", "f"]
 
 
-def clean_cache(model_cls):
+@functools.lru_cache(maxsize=1)
+def invalidation_window():
+    # seconds that the invalidations of a model are collected before cleaning its cache in one batch
+    return int(os.getenv("CACHE_INVALIDATION_WINDOW", "2"))
+
+
+DIRTY_KEY = "cache:dirty:{key}"
+SCHEDULED_KEY = "cache:dirty:{key}:scheduled"
+METRICS_KEY = "cache:invalidation:metrics"
+FULL_CLEAN = "*"
+
+_local = threading.local()
+
+
+def encode_invalidation(pk: Optional[int | str] = None, deleted: bool = False) -> str:
+    """Encode an invalidation, without a primary key the whole cache of the model is cleaned."""
+
+    if pk is None:
+        return FULL_CLEAN
+
+    if deleted:
+        return f"{pk}:deleted"
+
+    return str(pk)
+
+
+def decode_invalidations(invalidations: list[str] | set[str]) -> tuple[bool, set[str], set[str]]:
+    """Get if the whole cache must be cleaned, the primary keys saved and the primary keys deleted."""
+
+    saved, deleted = set(), set()
+    for invalidation in invalidations:
+        if invalidation == FULL_CLEAN:
+            return True, set(), set()
+
+        if invalidation.endswith(":deleted"):
+            deleted.add(invalidation[:-8])
+
+        else:
+            saved.add(invalidation)
+
+    return False, saved - deleted, deleted
+
+
+class InvalidationBatch:
+    """
+    Invalidations collected in a transaction, they are scheduled together once it is committed.
+
+    The batch is only referenced by the on_commit callbacks of the connection, so a rollback, of the transaction or of
+    the savepoint where it was created, discards it along with them.
+    """
+
+    def __init__(self) -> None:
+        self.invalidations: dict[str, set[str]] = {}
+        self.received = 0
+
+    def add(self, key: str, invalidation: str) -> None:
+        self.received += 1
+        self.invalidations.setdefault(key, set()).add(invalidation)
+
+    def __call__(self) -> None:
+        if getattr(_local, "batch", lambda: None)() is self:
+            del _local.batch
+
+        schedule_invalidations(self.invalidations, self.received)
+
+
+def get_invalidation_batch() -> InvalidationBatch:
+    """Get the batch of the current transaction, it is registered with on_commit when it is created."""
+
+    batch = getattr(_local, "batch", lambda: None)()
+    if batch is None:
+        batch = InvalidationBatch()
+        _local.batch = weakref.ref(batch)
+        transaction.on_commit(batch)
+
+    return batch
+
+
+def schedule_invalidations(invalidations: dict[str, set[str]], received: int = 1) -> None:
+    """
+    Schedule the cleaning of the cache of each model.
+
+    In Redis the invalidations are added to a set per model and only one task is scheduled per time window, it
+    cleans all the invalidations collected in the meantime.
+    """
+
     from .tasks import clean_task
 
+    if not IS_DJANGO_REDIS:
+        for key, members in invalidations.items():
+            clean_task.apply_async(args=[key, sorted(members)], countdown=0)
+
+        return
+
+    window = invalidation_window()
+    keys = list(invalidations.keys())
+
+    with get_redis_connection("default").pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.sadd(DIRTY_KEY.format(key=key), *invalidations[key])
+            pipe.set(SCHEDULED_KEY.format(key=key), 1, nx=True, ex=window)
+
+        pipe.hincrby(METRICS_KEY, "invalidations", received)
+        results = pipe.execute()
+
+    batches = 0
+    for key, scheduled in zip(keys, results[1::2]):
+        if scheduled:
+            batches += 1
+            clean_task.apply_async(args=[key], countdown=window)
+
+    if batches:
+        get_redis_connection("default").hincrby(METRICS_KEY, "batches", batches)
+
+
+def pop_invalidations(key: str) -> set[str]:
+    """Get and remove the invalidations collected for a model."""
+
+    if not IS_DJANGO_REDIS:
+        return set()
+
+    with get_redis_connection("default").pipeline(transaction=True) as pipe:
+        pipe.smembers(DIRTY_KEY.format(key=key))
+        pipe.delete(DIRTY_KEY.format(key=key), SCHEDULED_KEY.format(key=key))
+        members, _ = pipe.execute()
+
+    return {x.decode("utf-8") if isinstance(x, bytes) else x for x in members}
+
+
+def restore_invalidations(key: str, invalidations: set[str]) -> None:
+    """Add back the invalidations of a batch that could not be cleaned."""
+
+    if IS_DJANGO_REDIS and invalidations:
+        get_redis_connection("default").sadd(DIRTY_KEY.format(key=key), *invalidations)
+
+
+def get_invalidation_metrics() -> dict[str, int]:
+    """Get how many invalidations were received and how many were coalesced into batches."""
+
+    if not IS_DJANGO_REDIS:
+        return {"invalidations": 0, "batches": 0, "coalesced": 0}
+
+    metrics = get_redis_connection("default").hgetall(METRICS_KEY)
+    invalidations = int(metrics.get(b"invalidations", 0))
+    batches = int(metrics.get(b"batches", 0))
+
+    return {"invalidations": invalidations, "batches": batches, "coalesced": invalidations - batches}
+
+
+def clean_cache(model_cls, pk: Optional[int | str] = None, deleted: bool = False):
     have_descriptor = model_cls in CACHE_DESCRIPTORS.keys()
     is_a_dependency = model_cls in CACHE_DEPENDENCIES
 
@@ -70,4 +221,11 @@ def clean_cache(model_cls):
                 is_dependency = True
 
     key = model_cls.__module__ + "." + model_cls.__name__
-    clean_task.apply_async(args=[key], countdown=0)
+    invalidation = encode_invalidation(pk, deleted)
+
+    # collect the invalidations of the transaction, they are scheduled together once it is committed
+    if transaction.get_connection().in_atomic_block:
+        get_invalidation_batch().add(key, invalidation)
+        return
+
+    schedule_invalidations({key: {invalidation}})
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from breathecode.commons.actions import get_invalidation_metrics
+
+
+class Command(BaseCommand):
+    help = "Show how many cache invalidations were coalesced into batches"
+
+    def handle(self, *args, **options):
+        metrics = get_invalidation_metrics()
+
+        self.stdout.write(f"Invalidations received: {metrics['invalidations']}")
+        self.stdout.write(f"Batches cleaned: {metrics['batches']}")
+        self.stdout.write(self.style.SUCCESS(f"Invalidations coalesced: {metrics['coalesced']}"))
@@ -1,7 +1,7 @@
 import functools
 import logging
 import os
-from typing import Any, Type
+from typing import Any, Optional, Type
 
 from django.db import models
 from django.db.models.signals import post_delete, post_save
@@ -30,13 +30,14 @@ def on_save(*args: Any, **kwargs: Any):
 @receiver(post_delete)
 def on_delete(*args: Any, **kwargs: Any):
     del kwargs["signal"]
-    update_cache.send_robust(*args, **kwargs)
+    update_cache.send_robust(*args, deleted=True, **kwargs)
 
 
 @receiver(update_cache)
-def clean_cache(sender: Type[models.Model], **_: Any):
+def clean_cache(sender: Type[models.Model], instance: Optional[models.Model] = None, deleted: bool = False, **_: Any):
     if not is_cache_enabled():
         logger.debug("Cache has been disabled")
         return
 
-    actions.clean_cache(sender)
+    pk = instance.pk if instance is not None else None
+    actions.clean_cache(sender, pk=pk, deleted=deleted)
@@ -1,5 +1,6 @@
 import importlib
 import logging
+from typing import Optional
 
 from task_manager.core.exceptions import AbortTask, RetryTask
 from task_manager.django.decorators import task
@@ -14,7 +15,7 @@ MODULES = {}
 
 
 @task(bind=True, priority=TaskPriority.CACHE.value)
-def clean_task(self, key: str, task_manager_id: int):
+def clean_task(self, key: str, invalidations: Optional[list[str]] = None, *, task_manager_id: int):
     # make sure all the modules are loaded
     from breathecode.admissions import caches as _  # noqa: F811, F401
     from breathecode.assignments import caches as _  # noqa: F811, F401
@@ -25,15 +26,6 @@ def clean_task(self, key: str, task_manager_id: int):
     from breathecode.payments import caches as _  # noqa: F811, F401
     from breathecode.registry import caches as _  # noqa: F811, F401
 
-    task_cls = self.task_manager.__class__
-    task_cls.objects.filter(
-        status="SCHEDULED",
-        task_module=self.task_manager.task_module,
-        task_name=self.task_manager.task_name,
-        arguments__args__exact=[key],
-        arguments__args__len=1,
-    ).exclude(id=task_manager_id).delete()
-
     unpack = key.split(".")
     model = unpack[-1]
     module = ".".join(unpack[:-1])
@@ -49,10 +41,30 @@ def clean_task(self, key: str, task_manager_id: int):
 
     cache = CACHE_DESCRIPTORS[model_cls]
 
+    # the invalidations collected in the time window are cleaned in one batch
+    pending = set(invalidations or []) | actions.pop_invalidations(key)
+    if not pending:
+        logger.debug(f"Nothing to clean for {key}, it was cleaned by a previous batch")
+        return
+
+    full_clean, saved, deleted = actions.decode_invalidations(pending)
+
     try:
-        cache.clear()
+        if full_clean:
+            cache.clear()
+
+        else:
+            if saved:
+                cache.invalidate(saved)
+
+            if deleted:
+                cache.invalidate(deleted, deleted=True)
+
         if actions.is_output_enable():
-            logger.debug(f"Cache cleaned for {key}")
+            logger.debug(f"Cache cleaned for {key}, {len(pending)} invalidations in one batch")
 
     except Exception:
+        # keep them to the next attempt
+        actions.restore_invalidations(key, pending)
+
         raise RetryTask(f"Could not clean the cache {key}", log=actions.is_output_enable())
@@ -0,0 +1,122 @@
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from breathecode.admissions.caches import CohortCache  # noqa: F401
+from breathecode.admissions.models import Cohort
+from breathecode.commons import actions
+
+KEY = "breathecode.admissions.models.Cohort"
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("breathecode.commons.tasks.clean_task.apply_async", MagicMock())
+    actions._local.__dict__.clear()
+    yield
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch):
+    conn = MagicMock()
+    pipe = conn.pipeline.return_value.__enter__.return_value
+
+    monkeypatch.setattr("breathecode.commons.actions.IS_DJANGO_REDIS", True)
+    monkeypatch.setattr("breathecode.commons.actions.get_redis_connection", lambda *args, **kwargs: conn)
+    monkeypatch.setattr("breathecode.commons.actions.invalidation_window", lambda: 2)
+
+    yield conn, pipe
+
+
+@pytest.mark.parametrize(
+    "invalidations, expected",
+    [
+        (["1", "2"], (False, {"1", "2"}, set())),
+        (["1", "2:deleted", "2"], (False, {"1"}, {"2"})),
+        (["1", "*", "2:deleted"], (True, set(), set())),
+    ],
+)
+def test_decode_invalidations(invalidations, expected):
+    assert actions.decode_invalidations(invalidations) == expected
+
+
+def test_coalesce_invalidations_of_a_transaction(django_capture_on_commit_callbacks):
+    from breathecode.commons.tasks import clean_task
+
+    with django_capture_on_commit_callbacks(execute=True):
+        actions.clean_cache(Cohort, pk=1)
+        actions.clean_cache(Cohort, pk=1)
+        actions.clean_cache(Cohort, pk=2)
+        actions.clean_cache(Cohort, pk=3, deleted=True)
+
+        assert clean_task.apply_async.call_args_list == []
+
+    assert clean_task.apply_async.call_args_list == [
+        call(args=[KEY, ["1", "2", "3:deleted"]], countdown=0),
+    ]
+
+
+def test_invalidations_of_a_rolled_back_savepoint_are_not_lost(django_capture_on_commit_callbacks):
+    from django.db import transaction
+
+    from breathecode.commons.tasks import clean_task
+
+    with django_capture_on_commit_callbacks(execute=True):
+        try:
+            with transaction.atomic():
+                actions.clean_cache(Cohort, pk=1)
+                raise Exception("rollback")
+
+        except Exception:
+            pass
+
+        with transaction.atomic():
+            actions.clean_cache(Cohort, pk=1)
+
+    assert clean_task.apply_async.call_args_list == [
+        call(args=[KEY, ["1"]], countdown=0),
+    ]
+
+
+def test_without_transaction(monkeypatch: pytest.MonkeyPatch):
+    from breathecode.commons.tasks import clean_task
+
+    transaction = MagicMock()
+    transaction.get_connection.return_value.in_atomic_block = False
+    monkeypatch.setattr("breathecode.commons.actions.transaction", transaction)
+
+    actions.clean_cache(Cohort, pk=1)
+    actions.clean_cache(Cohort)
+
+    assert clean_task.apply_async.call_args_list == [
+        call(args=[KEY, ["1"]], countdown=0),
+        call(args=[KEY, ["*"]], countdown=0),
+    ]
+
+
+def test_debounce_in_redis(redis):
+    from breathecode.commons.tasks import clean_task
+
+    conn, pipe = redis
+    pipe.execute.side_effect = [[1, True, 1], [1, None, 2]]
+
+    actions.schedule_invalidations({KEY: {"1"}})
+    actions.schedule_invalidations({KEY: {"2"}})
+
+    assert pipe.sadd.call_args_list == [
+        call(f"cache:dirty:{KEY}", "1"),
+        call(f"cache:dirty:{KEY}", "2"),
+    ]
+    assert pipe.set.call_args_list == [
+        call(f"cache:dirty:{KEY}:scheduled", 1, nx=True, ex=2),
+        call(f"cache:dirty:{KEY}:scheduled", 1, nx=True, ex=2),
+    ]
+    assert clean_task.apply_async.call_args_list == [call(args=[KEY], countdown=2)]
+    assert conn.hincrby.call_args_list == [call("cache:invalidation:metrics", "batches", 1)]
+
+
+def test_get_invalidation_metrics(redis):
+    conn, _ = redis
+    conn.hgetall.return_value = {b"invalidations": b"120", b"batches": b"3"}
+
+    assert actions.get_invalidation_metrics() == {"invalidations": 120, "batches": 3, "coalesced": 117}
@@ -37,7 +37,7 @@ def test_cohort_save_triggers_action(mock_action: MagicMock, bc: Breathecode, da
     # Assert action was called with Cohort after creation
     # Note: database.create might trigger saves on related models too.
     # We check specifically for the call with Cohort.
-    mock_action.assert_any_call(Cohort)
+    mock_action.assert_any_call(Cohort, pk=model.cohort.id, deleted=False)
     initial_call_count = mock_action.call_count
 
     # Reset mock and save again
@@ -46,7 +46,7 @@ def test_cohort_save_triggers_action(mock_action: MagicMock, bc: Breathecode, da
     model.cohort.save()
 
     # Assert action was called once with Cohort after update
-    mock_action.assert_called_once_with(Cohort)
+    mock_action.assert_called_once_with(Cohort, pk=model.cohort.id, deleted=False)
 
 
 @patch("breathecode.commons.actions.clean_cache")
@@ -60,10 +60,11 @@ def test_cohort_delete_triggers_action(mock_action: MagicMock, bc: Breathecode,
     mock_action.reset_mock()
 
     # Delete the instance
+    pk = model.cohort.id
     model.cohort.delete()
 
     # Assert action was called once with Cohort after deletion
-    mock_action.assert_called_once_with(Cohort)
+    mock_action.assert_called_once_with(Cohort, pk=pk, deleted=True)
 
 
 @patch("breathecode.commons.actions.clean_cache")
@@ -74,7 +75,7 @@ def test_event_save_triggers_action(mock_action: MagicMock, bc: Breathecode, dat
     model = database.create(event=1)
 
     # Assert action was called with Event after creation
-    mock_action.assert_any_call(Event)
+    mock_action.assert_any_call(Event, pk=model.event.id, deleted=False)
     initial_call_count = mock_action.call_count
 
     # Reset mock and save again
@@ -83,7 +84,7 @@ def test_event_save_triggers_action(mock_action: MagicMock, bc: Breathecode, dat
     model.event.save()
 
     # Assert action was called once with Event after update
-    mock_action.assert_called_once_with(Event)
+    mock_action.assert_called_once_with(Event, pk=model.event.id, deleted=False)
 
 
 @patch("breathecode.commons.actions.clean_cache")
@@ -97,7 +98,8 @@ def test_event_delete_triggers_action(mock_action: MagicMock, bc: Breathecode, d
     mock_action.reset_mock()
 
     # Delete the instance
+    pk = model.event.id
     model.event.delete()
 
     # Assert action was called once with Event after deletion
-    mock_action.assert_called_once_with(Event)
+    mock_action.assert_called_once_with(Event, pk=pk, deleted=True)
@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from breathecode.admissions.caches import CohortCache
+from breathecode.commons.tasks import clean_task
+
+KEY = "breathecode.admissions.models.Cohort"
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(CohortCache, "clear", MagicMock())
+    monkeypatch.setattr(CohortCache, "invalidate", MagicMock())
+    yield
+
+
+def test_nothing_to_clean():
+    clean_task.delay(KEY)
+
+    assert CohortCache.clear.call_args_list == []
+    assert CohortCache.invalidate.call_args_list == []
+
+
+def test_clean_a_batch():
+    clean_task.delay(KEY, ["1", "2", "3:deleted"])
+
+    assert CohortCache.clear.call_args_list == []
+    assert CohortCache.invalidate.call_args_list == [
+        call({"1", "2"}),
+        call({"3"}, deleted=True),
+    ]
+
+
+def test_clean_everything():
+    clean_task.delay(KEY, ["1", "*"])
+
+    assert CohortCache.clear.call_args_list == [call()]
+    assert CohortCache.invalidate.call_args_list == []
+
+
+def test_clean_the_invalidations_collected_in_redis(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("breathecode.commons.actions.pop_invalidations", MagicMock(return_value={"4", "5"}))
+
+    clean_task.delay(KEY)
+
+    assert CohortCache.invalidate.call_args_list == [call({"4", "5"})]
@@ -11,6 +11,7 @@ from django.utils import timezone
 
 from breathecode.events.caches import EventCache
 from breathecode.payments import tasks
+from breathecode.payments.models import ConsumptionSession
 from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
 
 from ..mixins.new_events_tests_case import EventTestCase
@@ -24,7 +25,7 @@ def setup(db):
 
 
 def consumption_session(event, event_type_set, user, consumable, data={}):
-    return {
+    item = {
         "consumable_id": consumable.id,
         "duration": timedelta(),
         "operation_code": "default",
@@ -47,6 +48,8 @@ def consumption_session(event, event_type_set, user, consumable, data={}):
         "was_discounted": False,
         **data,
     }
+    item["request_hash"] = ConsumptionSession.hash_request(item["request"])
+    return item
 
 
 def event_checkin_serializer(id, event, user):
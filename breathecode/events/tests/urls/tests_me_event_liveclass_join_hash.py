@@ -10,6 +10,7 @@ from django.utils import timezone
 from breathecode.events import tasks as tasks_events
 from breathecode.events.caches import EventCache
 from breathecode.payments import tasks
+from breathecode.payments.models import ConsumptionSession
 
 from ..mixins.new_events_tests_case import EventTestCase
 
@@ -22,7 +23,7 @@ def setup(db):
 
 
 def consumption_session(live_class, cohort_set, user, consumable, data={}):
-    return {
+    item = {
         "consumable_id": consumable.id,
         "duration": timedelta(),
         "operation_code": "default",
@@ -45,6 +46,8 @@ def consumption_session(live_class, cohort_set, user, consumable, data={}):
         "was_discounted": False,
         **data,
     }
+    item["request_hash"] = ConsumptionSession.hash_request(item["request"])
+    return item
 
 
 # IMPORTANT: the loader.render_to_string in a function is inside of function render
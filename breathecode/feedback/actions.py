@@ -139,7 +139,8 @@ def send_question(user, cohort=None):
 
     if question_was_sent_previously:
         answer = Answer.objects.filter(cohort=answer.cohort, user=user, status="SENT").first()
-        Token.objects.filter(id=answer.token_id).delete()
+        if token := Token.objects.filter(id=answer.token_id).first():
+            token.delete()
 
     else:
         answer.lang = answer.cohort.language.lower()
@@ -399,26 +399,12 @@ def _calculate_quality_score(has_mx, has_spf, has_dmarc, is_role, is_free):
     return max(0.0, min(1.0, score))
 
 
-def validate_email_local(email, lang):
+def _split_email(email, lang):
     """
-    Replica la funcionalidad de la API de Abstract API para validación de emails.
-    Realiza validaciones locales sin depender de servicios externos.
+    Verifica el formato del email y lo separa en usuario y dominio.
 
-    Retorna un diccionario con información de validación:
-    {
-        "email": "e@mail.com",
-        "user": "a",
-        "domain": "mail.com",
-        "format_valid": true,
-        "mx_found": true,
-        "mx_records": ["alt1.gmail-smtp-in.l.google.com"],
-        "spf": "v=spf1 include:_spf.google.com ~all",
-        "dmarc": "v=DMARC1; p=reject; ...",
-        "role": false,
-        "disposable": false,
-        "free": false,
-        "score": 0.8
-    }
+    Returns:
+        tuple: (email_lower, user_part, domain)
     """
     pattern = r"^[^@]+@[^@]+\.[^@]+$"
     format_valid = isinstance(email, str) and email and bool(re.match(pattern, email))
@@ -450,8 +436,80 @@ def validate_email_local(email, lang):
             slug="email-not-valid",
         )
 
-    user_part = split_email[0]
-    domain = split_email[1]
+    return email_lower, split_email[0], split_email[1]
+
+
+def _build_email_status(email_lower, user_part, domain, mx_records, spf_record, dmarc_record, lang):
+    """
+    Calcula el score de un email cuyo dominio tiene registros MX y no es temporal.
+
+    Lanza una ValidationException si el email es de mala calidad.
+    """
+    has_mx = True
+    is_role = user_part in ROLE_EMAIL_PREFIXES
+
+    is_free = domain in FREE_EMAIL_DOMAINS
+
+    quality_score = _calculate_quality_score(
+        has_mx=has_mx,
+        has_spf=spf_record is not None,
+        has_dmarc=dmarc_record is not None,
+        is_role=is_role,
+        is_free=is_free,
+    )
+
+    if quality_score <= 0.60:
+        raise ValidationException(
+            translation(
+                lang,
+                en="The email address seems to have poor quality. Are you able to provide a different email address?",
+                es="El correo electrónico que haz especificado parece de mala calidad. ¿Podrías especificarnos otra dirección?",
+                slug="poor-quality-email",
+            ),
+            data={"quality_score": quality_score},
+            slug="poor-quality-email",
+        )
+
+    email_status = {
+        "email": email_lower,
+        "user": user_part,
+        "domain": domain,
+        "format_valid": True,
+        "mx_found": has_mx,
+        "mx_records": mx_records,
+        "spf": spf_record,
+        "dmarc": dmarc_record,
+        "role": is_role,
+        "disposable": False,
+        "free": is_free,
+        "score": quality_score,
+    }
+
+    return email_status
+
+
+def validate_email_local(email, lang):
+    """
+    Replica la funcionalidad de la API de Abstract API para validación de emails.
+    Realiza validaciones locales sin depender de servicios externos.
+
+    Retorna un diccionario con información de validación:
+    {
+        "email": "e@mail.com",
+        "user": "a",
+        "domain": "mail.com",
+        "format_valid": true,
+        "mx_found": true,
+        "mx_records": ["alt1.gmail-smtp-in.l.google.com"],
+        "spf": "v=spf1 include:_spf.google.com ~all",
+        "dmarc": "v=DMARC1; p=reject; ...",
+        "role": false,
+        "disposable": false,
+        "free": false,
+        "score": 0.8
+    }
+    """
+    email_lower, user_part, domain = _split_email(email, lang)
 
     is_disposable = domain in DISPOSABLE_EMAIL_DOMAINS
 
@@ -493,46 +551,60 @@ def validate_email_local(email, lang):
     spf_record = _check_spf(domain)
     dmarc_record = _check_dmarc(domain)
 
-    is_role = user_part in ROLE_EMAIL_PREFIXES
+    return _build_email_status(email_lower, user_part, domain, mx_records, spf_record, dmarc_record, lang)
 
-    is_free = domain in FREE_EMAIL_DOMAINS
 
-    quality_score = _calculate_quality_score(
-        has_mx=has_mx,
-        has_spf=spf_record is not None,
-        has_dmarc=dmarc_record is not None,
-        is_role=is_role,
-        is_free=is_free,
-    )
+def validate_emails_local(emails, lang):
+    """
+    Valida varios emails con las mismas reglas de validate_email_local.
 
-    if quality_score <= 0.60:
-        raise ValidationException(
-            translation(
-                lang,
-                en="The email address seems to have poor quality. Are you able to provide a different email address?",
-                es="El correo electrónico que haz especificado parece de mala calidad. ¿Podrías especificarnos otra dirección?",
-                slug="poor-quality-email",
-            ),
-            data={"quality_score": quality_score},
-            slug="poor-quality-email",
-        )
+    Los dominios con una validación vigente se leen en una sola consulta y los demás se verifican una vez por
+    dominio, así una lista grande de emails no repite las consultas DNS ni las escrituras del cache.
 
-    email_status = {
-        "email": email_lower,
-        "user": user_part,
-        "domain": domain,
-        "format_valid": format_valid,
-        "mx_found": has_mx,
-        "mx_records": mx_records,
-        "spf": spf_record,
-        "dmarc": dmarc_record,
-        "role": is_role,
-        "disposable": is_disposable,
-        "free": is_free,
-        "score": quality_score,
+    Returns:
+        dict: email -> email_status, o la ValidationException del email
+    """
+    utc_now = timezone.now()
+
+    def get_domain(email):
+        if not isinstance(email, str) or "@" not in email:
+            return None
+
+        return email.lower().strip().split("@")[-1]
+
+    def is_cached(obj):
+        # con dnspython disponible, un cache sin registros MX se verifica de nuevo como en _check_mx_records
+        return obj is not None and (obj.mx_records or not DNS_AVAILABLE)
+
+    domains = {get_domain(x) for x in emails} - {None}
+    cached = {
+        x.domain: x
+        for x in EmailDomainValidation.objects.filter(domain__in=domains, next_check_at__gt=utc_now)
+        if is_cached(x)
     }
 
-    return email_status
+    result = {}
+    for email in emails:
+        domain = get_domain(email)
+        obj = cached.get(domain)
+
+        try:
+            if obj is None or not obj.has_mx or domain in DISPOSABLE_EMAIL_DOMAINS:
+                result[email] = validate_email_local(email, lang)
+
+            else:
+                email_lower, user_part, domain = _split_email(email, lang)
+                result[email] = _build_email_status(
+                    email_lower, user_part, domain, obj.mx_records, obj.spf, obj.dmarc, lang
+                )
+
+        except ValidationException as e:
+            result[email] = e
+
+        if domain and domain not in cached and is_cached(obj := EmailDomainValidation.get_valid_domain(domain)):
+            cached[domain] = obj
+
+    return result
 
 
 def validate_email(email, lang):
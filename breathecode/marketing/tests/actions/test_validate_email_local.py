@@ -1,10 +1,14 @@
 """
 Tests for validate_email_local action
 """
+from datetime import timedelta
+
 import pytest
 from capyc.rest_framework.exceptions import ValidationException
+from django.utils import timezone
 
-from breathecode.marketing.actions import validate_email_local
+from breathecode.marketing.actions import validate_email_local, validate_emails_local
+from breathecode.marketing.models import EmailDomainValidation
 
 
 @pytest.mark.django_db
@@ -162,3 +166,38 @@ class TestValidateEmailLocal:
         assert isinstance(result["score"], float)
         assert 0.0 <= result["score"] <= 1.0
 
+
+@pytest.mark.django_db
+class TestValidateEmailsLocal:
+    """Test suite for validate_emails_local function"""
+
+    @pytest.fixture(autouse=True)
+    def domain(self):
+        EmailDomainValidation.objects.create(
+            domain="company.com",
+            has_mx=True,
+            mx_records=["mx.company.com"],
+            spf="v=spf1 -all",
+            dmarc="v=DMARC1; p=reject",
+            next_check_at=timezone.now() + timedelta(days=180),
+        )
+
+    def test_cached_domains_are_read_in_one_query(self, django_assert_num_queries):
+        """Test that the domains validated recently are not checked again"""
+        with django_assert_num_queries(1):
+            result = validate_emails_local(["a@company.com", "B@company.com", "invalid-email"], "en")
+
+        assert result["a@company.com"]["score"] == 1.0
+        assert result["B@company.com"]["email"] == "b@company.com"
+        assert result["B@company.com"] == validate_email_local("b@company.com", "en")
+        assert result["invalid-email"].slug == "email-not-valid"
+
+    def test_cached_domain_quality(self):
+        """Test that the quality rules are applied to the emails of a cached domain"""
+        EmailDomainValidation.objects.filter(domain="company.com").update(spf=None, dmarc=None)
+
+        result = validate_emails_local(["info@company.com"], "en")
+
+        assert result["info@company.com"]["role"] is True
+        assert result["info@company.com"]["score"] == 0.75
+
@@ -22,6 +22,7 @@ from rest_framework import status
 from breathecode.mentorship.exceptions import ExtendSessionException
 from breathecode.mentorship.models import MentorshipSession
 from breathecode.payments import tasks
+from breathecode.payments.models import ConsumptionSession
 from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
 from breathecode.tests.mocks.requests import apply_requests_request_mock
 
@@ -85,7 +86,7 @@ def format_consumable(data={}):
 
 
 def format_consumption_session(mentorship_service, mentor_profile, mentorship_service_set, user, consumable, data={}):
-    return {
+    item = {
         "consumable_id": consumable.id,
         "duration": timedelta(),
         "eta": ...,
@@ -109,6 +110,8 @@ def format_consumption_session(mentorship_service, mentor_profile, mentorship_se
         "was_discounted": False,
         **data,
     }
+    item["request_hash"] = ConsumptionSession.hash_request(item["request"])
+    return item
 
 
 def apply_get_env(configuration={}):
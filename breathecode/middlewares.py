@@ -1,13 +1,15 @@
 import functools
 import gzip
 import os
-import sys
+import threading
 import zlib
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
 
 import brotli
 import zstandard
 from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.http import HttpRequest, HttpResponseRedirect
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import sync_and_async_middleware
 from django.utils.deprecation import MiddlewareMixin
 
@@ -27,12 +29,12 @@ def min_compression_size():
     return int(os.getenv("MIN_COMPRESSION_SIZE", "10"))
 
 
-def must_compress(data):
+def must_compress(data: bytes) -> bool:
     size = min_compression_size()
     if size == 0:
         return True
 
-    return sys.getsizeof(data) / 1024 > size
+    return len(data) / 1024 > size
 
 
 @functools.lru_cache(maxsize=1)
@@ -40,58 +42,174 @@ def use_gzip():
     return os.getenv("USE_GZIP", "0").lower() in ENABLE_LIST_OPTIONS
 
 
+DEFAULT_COMPRESSION_LEVELS = {"zstd": 3, "deflate": 6, "gzip": 6, "br": 4}
+
+# levels by content type, None means that the content is already compressed
+COMPRESSION_LEVELS = {
+    "application/json": DEFAULT_COMPRESSION_LEVELS,
+    "text/html": DEFAULT_COMPRESSION_LEVELS,
+    # exports are big and generated on the fly, the speed matters more than the ratio
+    "text/csv": {"zstd": 1, "deflate": 1, "gzip": 1, "br": 1},
+    "application/pdf": None,
+    "application/zip": None,
+    "application/gzip": None,
+    "application/x-gzip": None,
+    "image/": None,
+    "video/": None,
+    "audio/": None,
+    "font/woff": None,
+}
+
+_local = threading.local()
+
+
+def get_compression_level(content_type: str, encoding: str) -> Optional[int]:
+    """Get the compression level for a content type, None if it must not be compressed."""
+
+    content_type = content_type.split(";")[0].strip().lower()
+
+    for key, levels in COMPRESSION_LEVELS.items():
+        if content_type == key or (key.endswith("/") and content_type.startswith(key)):
+            return levels[encoding] if levels else None
+
+    return DEFAULT_COMPRESSION_LEVELS[encoding]
+
+
+def get_zstd_compressor(level: int) -> zstandard.ZstdCompressor:
+    """Get the zstd compressor of this thread, the contexts are expensive to create and can be reused."""
+
+    compressors = _local.__dict__.setdefault("zstd", {})
+    if level not in compressors:
+        compressors[level] = zstandard.ZstdCompressor(level=level)
+
+    return compressors[level]
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "zstd":
+        return get_zstd_compressor(level).compress(data)
+
+    if encoding == "deflate":
+        return zlib.compress(data, level)
+
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level)
+
+    return brotli.compress(data, quality=level)
+
+
+def compressobj(encoding: str, level: int):
+    """Get an incremental compressor, it must not be shared because it lives as long as the stream."""
+
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+
+    if encoding == "deflate":
+        return zlib.compressobj(level)
+
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    return BrotliCompressobj(level)
+
+
+class BrotliCompressobj:
+    """Adapt `brotli.Compressor` to the compressobj interface."""
+
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def stream_compress(content: Iterable[bytes], encoding: str, level: int) -> Iterator[bytes]:
+    compressor = compressobj(encoding, level)
+
+    for chunk in content:
+        if data := compressor.compress(chunk):
+            yield data
+
+    yield compressor.flush()
+
+
+async def astream_compress(content: AsyncIterable[bytes], encoding: str, level: int) -> AsyncIterator[bytes]:
+    compressor = compressobj(encoding, level)
+
+    async for chunk in content:
+        if data := compressor.compress(chunk):
+            yield data
+
+    yield compressor.flush()
+
+
 class CompressResponseMiddleware(MiddlewareMixin):
 
-    def _compress(self, response, encoding, alg):
-        if self._has_content:
-            compressed_content = alg(response.content)
-            response.content = compressed_content
+    def _get_encoding(self, request) -> Optional[str]:
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        dont_force_gzip = not use_gzip()
 
-        else:
-            compressed_content = alg(response.streaming_content)
-            response.streaming_content = compressed_content
+        # sort by compression ratio and speed
+        if "zstd" in accept_encoding and dont_force_gzip:
+            return "zstd"
 
-        response["Content-Encoding"] = encoding
-        # response['Content-Length'] = str(len(compressed_content))
+        if ("deflate" in accept_encoding or "*" in accept_encoding) and dont_force_gzip:
+            return "deflate"
 
-    def _must_compress(self, response):
-        self._has_content = hasattr(response, "content")
+        if "gzip" in accept_encoding:
+            return "gzip"
 
-        if self._has_content:
-            return must_compress(response.content)
+        if IS_DEV and "br" in accept_encoding and "PostmanRuntime" in request.META.get("HTTP_USER_AGENT", ""):
+            return "br"
 
-        else:
-            return must_compress(response.streaming_content)
+        return None
+
+    def _must_compress(self, response) -> bool:
+        if response.streaming:
+            # the size of a stream is unknown until it was consumed, it is compressed unless it says otherwise
+            if "Content-Length" in response.headers:
+                return int(response.headers["Content-Length"]) / 1024 > min_compression_size()
+
+            return True
+
+        return len(response.content) > 0 and must_compress(response.content)
 
     def process_response(self, request, response):
         # If the response is already compressed, do nothing
         if (
             "Content-Encoding" in response.headers
             or is_compression_enabled() is False
-            or self._must_compress(response) is False
             or IS_TEST
+            or self._must_compress(response) is False
         ):
             return response
 
-        # Compress the response if it's large enough
-        if response.content:
-            accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        encoding = self._get_encoding(request)
+        if encoding is None:
+            return response
 
-            dont_force_gzip = not use_gzip()
+        level = get_compression_level(response.headers.get("Content-Type", ""), encoding)
+        if level is None:
+            return response
 
-            # sort by compression ratio and speed
-            if "zstd" in accept_encoding and dont_force_gzip:
-                self._compress(response, "zstd", zstandard.compress)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = astream_compress(response.streaming_content, encoding, level)
 
-            elif ("deflate" in accept_encoding or "*" in accept_encoding) and dont_force_gzip:
-                self._compress(response, "deflate", zlib.compress)
+            else:
+                response.streaming_content = stream_compress(response.streaming_content, encoding, level)
 
-            elif "gzip" in accept_encoding:
-                self._compress(response, "gzip", gzip.compress)
+            del response["Content-Length"]
 
-            elif IS_DEV and "br" in accept_encoding and "PostmanRuntime" in request.META.get("HTTP_USER_AGENT", ""):
-                self._compress(response, "br", brotli.compress)
+        else:
+            response.content = compress(response.content, encoding, level)
+            response["Content-Length"] = str(len(response.content))
 
+        patch_vary_headers(response, ("Accept-Encoding",))
+        response["Content-Encoding"] = encoding
         return response
 
 
@@ -194,3 +312,29 @@ def detect_pagination_issues_middleware(get_response):
             return response
 
     return middleware
+
+
+@sync_and_async_middleware
+def release_cache_rebuild_locks_middleware(get_response):
+    from breathecode.utils.api_view_extensions.extensions.cache_extension import REBUILDS_ATTR, release_rebuild_locks
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request: HttpRequest):
+            try:
+                return await get_response(request)
+
+            finally:
+                if hasattr(request, REBUILDS_ATTR):
+                    await sync_to_async(release_rebuild_locks)(request)
+
+    else:
+
+        def middleware(request: HttpRequest):
+            try:
+                return get_response(request)
+
+            finally:
+                release_rebuild_locks(request)
+
+    return middleware
@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 
 from django.core.management.base import BaseCommand
@@ -5,14 +6,26 @@ from django.utils import timezone
 
 from breathecode.monitoring.models import Supervisor, SupervisorIssue
 from breathecode.monitoring.tasks import fix_issue, run_supervisor
-from breathecode.utils.decorators import paths
+from breathecode.utils.decorators import SUPERVISOR_COSTS, costs, paths
+
+# the high cost supervisors are staggered across the runs of this command
+MAX_EXPENSIVE_SUPERVISORS = int(os.getenv("MAX_EXPENSIVE_SUPERVISORS", "1"))
 
 
 class Command(BaseCommand):
     help = "Run all supervisors"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-cost",
+            choices=SUPERVISOR_COSTS,
+            default="high",
+            help="Skip the supervisors that declare a higher cost (default: high, run all)",
+        )
+
     def handle(self, *args, **options):
         self.utc_now = timezone.now()
+        self.max_cost = options.get("max_cost") or "high"
 
         SupervisorIssue.objects.filter(ran_at__lte=self.utc_now - timedelta(days=7)).delete()
 
@@ -30,14 +43,39 @@ class Command(BaseCommand):
         self.fix_issues()
 
     def run_supervisors(self):
-        supervisors = Supervisor.objects.all()
+        max_cost = SUPERVISOR_COSTS.index(self.max_cost)
+        expensive = []
+
+        for supervisor in Supervisor.objects.all():
+            if supervisor.ran_at is not None and self.utc_now - supervisor.delta <= supervisor.ran_at:
+                continue
 
-        for supervisor in supervisors:
-            if supervisor.ran_at is None or self.utc_now - supervisor.delta > supervisor.ran_at:
-                run_supervisor.delay(supervisor.id)
+            cost = costs.get((supervisor.task_module, supervisor.task_name), "low")
+            if SUPERVISOR_COSTS.index(cost) > max_cost:
                 self.stdout.write(
-                    self.style.SUCCESS(f"Supervisor {supervisor.task_module}.{supervisor.task_name} scheduled")
+                    self.style.WARNING(f"Supervisor {supervisor.task_module}.{supervisor.task_name} skipped ({cost})")
                 )
+                continue
+
+            if cost == "high":
+                expensive.append(supervisor)
+                continue
+
+            self.schedule(supervisor)
+
+        # the most overdue go first, the rest wait for the next run
+        expensive.sort(key=lambda x: (x.ran_at is not None, x.ran_at))
+        for supervisor in expensive[:MAX_EXPENSIVE_SUPERVISORS]:
+            self.schedule(supervisor)
+
+        for supervisor in expensive[MAX_EXPENSIVE_SUPERVISORS:]:
+            self.stdout.write(
+                self.style.WARNING(f"Supervisor {supervisor.task_module}.{supervisor.task_name} postponed")
+            )
+
+    def schedule(self, supervisor: Supervisor):
+        run_supervisor.delay(supervisor.id)
+        self.stdout.write(self.style.SUCCESS(f"Supervisor {supervisor.task_module}.{supervisor.task_name} scheduled"))
 
     def fix_issues(self):
         issues = SupervisorIssue.objects.filter(fixed=None, attempts__lt=3)
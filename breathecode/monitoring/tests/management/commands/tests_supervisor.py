@@ -10,6 +10,7 @@ from breathecode.monitoring.models import Supervisor as SupervisorModel
 from breathecode.monitoring.models import SupervisorIssue
 from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
 from breathecode.utils.decorators import paths
+from breathecode.utils.decorators import supervisor as supervisor_decorator
 
 from ....management.commands.supervisor import Command
 
@@ -336,3 +337,62 @@ class TestSupervision:
             not in run_supervisor_mock.call_args_list
         )
         assert fix_issue_mock.call_args_list == []
+
+
+@supervisor_decorator(cost="high")
+def expensive_supervisor1():
+    yield from []
+
+
+@supervisor_decorator(cost="high")
+def expensive_supervisor2():
+    yield from []
+
+
+class TestCost:
+
+    def tests_expensive_are_staggered(
+        self, database: dfx.Database, supervisor: Supervisor, patch, utc_now, monkeypatch: pytest.MonkeyPatch
+    ):
+        # supervise_billing_team_flag_drift never ran, it goes first
+        monkeypatch.setattr("breathecode.monitoring.management.commands.supervisor.MAX_EXPENSIVE_SUPERVISORS", 2)
+        module = "breathecode.monitoring.tests.management.commands.tests_supervisor"
+        database.create(
+            supervisor=[
+                {"task_module": module, "task_name": "expensive_supervisor1", "ran_at": utc_now - timedelta(hours=2)},
+                {"task_module": module, "task_name": "expensive_supervisor2", "ran_at": utc_now - timedelta(hours=3)},
+            ],
+        )
+
+        run_supervisor_mock, _ = patch
+        command = Command()
+
+        assert command.handle() == None
+        assert call(supervisor.id(module, "expensive_supervisor2")) in run_supervisor_mock.call_args_list
+        assert call(supervisor.id(module, "expensive_supervisor1")) not in run_supervisor_mock.call_args_list
+        assert (
+            call(supervisor.id("breathecode.payments.supervisors", "supervise_billing_team_flag_drift"))
+            in run_supervisor_mock.call_args_list
+        )
+        assert (
+            call(supervisor.id("breathecode.payments.supervisors", "supervise_all_consumption_sessions"))
+            in run_supervisor_mock.call_args_list
+        )
+
+    def tests_max_cost(self, database: dfx.Database, supervisor: Supervisor, patch):
+        module = "breathecode.monitoring.tests.management.commands.tests_supervisor"
+        database.create(supervisor={"task_module": module, "task_name": "expensive_supervisor1", "ran_at": None})
+
+        run_supervisor_mock, _ = patch
+        command = Command()
+
+        assert command.handle(max_cost="low") == None
+        assert call(supervisor.id(module, "expensive_supervisor1")) not in run_supervisor_mock.call_args_list
+        assert (
+            call(supervisor.id("breathecode.payments.supervisors", "supervise_all_consumption_sessions"))
+            not in run_supervisor_mock.call_args_list
+        )
+        assert (
+            call(supervisor.id("breathecode.payments.supervisors", "supervise_pending_bags_to_be_delivered"))
+            in run_supervisor_mock.call_args_list
+        )
@@ -1,10 +1,11 @@
 import os
-import re
+import time
 import uuid
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from decimal import ROUND_FLOOR, Decimal
 from functools import lru_cache
-from typing import Any, Literal, Optional, Tuple, Type, TypedDict, Union
+from typing import TYPE_CHECKING, Any, Literal, Optional, Tuple, Type, TypedDict, Union
 
 import redis
 import redis.lock
@@ -13,13 +14,14 @@ from capyc.core.i18n import translation
 from capyc.rest_framework.exceptions import ValidationException
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.handlers.wsgi import WSGIRequest
 from django.db import transaction
-from django.db.models import Q, QuerySet, Sum
+from django.db.models import Count, F, Max, Min, Q, QuerySet, Sum, prefetch_related_objects
 from django.http import HttpRequest
 from django.utils import timezone
 from django_redis import get_redis_connection
-from pytz import UTC
+from redis.exceptions import LockError
 from rest_framework.request import Request
 from task_manager.core.exceptions import AbortTask, RetryTask
 
@@ -27,16 +29,18 @@ from breathecode.admissions import tasks as admissions_tasks
 from breathecode.admissions.models import Academy, Cohort, CohortUser, Syllabus
 from breathecode.authenticate.actions import get_app_url, get_api_url, get_user_settings
 from breathecode.authenticate.models import Role, UserInvite, UserSetting
-from breathecode.marketing.actions import validate_email_local
+from breathecode.marketing.actions import validate_email_local, validate_emails_local
 from breathecode.media.models import File
 from breathecode.notify import actions as notify_actions
-from breathecode.payments import tasks
+from breathecode.payments import signals, tasks
 from breathecode.utils import getLogger
+from breathecode.utils.redis import Lock
 from breathecode.utils.validate_conversion_info import validate_conversion_info
 from settings import GENERAL_PRICING_RATIOS
 
 from .models import (
     SERVICE_UNITS,
+    AcademyPaymentSettings,
     AcademyService,
     Bag,
     CohortSet,
@@ -48,19 +52,28 @@ from .models import (
     FinancingOption,
     Invoice,
     MentorshipServiceSet,
+    PaymentContact,
     PaymentMethod,
     Plan,
     PlanFinancing,
     PlanFinancingSeat,
     PlanFinancingTeam,
+    PlanServiceItem,
+    PlanServiceItemHandler,
     ProofOfPayment,
     Service,
     ServiceItem,
+    ServiceStockScheduler,
     Subscription,
     SubscriptionBillingTeam,
     SubscriptionSeat,
+    SubscriptionServiceItem,
+    UserEntitlement,
 )
 
+if TYPE_CHECKING:
+    from .services.stripe import BulkCharge
+
 logger = getLogger(__name__)
 
 
@@ -766,55 +779,19 @@ def get_amount(
         )
 
         if not bag.how_many_installments and (bag.chosen_period != "NO_SET" or must_it_be_charged):
-            # Get base prices
-            base_price_per_month = plan.price_per_month or 0
-            base_price_per_quarter = plan.price_per_quarter or 0
-            base_price_per_half = plan.price_per_half or 0
-            base_price_per_year = plan.price_per_year or 0
-
-            # Apply pricing ratio if country code is available
-            if bag.country_code:
-                # Apply pricing ratio to each price type
-                adjusted_price_per_month, ratio_per_month, c = apply_pricing_ratio(
-                    base_price_per_month, bag.country_code, plan, lang=lang, price_attr="price_per_month"
-                )
-                adjusted_price_per_quarter, ratio_per_quarter, _ = apply_pricing_ratio(
-                    base_price_per_quarter, bag.country_code, plan, lang=lang, price_attr="price_per_quarter"
-                )
-                adjusted_price_per_half, ratio_per_half, _ = apply_pricing_ratio(
-                    base_price_per_half, bag.country_code, plan, lang=lang, price_attr="price_per_half"
-                )
-                adjusted_price_per_year, ratio_per_year, _ = apply_pricing_ratio(
-                    base_price_per_year, bag.country_code, plan, lang=lang, price_attr="price_per_year"
-                )
-
-                add_currency(c)
-                currency = c or currency
+            # the prices were adjusted to the country when the plan was quoted
+            quote = get_plan_quote(plan, bag.country_code, lang)
 
-                # Calculate ratio for explanation if not direct price
-                if adjusted_price_per_month != base_price_per_month and base_price_per_month > 0:
-                    pricing_ratio_explanation["plans"].append({"plan": plan.slug, "ratio": ratio_per_month})
+            add_currency(quote["currency"])
+            currency = quote["currency"] or currency
 
-                elif adjusted_price_per_quarter != base_price_per_quarter and base_price_per_quarter > 0:
-                    pricing_ratio_explanation["plans"].append({"plan": plan.slug, "ratio": ratio_per_quarter})
+            if quote["explanation"]:
+                pricing_ratio_explanation["plans"].append(quote["explanation"])
 
-                elif adjusted_price_per_half != base_price_per_half and base_price_per_half > 0:
-                    pricing_ratio_explanation["plans"].append({"plan": plan.slug, "ratio": ratio_per_half})
-
-                elif adjusted_price_per_year != base_price_per_year and base_price_per_year > 0:
-                    pricing_ratio_explanation["plans"].append({"plan": plan.slug, "ratio": ratio_per_year})
-
-                # Use adjusted prices
-                price_per_month += adjusted_price_per_month
-                price_per_quarter += adjusted_price_per_quarter
-                price_per_half += adjusted_price_per_half
-                price_per_year += adjusted_price_per_year
-            else:
-                # No country code, use base prices
-                price_per_month += base_price_per_month
-                price_per_quarter += base_price_per_quarter
-                price_per_half += base_price_per_half
-                price_per_year += base_price_per_year
+            price_per_month += quote["price_per_month"]
+            price_per_quarter += quote["price_per_quarter"]
+            price_per_half += quote["price_per_half"]
+            price_per_year += quote["price_per_year"]
 
     plans = bag.plans.all()
     add_ons: dict[int, AcademyService] = {}
@@ -1056,6 +1033,31 @@ def get_bag_from_plan_financing(plan_financing: PlanFinancing, settings: Optiona
     return bag
 
 
+def get_installment_amount(first_invoice: Invoice) -> float:
+    """Get the price of an installment from the first invoice of a plan financing, without the reward coupons."""
+
+    amount = first_invoice.amount
+    coupons = first_invoice.bag.coupons.all() if first_invoice.bag else []
+
+    reward_coupons = [
+        coupon
+        for coupon in coupons
+        if coupon and coupon.allowed_user_id is not None and coupon.referral_type == Coupon.Referral.NO_REFERRAL
+    ]
+
+    for coupon in reward_coupons:
+        v = coupon.discount_value or 0
+
+        if coupon.discount_type == Coupon.Discount.PERCENT_OFF:
+            factor = 1 - v
+            if factor > 0:
+                amount /= factor
+        elif coupon.discount_type == Coupon.Discount.FIXED_PRICE:
+            amount += v
+
+    return amount
+
+
 def filter_consumables(
     request: WSGIRequest,
     items: QuerySet[Consumable],
@@ -1103,12 +1105,9 @@ def filter_void_consumable_balance(request: WSGIRequest, items: QuerySet[Consuma
 
         consumables = consumables.filter(service_item__service__slug__in=slugs)
 
-    if not consumables:
-        return []
-
     result = {}
 
-    for consumable in consumables:
+    for consumable in consumables.select_related("service_item__service"):
         service = consumable.service_item.service
         if service.id not in result:
             result[service.id] = {
@@ -1126,76 +1125,217 @@ def filter_void_consumable_balance(request: WSGIRequest, items: QuerySet[Consuma
         elif result[service.id]["balance"]["unit"] != -1:
             result[service.id]["balance"]["unit"] += consumable.how_many
 
-        result[service.id]["items"].append(
-            {
-                "id": consumable.id,
-                "how_many": consumable.how_many,
-                "unit_type": consumable.unit_type,
-                "valid_until": consumable.valid_until,
-                "subscription_seat": consumable.subscription_seat.id if consumable.subscription_seat else None,
-                "subscription_billing_team": (
-                    consumable.subscription_billing_team.id if consumable.subscription_billing_team else None
-                ),
-                "user": consumable.user.id if consumable.user else None,
-                "subscription": consumable.subscription.id if consumable.subscription else None,
-                "plan_financing": consumable.plan_financing.id if consumable.plan_financing else None,
-            }
-        )
+        result[service.id]["items"].append(serialize_consumable_item(consumable))
 
     return list(result.values())
 
 
+def serialize_consumable_item(consumable: Consumable) -> dict[str, Any]:
+    return {
+        "id": consumable.id,
+        "how_many": consumable.how_many,
+        "unit_type": consumable.unit_type,
+        "valid_until": consumable.valid_until,
+        # identity info
+        "subscription_seat": consumable.subscription_seat_id,
+        "subscription_billing_team": consumable.subscription_billing_team_id,
+        "user": consumable.user_id,
+        "subscription": consumable.subscription_id,
+        "plan_financing": consumable.plan_financing_id,
+    }
+
+
 def get_balance_by_resource(
     queryset: QuerySet[Consumable],
     key: str,
 ):
-    result = []
-
-    ids = {getattr(x, key).id for x in queryset}
-    for id in ids:
-        current = queryset.filter(**{f"{key}__id": id})
-
-        instance = current.first()
-        balance = {}
-        items = []
-        units = {x[0] for x in SERVICE_UNITS}
-        for unit in units:
-            per_unit = current.filter(unit_type=unit)
-            balance[unit.lower()] = (
-                -1 if per_unit.filter(how_many=-1).exists() else per_unit.aggregate(Sum("how_many"))["how_many__sum"]
-            )
+    """
+    Get the balance of each resource of the consumables, it uses one grouped aggregation and one fetch.
 
-        for x in queryset:
-            valid_until = x.valid_until
-            if valid_until:
-                valid_until = re.sub(r"\+00:00$", "Z", valid_until.replace(tzinfo=UTC).isoformat())
-
-            items.append(
-                {
-                    "id": x.id,
-                    "how_many": x.how_many,
-                    "unit_type": x.unit_type,
-                    "valid_until": x.valid_until,
-                    # identity info
-                    "subscription_seat": x.subscription_seat.id if x.subscription_seat else None,
-                    "subscription_billing_team": (
-                        x.subscription_billing_team.id if x.subscription_billing_team else None
-                    ),
-                    "user": x.user.id if x.user else None,
-                    "subscription": x.subscription.id if x.subscription else None,
-                    "plan_financing": x.plan_financing.id if x.plan_financing else None,
-                }
-            )
+    The balance of a unit type is -1 if any of its consumables is unlimited, and the items of every resource are
+    all the consumables of the queryset.
+    """
 
-        result.append(
-            {
-                "id": getattr(instance, key).id,
-                "slug": getattr(instance, key).slug,
-                "balance": balance,
-                "items": items,
+    # the joins of the seats could repeat a consumable
+    rows = (
+        Consumable.objects.filter(id__in=queryset.values("id"))
+        .values(f"{key}_id", f"{key}__slug", "unit_type")
+        .annotate(total=Sum("how_many"), unlimited=Count("id", filter=Q(how_many=-1)))
+        .order_by(f"{key}_id")
+    )
+
+    resources: dict[int, dict[str, Any]] = {}
+    units = {x[0] for x in SERVICE_UNITS}
+
+    for row in rows:
+        id = row[f"{key}_id"]
+        if id not in resources:
+            resources[id] = {
+                "id": id,
+                "slug": row[f"{key}__slug"],
+                "balance": {unit.lower(): None for unit in units},
             }
+
+        if row["unit_type"] in units:
+            resources[id]["balance"][row["unit_type"].lower()] = -1 if row["unlimited"] else row["total"]
+
+    if not resources:
+        return []
+
+    items = [serialize_consumable_item(x) for x in queryset]
+
+    # every resource gets its own list, the virtual balance appends items to them
+    return [{**resource, "items": list(items)} for resource in resources.values()]
+
+
+CONSUMABLE_BALANCE_KEY = "consumable:balance:{user_id}"
+IS_DJANGO_REDIS = hasattr(cache, "fake") is False
+
+# it decrements a balance only if it was cached and it is not unlimited
+DECREMENT_CONSUMABLE_BALANCE_SCRIPT = """
+local value = redis.call("HGET", KEYS[1], ARGV[1])
+if not value or tonumber(value) == -1 then
+    return value
+end
+
+local balance = math.max(tonumber(value) - tonumber(ARGV[2]), 0)
+redis.call("HSET", KEYS[1], ARGV[1], balance)
+return tostring(balance)
+"""
+
+
+@lru_cache(maxsize=1)
+def get_consumable_balance_ttl() -> int:
+    return int(os.getenv("CONSUMABLE_BALANCE_TTL", "300"))
+
+
+def compute_consumable_balance(user_id: int, service: str) -> float:
+    """Get the units of a service available for a user from its consumables, -1 if they are unlimited."""
+
+    # the joins of the seats could repeat a consumable
+    ids = Consumable.list(user=user_id, service=service).values("id")
+    result = Consumable.objects.filter(id__in=ids).aggregate(
+        total=Sum("how_many"), unlimited=Count("id", filter=Q(how_many=-1))
+    )
+
+    if result["unlimited"]:
+        return -1
+
+    return result["total"] or 0
+
+
+def get_consumable_balance(user_id: int, service: str) -> float:
+    """
+    Get the units of a service available for a user, -1 if they are unlimited.
+
+    The balances are kept in a hash per user, they are computed from the consumables on a miss and they expire
+    after CONSUMABLE_BALANCE_TTL seconds, it bounds the time that a balance could drift from its consumables.
+    """
+
+    key = CONSUMABLE_BALANCE_KEY.format(user_id=user_id)
+
+    if IS_DJANGO_REDIS:
+        conn = get_redis_connection("default")
+        value = conn.hget(key, service)
+        if value is not None:
+            return float(value)
+
+        balance = compute_consumable_balance(user_id, service)
+
+        with conn.pipeline(transaction=False) as pipe:
+            pipe.hset(key, service, balance)
+            pipe.expire(key, get_consumable_balance_ttl())
+            pipe.execute()
+
+        return balance
+
+    balances = cache.get(key) or {}
+    if service in balances:
+        return balances[service]
+
+    balance = compute_consumable_balance(user_id, service)
+    cache.set(key, {**balances, service: balance}, timeout=get_consumable_balance_ttl())
+
+    return balance
+
+
+def decrement_consumable_balance(user_id: int, service: str, how_many: float) -> None:
+    """Discount the units consumed from the balance of a user, if it was cached."""
+
+    key = CONSUMABLE_BALANCE_KEY.format(user_id=user_id)
+
+    if IS_DJANGO_REDIS:
+        get_redis_connection("default").eval(DECREMENT_CONSUMABLE_BALANCE_SCRIPT, 1, key, service, how_many)
+        return
+
+    balances = cache.get(key) or {}
+    if service in balances and balances[service] != -1:
+        balances[service] = max(balances[service] - how_many, 0)
+        cache.set(key, balances, timeout=get_consumable_balance_ttl())
+
+
+def invalidate_consumable_balances(user_ids: list[int] | set[int]) -> None:
+    """Remove the balances of the users, they will be computed again from their consumables."""
+
+    keys = [CONSUMABLE_BALANCE_KEY.format(user_id=x) for x in user_ids if x]
+    if not keys:
+        return
+
+    if IS_DJANGO_REDIS:
+        get_redis_connection("default").delete(*keys)
+        return
+
+    cache.delete_many(keys)
+
+
+def get_consumable_owners(consumable: Consumable) -> set[int]:
+    """Get the users that could consume a consumable."""
+
+    user_ids = {
+        consumable.user_id,
+        consumable.subscription_seat and consumable.subscription_seat.user_id,
+        consumable.plan_financing_seat and consumable.plan_financing_seat.user_id,
+    }
+
+    if consumable.user_id is None and consumable.subscription_billing_team_id and not consumable.subscription_seat_id:
+        user_ids |= set(
+            SubscriptionSeat.objects.filter(billing_team_id=consumable.subscription_billing_team_id).values_list(
+                "user_id", flat=True
+            )
         )
-    return result
+
+    if consumable.user_id is None and consumable.plan_financing_team_id:
+        user_ids |= set(
+            PlanFinancingSeat.objects.filter(team_id=consumable.plan_financing_team_id).values_list(
+                "user_id", flat=True
+            )
+        )
+
+    return {x for x in user_ids if x}
+
+
+def reconcile_consumable_balances() -> int:
+    """Compute again the balances cached from their consumables, it returns how many of them had drifted."""
+
+    if not IS_DJANGO_REDIS:
+        return 0
+
+    conn = get_redis_connection("default")
+    drifted = 0
+
+    for key in conn.scan_iter(match=CONSUMABLE_BALANCE_KEY.format(user_id="*"), count=1000):
+        key = key.decode("utf-8") if isinstance(key, bytes) else key
+        user_id = int(key.rsplit(":", 1)[1])
+
+        for service, value in conn.hgetall(key).items():
+            service = service.decode("utf-8") if isinstance(service, bytes) else service
+            balance = compute_consumable_balance(user_id, service)
+
+            if float(value) != balance:
+                drifted += 1
+                conn.hset(key, service, balance)
+
+    return drifted
 
 
 @lru_cache(maxsize=1)
@@ -1274,15 +1414,7 @@ def get_available_coupons(
     cou_fields = ("id", "slug", "how_many_offers", "offered_at", "expires_at", "seller", "allowed_user")
 
     if not only_sent_coupons:
-        special_offer = (
-            Coupon.objects.filter(*cou_args, auto=True)
-            .exclude(
-                Q(how_many_offers=0) | Q(discount_type=Coupon.Discount.NO_DISCOUNT) | Q(allowed_user__isnull=False)
-            )
-            .select_related("seller__user", "allowed_user")
-            .only(*cou_fields)
-            .first()
-        )
+        special_offer = get_plan_quote(plan)["special_offer"]
 
         if special_offer:
             manage_coupon(special_offer)
@@ -1912,6 +2044,128 @@ def apply_pricing_ratio(
     return price, None, None
 
 
+PRICING_QUOTE_VERSION_KEY = "payments:quote:version"
+PRICING_QUOTE_KEY = "payments:quote:{version}:{plan_id}:{country_code}"
+PLAN_PRICE_ATTRS = ("price_per_month", "price_per_quarter", "price_per_half", "price_per_year")
+
+
+class OneShotQuote(TypedDict):
+    base_price: float
+    price: float
+    ratio: Optional[float]
+    currency: Optional[Currency]
+
+
+class PlanQuote(TypedDict):
+    price_per_month: float
+    price_per_quarter: float
+    price_per_half: float
+    price_per_year: float
+    # pricing ratio explanation of the plan prices, None if they were not adjusted
+    explanation: Optional[dict[str, Any]]
+    currency: Optional[Currency]
+    # price of the financing option of one payment
+    one_shot: Optional[OneShotQuote]
+    # auto coupon offered for the plan, it still must be validated for the user
+    special_offer: Optional[Coupon]
+
+
+@lru_cache(maxsize=1)
+def get_pricing_quote_ttl() -> int:
+    return int(os.getenv("PRICING_QUOTE_TTL", "3600"))
+
+
+def get_pricing_quote_version() -> int:
+    return int(cache.get(PRICING_QUOTE_VERSION_KEY) or 0)
+
+
+def invalidate_pricing_quotes() -> None:
+    """Discard every quote, a change in the catalog could affect the prices of any plan."""
+
+    if IS_DJANGO_REDIS:
+        get_redis_connection("default").incr(cache.make_key(PRICING_QUOTE_VERSION_KEY))
+        return
+
+    cache.set(PRICING_QUOTE_VERSION_KEY, get_pricing_quote_version() + 1)
+
+
+def build_plan_quote(plan: Plan, country_code: str, lang: Optional[str] = None) -> Tuple[PlanQuote, int]:
+    """
+    Price a plan for a country, it returns the quote and for how many seconds it is valid.
+
+    It does not include anything about the buyer, the coupons sent by the user and the offers left are validated
+    on each checkout.
+    """
+
+    utc_now = timezone.now()
+    quote: PlanQuote = {"explanation": None, "currency": None, "one_shot": None, "special_offer": None}
+
+    for attr in PLAN_PRICE_ATTRS:
+        base_price = getattr(plan, attr) or 0
+        price, ratio, currency = apply_pricing_ratio(base_price, country_code, plan, price_attr=attr, lang=lang)
+        quote[attr] = price
+
+        # the currency of the monthly price is the one used on checkout
+        if attr == "price_per_month":
+            quote["currency"] = currency
+
+        if quote["explanation"] is None and price != base_price and base_price > 0:
+            quote["explanation"] = {"plan": plan.slug, "ratio": ratio}
+
+    option = plan.financing_options.filter(how_many_months=1).first()
+    if option:
+        base_price = option.monthly_price or 0
+        price, ratio, currency = apply_pricing_ratio(base_price, country_code, option, lang=lang)
+        quote["one_shot"] = {"base_price": base_price, "price": price, "ratio": ratio, "currency": currency}
+
+    auto_coupons = Coupon.objects.filter(Q(plans=plan) | Q(plans=None), auto=True)
+    quote["special_offer"] = (
+        auto_coupons.filter(
+            Q(offered_at=None) | Q(offered_at__lte=utc_now),
+            Q(expires_at=None) | Q(expires_at__gte=utc_now),
+        )
+        .exclude(Q(how_many_offers=0) | Q(discount_type=Coupon.Discount.NO_DISCOUNT) | Q(allowed_user__isnull=False))
+        .select_related("seller__user", "allowed_user")
+        .first()
+    )
+
+    # the quote must not outlive the offer, neither hide the next one
+    timeout = get_pricing_quote_ttl()
+    changes = [
+        quote["special_offer"] and quote["special_offer"].expires_at,
+        auto_coupons.filter(offered_at__gt=utc_now).aggregate(x=Min("offered_at"))["x"],
+    ]
+
+    for change in changes:
+        if change:
+            timeout = min(timeout, max(int((change - utc_now).total_seconds()), 1))
+
+    return quote, timeout
+
+
+def get_plan_quote(plan: Plan, country_code: Optional[str] = None, lang: Optional[str] = None) -> PlanQuote:
+    """
+    Get the prices of a plan for a country.
+
+    The plan belongs to an academy and it has a currency, so the quotes are kept per plan and country, they are
+    discarded when a plan, financing option, auto coupon, academy service or currency changes.
+    """
+
+    country_code = (country_code or "").lower()
+    key = PRICING_QUOTE_KEY.format(
+        version=get_pricing_quote_version(), plan_id=plan.id, country_code=country_code or "-"
+    )
+
+    quote = cache.get(key)
+    if quote is not None:
+        return quote
+
+    quote, timeout = build_plan_quote(plan, country_code, lang)
+    cache.set(key, quote, timeout=timeout)
+
+    return quote
+
+
 def create_seller_reward_coupons(coupons: list[Coupon], original_price: float, buyer_user: User) -> None:
     """
     Create reward coupons for sellers when their coupons are used in payments.
@@ -1991,7 +2245,10 @@ def is_plan_paid(plan: Plan) -> bool:
         bool: True if the plan is paid, False if it's free
     """
     if not plan.is_renewable:
-        # For non-renewable plans, check if they have financing options
+        # For non-renewable plans, check if they have financing options, the prefetched ones are reused
+        if "financing_options" in getattr(plan, "_prefetched_objects_cache", {}):
+            return len(plan.financing_options.all()) > 0
+
         return plan.financing_options.exists()
 
     # For renewable plans, check if any pricing field is greater than 0
@@ -2100,8 +2357,8 @@ def get_plan_addons_amount(bag: Bag, lang: str) -> float:
     pricing_explanation: list[dict[str, Any]] = []
 
     for plan in addons:
-        option = plan.financing_options.filter(how_many_months=1).first()
-        if not option:
+        one_shot = get_plan_quote(plan, bag.country_code, lang)["one_shot"]
+        if not one_shot:
             raise ValidationException(
                 translation(
                     lang,
@@ -2112,22 +2369,13 @@ def get_plan_addons_amount(bag: Bag, lang: str) -> float:
                 code=400,
             )
 
-        base_price = option.monthly_price or 0
-
-        if bag.country_code:
-            adjusted_price, ratio, c = apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
-
-            if c:
-                currencies[c.code.upper()] = c
-
-            if adjusted_price != base_price and base_price > 0 and ratio:
-                pricing_explanation.append({"plan": plan.slug, "ratio": ratio})
+        if c := one_shot["currency"]:
+            currencies[c.code.upper()] = c
 
-            price = adjusted_price
-        else:
-            price = base_price
+        if one_shot["price"] != one_shot["base_price"] and one_shot["base_price"] > 0 and one_shot["ratio"]:
+            pricing_explanation.append({"plan": plan.slug, "ratio": one_shot["ratio"]})
 
-        total += float(price or 0)
+        total += float(one_shot["price"] or 0)
 
     if len(currencies.keys()) > 1:
         raise ValidationException(
@@ -2155,9 +2403,7 @@ def get_plan_addons_amount(bag: Bag, lang: str) -> float:
     return total
 
 
-def get_plan_addons_amounts_with_coupons(
-    bag: Bag, coupons: list[Coupon], lang: str
-) -> tuple[float, float]:
+def get_plan_addons_amounts_with_coupons(bag: Bag, coupons: list[Coupon], lang: str) -> tuple[float, float]:
     """
     Calculate the total one-shot amount for all plan addons in a bag,
     returning both:
@@ -2228,46 +2474,112 @@ def get_plan_addons_amounts_with_coupons(
 
     return total_before, total_after
 
-def calculate_invoice_breakdown(
+
+INVOICE_BREAKDOWN_PREFETCH = (
+    "currency",
+    "academy__main_currency",
+    "seat_service_item__service",
+    "plans__financing_options",
+    "plans__add_ons__service",
+    "plans__add_ons__currency",
+    "plan_addons__financing_options",
+    "coupons__plans",
+    "service_items__service",
+)
+
+
+class InvoiceBreakdownContext(TypedDict):
+    # academy services by (academy id, service id), sorted by id
+    academy_services: dict[tuple[int, int], list[AcademyService]]
+    # currencies used by the pricing ratio exceptions, it is shared with apply_pricing_ratio
+    currencies: dict[str, Currency]
+
+
+def get_invoice_breakdown_context(bags: list[Bag]) -> InvoiceBreakdownContext:
+    """
+    Prefetch everything the breakdown of the given bags needs.
+
+    It takes the same amount of queries for one bag or for a whole page of invoices, the bags are
+    prefetched in place.
+    """
+
+    prefetch_related_objects(bags, *INVOICE_BREAKDOWN_PREFETCH)
+
+    academy_ids: set[int] = set()
+    service_ids: set[int] = set()
+    codes: set[str] = set()
+
+    def collect_currencies(obj: Any) -> None:
+        for exceptions in (getattr(obj, "pricing_ratio_exceptions", None) or {}).values():
+            if isinstance(exceptions, dict) and exceptions.get("currency"):
+                codes.add(exceptions["currency"].upper())
+
+    for bag in bags:
+        academy_ids.add(bag.academy_id)
+        service_ids.update(x.service_id for x in bag.service_items.all())
+
+        if bag.seat_service_item:
+            service_ids.add(bag.seat_service_item.service_id)
+
+        for plan in bag.plans.all():
+            collect_currencies(plan)
+            for x in plan.financing_options.all():
+                collect_currencies(x)
+            for x in plan.add_ons.all():
+                collect_currencies(x)
+
+        for plan in bag.plan_addons.all():
+            for x in plan.financing_options.all():
+                collect_currencies(x)
+
+    academy_services: dict[tuple[int, int], list[AcademyService]] = {}
+    if academy_ids and service_ids:
+        for academy_service in (
+            AcademyService.objects.filter(academy__id__in=academy_ids, service__id__in=service_ids)
+            .select_related("service", "currency")
+            .order_by("id")
+        ):
+            collect_currencies(academy_service)
+            key = (academy_service.academy_id, academy_service.service_id)
+            academy_services.setdefault(key, []).append(academy_service)
+
+    currencies: dict[str, Currency] = {}
+    if codes:
+        currencies = {x.code.upper(): x for x in Currency.objects.filter(code__in=codes)}
+
+    return {"academy_services": academy_services, "currencies": currencies}
+
+
+def get_prefetched_coupons_for_plan(plan: Plan, coupons: list[Coupon]) -> list[Coupon]:
+    """Same as get_coupons_for_plan, for coupons with their plans prefetched."""
+
+    eligible: list[Coupon] = []
+
+    for coupon in coupons:
+        plan_ids = [x.id for x in coupon.plans.all()]
+        if not plan_ids or plan.id in plan_ids:
+            eligible.append(coupon)
+
+    return eligible
+
+
+def build_invoice_breakdown(
     bag: Bag,
-    invoice: Invoice | None = None,
+    currency: Currency | None,
+    context: InvoiceBreakdownContext,
     lang: str = "en",
     chosen_period: str | None = None,
     how_many_installments: int | None = None,
 ) -> dict[str, Any]:
     """
-    Calculate the breakdown of how the invoice amount is divided across plans, plan addons, and service items.
-
-    Args:
-        bag: The bag containing plans, plan_addons, and service_items
-        invoice: Optional invoice to get currency from. If not provided, uses bag currency
-        lang: Language code for error messages
-        chosen_period: Optional chosen period (MONTH, QUARTER, HALF, YEAR). If not provided, uses bag.chosen_period
-        how_many_installments: Optional number of installments. If not provided, uses bag.how_many_installments
-
-    Returns a dictionary with the following structure:
-    {
-        "plans": {
-            "plan-slug": {
-                "amount": float,
-                "currency": str
-            }
-        },
-        "service-items": {
-            "service-slug": {
-                "amount": float,
-                "currency": str,
-                "how-many": int,
-                "unit-type": str
-            }
-        }
-    }
+    Build the breakdown of a bag prefetched by get_invoice_breakdown_context, it does not make any query.
 
-    Note: Plan addons are included in the "plans" section with their plan slug.
+    Look at calculate_invoice_breakdown to know its structure.
     """
+
     breakdown: dict[str, Any] = {"plans": {}, "service-items": {}}
 
-    currency = invoice.currency if invoice else (bag.currency or bag.academy.main_currency)
+    currency = currency or bag.currency or bag.academy.main_currency
     if not currency:
         raise ValidationException(
             translation(
@@ -2280,7 +2592,9 @@ def calculate_invoice_breakdown(
         )
 
     currency_code = currency.code.upper()
+    currencies = context["currencies"]
     coupons = list(bag.coupons.all())
+    service_items = sorted(bag.service_items.all(), key=lambda x: x.id)
 
     # Use provided values or fall back to bag values
     effective_chosen_period = chosen_period if chosen_period is not None else bag.chosen_period
@@ -2288,16 +2602,33 @@ def calculate_invoice_breakdown(
         how_many_installments if how_many_installments is not None else bag.how_many_installments
     )
 
-    # Ensure we have all plans loaded - use select_related/prefetch_related if needed
+    def get_financing_option(plan: Plan, how_many_months: int) -> FinancingOption | None:
+        options = [x for x in plan.financing_options.all() if x.how_many_months == how_many_months]
+        return min(options, key=lambda x: x.id, default=None)
+
+    def get_academy_service(service_id: int, currency: Currency | None = None) -> AcademyService | None:
+        for academy_service in context["academy_services"].get((bag.academy_id, service_id), []):
+            if currency is None or academy_service.currency_id == currency.id:
+                return academy_service
+
+        return None
+
+    def get_plan_add_ons(plan: Plan) -> list[AcademyService]:
+        return [x for x in plan.add_ons.all() if x.currency_id == currency.id]
+
     plans = list(bag.plans.all())
     if not plans:
         return breakdown
 
+    seat_academy_service = None
+    if bag.seat_service_item and bag.seat_service_item.how_many > 0:
+        seat_academy_service = get_academy_service(bag.seat_service_item.service_id)
+
     for plan in plans:
         base_price = 0.0
 
         if effective_how_many_installments > 0:
-            option = plan.financing_options.filter(how_many_months=effective_how_many_installments).first()
+            option = get_financing_option(plan, effective_how_many_installments)
             if not option:
                 continue
 
@@ -2305,29 +2636,29 @@ def calculate_invoice_breakdown(
 
             if base_price > 0:
                 if bag.country_code:
-                    adjusted_price, _, c = apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
+                    adjusted_price, _, c = apply_pricing_ratio(
+                        base_price, bag.country_code, option, lang=lang, cache=currencies
+                    )
                     if c:
                         currency_code = c.code.upper()
                     base_price = adjusted_price
 
-                if bag.seat_service_item and bag.seat_service_item.how_many > 0:
-                    academy_service = AcademyService.objects.filter(
-                        service=bag.seat_service_item.service, academy=bag.academy
-                    ).first()
-                    if academy_service:
-                        seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many
-                        base_price += seat_cost
+                if seat_academy_service:
+                    seat_cost = seat_academy_service.price_per_unit * bag.seat_service_item.how_many
+                    base_price += seat_cost
 
                 add_ons_amount = 0
-                for add_on in plan.add_ons.filter(currency=currency):
-                    service_item = bag.service_items.filter(service=add_on.service).first()
+                for add_on in get_plan_add_ons(plan):
+                    service_item = next((x for x in service_items if x.service_id == add_on.service_id), None)
                     if service_item:
-                        add_on_price, _, _ = add_on.get_discounted_price(service_item.how_many, bag.country_code, lang)
+                        add_on_price, _, _ = add_on.get_discounted_price(
+                            service_item.how_many, bag.country_code, lang, cache=currencies
+                        )
                         add_ons_amount += add_on_price
 
                 base_price += add_ons_amount
 
-                plan_coupons = get_coupons_for_plan(plan, coupons)
+                plan_coupons = get_prefetched_coupons_for_plan(plan, coupons)
                 final_price = get_discounted_price(base_price, plan_coupons)
 
                 if final_price > 0:
@@ -2357,31 +2688,27 @@ def calculate_invoice_breakdown(
                 # Apply pricing ratio if country code is available
                 if bag.country_code:
                     adjusted_price, _, c = apply_pricing_ratio(
-                        base_price, bag.country_code, plan, lang=lang, price_attr=price_attr
+                        base_price, bag.country_code, plan, lang=lang, price_attr=price_attr, cache=currencies
                     )
                     if c:
                         currency_code = c.code.upper()
                     base_price = adjusted_price
 
-                if bag.seat_service_item and bag.seat_service_item.how_many > 0:
-                    academy_service = AcademyService.objects.filter(
-                        service=bag.seat_service_item.service, academy=bag.academy
-                    ).first()
-                    if academy_service:
-                        if effective_chosen_period == "MONTH":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many
-                        elif effective_chosen_period == "QUARTER":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 3
-                        elif effective_chosen_period == "HALF":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 6
-                        elif effective_chosen_period == "YEAR":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 12
-                        else:
-                            seat_cost = 0
-                        base_price += seat_cost
+                if seat_academy_service:
+                    if effective_chosen_period == "MONTH":
+                        seat_cost = seat_academy_service.price_per_unit * bag.seat_service_item.how_many
+                    elif effective_chosen_period == "QUARTER":
+                        seat_cost = seat_academy_service.price_per_unit * bag.seat_service_item.how_many * 3
+                    elif effective_chosen_period == "HALF":
+                        seat_cost = seat_academy_service.price_per_unit * bag.seat_service_item.how_many * 6
+                    elif effective_chosen_period == "YEAR":
+                        seat_cost = seat_academy_service.price_per_unit * bag.seat_service_item.how_many * 12
+                    else:
+                        seat_cost = 0
+                    base_price += seat_cost
 
                 # Apply coupons to get the final discounted price
-                plan_coupons = get_coupons_for_plan(plan, coupons)
+                plan_coupons = get_prefetched_coupons_for_plan(plan, coupons)
                 final_price = get_discounted_price(base_price, plan_coupons)
 
                 if final_price > 0:
@@ -2391,7 +2718,7 @@ def calculate_invoice_breakdown(
                     }
 
     for plan_addon in bag.plan_addons.all():
-        option = plan_addon.financing_options.filter(how_many_months=1).first()
+        option = get_financing_option(plan_addon, 1)
         if not option:
             continue
 
@@ -2399,13 +2726,15 @@ def calculate_invoice_breakdown(
 
         if base_price > 0:
             if bag.country_code:
-                adjusted_price, _, c = apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
+                adjusted_price, _, c = apply_pricing_ratio(
+                    base_price, bag.country_code, option, lang=lang, cache=currencies
+                )
                 if c:
                     currency_code = c.code.upper()
                 base_price = adjusted_price
 
             # Apply coupons
-            addon_coupons = get_coupons_for_plan(plan_addon, coupons)
+            addon_coupons = get_prefetched_coupons_for_plan(plan_addon, coupons)
             final_price = get_discounted_price(base_price, addon_coupons)
 
             if final_price > 0:
@@ -2415,30 +2744,25 @@ def calculate_invoice_breakdown(
                 }
 
     # Track which services are already included as plan add-ons to avoid duplication
-    plans = bag.plans.all()
-    add_ons: dict[int, AcademyService] = {}
     services_in_plan_addons: set[int] = set()
 
     for plan in plans:
-        for add_on in plan.add_ons.filter(currency=currency):
-            if add_on.service.id not in add_ons:
-                add_ons[add_on.service.id] = add_on
-                services_in_plan_addons.add(add_on.service.id)
+        for add_on in get_plan_add_ons(plan):
+            services_in_plan_addons.add(add_on.service_id)
 
     for service_item in bag.service_items.all():
-        if service_item.service.id in services_in_plan_addons:
+        if service_item.service_id in services_in_plan_addons:
             continue
 
         service_slug = service_item.service.slug
 
-        academy_service = AcademyService.objects.filter(
-            service=service_item.service, academy=bag.academy, currency=currency
-        ).first()
-
+        academy_service = get_academy_service(service_item.service_id, currency)
         if not academy_service:
             continue
 
-        amount, c, _ = academy_service.get_discounted_price(service_item.how_many, bag.country_code, lang)
+        amount, c, _ = academy_service.get_discounted_price(
+            service_item.how_many, bag.country_code, lang, cache=currencies
+        )
         if c:
             currency_code = c.code.upper()
 
@@ -2453,28 +2777,125 @@ def calculate_invoice_breakdown(
     return breakdown
 
 
-# Keep old function name for backward compatibility
-def calculate_invoice_amount_breakdown(
+def calculate_invoice_breakdown(
     bag: Bag,
-    main_plan_amount: float = 0.0,
-    main_plan_amount_before_discount: float = 0.0,
-    service_items_amount: float = 0.0,
-    plan_addons_amount: float = 0.0,
-    plan_addons_amount_before_discount: float = 0.0,
-    seat_costs: float = 0.0,
-    lang: str = "en",
     invoice: Invoice | None = None,
+    lang: str = "en",
+    chosen_period: str | None = None,
+    how_many_installments: int | None = None,
 ) -> dict[str, Any]:
     """
-    Legacy function for backward compatibility.
-    Now delegates to calculate_invoice_breakdown which calculates everything from scratch.
-    """
-    return calculate_invoice_breakdown(bag=bag, invoice=invoice, lang=lang)
-
+    Calculate the breakdown of how the invoice amount is divided across plans, plan addons, and service items.
 
-def calculate_refund_breakdown(
-    invoice: Invoice, refund_amount: float, items_to_refund: dict[str, float], lang: str = "en"
-) -> dict[str, Any]:
+    Args:
+        bag: The bag containing plans, plan_addons, and service_items
+        invoice: Optional invoice to get currency from. If not provided, uses bag currency
+        lang: Language code for error messages
+        chosen_period: Optional chosen period (MONTH, QUARTER, HALF, YEAR). If not provided, uses bag.chosen_period
+        how_many_installments: Optional number of installments. If not provided, uses bag.how_many_installments
+
+    Returns a dictionary with the following structure:
+    {
+        "plans": {
+            "plan-slug": {
+                "amount": float,
+                "currency": str
+            }
+        },
+        "service-items": {
+            "service-slug": {
+                "amount": float,
+                "currency": str,
+                "how-many": int,
+                "unit-type": str
+            }
+        }
+    }
+
+    Note: Plan addons are included in the "plans" section with their plan slug.
+    """
+
+    context = get_invoice_breakdown_context([bag])
+    currency = invoice.currency if invoice else None
+
+    return build_invoice_breakdown(bag, currency, context, lang, chosen_period, how_many_installments)
+
+
+def calculate_invoice_breakdowns(
+    invoices: list[Invoice], lang: str = "en"
+) -> dict[int, dict[str, Any] | ValidationException]:
+    """
+    Calculate the breakdown of many invoices at once, using the period and installments of their bags.
+
+    It takes a fixed amount of queries regardless of the amount of invoices, invoices without a bag are
+    skipped and the invoices that cannot be calculated get its ValidationException instead of a breakdown.
+    """
+
+    invoices = [x for x in invoices if x.bag_id]
+    prefetch_related_objects(invoices, "currency", "bag")
+
+    context = get_invoice_breakdown_context([x.bag for x in invoices])
+
+    result: dict[int, dict[str, Any] | ValidationException] = {}
+    for invoice in invoices:
+        try:
+            result[invoice.id] = build_invoice_breakdown(invoice.bag, invoice.currency, context, lang)
+
+        except ValidationException as e:
+            result[invoice.id] = e
+
+    return result
+
+
+def save_missing_invoice_breakdowns(invoices: list[Invoice], lang: str = "en") -> list[Invoice]:
+    """
+    Store the breakdown of the invoices that do not have one yet, it is an explicit backfill.
+
+    The breakdown is calculated from the current prices, not the charged ones. Returns the invoices that were updated.
+    """
+
+    pending = [x for x in invoices if x.amount_breakdown is None and x.bag_id]
+    if not pending:
+        return []
+
+    breakdowns = calculate_invoice_breakdowns(pending, lang)
+
+    updated: list[Invoice] = []
+    for invoice in pending:
+        breakdown = breakdowns[invoice.id]
+        if isinstance(breakdown, ValidationException):
+            logger.warning(f"Invoice {invoice.id} breakdown could not be calculated: {breakdown}")
+            continue
+
+        invoice.amount_breakdown = breakdown
+        updated.append(invoice)
+
+    Invoice.objects.bulk_update(updated, ["amount_breakdown"])
+    return updated
+
+
+# Keep old function name for backward compatibility
+def calculate_invoice_amount_breakdown(
+    bag: Bag,
+    main_plan_amount: float = 0.0,
+    main_plan_amount_before_discount: float = 0.0,
+    service_items_amount: float = 0.0,
+    plan_addons_amount: float = 0.0,
+    plan_addons_amount_before_discount: float = 0.0,
+    seat_costs: float = 0.0,
+    lang: str = "en",
+    invoice: Invoice | None = None,
+) -> dict[str, Any]:
+    """
+    Legacy function for backward compatibility.
+    Now delegates to calculate_invoice_breakdown which calculates everything from scratch.
+    """
+    return calculate_invoice_breakdown(bag=bag, invoice=invoice, lang=lang)
+
+
+def calculate_refund_breakdown(
+    invoice: Invoice, refund_amount: float, items_to_refund: dict[str, float], lang: str = "en"
+) -> dict[str, Any]:
     """
     Calculate which components of the invoice should be refunded based on the refund amount and items to refund.
 
@@ -2667,7 +3088,6 @@ def process_refund(
     """
     from breathecode.payments.models import (
         CreditNote,
-        Plan,
         PlanFinancing,
         PlanServiceItemHandler,
         Subscription,
@@ -2784,6 +3204,7 @@ def process_refund(
     user = invoice.user
 
     plans_to_deprecate: list[str] = []
+    services_to_remove: list[str] = []
     service_items_to_remove: list[int] = []
 
     if items_to_refund:
@@ -2801,32 +3222,30 @@ def process_refund(
         if original_breakdown.get("service-items"):
             for service_slug, refund_amount_for_service in items_to_refund.items():
                 if service_slug in original_breakdown["service-items"] and refund_amount_for_service > 0:
-                    service_items = bag.service_items.filter(service__slug=service_slug)
-                    for service_item in service_items:
-                        service_items_to_remove.append(service_item.id)
+                    services_to_remove.append(service_slug)
+
+    if services_to_remove:
+        service_items_to_remove = list(
+            bag.service_items.filter(service__slug__in=services_to_remove).values_list("id", flat=True)
+        )
 
     if plans_to_deprecate:
-        plans = Plan.objects.filter(slug__in=plans_to_deprecate)
-        for plan in plans:
-            # Expire subscription if it exists (regardless of whether it's main plan or plan addon)
-            # Using plans__in for ManyToManyField
-            subscriptions = Subscription.objects.filter(
-                user=user, plans__in=[plan], status__in=[Subscription.Status.ACTIVE]
-            )
-            for subscription in subscriptions:
-                subscription.status = Subscription.Status.EXPIRED
-                subscription.status_message = f"Subscription expired due to refund of invoice {invoice.id}"
-                subscription.save()
-
-            # Expire plan financing if it exists (regardless of whether it's main plan or plan addon)
-            # Using plans__in for ManyToManyField
-            plan_financings = PlanFinancing.objects.filter(
-                user=user, plans__in=[plan], status__in=[PlanFinancing.Status.ACTIVE]
-            )
-            for financing in plan_financings:
-                financing.status = PlanFinancing.Status.EXPIRED
-                financing.status_message = f"Plan financing expired due to refund of invoice {invoice.id}"
-                financing.save()
+        # Expire subscriptions and plan financings if they exist (regardless of whether it's main plan or plan addon)
+        subscriptions = Subscription.objects.filter(
+            user=user, plans__slug__in=plans_to_deprecate, status__in=[Subscription.Status.ACTIVE]
+        ).distinct()
+        for subscription in subscriptions:
+            subscription.status = Subscription.Status.EXPIRED
+            subscription.status_message = f"Subscription expired due to refund of invoice {invoice.id}"
+            subscription.save()
+
+        plan_financings = PlanFinancing.objects.filter(
+            user=user, plans__slug__in=plans_to_deprecate, status__in=[PlanFinancing.Status.ACTIVE]
+        ).distinct()
+        for financing in plan_financings:
+            financing.status = PlanFinancing.Status.EXPIRED
+            financing.status_message = f"Plan financing expired due to refund of invoice {invoice.id}"
+            financing.save()
 
     if service_items_to_remove:
         SubscriptionServiceItem.objects.filter(
@@ -2841,223 +3260,6 @@ def process_refund(
     return credit_note
 
 
-def calculate_invoice_breakdown(
-    bag: Bag, invoice: Invoice, lang: str, chosen_period: str | None = None, how_many_installments: int | None = None
-) -> dict[str, Any]:
-    """
-    Calculate the breakdown of how the invoice amount is divided across plans, plan addons, and service items.
-
-    Args:
-        bag: The bag containing plans, plan_addons, and service_items
-        invoice: The invoice to calculate breakdown for
-        lang: Language code for error messages
-        chosen_period: Optional chosen period (MONTH, QUARTER, HALF, YEAR). If not provided, uses bag.chosen_period
-        how_many_installments: Optional number of installments. If not provided, uses bag.how_many_installments
-
-    Returns a dictionary with the following structure:
-    {
-        "plans": {
-            "plan-slug": {
-                "amount": float,
-                "currency": str
-            }
-        },
-        "service-items": {
-            "service-slug": {
-                "amount": float,
-                "currency": str,
-                "how-many": int,
-                "unit-type": str
-            }
-        }
-    }
-
-    Note: Plan addons are included in the "plans" section with their plan slug.
-    """
-    breakdown: dict[str, Any] = {"plans": {}, "service-items": {}}
-
-    currency = invoice.currency or bag.currency or bag.academy.main_currency
-    if not currency:
-        raise ValidationException(
-            translation(
-                lang,
-                en="Currency not found for invoice breakdown calculation",
-                es="Moneda no encontrada para el cálculo del desglose de la factura",
-                slug="currency-not-found-for-breakdown",
-            ),
-            code=500,
-        )
-
-    currency_code = currency.code.upper()
-    coupons = list(bag.coupons.all())
-
-    # Use provided values or fall back to bag values
-    effective_chosen_period = chosen_period if chosen_period is not None else bag.chosen_period
-    effective_how_many_installments = how_many_installments if how_many_installments is not None else bag.how_many_installments
-
-    # Ensure we have all plans loaded - use select_related/prefetch_related if needed
-    plans = list(bag.plans.all())
-    if not plans:
-        return breakdown
-
-    for plan in plans:
-        base_price = 0.0
-
-        if effective_how_many_installments > 0:
-            option = plan.financing_options.filter(how_many_months=effective_how_many_installments).first()
-            if not option:
-                continue
-
-            base_price = option.monthly_price or 0
-
-            if base_price > 0:
-                if bag.country_code:
-                    adjusted_price, _, c = apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
-                    if c:
-                        currency_code = c.code.upper()
-                    base_price = adjusted_price
-
-                if bag.seat_service_item and bag.seat_service_item.how_many > 0:
-                    academy_service = AcademyService.objects.filter(
-                        service=bag.seat_service_item.service, academy=bag.academy
-                    ).first()
-                    if academy_service:
-                        seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many
-                        base_price += seat_cost
-
-                add_ons_amount = 0
-                for add_on in plan.add_ons.filter(currency=currency):
-                    service_item = bag.service_items.filter(service=add_on.service).first()
-                    if service_item:
-                        add_on_price, _, _ = add_on.get_discounted_price(service_item.how_many, bag.country_code, lang)
-                        add_ons_amount += add_on_price
-
-                base_price += add_ons_amount
-
-                plan_coupons = get_coupons_for_plan(plan, coupons)
-                final_price = get_discounted_price(base_price, plan_coupons)
-
-                if final_price > 0:
-                    breakdown["plans"][plan.slug] = {
-                        "amount": round(final_price, 2),
-                        "currency": currency_code,
-                    }
-
-        elif effective_chosen_period and effective_chosen_period != "NO_SET":
-            if effective_chosen_period == "MONTH":
-                base_price = plan.price_per_month or 0
-                price_attr = "price_per_month"
-            elif effective_chosen_period == "QUARTER":
-                base_price = plan.price_per_quarter or 0
-                price_attr = "price_per_quarter"
-            elif effective_chosen_period == "HALF":
-                base_price = plan.price_per_half or 0
-                price_attr = "price_per_half"
-            elif effective_chosen_period == "YEAR":
-                base_price = plan.price_per_year or 0
-                price_attr = "price_per_year"
-            else:
-                base_price = 0
-                price_attr = None
-
-            if base_price > 0 and price_attr:
-                # Apply pricing ratio if country code is available
-                if bag.country_code:
-                    adjusted_price, _, c = apply_pricing_ratio(base_price, bag.country_code, plan, lang=lang, price_attr=price_attr)
-                    if c:
-                        currency_code = c.code.upper()
-                    base_price = adjusted_price
-
-                if bag.seat_service_item and bag.seat_service_item.how_many > 0:
-                    academy_service = AcademyService.objects.filter(
-                        service=bag.seat_service_item.service, academy=bag.academy
-                    ).first()
-                    if academy_service:
-                        if effective_chosen_period == "MONTH":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many
-                        elif effective_chosen_period == "QUARTER":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 3
-                        elif effective_chosen_period == "HALF":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 6
-                        elif effective_chosen_period == "YEAR":
-                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 12
-                        else:
-                            seat_cost = 0
-                        base_price += seat_cost
-
-                # Apply coupons to get the final discounted price
-                plan_coupons = get_coupons_for_plan(plan, coupons)
-                final_price = get_discounted_price(base_price, plan_coupons)
-
-                if final_price > 0:
-                    breakdown["plans"][plan.slug] = {
-                        "amount": round(final_price, 2),
-                        "currency": currency_code,
-                    }
-
-    for plan_addon in bag.plan_addons.all():
-        option = plan_addon.financing_options.filter(how_many_months=1).first()
-        if not option:
-            continue
-
-        base_price = option.monthly_price or 0
-
-        if base_price > 0:
-            if bag.country_code:
-                adjusted_price, _, c = apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
-                if c:
-                    currency_code = c.code.upper()
-                base_price = adjusted_price
-
-            # Apply coupons
-            addon_coupons = get_coupons_for_plan(plan_addon, coupons)
-            final_price = get_discounted_price(base_price, addon_coupons)
-
-            if final_price > 0:
-                breakdown["plans"][plan_addon.slug] = {
-                    "amount": round(final_price, 2),
-                    "currency": currency_code,
-                }
-
-    # Track which services are already included as plan add-ons to avoid duplication
-    plans = bag.plans.all()
-    add_ons: dict[int, AcademyService] = {}
-    services_in_plan_addons: set[int] = set()
-    
-    for plan in plans:
-        for add_on in plan.add_ons.filter(currency=currency):
-            if add_on.service.id not in add_ons:
-                add_ons[add_on.service.id] = add_on
-                services_in_plan_addons.add(add_on.service.id)
-
-    for service_item in bag.service_items.all():
-        if service_item.service.id in services_in_plan_addons:
-            continue
-
-        service_slug = service_item.service.slug
-
-        academy_service = AcademyService.objects.filter(
-            service=service_item.service, academy=bag.academy, currency=currency
-        ).first()
-
-        if not academy_service:
-            continue
-
-        amount, c, _ = academy_service.get_discounted_price(service_item.how_many, bag.country_code, lang)
-        if c:
-            currency_code = c.code.upper()
-
-        if amount > 0:
-            breakdown["service-items"][service_slug] = {
-                "amount": round(amount, 2),
-                "currency": currency_code,
-                "how-many": service_item.how_many,
-                "unit-type": service_item.unit_type,
-            }
-
-    return breakdown
-
-
 def build_plan_addons_financings(bag: Bag, invoice: Invoice, lang: str, conversion_info: str | None = "") -> None:
     """
     Create a PlanFinancing (one payment) for each plan addon in the bag.
@@ -3121,124 +3323,112 @@ def build_plan_addons_financings(bag: Bag, invoice: Invoice, lang: str, conversi
             financing.coupons.set(bag_coupons)
 
         financing.invoices.add(invoice)
-        
+
         if financing.how_many_installments == 1 and invoice.status == Invoice.Status.FULFILLED:
             financing.status = PlanFinancing.Status.FULLY_PAID
-        
+
         financing.save()
 
         tasks.build_service_stock_scheduler_from_plan_financing.delay(plan_financing_id=financing.id)
 
 
-def get_plan_addons_amount(bag: Bag, lang: str) -> float:
+def is_plan_financing_paid(plan_financing: PlanFinancing) -> bool:
     """
-    Calculate the total one-shot amount for all plan addons in a bag.
+    Check if a plan financing is paid by examining its plans.
 
-    Rules:
-      - Each addon plan must have a FinancingOption with how_many_months=1.
-      - Pricing ratio is applied using bag.country_code and the FinancingOption.
-      - All addons must share the same currency as the academy/bag.
-      - The result is stored in bag.plan_addons_amount.
+    Args:
+        plan_financing: The plan financing to check
+
+    Returns:
+        bool: True if the plan financing is paid, False if it's free
     """
+    return plan_financing.plans.filter(financing_options__isnull=False).exists()
 
-    addons = bag.plan_addons.all()
-    if not addons.exists():
-        if bag.plan_addons_amount:
-            bag.plan_addons_amount = 0
-            bag.save(update_fields=["plan_addons_amount"])
-        return 0.0
 
-    main_currency = bag.currency or bag.academy.main_currency
-    if not main_currency:
-        raise ValidationException(
-            translation(
-                lang,
-                en="Academy does not have a main currency configured",
-                es="La academia no tiene una moneda principal configurada",
-                slug="academy-without-main-currency",
-            ),
-            code=500,
-        )
+def build_user_entitlements(user_ids: list[int]) -> list[UserEntitlement]:
+    """
+    Rebuild the entitlements of many users, it takes the same queries for one user or a batch of them.
 
-    currencies: dict[str, Currency] = {main_currency.code.upper(): main_currency}
-    total = 0.0
-    pricing_explanation: list[dict[str, Any]] = []
+    Only the dates in the future are kept as `expires_at`, an active plan that is over is kept until it is
+    expired.
+    """
 
-    for plan in addons:
-        option = plan.financing_options.filter(how_many_months=1).first()
-        if not option:
-            raise ValidationException(
-                translation(
-                    lang,
-                    en=f"Plan addon {plan.slug} does not have a one-payment financing option configured",
-                    es=f"El plan addon {plan.slug} no tiene configurada una opción de financiamiento de un solo pago",
-                    slug="plan-addon-without-one-payment-option",
-                ),
-                code=400,
-            )
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return []
 
-        base_price = option.monthly_price or 0
+    utc_now = timezone.now()
+    entitlements = {
+        x: UserEntitlement(user_id=x, plans=[], seat_subscriptions=[], has_paid_plans=False, has_4geeks_plus=False)
+        for x in user_ids
+    }
 
-        if bag.country_code:
-            adjusted_price, ratio, c = apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
+    def add(entitlement: UserEntitlement, plans: list[Plan], expires_at: Optional[datetime]):
+        entitlement.plans += [x.slug for x in plans if x.slug not in entitlement.plans]
 
-            if c:
-                currencies[c.code.upper()] = c
+        if expires_at and expires_at > utc_now and (not entitlement.expires_at or expires_at < entitlement.expires_at):
+            entitlement.expires_at = expires_at
 
-            if adjusted_price != base_price and base_price > 0 and ratio:
-                pricing_explanation.append({"plan": plan.slug, "ratio": ratio})
+    seated: dict[int, set[int]] = {}
+    for user_id, subscription_id in SubscriptionSeat.objects.filter(user__id__in=user_ids).values_list(
+        "user_id", "billing_team__subscription_id"
+    ):
+        seated.setdefault(subscription_id, set()).add(user_id)
+        entitlements[user_id].seat_subscriptions.append(subscription_id)
 
-            price = adjusted_price
-        else:
-            price = base_price
+    subscriptions = Subscription.objects.filter(
+        Q(user__id__in=user_ids) | Q(id__in=seated.keys()), status=Subscription.Status.ACTIVE
+    ).prefetch_related("plans__financing_options")
 
-        total += float(price or 0)
+    for subscription in subscriptions:
+        plans = list(subscription.plans.all())
+        is_paid = any(is_plan_paid(x) for x in plans)
+        users = seated.get(subscription.id, set())
 
-    if len(currencies.keys()) > 1:
-        raise ValidationException(
-            translation(
-                lang,
-                en="Multiple currencies found, it means that the pricing ratio exceptions have a wrong configuration",
-                es="Múltiples monedas encontradas, lo que significa que las excepciones de ratio de precios tienen una configuración incorrecta",
-                slug="multiple-currencies-found",
-            ),
-            code=500,
-        )
+        if subscription.user_id in entitlements:
+            users = users | {subscription.user_id}
 
-    # Update pricing ratio explanation for plan_addons without touching plans/service_items keys
-    explanation = bag.pricing_ratio_explanation or {"plans": [], "service_items": [], "plan_addons": []}
-    if "plan_addons" not in explanation:
-        explanation["plan_addons"] = []
+            if any(x.slug == "4geeks-plus-subscription" for x in plans):
+                entitlements[subscription.user_id].has_4geeks_plus = True
 
-    if pricing_explanation:
-        explanation["plan_addons"] = pricing_explanation
-        bag.pricing_ratio_explanation = explanation
+        for user_id in users:
+            add(entitlements[user_id], plans, subscription.valid_until)
+            entitlements[user_id].has_paid_plans |= is_paid
 
-    bag.plan_addons_amount = total
-    bag.save(update_fields=["pricing_ratio_explanation", "plan_addons_amount"])
+    plan_financings = PlanFinancing.objects.filter(
+        user__id__in=user_ids, status=PlanFinancing.Status.ACTIVE
+    ).prefetch_related("plans")
 
-    return total
+    for plan_financing in plan_financings:
+        plans = list(plan_financing.plans.all())
+        add(entitlements[plan_financing.user_id], plans, plan_financing.plan_expires_at)
 
+        if any(x.slug == "4geeks-plus-planfinancing" for x in plans):
+            entitlements[plan_financing.user_id].has_4geeks_plus = True
 
-def is_plan_financing_paid(plan_financing: PlanFinancing) -> bool:
-    """
-    Check if a plan financing is paid by examining its plans.
+    return UserEntitlement.objects.bulk_create(
+        entitlements.values(),
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["plans", "seat_subscriptions", "has_paid_plans", "has_4geeks_plus", "expires_at", "updated_at"],
+    )
 
-    Args:
-        plan_financing: The plan financing to check
 
-    Returns:
-        bool: True if the plan financing is paid, False if it's free
-    """
-    for plan in plan_financing.plans.all():
-        if plan.financing_options.exists():
-            return True
-    return False
+def get_user_entitlement(user: User | int) -> UserEntitlement:
+    """Get the entitlement of a user, it is built if it does not exist or if it is stale."""
+
+    user_id = user if isinstance(user, int) else user.id
+    entitlement = UserEntitlement.objects.filter(user__id=user_id).first()
+
+    if entitlement is None or (entitlement.expires_at and entitlement.expires_at <= timezone.now()):
+        entitlement = build_user_entitlements([user_id])[0]
+
+    return entitlement
 
 
 def user_has_active_paid_plans(user: User) -> bool:
     """
-    Check if a user has any active paid subscriptions or plan financings.
+    Check if a user has any active paid subscriptions, owned or through a seat.
 
     Args:
         user: The user to check
@@ -3246,17 +3436,7 @@ def user_has_active_paid_plans(user: User) -> bool:
     Returns:
         bool: True if the user has active paid plans, False otherwise
     """
-    owned_subscriptions = Subscription.objects.filter(user=user, status=Subscription.Status.ACTIVE)
-    seated_subscription_ids = SubscriptionSeat.objects.filter(user=user).values_list(
-        "billing_team__subscription_id", flat=True
-    )
-    seat_subscriptions = Subscription.objects.filter(id__in=seated_subscription_ids, status=Subscription.Status.ACTIVE)
-
-    for subscription in owned_subscriptions.union(seat_subscriptions):
-        if is_subscription_paid(subscription):
-            return True
-
-    return False
+    return get_user_entitlement(user).has_paid_plans
 
 
 def user_has_active_4geeks_plus_plans(user: User) -> bool:
@@ -3269,16 +3449,7 @@ def user_has_active_4geeks_plus_plans(user: User) -> bool:
     Returns:
         bool: True if the user has active paid plans, False otherwise
     """
-    # Check for active subscriptions with 4Geeks Plus
-    for subscription in Subscription.objects.filter(user=user, status=Subscription.Status.ACTIVE):
-        if subscription.plans.filter(slug="4geeks-plus-subscription").exists():
-            return True
-    # Check for active plan financings with 4Geeks Plus
-    for plan_financing in PlanFinancing.objects.filter(user=user, status=PlanFinancing.Status.ACTIVE):
-        if plan_financing.plans.filter(slug="4geeks-plus-planfinancing").exists():
-            return True
-
-    return False
+    return get_user_entitlement(user).has_4geeks_plus
 
 
 # ------------------------------
@@ -3510,11 +3681,197 @@ def create_seat(email: str, user: User | None, billing_team: SubscriptionBilling
         SubscriptionBillingTeam.ConsumptionStrategy.PER_SEAT,
     )
 
-    # if strategy is not per team, create the individual consumables
-    if strategy != SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM:
-        tasks.build_service_stock_scheduler_from_subscription.delay(billing_team.subscription.id, seat_id=seat.id)
+    # if strategy is not per team, create the individual consumables
+    if strategy != SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM:
+        tasks.build_service_stock_scheduler_from_subscription.delay(billing_team.subscription.id, seat_id=seat.id)
+
+    return seat
+
+
+class SeatResult(TypedDict):
+    row: int
+    email: str
+    code: int
+    slug: Optional[str]
+    detail: Optional[str]
+    seat: Optional[SubscriptionSeat]
+
+
+SEAT_NOTIFICATION_BATCH_SIZE = 100
+
+
+def build_seat_schedulers_in_bulk(subscription: Subscription, seats: list[SubscriptionSeat]) -> list[int]:
+    """Create the schedulers of the team-allowed items for new seats, it returns their ids."""
+
+    subscription_handlers = list(
+        SubscriptionServiceItem.objects.filter(subscription=subscription, service_item__is_team_allowed=True)
+    )
+
+    plan_items = PlanServiceItem.objects.filter(
+        plan__in=subscription.plans.all(), service_item__is_team_allowed=True
+    ).values_list("id", flat=True)
+    plan_handlers = list(PlanServiceItemHandler.objects.filter(subscription=subscription, handler__id__in=plan_items))
+
+    missing = set(plan_items) - {x.handler_id for x in plan_handlers}
+    if missing:
+        plan_handlers += PlanServiceItemHandler.objects.bulk_create(
+            [PlanServiceItemHandler(subscription=subscription, handler_id=x) for x in sorted(missing)]
+        )
+
+    schedulers = ServiceStockScheduler.objects.bulk_create(
+        [
+            ServiceStockScheduler(subscription_handler=x, subscription_seat=seat)
+            for seat in seats
+            for x in subscription_handlers
+        ]
+        + [ServiceStockScheduler(plan_handler=x, subscription_seat=seat) for seat in seats for x in plan_handlers]
+    )
+
+    return [x.id for x in schedulers]
+
+
+def create_seats_in_bulk(seats: list[AddSeat], billing_team: SubscriptionBillingTeam, lang: str) -> list[SeatResult]:
+    """
+    Add many seats to a billing team, it returns the result of each row in the same order.
+
+    The email domains are validated once, the seats and users are read in one query each, and the seats,
+    schedulers and consumables are written with bulk queries. The invites and notifications are sent by
+    `notify_subscription_seats` in batches of `SEAT_NOTIFICATION_BATCH_SIZE`. The seats limit of the team is checked
+    with the rows that passed their validations.
+    """
+
+    def fail(row: int, email: str, e: ValidationException) -> SeatResult:
+        return {
+            "row": row,
+            "email": email,
+            "code": e.status_code,
+            "slug": e.slug,
+            "detail": e.get_message(),
+            "seat": None,
+        }
+
+    def duplicated() -> ValidationException:
+        return ValidationException(
+            translation(
+                lang,
+                en="User already has a seat for this team",
+                es="El usuario ya tiene un asiento para esta equipo",
+                slug="duplicate-team-seat",
+            ),
+            code=400,
+            slug="duplicate-team-seat",
+        )
+
+    subscription = billing_team.subscription
+    results: list[SeatResult] = []
+
+    emails = {x["email"] for x in seats}
+    user_ids = {x["user"] for x in seats if x["user"]}
+
+    taken = SubscriptionSeat.objects.filter(billing_team=billing_team).filter(
+        Q(email__in=emails) | Q(user__id__in=user_ids)
+    )
+    taken_emails = set()
+    taken_users = set()
+    for email, user_id in taken.values_list("email", "user__id"):
+        taken_emails.add(email)
+        if user_id:
+            taken_users.add(user_id)
+
+    users_by_id = {}
+    users_by_email = {}
+    for user in User.objects.filter(Q(email__in=emails) | Q(id__in=user_ids)):
+        users_by_id[user.id] = user
+        users_by_email[(user.email or "").strip().lower()] = user
+
+    email_statuses = validate_emails_local(list(emails), lang)
+
+    pending: list[tuple[SeatResult, AddSeat]] = []
+    for row, obj in enumerate(seats):
+        email = obj["email"]
+
+        try:
+            if isinstance(email_status := email_statuses[email], ValidationException):
+                raise email_status
+
+            if email in taken_emails:
+                raise duplicated()
+
+            user = users_by_id.get(obj["user"]) if obj["user"] else users_by_email.get(email)
+            if obj["user"] and user is None:
+                raise ValidationException(
+                    translation(lang, en="User not found", es="Usuario no encontrado", slug="user-not-found"),
+                    code=400,
+                    slug="user-not-found",
+                )
+
+            if user and (user.email or "").strip().lower() != email:
+                raise ValidationException(
+                    translation(
+                        lang,
+                        en="User email does not match seat email",
+                        es="El correo del usuario no coincide con el del asiento",
+                        slug="user-email-mismatch",
+                    ),
+                    code=400,
+                    slug="user-email-mismatch",
+                )
+
+            if user and user.id in taken_users:
+                raise duplicated()
+
+        except ValidationException as e:
+            results.append(fail(row, email, e))
+            continue
+
+        taken_emails.add(email)
+        if user:
+            taken_users.add(user.id)
+
+        seat = SubscriptionSeat(billing_team=billing_team, user=user, email=email, is_active=True)
+        seat.seat_log.append(create_seat_log_entry(seat, "ADDED"))
+
+        result: SeatResult = {"row": row, "email": email, "code": 201, "slug": None, "detail": None, "seat": seat}
+        results.append(result)
+        pending.append((result, obj))
+
+    if not pending:
+        return results
+
+    validate_seats_limit(billing_team, [obj for _, obj in pending], [], lang)
+
+    created = [result["seat"] for result, _ in pending]
+    strategy = getattr(
+        billing_team,
+        "consumption_strategy",
+        SubscriptionBillingTeam.ConsumptionStrategy.PER_SEAT,
+    )
+
+    with transaction.atomic():
+        SubscriptionSeat.objects.bulk_create(created)
 
-    return seat
+        # if strategy is not per team, create the individual consumables
+        scheduler_ids = []
+        if strategy != SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM:
+            scheduler_ids = build_seat_schedulers_in_bulk(subscription, created)
+
+    if scheduler_ids:
+        renew_scheduler_batch(scheduler_ids, timezone.now())
+
+    # bulk_create skips the receivers that keep the entitlements
+    if seated := [x.user.id for x in created if x.user]:
+        build_user_entitlements(seated)
+
+    notifications = [
+        {"seat": result["seat"].id, "first_name": obj["first_name"], "last_name": obj["last_name"]}
+        for result, obj in pending
+    ]
+    for i in range(0, len(notifications), SEAT_NOTIFICATION_BATCH_SIZE):
+        tasks.notify_subscription_seats.delay(
+            subscription.id, notifications[i : i + SEAT_NOTIFICATION_BATCH_SIZE], lang
+        )
+
+    return results
 
 
 def notify_user_was_added_to_plan_financing_team(team: PlanFinancingTeam, seat: PlanFinancingSeat, lang: str):
@@ -3699,6 +4056,7 @@ def replace_seat(
     if strategy != SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM:
         # Set user to the new user if exists, otherwise None (waiting for invitation acceptance)
         Consumable.objects.filter(subscription_seat=seat).update(user=to_user)
+        invalidate_consumable_balances([to_user.id] if to_user else [])
 
     return seat
 
@@ -3758,6 +4116,7 @@ def replace_plan_financing_seat(
 
     if seat.team.consumption_strategy != PlanFinancingTeam.ConsumptionStrategy.PER_TEAM:
         Consumable.objects.filter(plan_financing_seat=seat).update(user=to_user)
+        invalidate_consumable_balances([to_user.id] if to_user else [])
 
     tasks.build_service_stock_scheduler_from_plan_financing.delay(seat.team.financing.id, seat_id=seat.id)
 
@@ -3923,18 +4282,14 @@ def get_user_from_consumable_to_be_charged(
     if strategy in (
         SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM
         if isinstance(team, SubscriptionBillingTeam)
-        else PlanFinancingTeam.ConsumptionStrategy.PER_TEAM
-        if isinstance(team, PlanFinancingTeam)
-        else None
+        else PlanFinancingTeam.ConsumptionStrategy.PER_TEAM if isinstance(team, PlanFinancingTeam) else None
     ):
         return None
 
     if strategy in (
         SubscriptionBillingTeam.ConsumptionStrategy.PER_SEAT
         if isinstance(team, SubscriptionBillingTeam)
-        else PlanFinancingTeam.ConsumptionStrategy.PER_SEAT
-        if isinstance(team, PlanFinancingTeam)
-        else None
+        else PlanFinancingTeam.ConsumptionStrategy.PER_SEAT if isinstance(team, PlanFinancingTeam) else None
     ):
         return seat.user if (seat and seat.user) else resource.user
 
@@ -4211,3 +4566,782 @@ def process_auto_recharge(
     finally:
         # Always release the lock
         lock.release()
+
+
+class RenewalStage(TypedDict):
+    rows: int
+    seconds: float
+
+
+RENEWAL_SCHEDULER_RELATIONS = [
+    "subscription_handler__service_item__service",
+    "subscription_handler__subscription__selected_cohort_set",
+    "subscription_handler__subscription__selected_event_type_set",
+    "subscription_handler__subscription__selected_mentorship_service_set",
+    "subscription_handler__subscription__user",
+    "plan_handler__handler__service_item__service",
+    "plan_handler__subscription__selected_cohort_set",
+    "plan_handler__subscription__selected_event_type_set",
+    "plan_handler__subscription__selected_mentorship_service_set",
+    "plan_handler__subscription__user",
+    "plan_handler__plan_financing__selected_cohort_set",
+    "plan_handler__plan_financing__selected_event_type_set",
+    "plan_handler__plan_financing__selected_mentorship_service_set",
+    "plan_handler__plan_financing__user",
+    "subscription_seat__billing_team",
+    "subscription_seat__user",
+    "subscription_billing_team",
+    "plan_financing_seat__user",
+    "plan_financing_team",
+]
+
+
+@lru_cache(maxsize=1)
+def get_renewal_batch_size() -> int:
+    return int(os.getenv("RENEWAL_BATCH_SIZE", "500"))
+
+
+def get_schedulers_to_renew_from_subscriptions(utc_now: datetime) -> QuerySet[ServiceStockScheduler]:
+    return (
+        ServiceStockScheduler.objects.annotate(last_consumable_valid_until=Max("consumables__valid_until"))
+        .filter(
+            Q(
+                plan_handler__subscription__next_payment_at__gt=utc_now,
+                # this validation seems wrong
+                plan_handler__subscription__invoices__amount__gt=0,
+            )
+            | Q(
+                subscription_handler__subscription__next_payment_at__gt=utc_now,
+                # this validation seems wrong
+                subscription_handler__subscription__invoices__amount__gt=0,
+            ),
+            last_consumable_valid_until__lte=utc_now + timedelta(hours=1),
+        )
+        .exclude(plan_handler__subscription__status="CANCELLED")
+        .exclude(plan_handler__subscription__status="DEPRECATED")
+        .exclude(plan_handler__subscription__status="PAYMENT_ISSUE")
+        .exclude(subscription_handler__subscription__status="CANCELLED")
+        .exclude(subscription_handler__subscription__status="DEPRECATED")
+        .exclude(subscription_handler__subscription__status="PAYMENT_ISSUE")
+        .distinct()
+    )
+
+
+def get_schedulers_to_renew_from_plan_financings(utc_now: datetime) -> QuerySet[ServiceStockScheduler]:
+    return (
+        ServiceStockScheduler.objects.annotate(last_consumable_valid_until=Max("consumables__valid_until"))
+        .filter(
+            Q(
+                plan_handler__plan_financing__status="ACTIVE",
+                plan_handler__plan_financing__next_payment_at__gt=utc_now,
+                plan_handler__plan_financing__invoices__amount__gt=0,
+            )
+            | Q(
+                plan_handler__plan_financing__status="FULLY_PAID",
+                plan_handler__plan_financing__plan_expires_at__gt=utc_now,
+                plan_handler__plan_financing__invoices__amount__gt=0,
+            ),
+            last_consumable_valid_until__lte=utc_now + timedelta(hours=2),
+        )
+        .exclude(plan_handler__plan_financing__status="CANCELLED")
+        .exclude(plan_handler__plan_financing__status="DEPRECATED")
+        .exclude(plan_handler__plan_financing__status="PAYMENT_ISSUE")
+        .distinct()
+    )
+
+
+def build_renewed_consumable(
+    scheduler: ServiceStockScheduler, utc_now: datetime
+) -> Tuple[Optional[Consumable], Optional[str]]:
+    """
+    Move a scheduler to its next period and build the consumable of that period without saving them.
+
+    It returns the reason why the scheduler cannot be renewed, in that case the scheduler is not changed. The
+    consumable is None if the plan has not a resource linked to it.
+    """
+
+    def get_resource_lookup(i_owe_you, service: Service):
+        lookups = {}
+
+        key = service.type.lower()
+        value = getattr(i_owe_you, f"selected_{key}", None)
+        if value:
+            lookups[key] = value
+
+        return lookups
+
+    def get_extras():
+        extras = {}
+        if scheduler.subscription_seat:
+            # the instances are passed to avoid loading them again in Consumable.clean
+            extras["subscription_seat"] = scheduler.subscription_seat
+            extras["subscription_billing_team"] = scheduler.subscription_seat.billing_team
+
+        if scheduler.subscription_billing_team:
+            extras["user"] = None
+            if (
+                scheduler.subscription_billing_team.consumption_strategy
+                == SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM
+            ):
+                extras["subscription_seat"] = None
+
+            extras["subscription_billing_team"] = scheduler.subscription_billing_team
+
+        if scheduler.plan_financing_seat:
+            extras["plan_financing_seat_id"] = scheduler.plan_financing_seat.id
+            extras["plan_financing_team_id"] = scheduler.plan_financing_seat.team_id
+
+        if scheduler.plan_financing_team:
+            extras["user"] = None
+            extras["plan_financing_team_id"] = scheduler.plan_financing_team.id
+
+        return extras
+
+    plan_handler = scheduler.plan_handler
+    subscription_handler = scheduler.subscription_handler
+    extras = get_extras()
+
+    # is over
+    if (
+        plan_handler
+        and plan_handler.subscription
+        and plan_handler.subscription.valid_until
+        and plan_handler.subscription.valid_until < utc_now
+    ):
+        return None, f"The subscription {plan_handler.subscription.id} is over"
+
+    # it needs to be paid
+    if plan_handler and plan_handler.subscription and plan_handler.subscription.next_payment_at < utc_now:
+        return None, f"The subscription {plan_handler.subscription.id} needs to be paid to renew the consumables"
+
+    # is over
+    if plan_handler and plan_handler.plan_financing and plan_handler.plan_financing.plan_expires_at < utc_now:
+        return None, f"The plan financing {plan_handler.plan_financing.id} is over"
+
+    if (
+        plan_handler
+        and plan_handler.plan_financing
+        and plan_handler.plan_financing.status == PlanFinancing.Status.ACTIVE
+        and plan_handler.plan_financing.next_payment_at < utc_now
+    ):
+        return None, (
+            f"The plan financing {plan_handler.plan_financing.id} needs to be paid to renew " "the consumables"
+        )
+
+    # is over
+    if (
+        subscription_handler
+        and subscription_handler.subscription
+        and subscription_handler.subscription.valid_until
+        and subscription_handler.subscription.valid_until < utc_now
+    ):
+        return None, f"The subscription {subscription_handler.subscription.id} is over"
+
+    # it needs to be paid
+    if (
+        subscription_handler
+        and subscription_handler.subscription
+        and subscription_handler.subscription.next_payment_at < utc_now
+    ):
+        return None, (
+            f"The subscription {subscription_handler.subscription.id} needs to be paid to renew " "the consumables"
+        )
+
+    user = None
+    service_item = None
+    resource_valid_until = None
+    resource_next_payment_at = None
+    selected_lookup = {}
+    subscription = None
+    plan_financing = None
+
+    if plan_handler and plan_handler.subscription:
+        user = plan_handler.subscription.user
+        service_item = plan_handler.handler.service_item
+        resource_valid_until = plan_handler.subscription.valid_until
+        resource_next_payment_at = plan_handler.subscription.next_payment_at
+        subscription = plan_handler.subscription
+
+        selected_lookup = get_resource_lookup(plan_handler.subscription, service_item.service)
+
+    elif plan_handler and plan_handler.plan_financing:
+        user = plan_handler.plan_financing.user
+        service_item = plan_handler.handler.service_item
+        resource_valid_until = plan_handler.plan_financing.plan_expires_at
+        resource_next_payment_at = plan_handler.plan_financing.next_payment_at
+        plan_financing = plan_handler.plan_financing
+
+        selected_lookup = get_resource_lookup(plan_handler.plan_financing, service_item.service)
+
+    elif subscription_handler and subscription_handler.subscription:
+        user = subscription_handler.subscription.user
+        service_item = subscription_handler.service_item
+        resource_valid_until = subscription_handler.subscription.valid_until
+        resource_next_payment_at = subscription_handler.subscription.next_payment_at
+        subscription = subscription_handler.subscription
+
+        selected_lookup = get_resource_lookup(subscription_handler.subscription, service_item.service)
+
+    # If resource is Subscription and this scheduler is tied to a subscription seat,
+    # issue the consumable for the seat assignee (or None if not yet assigned) instead of the subscription owner.
+    if subscription and scheduler.subscription_seat:
+        # Use the seat's user if assigned, otherwise None (waiting for invitation acceptance)
+        user = scheduler.subscription_seat.user if scheduler.subscription_seat.user_id else None
+
+    if plan_financing and scheduler.plan_financing_seat:
+        user = scheduler.plan_financing_seat.user if scheduler.plan_financing_seat.user_id else None
+
+    if plan_financing and scheduler.plan_financing_team:
+        user = None
+
+    unit = service_item.renew_at
+    unit_type = service_item.renew_at_unit
+
+    delta = calculate_relative_delta(unit, unit_type)
+    scheduler.valid_until = scheduler.valid_until or utc_now
+
+    max_attempts = 100
+    attempts = 0
+
+    while attempts < max_attempts:
+        new_valid_until = scheduler.valid_until + delta
+
+        if new_valid_until > utc_now:
+            if attempts > 0:
+                logger.info(f"Scheduler {scheduler.id}: Found future date after {attempts + 1} attempts")
+            scheduler.valid_until = new_valid_until
+            break
+
+        scheduler.valid_until = new_valid_until
+        attempts += 1
+
+        if attempts >= max_attempts:
+            logger.warning(f"Could not find a future date for scheduler {scheduler.id} after {max_attempts} attempts")
+            scheduler.valid_until = scheduler.valid_until + delta
+            break
+
+    if resource_valid_until and scheduler.valid_until and scheduler.valid_until > resource_valid_until:
+        scheduler.valid_until = resource_valid_until
+
+    if (
+        not resource_valid_until
+        and resource_next_payment_at
+        and scheduler.valid_until
+        and scheduler.valid_until > resource_next_payment_at
+    ):
+        scheduler.valid_until = resource_next_payment_at
+
+    if not selected_lookup and service_item.service.type != "VOID":
+        return None, None
+
+    if "user" not in extras:
+        extras["user"] = user
+
+    consumable = Consumable(
+        service_item=service_item,
+        unit_type=service_item.unit_type,
+        how_many=service_item.how_many,
+        valid_until=scheduler.valid_until,
+        subscription=subscription,
+        plan_financing=plan_financing,
+        **selected_lookup,
+        **extras,
+    )
+
+    return consumable, None
+
+
+def renew_scheduler_batch(ids: list[int], utc_now: datetime, dry_run: bool = False) -> Tuple[int, int]:
+    """
+    Renew a batch of schedulers, it returns how many schedulers were renewed and how many consumables were issued.
+
+    The schedulers and their consumables are written in one transaction with bulk queries, the side effects of
+    Consumable.save are applied after the commit.
+    """
+
+    schedulers = ServiceStockScheduler.objects.filter(id__in=ids).select_related(*RENEWAL_SCHEDULER_RELATIONS)
+    renewed: list[ServiceStockScheduler] = []
+    issued: list[Tuple[ServiceStockScheduler, Consumable]] = []
+
+    for scheduler in schedulers.order_by("id"):
+        previous_valid_until = scheduler.valid_until
+        consumable, error = build_renewed_consumable(scheduler, utc_now)
+
+        if error:
+            logger.info(error)
+            continue
+
+        if consumable is None:
+            logger.error(f"The Plan not have a resource linked to it for the ServiceStockScheduler {scheduler.id}")
+            renewed.append(scheduler)
+            continue
+
+        try:
+            consumable.clean()
+
+        except Exception as e:
+            scheduler.valid_until = previous_valid_until
+            logger.error(f"The consumable of the ServiceStockScheduler {scheduler.id} is invalid: {e}")
+            continue
+
+        renewed.append(scheduler)
+        issued.append((scheduler, consumable))
+
+    if dry_run:
+        return len(renewed), len(issued)
+
+    through_model = ServiceStockScheduler.consumables.through
+
+    with transaction.atomic():
+        ServiceStockScheduler.objects.bulk_update(renewed, ["valid_until"])
+        Consumable.objects.bulk_create([consumable for _, consumable in issued])
+        through_model.objects.bulk_create(
+            [
+                through_model(servicestockscheduler_id=scheduler.id, consumable_id=consumable.id)
+                for scheduler, consumable in issued
+            ]
+        )
+
+    owners = set()
+    for _, consumable in issued:
+        if consumable.how_many != 0:
+            signals.grant_service_permissions.send_robust(instance=consumable, sender=Consumable)
+
+        owners |= get_consumable_owners(consumable)
+
+    invalidate_consumable_balances(owners)
+
+    return len(renewed), len(issued)
+
+
+def renew_consumables_in_bulk(
+    utc_now: Optional[datetime] = None, batch_size: Optional[int] = None, dry_run: bool = False
+) -> dict[str, RenewalStage]:
+    """
+    Renew the consumables of the schedulers that are due, it returns the rows touched and the time of each stage.
+
+    The select stages count the due schedulers and the renew stages count the consumables issued. The schedulers
+    are read in keyset-paginated chunks, each chunk is renewed in one transaction, and a scheduler found by both
+    selections is renewed once.
+    """
+
+    utc_now = utc_now or timezone.now()
+    batch_size = batch_size or get_renewal_batch_size()
+
+    report: dict[str, RenewalStage] = {}
+    seen = set()
+
+    selections = [
+        ("subscriptions", get_schedulers_to_renew_from_subscriptions(utc_now)),
+        ("plan_financings", get_schedulers_to_renew_from_plan_financings(utc_now)),
+    ]
+
+    for name, qs in selections:
+        select: RenewalStage = {"rows": 0, "seconds": 0.0}
+        renew: RenewalStage = {"rows": 0, "seconds": 0.0}
+        last_id = 0
+
+        while True:
+            start = time.perf_counter()
+            ids = list(qs.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+            select["seconds"] += time.perf_counter() - start
+
+            if not ids:
+                break
+
+            last_id = ids[-1]
+            ids = [x for x in ids if x not in seen]
+            if not ids:
+                continue
+
+            seen.update(ids)
+            select["rows"] += len(ids)
+
+            start = time.perf_counter()
+            _, issued = renew_scheduler_batch(ids, utc_now, dry_run=dry_run)
+            renew["seconds"] += time.perf_counter() - start
+            renew["rows"] += issued
+
+        report[f"select_{name}"] = select
+        report[f"renew_{name}"] = renew
+
+    return report
+
+
+class Prepayment(TypedDict):
+    owner: Subscription | PlanFinancing
+    bag: Bag
+    charge: "BulkCharge"
+    team: Optional[SubscriptionBillingTeam]
+
+
+CHARGEABLE_STATUSES = ["ACTIVE", "ERROR", "PAYMENT_ISSUE"]
+
+
+def get_charge_idempotency_key(owner: Subscription | PlanFinancing, bag: Bag) -> str:
+    """
+    Get the key of a charge attempt of a subscription or plan financing.
+
+    Each attempt builds its own bag, so Stripe only replays the retries of the same request, a new attempt after a
+    decline or a change of the amount reaches the card again.
+    """
+
+    kind = "subscription" if isinstance(owner, Subscription) else "plan-financing"
+    return f"{kind}-{owner.id}-bag-{bag.id}"
+
+
+def get_chargeable_owners(model: Type[Subscription | PlanFinancing], ids: list[int], utc_now: datetime) -> QuerySet:
+    """Get the resources that can be charged without any notification or fix, the rest are left to their task."""
+
+    pending_invoices = Invoice.objects.filter(status="FULFILLED", paid_at__lte=utc_now, bag__was_delivered=False)
+
+    return (
+        model.objects.filter(
+            id__in=ids, status__in=CHARGEABLE_STATUSES, externally_managed=False, next_payment_at__lte=utc_now
+        )
+        .exclude(status="PAYMENT_ISSUE", next_payment_at__lte=utc_now - timedelta(days=5))
+        .exclude(plans__status__in=[Plan.Status.DISCONTINUED, Plan.Status.DELETED])
+        .exclude(invoices__in=pending_invoices)
+        .select_related("user", "academy")
+    )
+
+
+def get_payment_customers(owners: list[Subscription | PlanFinancing]) -> dict[tuple[int, int], str]:
+    """Get the Stripe customers of the owners by user and academy."""
+
+    contacts = PaymentContact.objects.filter(
+        user__id__in={x.user_id for x in owners}, academy__id__in={x.academy_id for x in owners}
+    ).values_list("user_id", "academy_id", "stripe_id")
+
+    return {(user_id, academy_id): stripe_id for user_id, academy_id, stripe_id in contacts}
+
+
+def get_subscription_prepayments(ids: list[int], utc_now: datetime) -> list[Prepayment]:
+    """Build the charges of the subscriptions that are due, the customers that are not in Stripe yet are skipped."""
+
+    subscriptions = list(
+        get_chargeable_owners(Subscription, ids, utc_now).filter(
+            Q(valid_until__isnull=True) | Q(valid_until__gt=utc_now)
+        )
+    )
+    customers = get_payment_customers(subscriptions)
+    teams = {x.subscription_id: x for x in SubscriptionBillingTeam.objects.filter(subscription__in=subscriptions)}
+
+    prepayments: list[Prepayment] = []
+    for subscription in subscriptions:
+        if not (customer := customers.get((subscription.user_id, subscription.academy_id))):
+            continue
+
+        settings = get_user_settings(subscription.user_id)
+
+        try:
+            bag = get_bag_from_subscription(subscription, settings)
+
+        except Exception:
+            continue
+
+        amount = get_amount_by_chosen_period(bag, bag.chosen_period, settings.lang)
+        if coupons := bag.coupons.all():
+            amount = get_discounted_price(amount, coupons)
+
+        if amount <= 0 or bag.currency is None:
+            bag.delete()
+            continue
+
+        prepayments.append(
+            {
+                "owner": subscription,
+                "bag": bag,
+                "team": teams.get(subscription.id),
+                "charge": {
+                    "customer": customer,
+                    "amount": amount,
+                    "currency": bag.currency,
+                    "description": "",
+                    "idempotency_key": get_charge_idempotency_key(subscription, bag),
+                },
+            }
+        )
+
+    return prepayments
+
+
+def get_plan_financing_prepayments(ids: list[int], utc_now: datetime) -> list[Prepayment]:
+    """Build the charges of the installments that are due, the customers that are not in Stripe yet are skipped."""
+
+    plan_financings = list(
+        get_chargeable_owners(PlanFinancing, ids, utc_now).exclude(plan_expires_at__lt=utc_now, valid_until__lt=utc_now)
+    )
+    customers = get_payment_customers(plan_financings)
+    window_days = dict(
+        AcademyPaymentSettings.objects.filter(academy__id__in={x.academy_id for x in plan_financings}).values_list(
+            "academy_id", "early_renewal_window_days"
+        )
+    )
+
+    prepayments: list[Prepayment] = []
+    for plan_financing in plan_financings:
+        if not (customer := customers.get((plan_financing.user_id, plan_financing.academy_id))):
+            continue
+
+        invoices = list(
+            plan_financing.invoices.filter(bag__was_delivered=True).select_related("bag").order_by("created_at")
+        )
+        if not invoices:
+            continue
+
+        cooldown_days = window_days.get(plan_financing.academy_id, 2) or 5
+        if utc_now - invoices[-1].paid_at < timedelta(days=cooldown_days):
+            continue
+
+        if invoices[0].bag.how_many_installments - len(invoices) <= 0:
+            continue
+
+        settings = get_user_settings(plan_financing.user_id)
+        bag = get_bag_from_plan_financing(plan_financing, settings)
+        amount = get_installment_amount(invoices[0])
+
+        if amount <= 0 or bag.currency is None:
+            bag.delete()
+            continue
+
+        prepayments.append(
+            {
+                "owner": plan_financing,
+                "bag": bag,
+                "team": None,
+                "charge": {
+                    "customer": customer,
+                    "amount": amount,
+                    "currency": bag.currency,
+                    "description": "",
+                    "idempotency_key": get_charge_idempotency_key(plan_financing, bag),
+                },
+            }
+        )
+
+    return prepayments
+
+
+PREPAYMENT_LOCK_TIMEOUT = 600
+
+
+def lock_prepayments(prepayments: list[Prepayment], stack: ExitStack, utc_now: datetime) -> list[Prepayment]:
+    """
+    Take the lock of the owner of each prepayment, it returns the ones that can still be charged.
+
+    It is the lock of `charge_subscription` and `charge_plan_financing`, the owners locked by a task or renewed after
+    the prepayments were built are skipped.
+    """
+
+    client = None
+    if IS_DJANGO_REDIS:
+        client = get_redis_connection("default")
+
+    locked: list[Prepayment] = []
+    for prepayment in prepayments:
+        owner = prepayment["owner"]
+        kind = "subscription" if isinstance(owner, Subscription) else "plan_financing"
+
+        try:
+            stack.enter_context(
+                Lock(client, f"lock:{kind}:{owner.id}", timeout=PREPAYMENT_LOCK_TIMEOUT, blocking_timeout=0)
+            )
+
+        except LockError:
+            continue
+
+        locked.append(prepayment)
+
+    chargeable = set()
+    for model in [Subscription, PlanFinancing]:
+        if ids := [x["owner"].id for x in locked if isinstance(x["owner"], model)]:
+            qs = get_chargeable_owners(model, ids, utc_now).values_list("id", "next_payment_at")
+            chargeable.update((model, pk, next_payment_at) for pk, next_payment_at in qs)
+
+    return [x for x in locked if (type(x["owner"]), x["owner"].id, x["owner"].next_payment_at) in chargeable]
+
+
+def prepay_in_bulk(prepayments: list[Prepayment], utc_now: Optional[datetime] = None) -> int:
+    """
+    Charge the prepayments in Stripe and save their invoices in bulk, it returns how many of them were paid.
+
+    The charges of each academy are sent through a bounded pool while the locks of their owners are held, the
+    invoices paid are linked to their owner but they are not delivered, the charge tasks find them and finish the
+    renewal without calling Stripe again. The bags of the charges declined or skipped are removed, their tasks
+    charge them again and notify the users.
+    """
+
+    from .services.stripe import Stripe
+
+    utc_now = utc_now or timezone.now()
+    academies: dict[int, list[Prepayment]] = {}
+
+    for prepayment in prepayments:
+        academies.setdefault(prepayment["owner"].academy_id, []).append(prepayment)
+
+    paid_amount = 0
+    for items in academies.values():
+        with ExitStack() as stack:
+            locked = lock_prepayments(items, stack, utc_now)
+            locked_bags = {x["bag"].id for x in locked}
+
+            paid: list[tuple[Prepayment, Invoice]] = []
+            declined = [x["bag"].id for x in items if x["bag"].id not in locked_bags]
+
+            s = Stripe(academy=items[0]["owner"].academy)
+            results = s.charge_in_bulk([x["charge"] for x in locked])
+
+            for prepayment, result in zip(locked, results):
+                if result["error"]:
+                    logger.warning(f"Charge {prepayment['charge']['idempotency_key']} failed: {result['error']}")
+                    declined.append(prepayment["bag"].id)
+                    continue
+
+                bag = prepayment["bag"]
+                invoice = Invoice(
+                    user=bag.user,
+                    amount=prepayment["charge"]["amount"],
+                    currency=bag.currency,
+                    stripe_id=result["charge"]["id"],
+                    paid_at=utc_now,
+                    status="FULFILLED",
+                    subscription_billing_team=prepayment["team"],
+                    bag=bag,
+                    academy=bag.academy,
+                )
+                paid.append((prepayment, invoice))
+
+            with transaction.atomic():
+                Invoice.objects.bulk_create([invoice for _, invoice in paid])
+
+                Subscription.invoices.through.objects.bulk_create(
+                    [
+                        Subscription.invoices.through(subscription_id=x["owner"].id, invoice_id=invoice.id)
+                        for x, invoice in paid
+                        if isinstance(x["owner"], Subscription)
+                    ]
+                )
+                PlanFinancing.invoices.through.objects.bulk_create(
+                    [
+                        PlanFinancing.invoices.through(planfinancing_id=x["owner"].id, invoice_id=invoice.id)
+                        for x, invoice in paid
+                        if isinstance(x["owner"], PlanFinancing)
+                    ]
+                )
+
+                Bag.objects.filter(id__in=declined).delete()
+
+            paid_amount += len(paid)
+
+    return paid_amount
+
+
+def make_charges_in_bulk(
+    utc_now: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    prepay: bool = True,
+) -> dict[str, RenewalStage]:
+    """
+    Expire the resources that are over and fan out the charges, it returns the rows touched and the time of each stage.
+
+    The expirations are single updates and only the ids of the resources are read in keyset-paginated chunks. The
+    charge tasks abort if the next payment is in the future, so only the resources whose payment is due are sent
+    to them. If `prepay` is enabled, each chunk is charged in Stripe by `prepay_in_bulk` before the tasks are sent.
+    """
+
+    utc_now = utc_now or timezone.now()
+    batch_size = batch_size or get_renewal_batch_size()
+    report: dict[str, RenewalStage] = {}
+
+    def run(name: str, qs: QuerySet, **update):
+        start = time.perf_counter()
+        rows = qs.count() if dry_run else qs.update(**update)
+        report[name] = {"rows": rows, "seconds": time.perf_counter() - start}
+
+    def fan_out(name: str, qs: QuerySet, task, get_prepayments):
+        stage: RenewalStage = {"rows": 0, "seconds": 0.0}
+        prepaid: RenewalStage = {"rows": 0, "seconds": 0.0}
+        start = time.perf_counter()
+        last_id = 0
+
+        while ids := list(qs.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]):
+            last_id = ids[-1]
+            stage["rows"] += len(ids)
+
+            if dry_run:
+                continue
+
+            if prepay:
+                prepay_start = time.perf_counter()
+                prepaid["rows"] += prepay_in_bulk(get_prepayments(ids, utc_now), utc_now)
+                prepaid["seconds"] += time.perf_counter() - prepay_start
+
+            for id in ids:
+                task.delay(id)
+
+        stage["seconds"] = time.perf_counter() - start - prepaid["seconds"]
+        report[f"prepay_{name}"] = prepaid
+        report[f"charge_{name}"] = stage
+
+    avoid_expire_these_statuses = (
+        Q(status="EXPIRED")
+        | Q(status="ERROR")
+        | Q(status="PAYMENT_ISSUE")
+        | Q(status="FULLY_PAID")
+        | Q(status="FREE_TRIAL")
+        | Q(status="CANCELLED")
+        | Q(status="DEPRECATED")
+    )
+
+    run(
+        "expire_subscriptions_with_payment_issues",
+        Subscription.objects.filter(
+            Q(valid_until__gte=utc_now) | Q(valid_until__isnull=True),
+            next_payment_at__lte=utc_now - timedelta(days=7),
+            status="PAYMENT_ISSUE",
+        ),
+        status="EXPIRED",
+    )
+
+    run(
+        "expire_subscriptions",
+        Subscription.objects.filter(valid_until__lte=utc_now).exclude(avoid_expire_these_statuses),
+        status="EXPIRED",
+    )
+
+    run(
+        "expire_plan_financings",
+        PlanFinancing.objects.filter(plan_expires_at__lte=utc_now).exclude(avoid_expire_these_statuses),
+        status="EXPIRED",
+    )
+
+    # there is not a task to fix them yet, they are reported and skipped by the charges
+    start = time.perf_counter()
+    broken = Subscription.objects.filter(paid_at=F("next_payment_at")).count()
+    report["subscriptions_to_fix"] = {"rows": broken, "seconds": time.perf_counter() - start}
+
+    if broken:
+        logger.warning(f"There are {broken} subscriptions whose next_payment_at was not moved after their payment")
+
+    statuses = ["CANCELLED", "DEPRECATED", "FREE_TRIAL", "EXPIRED"]
+
+    subscriptions = (
+        Subscription.objects.filter(
+            Q(valid_until__isnull=True) | Q(valid_until__gt=utc_now),
+            next_payment_at__lte=utc_now,
+        )
+        .exclude(paid_at=F("next_payment_at"))
+        .exclude(status__in=statuses)
+    )
+
+    plan_financings = PlanFinancing.objects.filter(
+        Q(plan_expires_at__isnull=True) | Q(plan_expires_at__gt=utc_now),
+        next_payment_at__lte=utc_now,
+    ).exclude(status__in=statuses + ["FULLY_PAID"])
+
+    fan_out("subscriptions", subscriptions, tasks.charge_subscription, get_subscription_prepayments)
+    fan_out("plan_financings", plan_financings, tasks.charge_plan_financing, get_plan_financing_prepayments)
+
+    return report
@@ -307,24 +307,29 @@ class InvoiceForm(forms.ModelForm):
 @admin.display(description="Recalculate amount breakdown")
 def recalculate_invoice_breakdown(modeladmin, request, queryset):
     from django.contrib import messages
-    from breathecode.payments.actions import calculate_invoice_breakdown
+    from breathecode.payments.actions import calculate_invoice_breakdowns
 
-    updated_count = 0
+    updated = []
     error_count = 0
 
-    for invoice in queryset.all():
-        if not invoice.bag:
+    invoices = list(queryset.all())
+    breakdowns = calculate_invoice_breakdowns(invoices, "en")
+
+    for invoice in invoices:
+        if invoice.id not in breakdowns:
             continue
 
-        try:
-            lang = "en"
-            breakdown = calculate_invoice_breakdown(invoice.bag, invoice, lang)
-            invoice.amount_breakdown = breakdown
-            invoice.save(update_fields=["amount_breakdown"])
-            updated_count += 1
-        except Exception as e:
+        breakdown = breakdowns[invoice.id]
+        if isinstance(breakdown, Exception):
             error_count += 1
-            messages.error(request, f"Error recalculating breakdown for invoice {invoice.id}: {str(e)}")
+            messages.error(request, f"Error recalculating breakdown for invoice {invoice.id}: {str(breakdown)}")
+            continue
+
+        invoice.amount_breakdown = breakdown
+        updated.append(invoice)
+
+    Invoice.objects.bulk_update(updated, ["amount_breakdown"])
+    updated_count = len(updated)
 
     if updated_count > 0:
         messages.success(request, f"Successfully recalculated breakdown for {updated_count} invoice(s)")
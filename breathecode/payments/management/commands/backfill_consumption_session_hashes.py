@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...models import ConsumptionSession
+
+
+class Command(BaseCommand):
+    help = "Backfill request_hash for existing ConsumptionSession records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show what would be updated without making changes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of sessions to process per batch (default: 1000)",
+        )
+        parser.add_argument(
+            "--include-expired",
+            action="store_true",
+            help="Include sessions with an eta in the past",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+        include_expired = options["include_expired"]
+
+        sessions = ConsumptionSession.objects.filter(request_hash="")
+
+        # By default, only the sessions that still can be found by get_session are processed
+        if not include_expired:
+            sessions = sessions.filter(eta__gte=timezone.now())
+
+        total_count = sessions.count()
+
+        if total_count == 0:
+            self.stdout.write(self.style.SUCCESS("No consumption sessions need to be updated"))
+            return
+
+        self.stdout.write(f"Found {total_count} consumption sessions to process")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN - No changes were made"))
+            return
+
+        updated_count = 0
+        last_id = 0
+
+        # keyset pagination, the updated rows are not part of the queryset anymore
+        while True:
+            batch = list(sessions.filter(id__gt=last_id).order_by("id").only("id", "request")[:batch_size])
+            if not batch:
+                break
+
+            for session in batch:
+                session.request_hash = ConsumptionSession.hash_request(session.request)
+
+            ConsumptionSession.objects.bulk_update(batch, ["request_hash"])
+
+            last_id = batch[-1].id
+            updated_count += len(batch)
+            self.stdout.write(f"Processed {updated_count}/{total_count} consumption sessions...")
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated_count} consumption sessions"))
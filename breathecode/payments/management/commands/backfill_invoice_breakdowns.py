@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+
+from ...actions import save_missing_invoice_breakdowns
+from ...models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Backfill amount_breakdown for the invoices issued before it was stored, using the current prices"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show what would be updated without making changes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of invoices to process per batch (default: 500)",
+        )
+        parser.add_argument(
+            "--lang",
+            type=str,
+            default="en",
+            help="Language code for error messages (default: en)",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+        lang = options["lang"]
+
+        invoices = Invoice.objects.filter(amount_breakdown__isnull=True, bag__isnull=False)
+        total_count = invoices.count()
+
+        if total_count == 0:
+            self.stdout.write(self.style.SUCCESS("No invoices need to be updated"))
+            return
+
+        self.stdout.write(f"Found {total_count} invoices to process")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN - No changes were made"))
+            return
+
+        updated_count = 0
+        processed_count = 0
+        last_id = 0
+
+        # keyset pagination, the invoices that cannot be calculated keep matching the queryset
+        while True:
+            batch = list(invoices.filter(id__gt=last_id).order_by("id")[:batch_size])
+            if not batch:
+                break
+
+            updated_count += len(save_missing_invoice_breakdowns(batch, lang))
+
+            last_id = batch[-1].id
+            processed_count += len(batch)
+            self.stdout.write(f"Processed {processed_count}/{total_count} invoices...")
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated_count} invoices"))
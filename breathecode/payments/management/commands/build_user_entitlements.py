@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from ...actions import build_user_entitlements
+
+
+class Command(BaseCommand):
+    help = "Rebuild the entitlements of the users with subscriptions, plan financings or seats"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of users to rebuild per batch (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        users = User.objects.filter(
+            Q(subscription__isnull=False)
+            | Q(planfinancing__isnull=False)
+            | Q(subscriptionseat__isnull=False)
+            | Q(entitlement__isnull=False)
+        ).distinct()
+
+        rebuilt = 0
+        last_id = 0
+
+        while ids := list(users.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]):
+            build_user_entitlements(ids)
+
+            last_id = ids[-1]
+            rebuilt += len(ids)
+            self.stdout.write(f"Rebuilt {rebuilt} entitlements...")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} entitlements"))
@@ -1,71 +1,38 @@
-from datetime import timedelta
-
 from django.core.management.base import BaseCommand
-from django.db.models import F
-from django.db.models.query_utils import Q
-from django.utils import timezone
-
-from breathecode.payments import tasks
 
-from ...models import PlanFinancing, Subscription
+from breathecode.payments import actions
 
 
 # renew the subscriptions every 1 hours
 class Command(BaseCommand):
     help = "Renew credits"
 
-    def handle(self, *args, **options):
-        utc_now = timezone.now()
-        statuses = ["CANCELLED", "DEPRECATED", "FREE_TRIAL", "EXPIRED"]
-
-        avoid_expire_these_statuses = (
-            Q(status="EXPIRED")
-            | Q(status="ERROR")
-            | Q(status="PAYMENT_ISSUE")
-            | Q(status="FULLY_PAID")
-            | Q(status="FREE_TRIAL")
-            | Q(status="CANCELLED")
-            | Q(status="DEPRECATED")
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show how many rows each stage would touch without making changes",
         )
-
-        subscription_args = (Q(valid_until__isnull=True) | Q(valid_until__gt=utc_now),)
-        financing_args = (Q(plan_expires_at__isnull=True) | Q(plan_expires_at__gt=utc_now),)
-        params = {
-            "next_payment_at__lte": utc_now + timedelta(days=1),
-        }
-
-        Subscription.objects.filter(
-            Q(valid_until__gte=utc_now) | Q(valid_until__isnull=True),
-            next_payment_at__lte=utc_now - timedelta(days=7),
-            status="PAYMENT_ISSUE",
-        ).update(status="EXPIRED")
-
-        Subscription.objects.filter(valid_until__lte=utc_now).exclude(avoid_expire_these_statuses).update(
-            status="EXPIRED"
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of ids to read per query (default: RENEWAL_BATCH_SIZE or 500)",
         )
-
-        PlanFinancing.objects.filter(plan_expires_at__lte=utc_now).exclude(avoid_expire_these_statuses).update(
-            status="EXPIRED"
+        parser.add_argument(
+            "--no-prepay",
+            action="store_true",
+            help="Leave the charges to the tasks instead of sending them to Stripe in bulk first",
         )
 
-        fix_subscriptions = Subscription.objects.filter(paid_at=F("next_payment_at"))
-
-        for subscription in fix_subscriptions:
-            tasks.fix_subscription_next_payment_at.delay(subscription.id)
-
-        subscriptions = Subscription.objects.filter(*subscription_args, **params).exclude(paid_at=F("next_payment_at"))
-        plan_financings = PlanFinancing.objects.filter(*financing_args, **params)
-
-        for status in statuses:
-            subscriptions = subscriptions.exclude(status=status)
-
-        statuses.append("FULLY_PAID")
-
-        for status in statuses:
-            plan_financings = plan_financings.exclude(status=status)
+    def handle(self, *args, **options):
+        dry_run = options.get("dry_run", False)
+        report = actions.make_charges_in_bulk(
+            batch_size=options.get("batch_size"), dry_run=dry_run, prepay=not options.get("no_prepay", False)
+        )
 
-        for subscription in subscriptions:
-            tasks.charge_subscription.delay(subscription.id)
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN - No changes were made"))
 
-        for plan_financing in plan_financings:
-            tasks.charge_plan_financing.delay(plan_financing.id)
+        for stage, result in report.items():
+            self.stdout.write(f"{stage}: {result['rows']} rows in {result['seconds']:.3f}s")
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:03
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_request_hash(apps, schema_editor):
+    """
+    Populate request_hash for the sessions that can still be found.
+
+    The expired sessions are never looked up again, they can be filled with the
+    backfill_consumption_session_hashes command.
+    """
+    ConsumptionSession = apps.get_model("payments", "ConsumptionSession")
+
+    def sort_dict(d):
+        if isinstance(d, dict):
+            return {k: sort_dict(v) for k, v in sorted(d.items())}
+
+        elif isinstance(d, (list, tuple)):
+            return [sort_dict(x) for x in d]
+
+        return d
+
+    def generate_hash(request):
+        normalized = json.dumps(sort_dict(request or {}), sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    sessions = ConsumptionSession.objects.filter(request_hash="", eta__gte=timezone.now()).only("id", "request")
+    batch = []
+    for session in sessions.iterator(chunk_size=1000):
+        session.request_hash = generate_hash(session.request)
+        batch.append(session)
+
+        if len(batch) >= 1000:
+            ConsumptionSession.objects.bulk_update(batch, ["request_hash"])
+            batch = []
+
+    if batch:
+        ConsumptionSession.objects.bulk_update(batch, ["request_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0028_alter_invoice_status_creditnote"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="consumptionsession",
+            name="request_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="SHA256 hash of the canonicalized request, it's used to find the session",
+                max_length=64,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="consumptionsession",
+            index=models.Index(fields=["user", "request_hash", "eta"], name="payments_co_user_id_99da7a_idx"),
+        ),
+        migrations.RunPython(populate_request_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0029_consumptionsession_request_hash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserEntitlement",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "plans",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="Slugs of the plans of the active subscriptions and plan financings",
+                    ),
+                ),
+                (
+                    "seat_subscriptions",
+                    models.JSONField(
+                        blank=True, default=list, help_text="Ids of the subscriptions where the user has a seat"
+                    ),
+                ),
+                (
+                    "has_paid_plans",
+                    models.BooleanField(default=False, help_text="The user has an active paid subscription"),
+                ),
+                (
+                    "has_4geeks_plus",
+                    models.BooleanField(default=False, help_text="The user has an active 4Geeks Plus plan"),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        blank=True, default=None, help_text="When the first of the active plans expires", null=True
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        help_text="Customer",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entitlement",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -963,7 +963,11 @@ class AcademyService(models.Model):
         return self.pricing_ratio_exceptions.get(country_code, {}).get("max_amount", self.max_amount)
 
     def get_discounted_price(
-        self, num_items: float, country_code: Optional[str] = None, lang: Optional[str] = "en"
+        self,
+        num_items: float,
+        country_code: Optional[str] = None,
+        lang: Optional[str] = "en",
+        cache: Optional[dict[str, Currency]] = None,
     ) -> tuple[float, Currency, dict]:
         from breathecode.payments.actions import apply_pricing_ratio
 
@@ -985,7 +989,9 @@ class AcademyService(models.Model):
         if total_discount_ratio > max_discount:
             total_discount_ratio = max_discount
 
-        adjusted_price_per_unit, ratio, c = apply_pricing_ratio(self.price_per_unit, country_code, self, lang=lang)
+        adjusted_price_per_unit, ratio, c = apply_pricing_ratio(
+            self.price_per_unit, country_code, self, lang=lang, cache=cache
+        )
         currency = c or self.currency
         pricing_ratio_explanation = {"service_items": []}
         if ratio:
@@ -3163,17 +3169,16 @@ class Consumable(AbstractServiceItem):
         parent_entities = [self.subscription, self.plan_financing]
         # support user-owned and team-owned consumables
         owners = [self.user, self.subscription_billing_team]
-        # derive settings lang safely even if user is None (team-owned)
-        if self.user_id:
-            settings = get_user_settings(self.user.id)
-        elif self.subscription_id and getattr(self.subscription, "user_id", None):
-            settings = get_user_settings(self.subscription.user.id)
-        else:
 
-            class _Settings:
-                lang = "en"
+        # derive settings lang safely even if user is None (team-owned), it is only read to report an error
+        def get_lang():
+            if self.user_id:
+                return get_user_settings(self.user.id).lang
 
-            settings = _Settings()
+            if self.subscription_id and getattr(self.subscription, "user_id", None):
+                return get_user_settings(self.subscription.user.id).lang
+
+            return "en"
 
         how_many_resources_are_set = len([r for r in resources if r])
         how_many_parent_entities_are_set = len([p for p in parent_entities if p])
@@ -3182,7 +3187,7 @@ class Consumable(AbstractServiceItem):
         if how_many_owners_are_set == 0:
             raise forms.ValidationError(
                 translation(
-                    settings.lang,
+                    get_lang(),
                     en="A consumable must be associated with one owner (user or subscription billing team)",
                     es="Un consumible debe estar asociado con un propietario (usuario o suscripción con equipo de facturación)",
                 )
@@ -3191,7 +3196,7 @@ class Consumable(AbstractServiceItem):
         if how_many_resources_are_set > 1:
             raise forms.ValidationError(
                 translation(
-                    settings.lang,
+                    get_lang(),
                     en="A consumable can only be associated with one resource",
                     es="Un consumible solo se puede asociar con un recurso",
                 )
@@ -3200,7 +3205,7 @@ class Consumable(AbstractServiceItem):
         if how_many_parent_entities_are_set > 1:
             raise forms.ValidationError(
                 translation(
-                    settings.lang,
+                    get_lang(),
                     en="A consumable can only be associated with one parent entity (subscription or plan_financing)",
                     es="Un consumible solo se puede asociar con una entidad padre (suscripción o plan de financiamiento)",
                 )
@@ -3209,7 +3214,7 @@ class Consumable(AbstractServiceItem):
         if self.service_item is None:
             raise forms.ValidationError(
                 translation(
-                    settings.lang,
+                    get_lang(),
                     en="A consumable must be associated with a service item",
                     es="Un consumible debe estar asociado con un artículo de un servicio",
                 )
@@ -3227,7 +3232,7 @@ class Consumable(AbstractServiceItem):
             elif self.subscription_billing_team_id != seat_team.id:
                 raise forms.ValidationError(
                     translation(
-                        settings.lang,
+                        get_lang(),
                         en="Subscription billing team does not match seat billing team",
                         es="El equipo de facturación de la suscripción no coincide con el equipo del asiento",
                     )
@@ -3243,7 +3248,7 @@ class Consumable(AbstractServiceItem):
             ):
                 raise forms.ValidationError(
                     translation(
-                        settings.lang,
+                        get_lang(),
                         en="Subscription seat does not match consumable user",
                         es="El asiento de la suscripción no coincide con el usuario del consumible",
                     )
@@ -3302,6 +3307,13 @@ class ConsumptionSession(models.Model):
         blank=True,
         help_text="Request parameters, it's used to remind and recover and consumption session",
     )
+    request_hash = models.CharField(
+        max_length=64,
+        default="",
+        blank=True,
+        editable=False,
+        help_text="SHA256 hash of the canonicalized request, it's used to find the session",
+    )
 
     # this should be used to get
     path = models.CharField(max_length=200, blank=True, help_text="Path of the request")
@@ -3315,8 +3327,14 @@ class ConsumptionSession(models.Model):
         "letters, numbers and hyphens",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "request_hash", "eta"]),
+        ]
+
     def clean(self):
         self.request = self.sort_dict(self.request or {})
+        self.request_hash = self.hash_request(self.request)
 
     def save(self, *args, **kwargs):
         self.full_clean()
@@ -3328,11 +3346,43 @@ class ConsumptionSession(models.Model):
         if isinstance(d, dict):
             return {k: cls.sort_dict(v) for k, v in sorted(d.items())}
 
-        elif isinstance(d, list):
+        elif isinstance(d, (list, tuple)):
             return [cls.sort_dict(x) for x in d]
 
         return d
 
+    @classmethod
+    def hash_request(cls, data: dict) -> str:
+        """
+        Generate a deterministic hash from the request of a session.
+
+        Args:
+            data: Request parameters, the args, kwargs, headers and user of the request
+
+        Returns:
+            SHA256 hash string (64 characters)
+        """
+
+        # the same serialization is used for the JSON stored in the database, so tuples and lists match
+        normalized = json.dumps(cls.sort_dict(data or {}), sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_request_data(request: WSGIRequest, user: User) -> dict:
+        if hasattr(request, "parser_context"):
+            args = request.parser_context["args"]
+            kwargs = request.parser_context["kwargs"]
+        else:
+            args = request.resolver_match.args
+            kwargs = request.resolver_match.kwargs
+
+        return {
+            "args": list(args),
+            "kwargs": kwargs,
+            "headers": {"academy": request.META.get("HTTP_ACADEMY")},
+            "user": user.id,
+        }
+
     @classmethod
     def build_session(
         cls,
@@ -3363,20 +3413,7 @@ class ConsumptionSession(models.Model):
 
         path = resource.__class__._meta.app_label + "." + resource.__class__.__name__ if resource else ""
         user = user or request.user
-
-        if hasattr(request, "parser_context"):
-            args = request.parser_context["args"]
-            kwargs = request.parser_context["kwargs"]
-        else:
-            args = request.resolver_match.args
-            kwargs = request.resolver_match.kwargs
-
-        data = {
-            "args": args,
-            "kwargs": kwargs,
-            "headers": {"academy": request.META.get("HTTP_ACADEMY")},
-            "user": user.id,
-        }
+        data = cls.get_request_data(request, user)
 
         # assert path, 'You must provide a path'
         assert delta, "You must provide a delta"
@@ -3386,7 +3423,7 @@ class ConsumptionSession(models.Model):
             session = (
                 cls.objects.filter(
                     eta__gte=utc_now,
-                    request=data,
+                    request_hash=cls.hash_request(data),
                     path=path,
                     duration=delta,
                     related_id=id,
@@ -3431,27 +3468,22 @@ class ConsumptionSession(models.Model):
             return None
 
         utc_now = timezone.now()
-        if hasattr(request, "parser_context"):
-            args = request.parser_context["args"]
-            kwargs = request.parser_context["kwargs"]
-        else:
-            args = request.resolver_match.args
-            kwargs = request.resolver_match.kwargs
+        request_hash = cls.hash_request(cls.get_request_data(request, request.user))
 
-        data = {
-            "args": list(args),
-            "kwargs": kwargs,
-            "headers": {"academy": request.META.get("HTTP_ACADEMY")},
-            "user": request.user.id,
-        }
-
-        data = cls.sort_dict(data)
-        return cls.objects.filter(eta__gte=utc_now, request=data, user=request.user).first()
+        # it uses the index (user, request_hash, eta) instead of comparing the JSON
+        return cls.objects.filter(user=request.user, request_hash=request_hash, eta__gte=utc_now).first()
 
     @classmethod
-    @sync_to_async
-    def aget_session(cls, request: WSGIRequest) -> "ConsumptionSession":
-        return cls.get_session(request)
+    async def aget_session(cls, request: WSGIRequest) -> "ConsumptionSession":
+        # request.user could be lazy, and it could hit the database
+        user = await sync_to_async(lambda: request.user)()
+        if not user.id:
+            return None
+
+        utc_now = timezone.now()
+        request_hash = cls.hash_request(cls.get_request_data(request, user))
+
+        return await cls.objects.filter(user=user, request_hash=request_hash, eta__gte=utc_now).afirst()
 
     def will_consume(self, how_many: float = 1.0) -> None:
         # avoid dependency circle
@@ -3715,6 +3747,37 @@ class FinancialReputation(models.Model):
         return f"{self.user.email} -> {self.get_reputation()}"
 
 
+class UserEntitlement(models.Model):
+    """
+    Materialized summary of the active plans of a user, it is looked up by the permission checks.
+
+    It is rebuilt by the receivers of the subscriptions, plan financings and seats of the user, after `expires_at`
+    it is stale and it is rebuilt on the next lookup.
+    """
+
+    if TYPE_CHECKING:
+        objects: TypedManager["UserEntitlement"]
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="entitlement", help_text="Customer")
+
+    plans = models.JSONField(
+        default=list, blank=True, help_text="Slugs of the plans of the active subscriptions and plan financings"
+    )
+    seat_subscriptions = models.JSONField(
+        default=list, blank=True, help_text="Ids of the subscriptions where the user has a seat"
+    )
+    has_paid_plans = models.BooleanField(default=False, help_text="The user has an active paid subscription")
+    has_4geeks_plus = models.BooleanField(default=False, help_text="The user has an active 4Geeks Plus plan")
+    expires_at = models.DateTimeField(
+        default=None, null=True, blank=True, help_text="When the first of the active plans expires"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, editable=False)
+
+    def __str__(self) -> str:
+        return f"{self.user.email} -> {', '.join(self.plans)}"
+
+
 class AcademyPaymentSettings(models.Model):
     """
     Store payment settings for an academy.
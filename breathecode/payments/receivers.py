@@ -2,8 +2,10 @@ import logging
 from typing import Type
 
 from django.contrib.auth.models import Group, User
-from django.db.models import Q
-from django.db.models.signals import m2m_changed, post_save
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from task_manager.django.actions import schedule_task
@@ -21,7 +23,11 @@ from breathecode.payments.models import Invoice
 
 from .actions import validate_auto_recharge_service_units
 from .models import (
+    AcademyService,
     Consumable,
+    Coupon,
+    Currency,
+    FinancingOption,
     Plan,
     PlanFinancing,
     PlanFinancingSeat,
@@ -29,6 +35,7 @@ from .models import (
     Subscription,
     SubscriptionBillingTeam,
     SubscriptionSeat,
+    UserEntitlement,
 )
 from .signals import (
     consume_service,
@@ -52,8 +59,12 @@ def consume_service_receiver(sender: Type[Consumable], instance: Consumable, how
     if instance.how_many == -1:
         return
 
-    instance.how_many -= how_many
-    instance.save()
+    # the units are discounted in the database, a read-modify-write loses the units of the concurrent requests
+    sender.objects.filter(id=instance.id, how_many__gt=0).update(how_many=Greatest(F("how_many") - how_many, 0))
+    instance.refresh_from_db(fields=["how_many"])
+
+    # it is not triggered by post_save because the update does not save the instance
+    check_consumable_balance_for_auto_recharge(sender, instance)
 
     if instance.how_many == 0:
         lose_service_permissions.send_robust(instance=instance, sender=sender)
@@ -64,10 +75,13 @@ def reimburse_service_units_receiver(sender: Type[Consumable], instance: Consuma
     if instance.how_many == -1:
         return
 
+    sender.objects.filter(id=instance.id).update(how_many=F("how_many") + how_many)
+
     grant_permissions = not instance.how_many and how_many
+    instance.refresh_from_db(fields=["how_many"])
 
-    instance.how_many += how_many
-    instance.save()
+    if how_many:
+        actions.invalidate_consumable_balances(actions.get_consumable_owners(instance))
 
     if grant_permissions:
         grant_service_permissions.send_robust(instance=instance, sender=sender)
@@ -238,6 +252,7 @@ def handle_seat_invite_accepted(sender: Type[UserInvite], instance: UserInvite,
 
         if not per_team_strategy:
             Consumable.objects.filter(plan_financing_seat=seat, user__isnull=True).update(user=instance.user)
+            actions.invalidate_consumable_balances([instance.user_id])
 
         for plan in financing.plans.all():
             actions.grant_student_capabilities(instance.user, plan)
@@ -273,6 +288,7 @@ def handle_seat_invite_accepted(sender: Type[UserInvite], instance: UserInvite,
         if per_seat_enabled:
             # Update existing consumables for this seat to assign them to the user
             Consumable.objects.filter(subscription_seat=seat, user__isnull=True).update(user=instance.user)
+            actions.invalidate_consumable_balances([instance.user_id])
 
             # Grant student capabilities for each plan
             for p in subscription.plans.all():
@@ -432,3 +448,152 @@ def check_consumable_balance_for_auto_recharge(sender: Type[Consumable], instanc
 
 
 post_save.connect(check_consumable_balance_for_auto_recharge, sender=Consumable)
+
+
+def invalidate_consumable_balances_of_consumable(sender: Type[Consumable], instance: Consumable, **kwargs):
+    actions.invalidate_consumable_balances(actions.get_consumable_owners(instance))
+
+
+def invalidate_consumable_balances_of_owner(
+    sender: Type[SubscriptionSeat | PlanFinancingSeat | Subscription | PlanFinancing],
+    instance: SubscriptionSeat | PlanFinancingSeat | Subscription | PlanFinancing,
+    **kwargs,
+):
+    actions.invalidate_consumable_balances([instance.user_id])
+
+
+post_save.connect(invalidate_consumable_balances_of_consumable, sender=Consumable)
+post_delete.connect(invalidate_consumable_balances_of_consumable, sender=Consumable)
+
+for model in [SubscriptionSeat, PlanFinancingSeat, Subscription, PlanFinancing]:
+    post_save.connect(invalidate_consumable_balances_of_owner, sender=model)
+
+
+def invalidate_pricing_quotes(sender: Type[Plan | FinancingOption | AcademyService | Currency], **kwargs):
+    if kwargs.get("action", "post_").startswith("post_"):
+        transaction.on_commit(actions.invalidate_pricing_quotes)
+
+
+def remember_coupon_auto(sender: Type[Coupon], instance: Coupon, **kwargs):
+    # a coupon that stops being auto must leave the quotes too
+    instance._was_auto = bool(instance.pk) and Coupon.objects.filter(id=instance.pk, auto=True).exists()
+
+
+def invalidate_coupon_pricing_quotes(sender: Type[Coupon], instance: Coupon, **kwargs):
+    # only the auto coupons are offered in the quotes, the ones of a user like the rewards are not
+    if instance.auto or getattr(instance, "_was_auto", False):
+        transaction.on_commit(actions.invalidate_pricing_quotes)
+
+
+def invalidate_coupon_plans_pricing_quotes(sender, instance: Coupon | Plan, action: str, **kwargs):
+    if not action.startswith("post_"):
+        return
+
+    if isinstance(instance, Coupon):
+        is_auto = instance.auto
+
+    else:
+        pk_set = kwargs.get("pk_set")
+        is_auto = pk_set is None or Coupon.objects.filter(id__in=pk_set, auto=True).exists()
+
+    if is_auto:
+        transaction.on_commit(actions.invalidate_pricing_quotes)
+
+
+for model in [Plan, FinancingOption, AcademyService, Currency]:
+    post_save.connect(invalidate_pricing_quotes, sender=model)
+    post_delete.connect(invalidate_pricing_quotes, sender=model)
+
+for through in [Plan.financing_options.through, Plan.add_ons.through]:
+    m2m_changed.connect(invalidate_pricing_quotes, sender=through)
+
+pre_save.connect(remember_coupon_auto, sender=Coupon)
+post_save.connect(invalidate_coupon_pricing_quotes, sender=Coupon)
+post_delete.connect(invalidate_coupon_pricing_quotes, sender=Coupon)
+m2m_changed.connect(invalidate_coupon_plans_pricing_quotes, sender=Coupon.plans.through)
+
+
+def get_entitlement_users(instance: Subscription | PlanFinancing | SubscriptionSeat) -> list[int]:
+    if isinstance(instance, SubscriptionSeat):
+        return [x for x in [instance.user_id, getattr(instance, "_previous_user_id", None)] if x]
+
+    if isinstance(instance, PlanFinancing):
+        return [instance.user_id]
+
+    seats = SubscriptionSeat.objects.filter(billing_team__subscription__id=instance.id, user__isnull=False)
+    return [instance.user_id, *seats.values_list("user_id", flat=True)]
+
+
+def remember_seat_user(sender: Type[SubscriptionSeat], instance: SubscriptionSeat, **kwargs):
+    # a replaced seat loses its entitlement too
+    if instance.pk:
+        instance._previous_user_id = (
+            SubscriptionSeat.objects.filter(id=instance.pk).values_list("user_id", flat=True).first()
+        )
+
+
+def refresh_user_entitlements(sender: Type[Subscription | PlanFinancing | SubscriptionSeat], instance, **kwargs):
+    if kwargs.get("action", "post_").startswith("post_"):
+        actions.build_user_entitlements(get_entitlement_users(instance))
+
+
+def forget_plan_entitlements(sender: Type[Plan], instance: Plan, **kwargs):
+    # the users of a plan can be many, they are rebuilt on their next lookup
+    users = (
+        Subscription.objects.filter(plans=instance)
+        .values("user_id")
+        .union(PlanFinancing.objects.filter(plans=instance).values("user_id"))
+        .union(
+            SubscriptionSeat.objects.filter(billing_team__subscription__plans=instance, user__isnull=False).values(
+                "user_id"
+            )
+        )
+    )
+    UserEntitlement.objects.filter(user__id__in=[x["user_id"] for x in users]).delete()
+
+
+def refresh_plan_entitlements(sender, instance: Subscription | PlanFinancing | Plan, **kwargs):
+    if not kwargs.get("action", "post_").startswith("post_"):
+        return
+
+    if isinstance(instance, Plan):
+        forget_plan_entitlements(Plan, instance)
+
+    else:
+        refresh_user_entitlements(type(instance), instance)
+
+
+def forget_financing_option_entitlements(sender, instance: Plan | FinancingOption, action: str = "", **kwargs):
+    # the financing options decide if a non renewable plan is paid
+    if isinstance(instance, Plan):
+        if action.startswith("post_"):
+            forget_plan_entitlements(Plan, instance)
+
+        return
+
+    # the plans of a cleared or deleted option are only known before the relations are removed
+    if action in ["", "pre_clear"]:
+        plans = Plan.objects.filter(financing_options=instance)
+
+    elif action in ["post_add", "post_remove"]:
+        plans = Plan.objects.filter(id__in=kwargs.get("pk_set") or [])
+
+    else:
+        return
+
+    for plan in plans:
+        forget_plan_entitlements(Plan, plan)
+
+
+for model in [Subscription, PlanFinancing, SubscriptionSeat]:
+    post_save.connect(refresh_user_entitlements, sender=model)
+    post_delete.connect(refresh_user_entitlements, sender=model)
+
+pre_save.connect(remember_seat_user, sender=SubscriptionSeat)
+post_save.connect(forget_plan_entitlements, sender=Plan)
+
+for through in [Subscription.plans.through, PlanFinancing.plans.through]:
+    m2m_changed.connect(refresh_plan_entitlements, sender=through)
+
+m2m_changed.connect(forget_financing_option_entitlements, sender=Plan.financing_options.through)
+pre_delete.connect(forget_financing_option_entitlements, sender=FinancingOption)
@@ -7,7 +7,7 @@ from django.core.exceptions import FieldDoesNotExist
 from django.db.models.query_utils import Q
 from rest_framework.exceptions import ValidationError
 
-from breathecode.payments.actions import apply_pricing_ratio
+from breathecode.payments.actions import apply_pricing_ratio, get_plan_quote
 from breathecode.payments.models import (
     AcademyPaymentSettings,
     AcademyService,
@@ -344,16 +344,11 @@ class PlanAddOnSmallSerializer(serpy.Serializer):
     def get_price_before_coupon(self, obj: Plan):
         from . import actions
 
-        option = obj.financing_options.filter(how_many_months=1).first()
-        if not option:
+        one_shot = actions.get_plan_quote(obj, self.context.get("country_code"), "en")["one_shot"]
+        if not one_shot:
             return None
 
-        base_price = option.monthly_price or 0
-        country_code = self.context.get("country_code")
-        if country_code:
-            base_price, _, _ = actions.apply_pricing_ratio(base_price, country_code, option, lang="en")
-
-        return base_price
+        return one_shot["price"]
 
     def get_price_after_coupon(self, obj: Plan):
         from . import actions
@@ -431,11 +426,7 @@ class GetPlanSerializer(GetPlanSmallSerializer):
         if not country_code:
             return obj.price_per_month
 
-        price, _, _ = apply_pricing_ratio(
-            obj.price_per_month, country_code, obj, price_attr="price_per_month", cache=self.cache
-        )
-
-        return price
+        return get_plan_quote(obj, country_code, self.lang)["price_per_month"]
 
     def get_price_per_quarter(self, obj: Plan):
         if not hasattr(self, "context") or not self.context:
@@ -445,11 +436,7 @@ class GetPlanSerializer(GetPlanSmallSerializer):
         if not country_code:
             return obj.price_per_quarter
 
-        price, _, _ = apply_pricing_ratio(
-            obj.price_per_quarter, country_code, obj, price_attr="price_per_quarter", cache=self.cache
-        )
-
-        return price
+        return get_plan_quote(obj, country_code, self.lang)["price_per_quarter"]
 
     def get_price_per_half(self, obj: Plan):
         if not hasattr(self, "context") or not self.context:
@@ -459,11 +446,7 @@ class GetPlanSerializer(GetPlanSmallSerializer):
         if not country_code:
             return obj.price_per_half
 
-        price, _, _ = apply_pricing_ratio(
-            obj.price_per_half, country_code, obj, price_attr="price_per_half", cache=self.cache
-        )
-
-        return price
+        return get_plan_quote(obj, country_code, self.lang)["price_per_half"]
 
     def get_price_per_year(self, obj: Plan):
         if not hasattr(self, "context") or not self.context:
@@ -473,11 +456,7 @@ class GetPlanSerializer(GetPlanSmallSerializer):
         if not country_code:
             return obj.price_per_year
 
-        price, _, _ = apply_pricing_ratio(
-            obj.price_per_year, country_code, obj, price_attr="price_per_year", cache=self.cache
-        )
-
-        return price
+        return get_plan_quote(obj, country_code, self.lang)["price_per_year"]
 
     def get_add_ons(self, obj: Plan):
         context = {}
@@ -497,19 +476,8 @@ class GetPlanSerializer(GetPlanSmallSerializer):
         for plan in addons:
             data = GetPlanSmallSerializer(plan, many=False, context=self.context).data
 
-            option = plan.financing_options.filter(how_many_months=1).first()
-            if option:
-                country_code = (self.context.get("country_code") or "").lower()
-                base_price = option.monthly_price or 0
-                if country_code:
-                    price, _, _ = apply_pricing_ratio(
-                        base_price, country_code, option, lang=self.lang, cache=self.cache
-                    )
-                else:
-                    price = base_price
-                data["one_shot_price"] = price
-            else:
-                data["one_shot_price"] = None
+            one_shot = get_plan_quote(plan, self.context.get("country_code"), self.lang)["one_shot"]
+            data["one_shot_price"] = one_shot["price"] if one_shot else None
 
             items.append(data)
 
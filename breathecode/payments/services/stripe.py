@@ -1,6 +1,9 @@
 import math
 import os
-from typing import Any, Union
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, TypedDict, Union
 
 import stripe
 from capyc.core.i18n import translation
@@ -25,7 +28,47 @@ from breathecode.utils import getLogger
 
 logger = getLogger(__name__)
 
-__all__ = ["Stripe"]
+__all__ = ["Stripe", "BulkCharge", "BulkChargeResult"]
+
+# Stripe allows 100 operations per second in live mode, the charges in bulk keep a margin for the other requests
+MAX_CONCURRENT_CHARGES = int(os.getenv("STRIPE_MAX_CONCURRENT_CHARGES", "8"))
+MAX_CHARGES_PER_SECOND = float(os.getenv("STRIPE_MAX_CHARGES_PER_SECOND", "25"))
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF = 0.5
+
+
+class BulkCharge(TypedDict):
+    customer: str
+    amount: float
+    currency: Currency
+    description: str
+    idempotency_key: str
+
+
+class BulkChargeResult(TypedDict):
+    charge: Optional[dict[str, Any]]
+    error: Optional[str]
+
+
+class RateLimiter:
+    """Space the requests shared by many threads to send at most `rate` of them per second."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+
+        if delay > 0:
+            time.sleep(delay)
 
 
 class Stripe:
@@ -355,6 +398,7 @@ class Stripe:
         subscription_billing_team: SubscriptionBillingTeam | None = None,
         subscription_seat: SubscriptionSeat | None = None,
         amount_breakdown: dict | None = None,
+        idempotency_key: str | None = None,
     ) -> Invoice:
         """
         Processes a payment for a given user and bag.
@@ -370,6 +414,8 @@ class Stripe:
             currency (str | Currency, optional): The currency code (e.g., "usd") or
                                                  a Currency model instance. Defaults to "usd".
             description (str, optional): A description for the charge. Defaults to "".
+            idempotency_key (str, optional): Key to replay the result of a charge already sent to Stripe
+                                             instead of charging twice. Defaults to None.
 
         Returns:
             Invoice: The created Invoice object after successful payment.
@@ -395,24 +441,10 @@ class Stripe:
 
         customer = self.add_contact(user)
         original_amount = amount
-
-        # https://stripe.com/docs/currencies
-        # Calculate amount in smallest currency unit (e.g., cents)
-        decimals_factor = 1
-        for _ in range(currency.decimals):
-            decimals_factor *= 10
-
-        # https://stripe.com/docs/api/charges/create
-        # Stripe expects amount in cents (or smallest unit)
-        amount = math.ceil(amount * decimals_factor)
+        params = self._get_charge_params(customer.stripe_id, amount, currency, description, idempotency_key)
 
         def callback():
-            return stripe.Charge.create(
-                customer=customer.stripe_id,
-                amount=amount,  # Use the amount in cents
-                currency=currency.code.lower(),
-                description=description,
-            )
+            return stripe.Charge.create(**params)
 
         charge = self._i18n_validations(callback)
 
@@ -437,6 +469,83 @@ class Stripe:
 
         return invoice
 
+    def _get_charge_params(
+        self,
+        customer_id: str,
+        amount: int | float,
+        currency: Currency,
+        description: str = "",
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
+        # https://stripe.com/docs/currencies
+        # https://stripe.com/docs/api/charges/create
+        # Stripe expects amount in the smallest currency unit (e.g., cents)
+        params = {
+            "customer": customer_id,
+            "amount": math.ceil(amount * 10**currency.decimals),
+            "currency": currency.code.lower(),
+            "description": description,
+        }
+
+        if idempotency_key:
+            params["idempotency_key"] = idempotency_key
+
+        return params
+
+    def charge_in_bulk(
+        self,
+        charges: list[BulkCharge],
+        max_workers: int | None = None,
+        rate: float | None = None,
+    ) -> list[BulkChargeResult]:
+        """
+        Create many charges in Stripe concurrently, the results keep the order of the charges.
+
+        The charges are sent by a bounded pool of threads at most `rate` per second, a rate limited request is
+        retried with backoff. It does not touch the database, the caller must save the results.
+
+        Args:
+            charges (list[BulkCharge]): Charges of customers of the account of this instance.
+            max_workers (int, optional): Charges sent at the same time. Defaults to STRIPE_MAX_CONCURRENT_CHARGES.
+            rate (float, optional): Charges sent per second. Defaults to STRIPE_MAX_CHARGES_PER_SECOND.
+
+        Returns:
+            list[BulkChargeResult]: The charge created or the translated error of each charge.
+        """
+
+        limiter = RateLimiter(rate or MAX_CHARGES_PER_SECOND)
+
+        def charge(item: BulkCharge) -> BulkChargeResult:
+            params = self._get_charge_params(
+                item["customer"], item["amount"], item["currency"], item["description"], item["idempotency_key"]
+            )
+
+            def callback():
+                for attempt in range(RATE_LIMIT_RETRIES + 1):
+                    limiter.wait()
+
+                    try:
+                        # the global api key is shared by the threads
+                        return stripe.Charge.create(api_key=self.api_key, **params)
+
+                    except stripe.error.RateLimitError:
+                        if attempt == RATE_LIMIT_RETRIES:
+                            raise
+
+                        time.sleep(RATE_LIMIT_BACKOFF * 2**attempt)
+
+            try:
+                return {"charge": self._i18n_validations(callback), "error": None}
+
+            except PaymentException as e:
+                return {"charge": None, "error": str(e)}
+
+        if not charges:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers or MAX_CONCURRENT_CHARGES, len(charges))) as executor:
+            return list(executor.map(charge, charges))
+
     def refund_payment(self, invoice: Invoice, amount: float | None = None) -> dict[str, Any]:
         """
         Refunds a payment associated with a given invoice.
@@ -1,6 +1,6 @@
 from datetime import timedelta
 
-from django.contrib.auth.models import User
+from django.db.models import Count, Q
 from django.utils import timezone
 
 from breathecode.payments.actions import retry_pending_bag
@@ -24,20 +24,19 @@ MIN_PENDING_SESSIONS = 30
 MIN_CANCELLED_SESSIONS = 10
 
 
-@supervisor(delta=timedelta(days=1))
+@supervisor(delta=timedelta(days=1), cost="medium")
 def supervise_all_consumption_sessions():
     """Aggregates daily anomalies for consumption sessions (pending/cancelled ratios)."""
     utc_now = timezone.now()
 
-    done_sessions = ConsumptionSession.objects.filter(
-        status="DONE", eta__lte=utc_now, eta__gte=utc_now - timedelta(days=1)
-    )
-    pending_sessions = ConsumptionSession.objects.filter(
-        status="PENDING", eta__lte=utc_now, eta__gte=utc_now - timedelta(days=1)
+    last_day = Q(eta__lte=utc_now, eta__gte=utc_now - timedelta(days=1))
+    amounts = ConsumptionSession.objects.filter(last_day).aggregate(
+        done=Count("id", filter=Q(status="DONE")),
+        pending=Count("id", filter=Q(status="PENDING")),
     )
 
-    done_amount = done_sessions.count()
-    pending_amount = pending_sessions.count()
+    done_amount = amounts["done"]
+    pending_amount = amounts["pending"]
 
     if (
         pending_amount
@@ -47,40 +46,24 @@ def supervise_all_consumption_sessions():
     ):
         yield f"There has so much pending consumption sessions, {pending_amount} pending and rate {round(rate * 100, 2)}%"
 
-    users = User.objects.filter(
-        consumptionsession__status="CANCELLED",
-        consumptionsession__eta__lte=utc_now,
-        consumptionsession__eta__gte=utc_now - timedelta(days=1),
-    ).distinct()
-
-    for user in users:
-        done_sessions = ConsumptionSession.objects.filter(
-            user=user,
-            status="DONE",
+    # the done sessions are counted since ever, only the users with a cancelled session in the last day are reported
+    cancelled = Q(status="CANCELLED") & last_day
+    users = (
+        ConsumptionSession.objects.filter(
+            Q(status="DONE", eta__lte=utc_now - timedelta(minutes=10)) | cancelled,
             operation_code="unsafe-consume-service-set",
             consumable__service_item__service__type=Service.Type.VOID,
-            eta__lte=utc_now - timedelta(minutes=10),
         )
-        cancelled_sessions = ConsumptionSession.objects.filter(
-            user=user,
-            status="CANCELLED",
-            operation_code="unsafe-consume-service-set",
-            consumable__service_item__service__type=Service.Type.VOID,
-            eta__lte=utc_now,
-            eta__gte=utc_now - timedelta(days=1),
-        )
-
-        done_amount = done_sessions.count()
-        cancelled_amount = cancelled_sessions.count()
+        .values("user__id", "user__email")
+        .annotate(done=Count("id", filter=Q(status="DONE")), cancelled=Count("id", filter=Q(status="CANCELLED")))
+        .filter(cancelled__gt=0, done__gte=MIN_CANCELLED_SESSIONS)
+        .order_by("user__id")
+    )
 
+    for user in users:
         # this client should be a cheater
-        if (
-            cancelled_amount
-            and done_amount
-            and (rate := cancelled_amount / done_amount) > 0.1
-            and done_amount >= MIN_CANCELLED_SESSIONS
-        ):
-            yield f"There has {round(rate * 100, 2)}% cancelled consumption sessions, due to a bug or a cheater, user {user.email}"
+        if (rate := user["cancelled"] / user["done"]) > 0.1:
+            yield f"There has {round(rate * 100, 2)}% cancelled consumption sessions, due to a bug or a cheater, user {user['user__email']}"
 
 
 @supervisor(delta=timedelta(minutes=10))
@@ -224,7 +207,7 @@ def owner_seat_missing(subscription_id: int, team_id: int, user_id: int, email:
     return True
 
 
-@supervisor(delta=timedelta(minutes=30))
+@supervisor(delta=timedelta(minutes=30), cost="medium")
 def supervise_scheduler_configuration():
     """Detect scheduler topology drift based on team strategy (PER_TEAM vs PER_SEAT)."""
     for team in SubscriptionBillingTeam.objects.select_related("subscription").iterator():
@@ -264,7 +247,7 @@ def supervise_scheduler_configuration():
 #     return None
 
 
-@supervisor(delta=timedelta(minutes=30))
+@supervisor(delta=timedelta(minutes=30), cost="high")
 def supervise_billing_team_flag_drift():
     """Detect drift between subscription.has_billing_team and real team existence."""
     for sub in Subscription.objects.all().iterator():
@@ -290,7 +273,7 @@ def billing_team_flag_drift(subscription_id: int, expected: bool, current: bool)
     return True
 
 
-@supervisor(delta=timedelta(minutes=30))
+@supervisor(delta=timedelta(minutes=30), cost="medium")
 def supervise_team_seat_consumables():
     """
     Detect consumable ownership drift for teams:
@@ -29,13 +29,11 @@ from breathecode.utils.decorators import TaskPriority
 from breathecode.utils.redis import Lock
 
 from .models import (
-    AbstractIOweYou,
     AcademyPaymentSettings,
     Bag,
     CohortSet,
     Consumable,
     ConsumptionSession,
-    Coupon,
     Invoice,
     PaymentMethod,
     Plan,
@@ -46,7 +44,6 @@ from .models import (
     PlanServiceItem,
     PlanServiceItemHandler,
     ProofOfPayment,
-    Service,
     ServiceItem,
     ServiceStockScheduler,
     Subscription,
@@ -63,221 +60,31 @@ IS_DJANGO_REDIS = hasattr(cache, "fake") is False
 def renew_consumables(self, scheduler_id: int, **_: Any):
     """Renew consumables."""
 
-    def get_resource_lookup(i_owe_you: AbstractIOweYou, service: Service):
-        lookups = {}
-
-        key = service.type.lower()
-        value = getattr(i_owe_you, f"selected_{key}", None)
-        if value:
-            lookups[key] = value
-
-        return lookups
-
-    def get_extras(scheduler: ServiceStockScheduler):
-        extras = {}
-        if scheduler.subscription_seat:
-            extras["subscription_seat_id"] = scheduler.subscription_seat.id
-            extras["subscription_billing_team_id"] = scheduler.subscription_seat.billing_team.id
-
-        if scheduler.subscription_billing_team:
-            extras["user"] = None
-            if (
-                scheduler.subscription_billing_team.consumption_strategy
-                == SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM
-            ):
-                extras["subscription_seat_id"] = None
-
-            extras["subscription_billing_team_id"] = scheduler.subscription_billing_team.id
-
-        if scheduler.plan_financing_seat:
-            extras["plan_financing_seat_id"] = scheduler.plan_financing_seat.id
-            extras["plan_financing_team_id"] = scheduler.plan_financing_seat.team_id
-
-        if scheduler.plan_financing_team:
-            extras["user"] = None
-            extras["plan_financing_team_id"] = scheduler.plan_financing_team.id
-
-        return extras
-
     logger.info(f"Starting renew_consumables for service stock scheduler {scheduler_id}")
 
     if not (scheduler := ServiceStockScheduler.objects.filter(id=scheduler_id).first()):
         raise RetryTask(f"ServiceStockScheduler with id {scheduler_id} not found")
 
     utc_now = timezone.now()
-    extras = get_extras(scheduler)
-
-    # is over
-    if (
-        scheduler.plan_handler
-        and scheduler.plan_handler.subscription
-        and scheduler.plan_handler.subscription.valid_until
-        and scheduler.plan_handler.subscription.valid_until < utc_now
-    ):
-        raise AbortTask(f"The subscription {scheduler.plan_handler.subscription.id} is over")
-
-    # it needs to be paid
-    if (
-        scheduler.plan_handler
-        and scheduler.plan_handler.subscription
-        and scheduler.plan_handler.subscription.next_payment_at < utc_now
-    ):
-        raise AbortTask(
-            f"The subscription {scheduler.plan_handler.subscription.id} needs to be paid to renew the consumables"
-        )
-
-    # is over
-    if (
-        scheduler.plan_handler
-        and scheduler.plan_handler.plan_financing
-        and scheduler.plan_handler.plan_financing.plan_expires_at < utc_now
-    ):
-        raise AbortTask(f"The plan financing {scheduler.plan_handler.plan_financing.id} is over")
-
-    if (
-        scheduler.plan_handler
-        and scheduler.plan_handler.plan_financing
-        and scheduler.plan_handler.plan_financing.status == PlanFinancing.Status.ACTIVE
-        and scheduler.plan_handler.plan_financing.next_payment_at < utc_now
-    ):
-        raise AbortTask(
-            f"The plan financing {scheduler.plan_handler.plan_financing.id} needs to be paid to renew "
-            "the consumables"
-        )
-
-    # is over
-    if (
-        scheduler.subscription_handler
-        and scheduler.subscription_handler.subscription
-        and scheduler.subscription_handler.subscription.valid_until
-        and scheduler.subscription_handler.subscription.valid_until < utc_now
-    ):
-        raise AbortTask(f"The subscription {scheduler.subscription_handler.subscription.id} is over")
-
-    # it needs to be paid
-    if (
-        scheduler.subscription_handler
-        and scheduler.subscription_handler.subscription
-        and scheduler.subscription_handler.subscription.next_payment_at < utc_now
-    ):
-        raise AbortTask(
-            f"The subscription {scheduler.subscription_handler.subscription.id} needs to be paid to renew "
-            "the consumables"
-        )
-
-    service_item = None
-    resource_valid_until = None
-    resource_next_payment_at = None
-    selected_lookup = {}
-    subscription = None
-    plan_financing = None
-
-    if scheduler.plan_handler and scheduler.plan_handler.subscription:
-        user = scheduler.plan_handler.subscription.user
-        service_item = scheduler.plan_handler.handler.service_item
-        resource_valid_until = scheduler.plan_handler.subscription.valid_until
-        resource_next_payment_at = scheduler.plan_handler.subscription.next_payment_at
-        subscription = scheduler.plan_handler.subscription
-
-        selected_lookup = get_resource_lookup(scheduler.plan_handler.subscription, service_item.service)
-
-    elif scheduler.plan_handler and scheduler.plan_handler.plan_financing:
-        user = scheduler.plan_handler.plan_financing.user
-        service_item = scheduler.plan_handler.handler.service_item
-        resource_valid_until = scheduler.plan_handler.plan_financing.plan_expires_at
-        resource_next_payment_at = scheduler.plan_handler.plan_financing.next_payment_at
-        plan_financing = scheduler.plan_handler.plan_financing
+    consumable, error = actions.build_renewed_consumable(scheduler, utc_now)
 
-        selected_lookup = get_resource_lookup(scheduler.plan_handler.plan_financing, service_item.service)
-
-    elif scheduler.subscription_handler and scheduler.subscription_handler.subscription:
-        user = scheduler.subscription_handler.subscription.user
-        service_item = scheduler.subscription_handler.service_item
-        resource_valid_until = scheduler.subscription_handler.subscription.valid_until
-        resource_next_payment_at = scheduler.subscription_handler.subscription.next_payment_at
-        subscription = scheduler.subscription_handler.subscription
-
-        selected_lookup = get_resource_lookup(scheduler.subscription_handler.subscription, service_item.service)
-
-    # If resource is Subscription and this scheduler is tied to a subscription seat,
-    # issue the consumable for the seat assignee (or None if not yet assigned) instead of the subscription owner.
-    if subscription and scheduler.subscription_seat:
-        # Use the seat's user if assigned, otherwise None (waiting for invitation acceptance)
-        user = scheduler.subscription_seat.user if scheduler.subscription_seat.user_id else None
-
-    if plan_financing and scheduler.plan_financing_seat:
-        user = scheduler.plan_financing_seat.user if scheduler.plan_financing_seat.user_id else None
-
-    if plan_financing and scheduler.plan_financing_team:
-        user = None
-
-    unit = service_item.renew_at
-    unit_type = service_item.renew_at_unit
-
-    delta = actions.calculate_relative_delta(unit, unit_type)
-    scheduler.valid_until = scheduler.valid_until or utc_now
-
-    max_attempts = 100
-    attempts = 0
-
-    while attempts < max_attempts:
-        new_valid_until = scheduler.valid_until + delta
-
-        if new_valid_until > utc_now:
-            if attempts > 0:
-                logger.info(f"Scheduler {scheduler.id}: Found future date after {attempts + 1} attempts")
-            scheduler.valid_until = new_valid_until
-            break
-
-        scheduler.valid_until = new_valid_until
-        attempts += 1
-
-        if attempts >= max_attempts:
-            logger.warning(f"Could not find a future date for scheduler {scheduler.id} after {max_attempts} attempts")
-            scheduler.valid_until = scheduler.valid_until + delta
-            break
-
-    if resource_valid_until and scheduler.valid_until and scheduler.valid_until > resource_valid_until:
-        scheduler.valid_until = resource_valid_until
-
-    if (
-        not resource_valid_until
-        and resource_next_payment_at
-        and scheduler.valid_until
-        and scheduler.valid_until > resource_next_payment_at
-    ):
-        scheduler.valid_until = resource_next_payment_at
+    if error:
+        raise AbortTask(error)
 
     scheduler.save()
 
-    if not selected_lookup and service_item.service.type != "VOID":
+    if consumable is None:
         logger.error(f"The Plan not have a resource linked to it for the ServiceStockScheduler {scheduler.id}")
         return
 
-    if "user" not in extras:
-        extras["user"] = user
-
-    consumable = Consumable(
-        service_item=service_item,
-        unit_type=service_item.unit_type,
-        how_many=service_item.how_many,
-        valid_until=scheduler.valid_until,
-        subscription=subscription,
-        plan_financing=plan_financing,
-        **selected_lookup,
-        **extras,
-    )
-
     consumable.save()
 
     scheduler.consumables.add(consumable)
 
-    if selected_lookup:
-
-        key = list(selected_lookup.keys())[0]
-        id = selected_lookup[key].id
-        name = key.replace("selected_", "").replace("_", " ")
-        logger.info(f"The consumable {consumable.id} for {name} {id} was built")
+    key = consumable.service_item.service.type.lower()
+    if resource := getattr(consumable, key, None):
+        name = key.replace("_", " ")
+        logger.info(f"The consumable {consumable.id} for {name} {resource.id} was built")
 
     else:
         logger.info(f"The consumable {consumable.id} was built")
@@ -731,7 +538,12 @@ def charge_subscription(self, subscription_id: int, **_: Any):
                         s.set_language(settings.lang)
                         team = SubscriptionBillingTeam.objects.filter(subscription=subscription).first()
                         invoice = s.pay(
-                            subscription.user, bag, amount, currency=bag.currency, subscription_billing_team=team
+                            subscription.user,
+                            bag,
+                            amount,
+                            currency=bag.currency,
+                            subscription_billing_team=team,
+                            idempotency_key=actions.get_charge_idempotency_key(subscription, bag),
                         )
 
                     except Exception:
@@ -1122,26 +934,7 @@ def charge_plan_financing(self, plan_financing_id: int, **_: Any):
 
                 raise AbortTask(msg)
 
-            # Derive the display price per installment from the first invoice amount, but exclude reward coupons
-            amount = first_invoice.amount
-            coupons = first_invoice.bag.coupons.all() if first_invoice.bag else []
-
-            reward_coupons = [
-                coupon
-                for coupon in coupons
-                if coupon and coupon.allowed_user_id is not None and coupon.referral_type == Coupon.Referral.NO_REFERRAL
-            ]
-
-            for coupon in reward_coupons:
-                v = coupon.discount_value or 0
-
-                if coupon.discount_type == Coupon.Discount.PERCENT_OFF:
-                    factor = 1 - v
-                    if factor > 0:
-                        amount /= factor
-                elif coupon.discount_type == Coupon.Discount.FIXED_PRICE:
-                    amount += v
-
+            amount = actions.get_installment_amount(first_invoice)
             installments = first_invoice.bag.how_many_installments
 
             if utc_now - last_invoice.paid_at < timedelta(days=cooldown_days):
@@ -1199,7 +992,13 @@ def charge_plan_financing(self, plan_financing_id: int, **_: Any):
                         try:
                             s = Stripe(academy=plan_financing.academy)
                             s.set_language(settings.lang)
-                            invoice = s.pay(plan_financing.user, bag, amount, currency=bag.currency)
+                            invoice = s.pay(
+                                plan_financing.user,
+                                bag,
+                                amount,
+                                currency=bag.currency,
+                                idempotency_key=actions.get_charge_idempotency_key(plan_financing, bag),
+                            )
 
                         except Exception:
                             message = translation(
@@ -1470,6 +1269,38 @@ def build_service_stock_scheduler_from_subscription(
     build_schedulers(True if seat_id is not None else None)
 
 
+@task(bind=True, priority=TaskPriority.NOTIFICATION.value)
+def notify_subscription_seats(self, subscription_id: int, seats: list[dict[str, Any]], lang: str, **_: Any):
+    """Invite or notify the members of a batch of seats added in bulk, and grant their capabilities."""
+
+    logger.info(f"Starting notify_subscription_seats for subscription {subscription_id}")
+
+    if not (subscription := Subscription.objects.filter(id=subscription_id).select_related("academy", "user").first()):
+        raise RetryTask(f"Subscription with id {subscription_id} not found")
+
+    names = {x["seat"]: x for x in seats}
+    instances = SubscriptionSeat.objects.filter(
+        billing_team__subscription=subscription, id__in=names.keys(), is_active=True
+    ).select_related("billing_team", "user")
+
+    plans = list(subscription.plans.all())
+
+    for seat in instances:
+        if seat.user is None:
+            obj = names[seat.id]
+            actions.invite_user_to_subscription_team(
+                {"email": seat.email, "first_name": obj.get("first_name"), "last_name": obj.get("last_name")},
+                subscription,
+                seat,
+                lang,
+            )
+            continue
+
+        actions.notify_user_was_added_to_subscription_team(subscription, seat, lang)
+        for plan in plans:
+            actions.grant_student_capabilities(seat.user, plan)
+
+
 @task(bind=True, priority=TaskPriority.WEB_SERVICE_PAYMENT.value)
 def build_service_stock_scheduler_from_plan_financing(
     self,
@@ -1491,9 +1322,7 @@ def build_service_stock_scheduler_from_plan_financing(
         raise RetryTask(f"PlanFinancing with id {plan_financing_id} not found")
 
     team = getattr(plan_financing, "team", None)
-    per_team_strategy = (
-        team and team.consumption_strategy == PlanFinancingTeam.ConsumptionStrategy.PER_TEAM
-    )
+    per_team_strategy = team and team.consumption_strategy == PlanFinancingTeam.ConsumptionStrategy.PER_TEAM
 
     seat_scope: list[PlanFinancingSeat] = []
     if team:
@@ -1542,10 +1371,7 @@ def build_service_stock_scheduler_from_plan_financing(
         delta = actions.calculate_relative_delta(unit, unit_type)
         valid_until = plan_financing.created_at + delta
 
-        if (
-            plan_financing.status != PlanFinancing.Status.FULLY_PAID
-            and valid_until > plan_financing.next_payment_at
-        ):
+        if plan_financing.status != PlanFinancing.Status.FULLY_PAID and valid_until > plan_financing.next_payment_at:
             valid_until = plan_financing.next_payment_at
 
         if plan_financing.plan_expires_at and valid_until > plan_financing.plan_expires_at:
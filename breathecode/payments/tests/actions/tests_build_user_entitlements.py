@@ -0,0 +1,186 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from django.utils import timezone
+
+from breathecode.payments import actions
+from breathecode.payments.models import Plan, SubscriptionBillingTeam, SubscriptionSeat, UserEntitlement
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    monkeypatch.setattr("breathecode.payments.tasks.update_service_stock_schedulers.delay", MagicMock())
+    yield
+
+
+def serialize(entitlement: UserEntitlement):
+    return {
+        "user": entitlement.user_id,
+        "plans": entitlement.plans,
+        "seat_subscriptions": entitlement.seat_subscriptions,
+        "has_paid_plans": entitlement.has_paid_plans,
+        "has_4geeks_plus": entitlement.has_4geeks_plus,
+        "expires_at": entitlement.expires_at,
+    }
+
+
+def create_plans(bc: Breathecode):
+    plan = {"is_renewable": False, "time_of_life": 1, "time_of_life_unit": "MONTH", "trial_duration": 0}
+    model = bc.database.create(
+        user=3,
+        plan=[
+            {
+                **plan,
+                "slug": "paid",
+                "price_per_month": 10,
+                "is_renewable": True,
+                "time_of_life": 0,
+                "time_of_life_unit": None,
+            },
+            {**plan, "slug": "4geeks-plus-planfinancing", "price_per_month": 0, "price_per_year": 0},
+        ],
+        subscription={
+            "user_id": 1,
+            "status": "ACTIVE",
+            "valid_until": UTC_NOW + timedelta(days=30),
+            "plans": [1],
+        },
+        plan_financing={
+            "user_id": 2,
+            "status": "ACTIVE",
+            "plan_expires_at": UTC_NOW + timedelta(days=10),
+            "valid_until": UTC_NOW + timedelta(days=10),
+            "monthly_price": 10,
+            "plans": [2],
+        },
+    )
+
+    team = SubscriptionBillingTeam.objects.create(subscription=model.subscription, name="Team")
+    model.subscription_seat = SubscriptionSeat.objects.create(
+        billing_team=team, user=model.user[2], email=model.user[2].email
+    )
+
+    return model
+
+
+def test_build_in_batch(bc: Breathecode, django_assert_num_queries):
+    model = create_plans(bc)
+
+    # seats, subscriptions and plan financings with their plans, and the upsert
+    with django_assert_num_queries(7):
+        actions.build_user_entitlements([1, 2, 3])
+
+    assert [serialize(x) for x in UserEntitlement.objects.order_by("user__id")] == [
+        {
+            "user": 1,
+            "plans": ["paid"],
+            "seat_subscriptions": [],
+            "has_paid_plans": True,
+            "has_4geeks_plus": False,
+            "expires_at": model.subscription.valid_until,
+        },
+        {
+            "user": 2,
+            "plans": ["4geeks-plus-planfinancing"],
+            "seat_subscriptions": [],
+            "has_paid_plans": False,
+            "has_4geeks_plus": True,
+            "expires_at": model.plan_financing.plan_expires_at,
+        },
+        {
+            "user": 3,
+            "plans": ["paid"],
+            "seat_subscriptions": [1],
+            "has_paid_plans": True,
+            "has_4geeks_plus": False,
+            "expires_at": model.subscription.valid_until,
+        },
+    ]
+
+    # it is rebuilt in place
+    actions.build_user_entitlements([1])
+    assert UserEntitlement.objects.count() == 3
+
+
+def test_lookup_is_one_query(bc: Breathecode, django_assert_num_queries):
+    model = create_plans(bc)
+
+    # the receivers could have built them already, it starts without any entitlement
+    UserEntitlement.objects.all().delete()
+
+    # the first lookup builds the entitlement, the next ones only read it
+    assert actions.user_has_active_paid_plans(model.user[0]) is True
+    assert UserEntitlement.objects.filter(user=model.user[0]).count() == 1
+
+    with django_assert_num_queries(1):
+        assert actions.user_has_active_paid_plans(model.user[0]) is True
+
+    actions.build_user_entitlements([model.user[1].id, model.user[2].id])
+
+    with django_assert_num_queries(1):
+        assert actions.user_has_active_paid_plans(model.user[2]) is True
+
+    with django_assert_num_queries(1):
+        assert actions.user_has_active_4geeks_plus_plans(model.user[1]) is True
+
+
+def test_stale_entitlements_are_rebuilt(bc: Breathecode, monkeypatch: pytest.MonkeyPatch):
+    model = create_plans(bc)
+
+    assert actions.user_has_active_paid_plans(model.user[0]) is True
+
+    # the subscriptions are expired in bulk, without signals
+    model.subscription.__class__.objects.filter(id=1).update(status="EXPIRED")
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW + timedelta(days=31)))
+
+    assert actions.user_has_active_paid_plans(model.user[0]) is False
+
+
+def test_receivers_keep_the_entitlements(bc: Breathecode, enable_signals):
+    enable_signals()
+    model = create_plans(bc)
+
+    assert actions.user_has_active_paid_plans(model.user[2]) is True
+
+    model.subscription_seat.user = model.user[1]
+    model.subscription_seat.email = model.user[1].email
+    model.subscription_seat.save()
+
+    assert UserEntitlement.objects.get(user__id=3).has_paid_plans is False
+    assert UserEntitlement.objects.get(user__id=2).seat_subscriptions == [1]
+
+    model.subscription.status = "CANCELLED"
+    model.subscription.save()
+
+    assert actions.user_has_active_paid_plans(model.user[0]) is False
+    assert actions.user_has_active_paid_plans(model.user[1]) is False
+
+    model.subscription.status = "ACTIVE"
+    model.subscription.save()
+    model.subscription.plans.remove(model.plan[0])
+
+    assert actions.user_has_active_paid_plans(model.user[0]) is False
+
+
+def test_financing_options_of_non_renewable_plans(bc: Breathecode, django_assert_num_queries, enable_signals):
+    model = create_plans(bc)
+    financing_option = bc.database.create(financing_option=1).financing_option
+
+    Plan.objects.filter(slug="paid").update(is_renewable=False)
+    model.plan[0].financing_options.add(financing_option)
+
+    # the prefetched financing options are used
+    with django_assert_num_queries(7):
+        actions.build_user_entitlements([1, 2, 3])
+
+    assert UserEntitlement.objects.get(user__id=1).has_paid_plans is True
+
+    enable_signals()
+    model.plan[0].financing_options.clear()
+
+    assert actions.user_has_active_paid_plans(model.user[0]) is False
@@ -0,0 +1,371 @@
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from capyc.core.i18n import translation
+from capyc.rest_framework.exceptions import ValidationException
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import breathecode.activity.tasks as activity_tasks
+from breathecode.payments import actions
+from breathecode.payments.models import AcademyService, Bag, FinancingOption, Invoice
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(activity_tasks.add_activity, "delay", MagicMock())
+    monkeypatch.setattr("breathecode.payments.actions.GENERAL_PRICING_RATIOS", {"ve": {"pricing_ratio": 0.5}})
+    monkeypatch.setattr("breathecode.payments.tasks.update_service_stock_schedulers.delay", MagicMock())
+    yield
+
+
+def legacy_calculate_invoice_breakdown(
+    bag: Bag, invoice: Invoice, lang: str, chosen_period: str | None = None, how_many_installments: int | None = None
+) -> dict[str, Any]:
+    # the implementation before the breakdowns were calculated in batch, it makes a query per item
+    breakdown: dict[str, Any] = {"plans": {}, "service-items": {}}
+
+    currency = invoice.currency or bag.currency or bag.academy.main_currency
+    if not currency:
+        raise ValidationException(
+            translation(
+                lang,
+                en="Currency not found for invoice breakdown calculation",
+                es="Moneda no encontrada para el cálculo del desglose de la factura",
+                slug="currency-not-found-for-breakdown",
+            ),
+            code=500,
+        )
+
+    currency_code = currency.code.upper()
+    coupons = list(bag.coupons.all())
+
+    # Use provided values or fall back to bag values
+    effective_chosen_period = chosen_period if chosen_period is not None else bag.chosen_period
+    effective_how_many_installments = (
+        how_many_installments if how_many_installments is not None else bag.how_many_installments
+    )
+
+    # Ensure we have all plans loaded - use select_related/prefetch_related if needed
+    plans = list(bag.plans.all())
+    if not plans:
+        return breakdown
+
+    for plan in plans:
+        base_price = 0.0
+
+        if effective_how_many_installments > 0:
+            option = plan.financing_options.filter(how_many_months=effective_how_many_installments).first()
+            if not option:
+                continue
+
+            base_price = option.monthly_price or 0
+
+            if base_price > 0:
+                if bag.country_code:
+                    adjusted_price, _, c = actions.apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
+                    if c:
+                        currency_code = c.code.upper()
+                    base_price = adjusted_price
+
+                if bag.seat_service_item and bag.seat_service_item.how_many > 0:
+                    academy_service = AcademyService.objects.filter(
+                        service=bag.seat_service_item.service, academy=bag.academy
+                    ).first()
+                    if academy_service:
+                        seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many
+                        base_price += seat_cost
+
+                add_ons_amount = 0
+                for add_on in plan.add_ons.filter(currency=currency):
+                    service_item = bag.service_items.filter(service=add_on.service).first()
+                    if service_item:
+                        add_on_price, _, _ = add_on.get_discounted_price(service_item.how_many, bag.country_code, lang)
+                        add_ons_amount += add_on_price
+
+                base_price += add_ons_amount
+
+                plan_coupons = actions.get_coupons_for_plan(plan, coupons)
+                final_price = actions.get_discounted_price(base_price, plan_coupons)
+
+                if final_price > 0:
+                    breakdown["plans"][plan.slug] = {
+                        "amount": round(final_price, 2),
+                        "currency": currency_code,
+                    }
+
+        elif effective_chosen_period and effective_chosen_period != "NO_SET":
+            if effective_chosen_period == "MONTH":
+                base_price = plan.price_per_month or 0
+                price_attr = "price_per_month"
+            elif effective_chosen_period == "QUARTER":
+                base_price = plan.price_per_quarter or 0
+                price_attr = "price_per_quarter"
+            elif effective_chosen_period == "HALF":
+                base_price = plan.price_per_half or 0
+                price_attr = "price_per_half"
+            elif effective_chosen_period == "YEAR":
+                base_price = plan.price_per_year or 0
+                price_attr = "price_per_year"
+            else:
+                base_price = 0
+                price_attr = None
+
+            if base_price > 0 and price_attr:
+                # Apply pricing ratio if country code is available
+                if bag.country_code:
+                    adjusted_price, _, c = actions.apply_pricing_ratio(
+                        base_price, bag.country_code, plan, lang=lang, price_attr=price_attr
+                    )
+                    if c:
+                        currency_code = c.code.upper()
+                    base_price = adjusted_price
+
+                if bag.seat_service_item and bag.seat_service_item.how_many > 0:
+                    academy_service = AcademyService.objects.filter(
+                        service=bag.seat_service_item.service, academy=bag.academy
+                    ).first()
+                    if academy_service:
+                        if effective_chosen_period == "MONTH":
+                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many
+                        elif effective_chosen_period == "QUARTER":
+                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 3
+                        elif effective_chosen_period == "HALF":
+                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 6
+                        elif effective_chosen_period == "YEAR":
+                            seat_cost = academy_service.price_per_unit * bag.seat_service_item.how_many * 12
+                        else:
+                            seat_cost = 0
+                        base_price += seat_cost
+
+                # Apply coupons to get the final discounted price
+                plan_coupons = actions.get_coupons_for_plan(plan, coupons)
+                final_price = actions.get_discounted_price(base_price, plan_coupons)
+
+                if final_price > 0:
+                    breakdown["plans"][plan.slug] = {
+                        "amount": round(final_price, 2),
+                        "currency": currency_code,
+                    }
+
+    for plan_addon in bag.plan_addons.all():
+        option = plan_addon.financing_options.filter(how_many_months=1).first()
+        if not option:
+            continue
+
+        base_price = option.monthly_price or 0
+
+        if base_price > 0:
+            if bag.country_code:
+                adjusted_price, _, c = actions.apply_pricing_ratio(base_price, bag.country_code, option, lang=lang)
+                if c:
+                    currency_code = c.code.upper()
+                base_price = adjusted_price
+
+            # Apply coupons
+            addon_coupons = actions.get_coupons_for_plan(plan_addon, coupons)
+            final_price = actions.get_discounted_price(base_price, addon_coupons)
+
+            if final_price > 0:
+                breakdown["plans"][plan_addon.slug] = {
+                    "amount": round(final_price, 2),
+                    "currency": currency_code,
+                }
+
+    # Track which services are already included as plan add-ons to avoid duplication
+    plans = bag.plans.all()
+    add_ons: dict[int, AcademyService] = {}
+    services_in_plan_addons: set[int] = set()
+
+    for plan in plans:
+        for add_on in plan.add_ons.filter(currency=currency):
+            if add_on.service.id not in add_ons:
+                add_ons[add_on.service.id] = add_on
+                services_in_plan_addons.add(add_on.service.id)
+
+    for service_item in bag.service_items.all():
+        if service_item.service.id in services_in_plan_addons:
+            continue
+
+        service_slug = service_item.service.slug
+
+        academy_service = AcademyService.objects.filter(
+            service=service_item.service, academy=bag.academy, currency=currency
+        ).first()
+
+        if not academy_service:
+            continue
+
+        amount, c, _ = academy_service.get_discounted_price(service_item.how_many, bag.country_code, lang)
+        if c:
+            currency_code = c.code.upper()
+
+        if amount > 0:
+            breakdown["service-items"][service_slug] = {
+                "amount": round(amount, 2),
+                "currency": currency_code,
+                "how-many": service_item.how_many,
+                "unit-type": service_item.unit_type,
+            }
+
+    return breakdown
+
+
+def create_invoices(bc: Breathecode, n=1):
+    plan = {"is_renewable": False, "time_of_life": 1, "time_of_life_unit": "MONTH", "trial_duration": 0}
+    model = bc.database.create(
+        user=1,
+        currency=[{"code": "USD"}, {"code": "EUR"}],
+        academy=1,
+        service=[
+            {"type": "SEAT", "slug": "seat"},
+            {"type": "VOID", "slug": "add-on"},
+            {"type": "VOID", "slug": "extra"},
+        ],
+        academy_service=[
+            {"service_id": 1, "currency_id": 1, "price_per_unit": 2, "bundle_size": 1, "discount_ratio": 0},
+            {
+                "service_id": 2,
+                "currency_id": 1,
+                "price_per_unit": 3,
+                "bundle_size": 1,
+                "discount_ratio": 0,
+                "pricing_ratio_exceptions": {"ve": {"ratio": 0.8}},
+            },
+            {
+                "service_id": 3,
+                "currency_id": 1,
+                "price_per_unit": 4,
+                "bundle_size": 2,
+                "discount_ratio": 0.1,
+                "pricing_ratio_exceptions": {"ve": {"currency": "EUR", "ratio": 2}},
+            },
+        ],
+        service_item=[
+            {"service_id": 1, "how_many": 2},
+            {"service_id": 2, "how_many": 3},
+            {"service_id": 3, "how_many": 5},
+        ],
+        financing_option=[
+            {"how_many_months": 3, "monthly_price": 30, "currency_id": 1},
+            {
+                "how_many_months": 1,
+                "monthly_price": 50,
+                "currency_id": 1,
+                "pricing_ratio_exceptions": {"ve": {"currency": "EUR", "ratio": 0.8}},
+            },
+        ],
+        plan=[
+            {
+                **plan,
+                "slug": "main",
+                "price_per_month": 10,
+                "price_per_year": 100,
+                "pricing_ratio_exceptions": {"ve": {"price_per_year": 70}},
+                "financing_options": [1],
+                "add_ons": [2],
+            },
+            {**plan, "slug": "add-on-plan", "price_per_month": 0, "financing_options": [2]},
+        ],
+        coupon=[
+            {"slug": "scoped", "discount_type": "PERCENT_OFF", "discount_value": 0.1, "plans": [1]},
+            {"slug": "global", "discount_type": "FIXED_PRICE", "discount_value": 5, "plans": []},
+        ],
+    )
+
+    model.academy.main_currency = model.currency[0]
+    model.academy.save()
+
+    bags = [
+        # the add-on service is charged within the plan
+        {
+            "how_many_installments": 3,
+            "country_code": "VE",
+            "plans": [1],
+            "coupons": [1, 2],
+            "service_items": [1, 2, 3],
+            "seat_service_item_id": 1,
+        },
+        {
+            "chosen_period": "YEAR",
+            "how_many_installments": 0,
+            "country_code": "VE",
+            "plans": [1],
+            "plan_addons": [2],
+            "coupons": [2],
+            "service_items": [3],
+            "seat_service_item_id": 1,
+        },
+        {"chosen_period": "MONTH", "how_many_installments": 0, "plans": [1], "plan_addons": [2], "coupons": [1]},
+        # without plans nothing is charged
+        {"chosen_period": "MONTH", "how_many_installments": 0, "service_items": [3]},
+    ]
+
+    invoices = []
+    for _ in range(n):
+        for bag in bags:
+            x = bc.database.create(
+                bag={"user_id": 1, "academy_id": 1, "currency_id": 1, "plans": [], "coupons": [], **bag},
+                invoice={"user_id": 1, "academy_id": 1, "currency_id": 1, "amount": 100},
+            )
+            invoices.append(x.invoice)
+
+    return model, invoices
+
+
+def serialize(invoices: list[Invoice]):
+    return {x.id: legacy_calculate_invoice_breakdown(x.bag, x, "en") for x in invoices}
+
+
+def test_same_breakdowns_than_before(bc: Breathecode):
+    _, invoices = create_invoices(bc)
+    expected = serialize(invoices)
+
+    assert [len(x["plans"]) + len(x["service-items"]) for x in expected.values()] == [3, 3, 2, 0]
+
+    assert {x.id: actions.calculate_invoice_breakdown(x.bag, x, "en") for x in invoices} == expected
+    assert actions.calculate_invoice_breakdowns(Invoice.objects.all(), "en") == expected
+
+
+@pytest.mark.parametrize("chosen_period, how_many_installments", [("QUARTER", 0), ("YEAR", 0), ("MONTH", 3)])
+def test_same_breakdowns_with_other_periods(bc: Breathecode, chosen_period, how_many_installments):
+    _, invoices = create_invoices(bc)
+
+    for invoice in invoices:
+        args = (invoice.bag, invoice, "en", chosen_period, how_many_installments)
+        assert actions.calculate_invoice_breakdown(*args) == legacy_calculate_invoice_breakdown(*args)
+
+
+def test_queries_do_not_grow_with_the_invoices(bc: Breathecode):
+    create_invoices(bc, n=5)
+
+    def count(invoices):
+        with CaptureQueriesContext(connection) as ctx:
+            actions.calculate_invoice_breakdowns(list(invoices), "en")
+        return len(ctx.captured_queries)
+
+    assert count(Invoice.objects.all()[:4]) == count(Invoice.objects.all())
+
+
+def test_errors_are_returned_by_invoice(bc: Breathecode):
+    _, invoices = create_invoices(bc)
+    FinancingOption.objects.filter(id=2).update(pricing_ratio_exceptions={"ve": {"currency": "XYZ", "ratio": 0.8}})
+
+    breakdowns = actions.calculate_invoice_breakdowns(Invoice.objects.all(), "en")
+
+    assert isinstance(breakdowns[invoices[1].id], ValidationException)
+    assert str(breakdowns[invoices[1].id]) == "currency-not-found"
+    assert breakdowns[invoices[2].id] == legacy_calculate_invoice_breakdown(invoices[2].bag, invoices[2], "en")
+
+
+def test_missing_breakdowns_are_saved(bc: Breathecode):
+    _, invoices = create_invoices(bc)
+    Invoice.objects.filter(id=invoices[0].id).update(amount_breakdown={"plans": {}, "service-items": {}})
+
+    updated = actions.save_missing_invoice_breakdowns(list(Invoice.objects.all()), "en")
+
+    assert [x.id for x in updated] == [x.id for x in invoices[1:]]
+    assert Invoice.objects.get(id=invoices[0].id).amount_breakdown == {"plans": {}, "service-items": {}}
+    assert Invoice.objects.get(id=invoices[1].id).amount_breakdown == serialize([invoices[1]])[invoices[1].id]
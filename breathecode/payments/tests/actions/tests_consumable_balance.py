@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from breathecode.payments import actions
+from breathecode.payments.models import Consumable
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch):
+    conn = MagicMock()
+    pipe = conn.pipeline.return_value.__enter__.return_value
+
+    monkeypatch.setattr("breathecode.payments.actions.IS_DJANGO_REDIS", True)
+    monkeypatch.setattr("breathecode.payments.actions.get_redis_connection", lambda *args, **kwargs: conn)
+
+    yield conn, pipe
+
+
+def create_consumables(bc: Breathecode, *how_many):
+    return bc.database.create(
+        user=1,
+        service={"slug": "mentorships"},
+        consumable=[{"how_many": x} for x in how_many],
+    )
+
+
+def test_compute_balance(bc: Breathecode):
+    model = create_consumables(bc, 3, 4, 0)
+
+    assert actions.compute_consumable_balance(model.user.id, model.service.slug) == 7
+    assert actions.compute_consumable_balance(model.user.id, "other") == 0
+
+
+def test_compute_unlimited_balance(bc: Breathecode):
+    model = create_consumables(bc, 3, -1)
+
+    assert actions.compute_consumable_balance(model.user.id, model.service.slug) == -1
+
+
+def test_balance_is_cached(bc: Breathecode, django_assert_num_queries):
+    model = create_consumables(bc, 3, 4)
+
+    with django_assert_num_queries(1):
+        assert actions.get_consumable_balance(model.user.id, model.service.slug) == 7
+
+    with django_assert_num_queries(0):
+        assert actions.get_consumable_balance(model.user.id, model.service.slug) == 7
+
+    actions.decrement_consumable_balance(model.user.id, model.service.slug, 5)
+
+    with django_assert_num_queries(0):
+        assert actions.get_consumable_balance(model.user.id, model.service.slug) == 2
+
+    actions.decrement_consumable_balance(model.user.id, model.service.slug, 5)
+
+    with django_assert_num_queries(0):
+        assert actions.get_consumable_balance(model.user.id, model.service.slug) == 0
+
+
+def test_balance_is_invalidated_when_a_consumable_is_saved(bc: Breathecode, enable_signals, monkeypatch):
+    monkeypatch.setattr("breathecode.payments.tasks.process_auto_recharge.delay", MagicMock())
+    enable_signals()
+
+    model = create_consumables(bc, 0)
+
+    assert actions.get_consumable_balance(model.user.id, model.service.slug) == 0
+
+    model.consumable.how_many = 5
+    model.consumable.save()
+
+    assert actions.get_consumable_balance(model.user.id, model.service.slug) == 5
+
+    Consumable.objects.all().delete()
+
+    assert actions.get_consumable_balance(model.user.id, model.service.slug) == 0
+
+
+def test_get_balance_in_redis(bc: Breathecode, redis):
+    conn, pipe = redis
+    model = create_consumables(bc, 3)
+
+    conn.hget.return_value = None
+    assert actions.get_consumable_balance(model.user.id, model.service.slug) == 3
+
+    key = f"consumable:balance:{model.user.id}"
+    assert pipe.hset.call_args_list == [((key, model.service.slug, 3),)]
+    assert pipe.expire.call_args_list == [((key, actions.get_consumable_balance_ttl()),)]
+
+    conn.hget.return_value = b"2"
+    assert actions.get_consumable_balance(model.user.id, model.service.slug) == 2
+
+    actions.decrement_consumable_balance(model.user.id, model.service.slug, 1)
+    assert conn.eval.call_args_list == [
+        ((actions.DECREMENT_CONSUMABLE_BALANCE_SCRIPT, 1, key, model.service.slug, 1),),
+    ]
+
+
+def test_reconcile_in_redis(bc: Breathecode, redis):
+    conn, _ = redis
+    model = create_consumables(bc, 3)
+
+    key = f"consumable:balance:{model.user.id}"
+    conn.scan_iter.return_value = [key.encode()]
+    conn.hgetall.return_value = {model.service.slug.encode(): b"1", b"other": b"0"}
+
+    assert actions.reconcile_consumable_balances() == 1
+    assert conn.hset.call_args_list == [((key, model.service.slug, 3),)]
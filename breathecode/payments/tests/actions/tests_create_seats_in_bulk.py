@@ -0,0 +1,155 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, call
+
+import pytest
+from capyc.rest_framework.exceptions import ValidationException
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from breathecode.marketing.models import EmailDomainValidation
+from breathecode.payments import actions, tasks
+from breathecode.payments.models import Consumable, SubscriptionBillingTeam, SubscriptionSeat, UserEntitlement
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    monkeypatch.setattr(tasks, "notify_subscription_seats", MagicMock())
+    monkeypatch.setattr(tasks, "build_service_stock_scheduler_from_subscription", MagicMock())
+
+    # the domain was validated recently, so no dns lookups are made
+    EmailDomainValidation.objects.create(
+        domain="company.com",
+        has_mx=True,
+        mx_records=["mx.company.com"],
+        spf="v=spf1 -all",
+        dmarc="v=DMARC1; p=reject",
+        next_check_at=UTC_NOW + timedelta(days=180),
+    )
+    yield
+
+
+def create_team(bc: Breathecode, strategy=SubscriptionBillingTeam.ConsumptionStrategy.PER_SEAT):
+    model = bc.database.create(
+        user=[{"email": "owner@company.com"}, {"email": "member@company.com", "first_name": "Member"}],
+        service={"type": "VOID"},
+        service_item={"is_team_allowed": True, "how_many": 5},
+        plan={"is_renewable": True, "time_of_life": 0, "time_of_life_unit": None, "price_per_month": 10},
+        plan_service_item=1,
+        subscription={
+            "user_id": 1,
+            "status": "ACTIVE",
+            "next_payment_at": UTC_NOW + timedelta(days=30),
+            "valid_until": None,
+            "plans": [1],
+        },
+    )
+
+    model.subscription_billing_team = SubscriptionBillingTeam.objects.create(
+        subscription=model.subscription, name="Team", consumption_strategy=strategy
+    )
+    SubscriptionSeat.objects.create(billing_team=model.subscription_billing_team, user=None, email="taken@company.com")
+
+    return model
+
+
+def seats(*emails, user=None):
+    return actions.normalize_add_seats([{"email": x, "user": user} for x in emails])
+
+
+def test_rows_are_reported_in_order(bc: Breathecode):
+    model = create_team(bc)
+
+    rows = [
+        *seats("New@company.com", "member@company.com", "taken@company.com", "not-an-email", "new@company.com"),
+        *seats("other@company.com", user=999),
+    ]
+    results = actions.create_seats_in_bulk(rows, model.subscription_billing_team, "en")
+
+    assert [(x["row"], x["email"], x["code"], x["slug"]) for x in results] == [
+        (0, "new@company.com", 201, None),
+        (1, "member@company.com", 201, None),
+        (2, "taken@company.com", 400, "duplicate-team-seat"),
+        (3, "not-an-email", 400, "email-not-valid"),
+        (4, "new@company.com", 400, "duplicate-team-seat"),
+        (5, "other@company.com", 400, "user-not-found"),
+    ]
+
+    new, member = results[0]["seat"], results[1]["seat"]
+    assert [(x.email, x.user_id, x.is_active) for x in SubscriptionSeat.objects.order_by("id")] == [
+        ("taken@company.com", None, True),
+        ("new@company.com", None, True),
+        ("member@company.com", 2, True),
+    ]
+    assert member.seat_log[0]["action"] == "ADDED"
+
+    # the consumables were issued for the seats, the pending one waits for the invite to be accepted
+    assert sorted(
+        (x.subscription_seat_id, x.user_id, x.how_many)
+        for x in Consumable.objects.filter(subscription_seat__isnull=False)
+    ) == [(new.id, None, 5), (member.id, 2, 5)]
+
+    assert UserEntitlement.objects.get(user__id=2).seat_subscriptions == [1]
+    assert tasks.notify_subscription_seats.delay.call_args_list == [
+        call(
+            1,
+            [
+                {"seat": new.id, "first_name": "", "last_name": ""},
+                {"seat": member.id, "first_name": "", "last_name": ""},
+            ],
+            "en",
+        )
+    ]
+    assert tasks.build_service_stock_scheduler_from_subscription.delay.call_count == 0
+
+
+def test_per_team_seats_do_not_issue_consumables(bc: Breathecode):
+    model = create_team(bc, SubscriptionBillingTeam.ConsumptionStrategy.PER_TEAM)
+
+    results = actions.create_seats_in_bulk(seats("new@company.com"), model.subscription_billing_team, "en")
+
+    assert results[0]["code"] == 201
+    assert Consumable.objects.filter(subscription_seat__isnull=False).count() == 0
+
+
+def test_queries_do_not_grow_with_the_rows(bc: Breathecode):
+    model = create_team(bc)
+
+    def count(emails):
+        with CaptureQueriesContext(connection) as ctx:
+            actions.create_seats_in_bulk(seats(*emails), model.subscription_billing_team, "en")
+        return len(ctx.captured_queries)
+
+    # the first import creates the handlers of the plan
+    count(["first@company.com"])
+
+    assert count([f"a{x}@company.com" for x in range(2)]) == count([f"b{x}@company.com" for x in range(20)])
+    assert tasks.notify_subscription_seats.delay.call_count == 3
+
+
+def test_notifications_are_sent_in_batches(bc: Breathecode, monkeypatch: pytest.MonkeyPatch):
+    model = create_team(bc)
+    monkeypatch.setattr(actions, "SEAT_NOTIFICATION_BATCH_SIZE", 2)
+
+    actions.create_seats_in_bulk(seats(*[f"a{x}@company.com" for x in range(5)]), model.subscription_billing_team, "en")
+
+    assert [len(x.args[1]) for x in tasks.notify_subscription_seats.delay.call_args_list] == [2, 2, 1]
+
+
+def test_the_seats_limit_counts_the_rows_that_pass(bc: Breathecode):
+    model = create_team(bc)
+    team = model.subscription_billing_team
+    team.additional_seats = 1
+    team.save()
+
+    rows = seats("taken@company.com", "not-an-email", "new@company.com")
+    assert [x["code"] for x in actions.create_seats_in_bulk(rows, team, "en")] == [400, 400, 201]
+
+    with pytest.raises(ValidationException, match="seats-limit-exceeded"):
+        actions.create_seats_in_bulk(seats("other@company.com"), team, "en")
+
+    assert SubscriptionSeat.objects.count() == 2
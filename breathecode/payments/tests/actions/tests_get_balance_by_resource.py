@@ -0,0 +1,54 @@
+import pytest
+
+from breathecode.payments import actions
+from breathecode.payments.models import Consumable
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+def serialize_consumable(consumable):
+    return {
+        "id": consumable.id,
+        "how_many": consumable.how_many,
+        "unit_type": consumable.unit_type,
+        "valid_until": consumable.valid_until,
+        "subscription_seat": None,
+        "subscription_billing_team": None,
+        "user": consumable.user_id,
+        "subscription": None,
+        "plan_financing": None,
+    }
+
+
+def test_no_consumables(bc: Breathecode, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert actions.get_balance_by_resource(Consumable.objects.all(), "cohort_set") == []
+
+
+def test_balance_by_resource(bc: Breathecode, django_assert_num_queries):
+    model = bc.database.create(
+        user=1,
+        cohort_set=2,
+        consumable=[
+            {"how_many": 3, "cohort_set_id": 1},
+            {"how_many": 4, "cohort_set_id": 1},
+            {"how_many": 5, "cohort_set_id": 2},
+            {"how_many": -1, "cohort_set_id": 2},
+        ],
+    )
+
+    with django_assert_num_queries(2):
+        result = actions.get_balance_by_resource(Consumable.objects.order_by("id").distinct(), "cohort_set")
+
+    items = [serialize_consumable(x) for x in model.consumable]
+    assert result == [
+        {"id": 1, "slug": model.cohort_set[0].slug, "balance": {"unit": 7}, "items": items},
+        {"id": 2, "slug": model.cohort_set[1].slug, "balance": {"unit": -1}, "items": items},
+    ]
+
+    # the virtual balance appends items to a resource
+    assert result[0]["items"] is not result[1]["items"]
@@ -0,0 +1,151 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from django.utils import timezone
+
+from breathecode.payments import actions
+from breathecode.payments.models import Coupon
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    monkeypatch.setattr("breathecode.payments.actions.GENERAL_PRICING_RATIOS", {"ve": {"pricing_ratio": 0.5}})
+    monkeypatch.setattr("breathecode.payments.tasks.update_service_stock_schedulers.delay", MagicMock())
+    yield
+
+
+def create_plan(bc: Breathecode, **kwargs):
+    return bc.database.create(
+        plan={
+            "price_per_month": 10,
+            "price_per_quarter": 27,
+            "price_per_half": 0,
+            "price_per_year": 100,
+            "is_renewable": False,
+            "time_of_life": 1,
+            "time_of_life_unit": "MONTH",
+            "pricing_ratio_exceptions": {"ar": {"price_per_month": 4, "price_per_year": 40}},
+        },
+        financing_option={"how_many_months": 1, "monthly_price": 50},
+        **kwargs,
+    )
+
+
+def test_plan_prices_by_country(bc: Breathecode):
+    model = create_plan(bc)
+
+    quote = actions.get_plan_quote(model.plan, "VE")
+    assert {x: quote[x] for x in actions.PLAN_PRICE_ATTRS} == {
+        "price_per_month": 5,
+        "price_per_quarter": 13.5,
+        "price_per_half": 0,
+        "price_per_year": 50,
+    }
+    assert quote["explanation"] == {"plan": model.plan.slug, "ratio": 0.5}
+    assert quote["one_shot"] == {"base_price": 50, "price": 25, "ratio": 0.5, "currency": None}
+    assert quote["special_offer"] is None
+
+    quote = actions.get_plan_quote(model.plan, "ar")
+    assert {x: quote[x] for x in actions.PLAN_PRICE_ATTRS} == {
+        "price_per_month": 4,
+        "price_per_quarter": 27,
+        "price_per_half": 0,
+        "price_per_year": 40,
+    }
+    assert quote["explanation"] == {"plan": model.plan.slug, "ratio": None}
+
+    quote = actions.get_plan_quote(model.plan)
+    assert quote["price_per_month"] == 10
+    assert quote["explanation"] is None
+    assert quote["one_shot"]["price"] == 50
+
+
+def test_quotes_are_cached_until_invalidated(bc: Breathecode, django_assert_num_queries):
+    model = create_plan(bc)
+
+    actions.get_plan_quote(model.plan, "ve")
+
+    with django_assert_num_queries(0):
+        assert actions.get_plan_quote(model.plan, "ve")["price_per_month"] == 5
+
+    model.plan.price_per_month = 20
+    model.plan.save()
+    actions.invalidate_pricing_quotes()
+
+    assert actions.get_plan_quote(model.plan, "ve")["price_per_month"] == 10
+
+
+def test_special_offer_limits_the_quote(bc: Breathecode):
+    model = create_plan(
+        bc,
+        coupon={
+            "auto": True,
+            "discount_type": "PERCENT_OFF",
+            "discount_value": 0.1,
+            "how_many_offers": -1,
+            "offered_at": None,
+            "expires_at": UTC_NOW + timedelta(minutes=10),
+        },
+    )
+
+    quote, timeout = actions.build_plan_quote(model.plan, "")
+
+    assert quote["special_offer"] == model.coupon
+    assert timeout == 600
+
+
+def test_catalog_changes_invalidate_the_quotes(bc: Breathecode, enable_signals, django_capture_on_commit_callbacks):
+    enable_signals()
+    model = create_plan(bc)
+
+    version = actions.get_pricing_quote_version()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        model.financing_option.monthly_price = 60
+        model.financing_option.save()
+
+    assert actions.get_pricing_quote_version() == version + 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        model.plan.financing_options.clear()
+
+    assert actions.get_pricing_quote_version() > version + 1
+
+
+def test_only_the_auto_coupons_invalidate_the_quotes(
+    bc: Breathecode, enable_signals, django_capture_on_commit_callbacks
+):
+    enable_signals()
+    model = bc.database.create(user=1, currency=1)
+    version = actions.get_pricing_quote_version()
+
+    # a reward coupon of a seller does not affect the quotes
+    with django_capture_on_commit_callbacks(execute=True):
+        reward = Coupon(slug="reward", discount_type="FIXED_PRICE", discount_value=10, allowed_user=model.user)
+        reward.save()
+
+    assert actions.get_pricing_quote_version() == version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        coupon = Coupon(slug="offer", discount_type="PERCENT_OFF", discount_value=0.1, auto=True)
+        coupon.save()
+
+    assert actions.get_pricing_quote_version() == version + 1
+
+    # it stopped being offered
+    with django_capture_on_commit_callbacks(execute=True):
+        coupon.auto = False
+        coupon.save()
+
+    assert actions.get_pricing_quote_version() == version + 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        model.currency.decimals = 3
+        model.currency.save()
+
+    assert actions.get_pricing_quote_version() == version + 3
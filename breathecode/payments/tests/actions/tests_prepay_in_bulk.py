@@ -0,0 +1,240 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, call
+from urllib.parse import parse_qs
+
+import pytest
+import stripe
+from dateutil.relativedelta import relativedelta
+from redis.exceptions import LockError
+from django.utils import timezone
+
+from breathecode.payments import actions, tasks
+from breathecode.payments.models import Bag, Invoice, Subscription
+from breathecode.payments.services.stripe import Stripe
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+class FakeStripe(BaseHTTPRequestHandler):
+    """Create charges like Stripe does, it replays the response of a key already used."""
+
+    requests: list[dict] = []
+    responses: dict[str, tuple[int, dict]] = {}
+    rate_limited: set[str] = set()
+    declined: set[str] = set()
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+        key = self.headers.get("Idempotency-Key")
+        self.requests.append({"key": key, **body})
+
+        if body["customer"] in self.rate_limited:
+            self.rate_limited.discard(body["customer"])
+            return self.reply(429, {"error": {"type": "invalid_request_error", "message": "Too many requests"}})
+
+        if key not in self.responses:
+            if body["customer"] in self.declined:
+                self.responses[key] = (
+                    402,
+                    {"error": {"type": "card_error", "code": "card_declined", "message": "Your card was declined"}},
+                )
+
+            else:
+                charge = {"id": f"ch_{len(self.responses) + 1}", "object": "charge", "amount": int(body["amount"])}
+                self.responses[key] = (200, charge)
+
+        self.reply(*self.responses[key])
+
+    def reply(self, status: int, data: dict):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_stripe(monkeypatch: pytest.MonkeyPatch):
+    FakeStripe.requests = []
+    FakeStripe.responses = {}
+    FakeStripe.rate_limited = {"cus_limited"}
+    FakeStripe.declined = {"cus_declined"}
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripe)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(stripe, "api_base", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(stripe, "max_network_retries", 0)
+    # urllib3 is blocked in the tests to avoid requests to third party services, this server is local
+    monkeypatch.setattr(stripe, "default_http_client", stripe.http_client.Urllib2Client())
+    monkeypatch.setenv("STRIPE_API_KEY", "sk_test_123")
+
+    yield FakeStripe
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    monkeypatch.setattr("breathecode.payments.services.stripe.RATE_LIMIT_BACKOFF", 0)
+    monkeypatch.setattr(tasks.charge_subscription, "delay", MagicMock())
+    monkeypatch.setattr(tasks.charge_plan_financing, "delay", MagicMock())
+    yield
+
+
+def create_due_subscriptions(bc: Breathecode, customers: list[str]):
+    n = len(customers)
+    model = bc.database.create(
+        user=n,
+        academy=1,
+        currency={"code": "USD", "decimals": 2},
+        plan={"price_per_month": 10, "is_renewable": True, "time_of_life": 0, "time_of_life_unit": None},
+        bag=[{"user_id": x, "chosen_period": "MONTH", "was_delivered": True} for x in range(1, n + 1)],
+        invoice=[{"user_id": x, "bag_id": x, "amount": 10} for x in range(1, n + 1)],
+        subscription=[
+            {
+                "user_id": x,
+                "status": "ACTIVE",
+                "next_payment_at": UTC_NOW - relativedelta(hours=1),
+                "valid_until": None,
+                "externally_managed": False,
+                "currency_id": 1,
+            }
+            for x in range(1, n + 1)
+        ],
+        payment_contact=[{"user_id": x, "academy_id": 1, "stripe_id": customers[x - 1]} for x in range(1, n + 1)],
+    )
+
+    for subscription, invoice in zip(model.subscription, model.invoice):
+        subscription.plans.add(model.plan)
+        subscription.invoices.add(invoice)
+
+    return model
+
+
+def test_prepay_due_subscriptions(bc: Breathecode, fake_stripe):
+    model = create_due_subscriptions(bc, ["cus_paid", "cus_declined", "cus_limited"])
+
+    prepayments = sorted(actions.get_subscription_prepayments([1, 2, 3], UTC_NOW), key=lambda x: x["owner"].id)
+    keys = [actions.get_charge_idempotency_key(x["owner"], x["bag"]) for x in prepayments]
+
+    assert actions.prepay_in_bulk(prepayments, UTC_NOW) == 2
+    assert sorted((x["key"], x["customer"], x["amount"]) for x in fake_stripe.requests) == sorted(
+        [
+            (keys[0], "cus_paid", "1000"),
+            (keys[1], "cus_declined", "1000"),
+            # the rate limited charge was retried with the same key
+            (keys[2], "cus_limited", "1000"),
+            (keys[2], "cus_limited", "1000"),
+        ]
+    )
+
+    invoices = Invoice.objects.filter(status="FULFILLED", bag__was_delivered=False).order_by("id")
+    assert [(x.user_id, x.amount, x.paid_at, x.academy_id) for x in invoices] == [
+        (1, 10, UTC_NOW, 1),
+        (3, 10, UTC_NOW, 1),
+    ]
+    assert [x.subscription_set.get().id for x in invoices] == [1, 3]
+
+    # the bag of the charge declined was removed, its task charges it again
+    assert Bag.objects.filter(was_delivered=False).count() == 2
+
+    # the subscriptions with a pending invoice are not charged twice
+    assert actions.get_subscription_prepayments([1, 2, 3], UTC_NOW)[0]["owner"].id == 2
+
+
+def test_a_new_attempt_reaches_the_card_again(bc: Breathecode, fake_stripe):
+    create_due_subscriptions(bc, ["cus_declined"])
+
+    assert actions.prepay_in_bulk(actions.get_subscription_prepayments([1], UTC_NOW), UTC_NOW) == 0
+
+    # the user updated their card the same day
+    fake_stripe.declined = set()
+
+    assert actions.prepay_in_bulk(actions.get_subscription_prepayments([1], UTC_NOW), UTC_NOW) == 1
+    assert len({x["key"] for x in fake_stripe.requests}) == 2
+
+
+def test_owners_locked_by_a_charge_task_are_skipped(bc: Breathecode, fake_stripe, monkeypatch: pytest.MonkeyPatch):
+    create_due_subscriptions(bc, ["cus_paid", "cus_paid"])
+    taken = []
+
+    class Lock:
+        def __init__(self, client, name, **kwargs):
+            self.name = name
+
+        def __enter__(self):
+            # charge_subscription is charging the subscription 2
+            if self.name == "lock:subscription:2":
+                raise LockError("Unable to acquire lock within the time specified")
+
+            taken.append(self.name)
+
+        def __exit__(self, *args):
+            taken.remove(self.name)
+
+    monkeypatch.setattr("breathecode.payments.actions.Lock", Lock)
+
+    prepayments = actions.get_subscription_prepayments([1, 2], UTC_NOW)
+    assert actions.prepay_in_bulk(prepayments, UTC_NOW) == 1
+
+    assert [x["customer"] for x in fake_stripe.requests] == ["cus_paid"]
+    assert [x.subscription_set.get().id for x in Invoice.objects.filter(bag__was_delivered=False)] == [1]
+    assert Bag.objects.filter(was_delivered=False).count() == 1
+    assert taken == []
+
+
+def test_owners_renewed_after_the_prepayments_were_built_are_skipped(bc: Breathecode, fake_stripe):
+    create_due_subscriptions(bc, ["cus_paid", "cus_paid"])
+
+    prepayments = actions.get_subscription_prepayments([1, 2], UTC_NOW)
+
+    # a charge task renewed the subscription 2 before the batch took its lock
+    Subscription.objects.filter(id=2).update(next_payment_at=UTC_NOW + relativedelta(months=1))
+
+    assert actions.prepay_in_bulk(prepayments, UTC_NOW) == 1
+    assert len(fake_stripe.requests) == 1
+    assert Invoice.objects.filter(bag__was_delivered=False).count() == 1
+
+
+def test_charges_are_replayed_by_key(bc: Breathecode, fake_stripe):
+    model = bc.database.create(academy=1, currency={"code": "USD", "decimals": 2})
+
+    charge = {
+        "customer": "cus_paid",
+        "amount": 10,
+        "currency": model.currency,
+        "description": "",
+        "idempotency_key": "key",
+    }
+    s = Stripe(academy=model.academy)
+
+    first = s.charge_in_bulk([charge])
+    assert s.charge_in_bulk([charge]) == first
+    assert first[0]["charge"]["id"] == "ch_1"
+    assert s.charge_in_bulk([]) == []
+
+
+def test_make_charges_prepays_before_the_tasks(bc: Breathecode, fake_stripe):
+    create_due_subscriptions(bc, ["cus_paid", "cus_declined"])
+
+    report = actions.make_charges_in_bulk(batch_size=10)
+
+    assert report["prepay_subscriptions"]["rows"] == 1
+    assert report["charge_subscriptions"]["rows"] == 2
+    assert tasks.charge_subscription.delay.call_args_list == [call(1), call(2)]
+
+    report = actions.make_charges_in_bulk(batch_size=10, prepay=False)
+    assert report["prepay_subscriptions"]["rows"] == 0
+    assert len(fake_stripe.requests) == 2
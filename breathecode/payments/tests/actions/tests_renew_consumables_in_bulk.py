@@ -0,0 +1,113 @@
+from unittest.mock import MagicMock, call
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from django.utils import timezone
+
+from breathecode.payments import actions, tasks
+from breathecode.payments.models import Consumable, ServiceStockScheduler
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    monkeypatch.setattr(tasks.charge_subscription, "delay", MagicMock())
+    monkeypatch.setattr(tasks.charge_plan_financing, "delay", MagicMock())
+    yield
+
+
+def create_due_schedulers(bc: Breathecode, n):
+    return bc.database.create(
+        subscription=(n, {"next_payment_at": UTC_NOW + relativedelta(days=10), "valid_until": None}),
+        invoice={"amount": 10},
+        service={"type": "VOID"},
+        service_item={"renew_at": 1, "renew_at_unit": "MONTH", "how_many": 5},
+        consumable=(n, {"valid_until": UTC_NOW - relativedelta(hours=2)}),
+        service_stock_scheduler=[{"consumables": [x], "plan_handler_id": x} for x in range(1, n + 1)],
+        plan_service_item_handler=[{"subscription_id": x} for x in range(1, n + 1)],
+        plan={"is_renewable": False, "time_of_life": 1, "time_of_life_unit": "MONTH"},
+    )
+
+
+def test_renew_in_bulk(bc: Breathecode):
+    create_due_schedulers(bc, 3)
+
+    report = actions.renew_consumables_in_bulk(batch_size=2)
+
+    assert report["select_subscriptions"]["rows"] == 3
+    assert report["renew_subscriptions"]["rows"] == 3
+    assert report["select_plan_financings"]["rows"] == 0
+
+    renewed = Consumable.objects.filter(valid_until__gt=UTC_NOW).order_by("id")
+    assert [(x.how_many, x.subscription_id, x.valid_until) for x in renewed] == [
+        (5, n, UTC_NOW + relativedelta(days=10)) for n in range(1, 4)
+    ]
+
+    # each scheduler is linked to its new consumable and it was moved to the next period
+    for scheduler in ServiceStockScheduler.objects.order_by("id"):
+        assert scheduler.valid_until == UTC_NOW + relativedelta(days=10)
+        assert scheduler.consumables.filter(valid_until__gt=UTC_NOW).count() == 1
+
+    # they are not due anymore
+    report = actions.renew_consumables_in_bulk(batch_size=2)
+    assert report["select_subscriptions"]["rows"] == 0
+
+
+def test_renew_with_bounded_queries(bc: Breathecode, django_assert_max_num_queries):
+    create_due_schedulers(bc, 4)
+
+    # the queries grow with the batches, not with the schedulers, apart from the settings read by Consumable.clean
+    with django_assert_max_num_queries(25):
+        actions.renew_consumables_in_bulk(batch_size=10)
+
+    assert Consumable.objects.filter(valid_until__gt=UTC_NOW).count() == 4
+
+
+def test_renew_dry_run(bc: Breathecode):
+    model = create_due_schedulers(bc, 2)
+
+    report = actions.renew_consumables_in_bulk(dry_run=True)
+
+    assert report["select_subscriptions"]["rows"] == 2
+    assert report["renew_subscriptions"]["rows"] == 2
+    assert all(x["seconds"] >= 0 for x in report.values())
+    assert bc.database.list_of("payments.Consumable") == bc.format.to_dict(model.consumable)
+    assert bc.database.list_of("payments.ServiceStockScheduler") == bc.format.to_dict(model.service_stock_scheduler)
+
+
+def test_charges_only_the_due_payments(bc: Breathecode):
+    bc.database.create(
+        subscription=[
+            {"next_payment_at": UTC_NOW - relativedelta(hours=1), "status": "ACTIVE", "valid_until": None},
+            {"next_payment_at": UTC_NOW + relativedelta(hours=1), "status": "ACTIVE", "valid_until": None},
+            {"next_payment_at": UTC_NOW - relativedelta(hours=1), "status": "CANCELLED", "valid_until": None},
+        ],
+    )
+
+    report = actions.make_charges_in_bulk(batch_size=1)
+
+    assert report["charge_subscriptions"]["rows"] == 1
+    assert tasks.charge_subscription.delay.call_args_list == [call(1)]
+    assert tasks.charge_plan_financing.delay.call_args_list == []
+
+
+def test_make_charges_dry_run(bc: Breathecode):
+    bc.database.create(
+        subscription=[
+            {"next_payment_at": UTC_NOW - relativedelta(hours=1), "status": "ACTIVE", "valid_until": None},
+            {"next_payment_at": UTC_NOW, "status": "ACTIVE", "valid_until": UTC_NOW - relativedelta(hours=1)},
+        ],
+    )
+
+    report = actions.make_charges_in_bulk(dry_run=True)
+
+    assert report["expire_subscriptions"]["rows"] == 1
+    assert report["charge_subscriptions"]["rows"] == 1
+    assert tasks.charge_subscription.delay.call_args_list == []
+    assert [x.status for x in bc.database.get_model("payments.Subscription").objects.order_by("id")] == [
+        "ACTIVE",
+        "ACTIVE",
+    ]
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from breathecode.payments.management.commands.backfill_consumption_session_hashes import Command
+from breathecode.payments.models import ConsumptionSession
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+def create_sessions(bc: Breathecode, *etas):
+    model = bc.database.create(
+        user=1,
+        consumption_session=[
+            {"request": {"args": [], "kwargs": {"id": n}, "headers": {"academy": None}, "user": 1}, "eta": eta}
+            for n, eta in enumerate(etas)
+        ],
+    )
+
+    # emulate the rows created before the hash existed
+    ConsumptionSession.objects.update(request_hash="")
+    return model
+
+
+def get_hashes():
+    return [x.request_hash for x in ConsumptionSession.objects.order_by("id")]
+
+
+def test_nothing_to_update(bc: Breathecode):
+    command = Command()
+    result = command.handle(dry_run=False, batch_size=1000, include_expired=False)
+
+    assert result == None
+
+
+def test_only_pending_sessions(bc: Breathecode):
+    model = create_sessions(
+        bc, UTC_NOW + timedelta(hours=1), UTC_NOW + timedelta(hours=2), UTC_NOW - timedelta(hours=1)
+    )
+
+    command = Command()
+    command.handle(dry_run=False, batch_size=1, include_expired=False)
+
+    assert get_hashes() == [
+        ConsumptionSession.hash_request(model.consumption_session[0].request),
+        ConsumptionSession.hash_request(model.consumption_session[1].request),
+        "",
+    ]
+
+
+def test_include_expired(bc: Breathecode):
+    model = create_sessions(bc, UTC_NOW + timedelta(hours=1), UTC_NOW - timedelta(hours=1))
+
+    command = Command()
+    command.handle(dry_run=False, batch_size=1000, include_expired=True)
+
+    assert get_hashes() == [ConsumptionSession.hash_request(x.request) for x in model.consumption_session]
+
+
+def test_dry_run(bc: Breathecode):
+    create_sessions(bc, UTC_NOW + timedelta(hours=1))
+
+    command = Command()
+    command.handle(dry_run=True, batch_size=1000, include_expired=False)
+
+    assert get_hashes() == [""]
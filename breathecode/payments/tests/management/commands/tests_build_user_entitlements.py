@@ -0,0 +1,44 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from breathecode.payments.management.commands.build_user_entitlements import Command
+from breathecode.payments.models import UserEntitlement
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("breathecode.payments.tasks.update_service_stock_schedulers.delay", MagicMock())
+    yield
+
+
+def test_nothing_to_rebuild(bc: Breathecode):
+    bc.database.create(user=1)
+
+    command = Command()
+    assert command.handle(batch_size=500) == None
+
+    assert UserEntitlement.objects.count() == 0
+
+
+def test_rebuild_in_batches(bc: Breathecode):
+    plan = {"is_renewable": True, "price_per_month": 10, "time_of_life": 0, "time_of_life_unit": None}
+    bc.database.create(
+        user=4,
+        plan=plan,
+        subscription=[{"user_id": x, "status": "ACTIVE", "plans": [1]} for x in range(1, 4)],
+    )
+
+    # a stale entitlement of a user without plans
+    UserEntitlement.objects.create(user_id=4, plans=["paid"], has_paid_plans=True)
+
+    command = Command()
+    assert command.handle(batch_size=3) == None
+
+    assert [(x.user_id, x.has_paid_plans) for x in UserEntitlement.objects.order_by("user__id")] == [
+        (1, True),
+        (2, True),
+        (3, True),
+        (4, False),
+    ]
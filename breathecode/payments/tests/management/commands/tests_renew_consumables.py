@@ -1,11 +1,11 @@
 import random
-from unittest.mock import MagicMock, call, patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 
-from breathecode.payments import tasks
+from breathecode.payments import actions, tasks
 from breathecode.payments.management.commands.renew_consumables import Command
 from breathecode.payments.tests.mixins import PaymentsTestCase
 from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
@@ -17,9 +17,14 @@ UTC_NOW = timezone.now()
 def apply_patch(db, monkeypatch):
     m = MagicMock()
     monkeypatch.setattr(tasks.renew_consumables, "delay", m)
+    monkeypatch.setattr(actions, "renew_scheduler_batch", MagicMock(wraps=actions.renew_scheduler_batch))
     yield m
 
 
+def get_renewed_batches():
+    return [x.args[0] for x in actions.renew_scheduler_batch.call_args_list]
+
+
 def test_no_related_entities(bc: Breathecode):
     command = Command()
     result = command.handle()
@@ -227,9 +232,36 @@ def test_this_resource_requires_a_renovation(bc: Breathecode, entity, entity_att
         assert bc.database.list_of("payments.Subscription") == []
         assert bc.database.list_of("payments.PlanFinancing") == bc.format.to_dict(model.plan_financing)
 
-    # two schedulers were created with expired consumables, expect one task per scheduler
-    # Note: for subscriptions, both subscriptions() and plan_financing() methods find the schedulers
-    if entity == "subscription":
-        assert tasks.renew_consumables.delay.call_args_list == [call(1), call(2), call(1), call(2)]
+    # two schedulers were created with expired consumables, they are renewed in one batch
+    # Note: for subscriptions, both selections find the schedulers, they are renewed once
+    if entity == "plan_financing" and entity_attrs["status"] != "ACTIVE":
+        assert get_renewed_batches() == []
+
     else:
-        assert tasks.renew_consumables.delay.call_args_list == [call(1), call(2)]
+        assert get_renewed_batches() == [[1, 2]]
+
+    assert tasks.renew_consumables.delay.call_args_list == []
+
+
+def test_dry_run(bc: Breathecode):
+    consumable = {
+        "valid_until": bc.datetime.now() - relativedelta(hours=2),
+    }
+
+    model = bc.database.create(
+        subscription=(2, {"next_payment_at": bc.datetime.now() + relativedelta(minutes=2)}),
+        invoice={"amount": 10},
+        consumable=(2, consumable),
+        service_stock_scheduler=[{"consumables": [n]} for n in range(1, 3)],
+        plan_service_item_handler=[{"subscription_id": n} for n in range(1, 3)],
+        plan={"is_renewable": False, "time_of_life": 1, "time_of_life_unit": "MONTH"},
+    )
+
+    command = Command()
+    result = command.handle(dry_run=True, batch_size=1)
+
+    assert result == None
+
+    assert get_renewed_batches() == [[1], [2]]
+    assert bc.database.list_of("payments.ServiceStockScheduler") == bc.format.to_dict(model.service_stock_scheduler)
+    assert bc.database.list_of("payments.Consumable") == bc.format.to_dict(model.consumable)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from breathecode.payments.models import ConsumptionSession
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("django.utils.timezone.now", MagicMock(return_value=UTC_NOW))
+    yield
+
+
+def get_request(user, academy=None, **kwargs):
+    request = MagicMock(spec=["user", "parser_context", "META"])
+    request.user = user
+    request.parser_context = {"args": (), "kwargs": kwargs}
+    request.META = {"HTTP_ACADEMY": academy} if academy else {}
+    return request
+
+
+def create_session(bc: Breathecode, request, eta=UTC_NOW + timedelta(minutes=10)):
+    return bc.database.create(
+        user=1,
+        consumption_session={"request": request, "eta": eta},
+    )
+
+
+def test_hash_request_is_canonical():
+    a = {"kwargs": {"b": 1, "a": "x"}, "args": (1, 2), "user": 1, "headers": {"academy": None}}
+    b = {"user": 1, "headers": {"academy": None}, "args": [1, 2], "kwargs": {"a": "x", "b": 1}}
+
+    assert ConsumptionSession.hash_request(a) == ConsumptionSession.hash_request(b)
+    assert len(ConsumptionSession.hash_request(a)) == 64
+    assert ConsumptionSession.hash_request(a) != ConsumptionSession.hash_request({**b, "user": 2})
+
+
+def test_request_hash_is_stored_on_save(bc: Breathecode):
+    request = {"args": [], "kwargs": {"service_slug": "x"}, "headers": {"academy": None}, "user": 1}
+    model = create_session(bc, request)
+
+    assert model.consumption_session.request_hash == ConsumptionSession.hash_request(request)
+
+
+def test_get_session(bc: Breathecode, django_assert_num_queries):
+    request = {"args": [], "kwargs": {"service_slug": "x"}, "headers": {"academy": "1"}, "user": 1}
+    model = create_session(bc, request)
+
+    with django_assert_num_queries(1) as ctx:
+        assert ConsumptionSession.get_session(get_request(model.user, academy="1", service_slug="x")) == (
+            model.consumption_session
+        )
+
+    assert "request_hash" in ctx.captured_queries[0]["sql"]
+
+    assert ConsumptionSession.get_session(get_request(model.user, service_slug="x")) is None
+    assert ConsumptionSession.get_session(get_request(model.user, academy="1", service_slug="y")) is None
+
+
+def test_get_session_ignores_expired_sessions(bc: Breathecode):
+    request = {"args": [], "kwargs": {"service_slug": "x"}, "headers": {"academy": None}, "user": 1}
+    model = create_session(bc, request, eta=UTC_NOW - timedelta(minutes=1))
+
+    assert ConsumptionSession.get_session(get_request(model.user, service_slug="x")) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(reset_sequences=True)
+async def test_aget_session(bc: Breathecode):
+    request = {"args": [], "kwargs": {"service_slug": "x"}, "headers": {"academy": None}, "user": 1}
+    model = await sync_to_async(create_session)(bc, request)
+
+    assert await ConsumptionSession.aget_session(get_request(model.user, service_slug="x")) == (
+        model.consumption_session
+    )
+    assert await ConsumptionSession.aget_session(get_request(model.user, service_slug="y")) is None
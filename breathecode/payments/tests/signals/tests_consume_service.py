@@ -86,3 +86,55 @@ class TestSignal(LegacyAPITestCase):
             ],
         )
         self.assertEqual(signals.lose_service_permissions.send_robust.call_args_list, [])
+
+    @patch("breathecode.payments.signals.lose_service_permissions.send_robust", MagicMock())
+    def test__consumable_how_many_gte_1__consumed_by_two_stale_instances(self, enable_signals):
+        enable_signals()
+
+        consumable = {"how_many": 10}
+        model = self.bc.database.create(consumable=consumable)
+        consumable_db = self.bc.format.to_dict(model.consumable)
+
+        # two requests that read the consumable before any of them consumed it
+        instances = [model.consumable.__class__.objects.get(id=model.consumable.id) for _ in range(2)]
+
+        for instance in instances:
+            signals.consume_service.send(sender=instance.__class__, instance=instance, how_many=3)
+
+        self.assertEqual(
+            self.bc.database.list_of("payments.Consumable"),
+            [
+                {
+                    **consumable_db,
+                    "how_many": 4,
+                },
+            ],
+        )
+        self.assertEqual([x.how_many for x in instances], [7, 4])
+        self.assertEqual(signals.lose_service_permissions.send_robust.call_args_list, [])
+
+    @patch("breathecode.payments.signals.lose_service_permissions.send_robust", MagicMock())
+    def test__consumable_how_many_gte_1__consume_more_than_the_balance(self, enable_signals):
+        enable_signals()
+
+        consumable = {"how_many": 2}
+        model = self.bc.database.create(consumable=consumable)
+        consumable_db = self.bc.format.to_dict(model.consumable)
+
+        signals.consume_service.send(sender=model.consumable.__class__, instance=model.consumable, how_many=3)
+
+        self.assertEqual(
+            self.bc.database.list_of("payments.Consumable"),
+            [
+                {
+                    **consumable_db,
+                    "how_many": 0,
+                },
+            ],
+        )
+        self.assertEqual(
+            signals.lose_service_permissions.send_robust.call_args_list,
+            [
+                call(sender=model.consumable.__class__, instance=model.consumable),
+            ],
+        )
@@ -173,3 +173,26 @@ def tests_so_much_cancelled_sessions__unsafe_sessions(
     assert supervisor.log("breathecode.payments.supervisors", "supervise_all_consumption_sessions") == [
         f"There has 66.67% cancelled consumption sessions, due to a bug or a cheater, user {model.user.email}",
     ]
+
+
+def tests_cancelled_sessions_are_aggregated_by_user(
+    database: dfx.Database, supervisor: Supervisor, utc_now: datetime, django_assert_num_queries
+):
+    """The ratios of every user are aggregated in one query instead of two counts per user."""
+    eta = utc_now - timedelta(hours=1)
+    x = {"eta": eta, "operation_code": "unsafe-consume-service-set"}
+    consumption_sessions = []
+    for user_id in range(1, 4):
+        consumption_sessions += [{"status": "CANCELLED", "user_id": user_id, **x} for _ in range(user_id)]
+        consumption_sessions += [{"status": "DONE", "user_id": user_id, **x} for _ in range(4)]
+
+    model = database.create(consumption_session=consumption_sessions, user=3, service={"type": "VOID"})
+
+    with django_assert_num_queries(2):
+        messages = list(supervise_all_consumption_sessions.__wrapped__())
+
+    assert messages == [
+        f"There has 25.0% cancelled consumption sessions, due to a bug or a cheater, user {model.user[0].email}",
+        f"There has 50.0% cancelled consumption sessions, due to a bug or a cheater, user {model.user[1].email}",
+        f"There has 75.0% cancelled consumption sessions, due to a bug or a cheater, user {model.user[2].email}",
+    ]
@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from breathecode.payments import actions, tasks
+from breathecode.payments.models import SubscriptionBillingTeam, SubscriptionSeat
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(actions, "invite_user_to_subscription_team", MagicMock())
+    monkeypatch.setattr(actions, "notify_user_was_added_to_subscription_team", MagicMock())
+    monkeypatch.setattr(actions, "grant_student_capabilities", MagicMock())
+    yield
+
+
+def test_subscription_not_found(bc: Breathecode):
+    tasks.notify_subscription_seats.delay(1, [{"seat": 1, "first_name": "", "last_name": ""}], "en")
+
+    assert actions.invite_user_to_subscription_team.call_count == 0
+    assert actions.notify_user_was_added_to_subscription_team.call_count == 0
+
+
+def test_seats_are_invited_or_notified(bc: Breathecode):
+    model = bc.database.create(
+        user=[{"email": "owner@company.com"}, {"email": "member@company.com"}],
+        plan={"is_renewable": False, "time_of_life": 1, "time_of_life_unit": "MONTH"},
+        subscription={"user_id": 1, "plans": [1]},
+    )
+
+    team = SubscriptionBillingTeam.objects.create(subscription=model.subscription, name="Team")
+    pending = SubscriptionSeat.objects.create(billing_team=team, email="new@company.com")
+    member = SubscriptionSeat.objects.create(billing_team=team, email="member@company.com", user=model.user[1])
+    SubscriptionSeat.objects.create(billing_team=team, email="other@company.com", is_active=False)
+
+    seats = [
+        {"seat": pending.id, "first_name": "New", "last_name": "Member"},
+        {"seat": member.id, "first_name": "", "last_name": ""},
+        {"seat": 3, "first_name": "", "last_name": ""},
+    ]
+    tasks.notify_subscription_seats.delay(model.subscription.id, seats, "es")
+
+    assert actions.invite_user_to_subscription_team.call_args_list == [
+        call(
+            {"email": "new@company.com", "first_name": "New", "last_name": "Member"},
+            model.subscription,
+            pending,
+            "es",
+        )
+    ]
+    assert actions.notify_user_was_added_to_subscription_team.call_args_list == [call(model.subscription, member, "es")]
+    assert actions.grant_student_capabilities.call_args_list == [call(model.user[1], model.plan)]
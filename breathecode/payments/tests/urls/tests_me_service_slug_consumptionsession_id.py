@@ -6,6 +6,7 @@ import pytest
 from django.urls import reverse_lazy
 from rest_framework import status
 
+from breathecode.payments.models import ConsumptionSession
 from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
 
 
@@ -25,7 +26,7 @@ def random_duration():
 
 
 def db_item(service, data={}):
-    return {
+    item = {
         "consumable_id": 1,
         "duration": ...,
         "eta": ...,
@@ -51,6 +52,8 @@ def db_item(service, data={}):
         "was_discounted": False,
         **data,
     }
+    item["request_hash"] = ConsumptionSession.hash_request(item["request"])
+    return item
 
 
 def test_no_auth(bc: Breathecode, client: capy.Client):
@@ -0,0 +1,186 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from rest_framework import status
+
+from breathecode.marketing.models import EmailDomainValidation
+from breathecode.payments import tasks
+from breathecode.payments.models import SubscriptionBillingTeam, SubscriptionSeat
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+
+UTC_NOW = timezone.now()
+
+
+@pytest.fixture(autouse=True)
+def setup(db, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(tasks, "notify_subscription_seats", MagicMock())
+
+    EmailDomainValidation.objects.create(
+        domain="company.com",
+        has_mx=True,
+        mx_records=["mx.company.com"],
+        spf="v=spf1 -all",
+        dmarc="v=DMARC1; p=reject",
+        next_check_at=UTC_NOW + timedelta(days=180),
+    )
+    yield
+
+
+@pytest.fixture
+def team(bc: Breathecode):
+    model = bc.database.create(
+        user={"email": "owner@company.com"},
+        subscription={"user_id": 1, "next_payment_at": UTC_NOW + timedelta(days=30), "valid_until": None},
+    )
+    team = SubscriptionBillingTeam.objects.create(subscription=model.subscription, name="Team", additional_seats=9)
+    SubscriptionSeat.objects.create(billing_team=team, email="taken@company.com")
+
+    return team
+
+
+def url(team: SubscriptionBillingTeam):
+    return f"/v2/payments/subscription/{team.subscription.id}/billing-team/seat/bulk"
+
+
+def test_json_list(client, team: SubscriptionBillingTeam):
+    client.force_authenticate(user=team.subscription.user)
+
+    data = [{"email": "a@company.com"}, {"email": "taken@company.com"}, {"email": "not-an-email"}]
+    resp = client.post(url(team), data, format="json")
+
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS
+    seat = SubscriptionSeat.objects.get(email="a@company.com")
+    assert resp.json() == {
+        "success": [
+            {
+                "status_code": 201,
+                "resources": [{"pk": seat.id, "display_field": "email", "display_value": "a@company.com"}],
+            }
+        ],
+        "failure": [
+            {
+                "detail": "duplicate-team-seat",
+                "status_code": 400,
+                "resources": [{"pk": None, "display_field": "email", "display_value": "taken@company.com"}],
+            },
+            {
+                "detail": "email-not-valid",
+                "status_code": 400,
+                "resources": [{"pk": None, "display_field": "email", "display_value": "not-an-email"}],
+            },
+        ],
+    }
+    assert tasks.notify_subscription_seats.delay.call_count == 1
+
+
+def test_csv_file(client, team: SubscriptionBillingTeam):
+    client.force_authenticate(user=team.subscription.user)
+
+    content = "Email,First_Name,Last_Name\na@company.com,A,B\nb@company.com,,\n"
+    file = SimpleUploadedFile("seats.csv", content.encode(), content_type="text/csv")
+    resp = client.post(url(team), {"file": file}, format="multipart")
+
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS
+    assert [x["display_value"] for x in resp.json()["success"][0]["resources"]] == ["a@company.com", "b@company.com"]
+    assert resp.json()["failure"] == []
+
+    seats = tasks.notify_subscription_seats.delay.call_args.args[1]
+    assert [(x["first_name"], x["last_name"]) for x in seats] == [("A", "B"), ("", "")]
+
+
+def test_only_the_owner(client, bc: Breathecode, team: SubscriptionBillingTeam):
+    model = bc.database.create(user=1)
+    client.force_authenticate(user=model.user)
+
+    resp = client.post(url(team), [{"email": "a@company.com"}], format="json")
+
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+    assert resp.json() == {"detail": "only-owner-allowed", "status_code": 403}
+    assert SubscriptionSeat.objects.count() == 1
+
+
+@pytest.mark.parametrize(
+    "data, slug",
+    [
+        ([], "seats-required"),
+        ({"seats": "a@company.com"}, "seats-must-be-a-list"),
+        ([{"email": f"{x}@company.com"} for x in range(11)], "seats-limit-exceeded"),
+    ],
+)
+def test_bad_payloads(client, team: SubscriptionBillingTeam, data, slug):
+    client.force_authenticate(user=team.subscription.user)
+
+    resp = client.post(url(team), data, format="json")
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp.json() == {"detail": slug, "status_code": 400}
+
+
+def test_malformed_rows(client, team: SubscriptionBillingTeam):
+    client.force_authenticate(user=team.subscription.user)
+
+    data = [{"email": "a@company.com"}, {"email": 123}, "b@company.com"]
+    resp = client.post(url(team), data, format="json")
+
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS
+    seat = SubscriptionSeat.objects.get(email="a@company.com")
+    assert resp.json() == {
+        "success": [
+            {
+                "status_code": 201,
+                "resources": [{"pk": seat.id, "display_field": "email", "display_value": "a@company.com"}],
+            }
+        ],
+        "failure": [
+            {
+                "detail": "email-must-be-a-string",
+                "status_code": 400,
+                "resources": [{"pk": None, "display_field": "email", "display_value": "123"}],
+            },
+            {
+                "detail": "seat-must-be-an-object",
+                "status_code": 400,
+                "resources": [{"pk": None, "display_field": "email", "display_value": ""}],
+            },
+        ],
+    }
+    assert SubscriptionSeat.objects.count() == 2
+
+
+def test_the_seats_limit_counts_the_valid_rows(client, team: SubscriptionBillingTeam):
+    client.force_authenticate(user=team.subscription.user)
+
+    data = [{"email": f"{x}@company.com"} for x in range(9)] + [{"email": "not-an-email"}, {"email": 1}, "x"]
+    resp = client.post(url(team), data, format="json")
+
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS
+    assert len(resp.json()["success"][0]["resources"]) == 9
+    assert [x["detail"] for x in resp.json()["failure"]] == [
+        "email-not-valid",
+        "email-must-be-a-string",
+        "seat-must-be-an-object",
+    ]
+    assert SubscriptionSeat.objects.count() == 10
+
+
+def test_rows_are_reported_by_their_index_in_the_request(client, team: SubscriptionBillingTeam, monkeypatch):
+    from breathecode.payments import actions
+
+    create_seats_in_bulk = actions.create_seats_in_bulk
+    results = []
+
+    def spy(*args, **kwargs):
+        results.extend(create_seats_in_bulk(*args, **kwargs))
+        return results
+
+    monkeypatch.setattr(actions, "create_seats_in_bulk", spy)
+    client.force_authenticate(user=team.subscription.user)
+
+    data = ["x", {"email": "a@company.com"}, {"email": 1}, {"email": "taken@company.com"}]
+    resp = client.post(url(team), data, format="json")
+
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS
+    assert [(x["row"], x["email"]) for x in results] == [(1, "a@company.com"), (3, "taken@company.com")]
@@ -6,6 +6,7 @@ from ..views import (
     PlanFinancingSeatView,
     PlanFinancingTeamView,
     SubscriptionBillingTeamView,
+    SubscriptionSeatBulkView,
     SubscriptionSeatView,
 )
 
@@ -27,6 +28,11 @@ urlpatterns = [
         SubscriptionSeatView.as_view(),
         name="subscription_id_billing_team_seat",
     ),
+    path(
+        "subscription/<int:subscription_id>/billing-team/seat/bulk",
+        SubscriptionSeatBulkView.as_view(),
+        name="subscription_id_billing_team_seat_bulk",
+    ),
     path(
         "subscription/<int:subscription_id>/billing-team/seat/<int:seat_id>",
         SubscriptionSeatView.as_view(),
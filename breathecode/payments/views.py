@@ -1,3 +1,5 @@
+import csv
+import io
 from datetime import timedelta
 from typing import Any
 
@@ -108,9 +110,10 @@ from breathecode.payments.serializers import (
 from breathecode.payments.services.coinbase import CoinbaseCommerce
 from breathecode.payments.services.stripe import Stripe
 from breathecode.payments.signals import reimburse_service_units
-from breathecode.utils import APIViewExtensions, getLogger, validate_conversion_info
+from breathecode.utils import APIViewExtensions, getLogger, response_207, validate_conversion_info
 from breathecode.utils.decorators.capable_of import capable_of
 from breathecode.utils.decorators.consume import discount_consumption_sessions
+from breathecode.utils.multi_status_response import MultiStatusResponse
 from breathecode.utils.redis import Lock
 
 logger = getLogger(__name__)
@@ -2571,16 +2574,16 @@ class ConsumeView(APIView):
             if session:
                 return Response({"id": session.id, "status": "ok"}, status=status.HTTP_200_OK)
 
-        consumables = Consumable.list(user=request.user, lang=lang, service=service_slug, service_type="VOID")
+        consumable = None
+        if actions.get_consumable_balance(request.user.id, service_slug) != 0:
+            consumables = Consumable.list(user=request.user, lang=lang, service=service_slug, service_type="VOID")
+            consumable = discount_consumption_sessions(consumables).first()
 
-        consumables = discount_consumption_sessions(consumables)
-        if consumables.count() == 0:
+        if consumable is None:
             raise PaymentException(
                 translation(lang, en="Insuficient credits", es="Créditos insuficientes", slug="insufficient-credits")
             )
 
-        consumable = consumables.first()
-
         session_duration = consumable.service_item.service.session_duration or timedelta(minutes=1)
         session = ConsumptionSession.build_session(
             request,
@@ -5979,6 +5982,140 @@ class SubscriptionSeatView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class SubscriptionSeatBulkView(SubscriptionSeatView):
+    """Add many seats to a subscription's billing team from a JSON list or a CSV file."""
+
+    http_method_names = ["post", "options"]
+    max_rows = 1000
+
+    def _get_rows(self, request, lang: str) -> tuple[list[tuple[int, dict[str, Any]]], list[actions.SeatResult]]:
+        """Read the rows of the request, it returns the valid rows with their index and the failures of the rest."""
+
+        if file := request.FILES.get("file"):
+            try:
+                content = file.read().decode("utf-8-sig")
+
+            except UnicodeDecodeError:
+                raise ValidationException(
+                    translation(
+                        lang,
+                        en="The file must be a UTF-8 encoded CSV",
+                        es="El archivo debe ser un CSV codificado en UTF-8",
+                        slug="bad-file-format",
+                    ),
+                    code=400,
+                )
+
+            rows = [{k.strip().lower(): v for k, v in x.items() if k} for x in csv.DictReader(io.StringIO(content))]
+
+        elif isinstance(request.data, list):
+            rows = request.data
+
+        else:
+            rows = request.data.get("seats", [])
+
+        if not isinstance(rows, list):
+            raise ValidationException(
+                translation(
+                    lang,
+                    en="Seats must be a list of objects",
+                    es="Los asientos deben ser una lista de objetos",
+                    slug="seats-must-be-a-list",
+                ),
+                code=400,
+            )
+
+        if not rows:
+            raise ValidationException(
+                translation(lang, en="Seats are required", es="Los asientos son requeridos", slug="seats-required"),
+                code=400,
+            )
+
+        if len(rows) > self.max_rows:
+            raise ValidationException(
+                translation(
+                    lang,
+                    en=f"You can add up to {self.max_rows} seats at once",
+                    es=f"Puedes agregar hasta {self.max_rows} asientos a la vez",
+                    slug="too-many-seats",
+                ),
+                code=400,
+            )
+
+        valid = []
+        invalid: list[actions.SeatResult] = []
+        for row, obj in enumerate(rows):
+            if not isinstance(obj, dict):
+                slug = "seat-must-be-an-object"
+                detail = translation(
+                    lang, en="Each seat must be an object", es="Cada asiento debe ser un objeto", slug=slug
+                )
+                email = ""
+
+            elif not isinstance(email := obj.get("email") or "", str):
+                slug = "email-must-be-a-string"
+                detail = translation(lang, en="The email must be a string", es="El correo debe ser un texto", slug=slug)
+                email = str(email)
+
+            else:
+                valid.append((row, {**obj, "email": email, "user": obj.get("user") or None}))
+                continue
+
+            invalid.append({"row": row, "email": email, "code": 400, "slug": slug, "detail": detail, "seat": None})
+
+        return valid, invalid
+
+    def post(self, request, subscription_id: int):
+        lang = get_user_language(request)
+
+        subscription = self._get_subscription(subscription_id, lang)
+
+        if request.user.id != subscription.user_id:
+            raise ValidationException(
+                translation(
+                    lang,
+                    en="Only the owner can manage team members",
+                    es="Solo el dueño puede gestionar miembros del equipo",
+                    slug="only-owner-allowed",
+                ),
+                code=403,
+            )
+
+        seats, invalid = self._get_rows(request, lang)
+        add_seats = actions.normalize_add_seats([x for _, x in seats])
+        team = self._get_team(subscription, lang)
+
+        results = actions.create_seats_in_bulk(add_seats, team, lang) if add_seats else []
+
+        # the rows of the results are relative to the valid ones, they are reported by their index in the request
+        for result in results:
+            result["row"] = seats[result["row"]][0]
+
+        results = sorted(invalid + results, key=lambda x: x["row"])
+
+        created = [x["seat"] for x in results if x["seat"]]
+        failures: dict[tuple[int, str], list[dict[str, Any]]] = {}
+        for result in results:
+            if result["seat"] is None:
+                failures.setdefault((result["code"], result["slug"]), []).append(result)
+
+        responses = []
+        if created:
+            responses.append(MultiStatusResponse(code=201, queryset=created))
+
+        for (code, slug), rows in failures.items():
+            responses.append(
+                MultiStatusResponse(
+                    rows[0]["detail"],
+                    code=code,
+                    slug=slug,
+                    queryset=[SubscriptionSeat(email=x["email"]) for x in rows],
+                )
+            )
+
+        return response_207(responses, "email")
+
+
 class PlanFinancingTeamView(APIView):
     """Manage PlanFinancing team (read-only for now)."""
 
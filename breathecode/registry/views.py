@@ -897,7 +897,7 @@ class AssetView(APIView, GenerateLookupsMixin):
     """
 
     permission_classes = [AllowAny]
-    extensions = APIViewExtensions(cache=AssetCache, sort="-published_at", paginate=True)
+    extensions = APIViewExtensions(cache=AssetCache, swr=True, sort="-published_at", paginate=True)
 
     def get(self, request, asset_slug=None):
         handler = self.extensions(request)
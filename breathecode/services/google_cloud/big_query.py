@@ -2,6 +2,7 @@ import datetime
 import os
 from typing import Any, Optional
 
+from django.core.cache import cache
 from django.db.models import Avg, Count, Sum
 from google.api_core.client_options import ClientOptions
 from google.auth.credentials import AnonymousCredentials
@@ -14,6 +15,8 @@ from breathecode.services.google_cloud import credentials
 client = None
 engine = None
 
+SCHEMA_CACHE_TIMEOUT = 60 * 60 * 24
+
 __all__ = ["BigQuery"]
 
 
@@ -97,15 +100,25 @@ class BigQuerySet:
     def new(self, **kwargs) -> BigQueryModel:
         return BigQueryModel(client, self.project_id, self.dataset, self.table, **kwargs)
 
-    def bulk_insert(self, rows: list[dict[str, Any]]) -> None:
+    def bulk_insert(self, rows: list[dict[str, Any]], schema: Optional[list[SchemaField]] = None) -> None:
+        """
+        Insert rows into the table.
+
+        If the schema is provided and the table was not fetched yet, the rows are inserted without fetching it.
+        """
+
         if len(rows) == 0:
             return None
 
         if isinstance(rows[0], BigQueryModel):
             rows = [x.__dict__ for x in rows]
 
-        table = self._get_table()
-        errors = self.client.insert_rows(table, rows)
+        if schema is not None and self._table_ref is None:
+            errors = self.client.insert_rows(f"{self.dataset}.{self.table}", rows, selected_fields=schema)
+
+        else:
+            table = self._get_table()
+            errors = self.client.insert_rows(table, rows)
 
         if errors:
             raise Exception(errors)
@@ -114,11 +127,41 @@ class BigQuerySet:
         table = self._get_table()
         return table.schema
 
+    def _schema_cache_key(self) -> str:
+        return f"bigquery:schema:{self.project_id}.{self.dataset}.{self.table}"
+
+    def _cache_schema(self, table: Table) -> None:
+        data = {"schema": [x.to_api_repr() for x in table.schema]}
+        cache.set(self._schema_cache_key(), data, SCHEMA_CACHE_TIMEOUT)
+
+    def cached_schema(self) -> list[SchemaField]:
+        """
+        Get the schema of the table, it is fetched from BigQuery only if it is not cached.
+
+        The cached schema is not compared with the table, a change made outside of `update_schema` is fetched again
+        once it expires after `SCHEMA_CACHE_TIMEOUT`, or once an insert fails and the caller clears it.
+        """
+
+        data = cache.get(self._schema_cache_key())
+        if data is None:
+            table = self._get_table()
+            self._cache_schema(table)
+            return table.schema
+
+        return [SchemaField.from_api_repr(x) for x in data["schema"]]
+
+    def clear_schema_cache(self) -> None:
+        cache.delete(self._schema_cache_key())
+
     def update_schema(self, schema: list[SchemaField]) -> None:
         table = self._get_table()
         table.schema = schema
 
-        self.client.update_table(table, ["schema"])
+        table = self.client.update_table(table, ["schema"])
+        if isinstance(table, Table):
+            self._table_ref = table
+
+        self._cache_schema(self._table_ref)
 
     def set_query(self, *args: Any, **kwargs: Any) -> None:
         self.query.update(kwargs)
@@ -376,6 +419,13 @@ class BigQuery(metaclass=BigQueryMeta):
 
         return res
 
+    @classmethod
+    def _with_fields(cls, field: SchemaField, fields: Schema) -> SchemaField:
+        # the subfields are read from the api representation, assigning `_fields` has no effect
+        data = field.to_api_repr()
+        data["fields"] = [x.to_api_repr() for x in fields]
+        return SchemaField.from_api_repr(data)
+
     @classmethod
     def join_schemas(
         cls,
@@ -400,7 +450,7 @@ class BigQuery(metaclass=BigQueryMeta):
             for key in common:
                 new_field = new[key]
                 if new_field.field_type == bigquery.enums.SqlTypeNames.STRUCT:
-                    new_field._fields = cls.join_schemas(res[key].fields, new_field.fields)
+                    new_field = cls._with_fields(new_field, cls.join_schemas(res[key].fields, new_field.fields))
                     res[key] = new_field
 
                 elif new_field != res[key]:
@@ -430,8 +480,8 @@ class BigQuery(metaclass=BigQueryMeta):
         for key in common:
             new_field = new[key]
             if new_field.field_type == bigquery.enums.SqlTypeNames.STRUCT:
-                new_field._fields = cls.schema_difference(old[key].fields, new_field.fields)
-                if len(new_field._fields) > 0:
+                new_field = cls._with_fields(new_field, cls.schema_difference(old[key].fields, new_field.fields))
+                if len(new_field.fields) > 0:
                     res.append(new_field)
 
             elif new_field != old[key]:
@@ -439,6 +489,25 @@ class BigQuery(metaclass=BigQueryMeta):
 
         return res
 
+    @classmethod
+    def _field_paths(cls, schema: Schema, prefix: str = "") -> set[str]:
+        res = set()
+
+        for field in schema:
+            path = prefix + field.name
+            res.add(path)
+
+            if field.field_type in [bigquery.enums.SqlTypeNames.STRUCT, "RECORD"]:
+                res |= cls._field_paths(field.fields, path + ".")
+
+        return res
+
+    @classmethod
+    def has_new_fields(cls, schema: Schema, new_schema: Schema) -> bool:
+        """Check if the new schema has fields that the original one has not, the types are not compared."""
+
+        return len(cls._field_paths(new_schema) - cls._field_paths(schema)) > 0
+
     @classmethod
     def merge_schema(cls, diff: Schema, schema: Schema) -> BigQuerySet:
         """Add the difference of the new schema to the original"""
@@ -458,15 +527,19 @@ class BigQuery(metaclass=BigQueryMeta):
 
         for key in diff_map:
             new_field = diff_map[key]
-            if new_field.field_type == bigquery.enums.SqlTypeNames.STRUCT:
+            if new_field.field_type == bigquery.enums.SqlTypeNames.STRUCT and key in schema_map:
                 old_field = schema_map[key]
 
-                new_field._fields = cls.merge_schema(new_field.fields, old_field.fields)
+                new_field = cls._with_fields(new_field, cls.merge_schema(new_field.fields, old_field.fields))
 
-                if len(new_field._fields) > 0:
+                if len(new_field.fields) > 0:
                     res.append(new_field)
 
             elif key not in schema_map:
                 res.append(new_field)
 
+            # the type of an existing column cannot be changed, it is kept as is
+            else:
+                res.append(schema_map[key])
+
         return res
@@ -122,6 +122,7 @@ MIDDLEWARE = [
     "breathecode.middlewares.static_redirect_middleware",
     "breathecode.middlewares.set_service_header_middleware",
     "breathecode.middlewares.detect_pagination_issues_middleware",
+    "breathecode.middlewares.release_cache_rebuild_locks_middleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     # Cache
@@ -450,7 +451,7 @@ if IS_TEST_ENV:
         fake = 1
 
         def delete_pattern(self, pattern):
-            for key in self._cache.keys():
+            for key in list(self._cache.keys()):
                 if fnmatch.fnmatch(key, pattern):
                     del self._cache[key]
 
@@ -1,10 +1,11 @@
 import functools
 import logging
 import os
+import time
 from typing import Optional
 from breathecode.utils.api_view_extensions.extension_base import ExtensionBase
 from breathecode.utils.api_view_extensions.priorities.response_order import ResponseOrder
-from breathecode.utils.cache import Cache
+from breathecode.utils.cache import Cache, canonical_encoding
 from django.http import HttpResponse
 from rest_framework import status
 
@@ -26,8 +27,27 @@ def user_timeout():
 
 
 @functools.lru_cache(maxsize=1)
-def use_gzip():
-    return os.getenv("USE_GZIP", "0").lower() in ENABLE_LIST_OPTIONS
+def swr_timeout():
+    # seconds that a stale response can be served while it is rebuilt
+    return 60 * int(os.getenv("SWR_CACHE_MINUTES", 10))
+
+
+@functools.lru_cache(maxsize=1)
+def rebuild_timeout():
+    # seconds that a worker can take to rebuild a response, the concurrent requests wait for it
+    return int(os.getenv("SWR_REBUILD_SECONDS", 10))
+
+
+POLL_INTERVAL = 0.05
+# attribute of the request with the extensions that hold a rebuild lock
+REBUILDS_ATTR = "_cache_rebuilds"
+
+
+def release_rebuild_locks(request) -> None:
+    """Release the rebuild locks of a request that did not build its response, like when its view raised."""
+
+    for extension in getattr(request, REBUILDS_ATTR, []):
+        extension._release_rebuild_lock()
 
 
 class CacheExtension(ExtensionBase):
@@ -36,24 +56,32 @@ class CacheExtension(ExtensionBase):
     _cache_per_user: bool
     _cache_prefix: str
     _encoding: Optional[str]
+    _swr: int
+    _rebuild_params: Optional[dict]
 
     def __init__(self, cache: Cache, **kwargs) -> None:
         self._cache = cache()
         self._encoding = None
+        self._rebuild_params = None
 
-    def _optional_dependencies(self, cache_per_user: bool = False, cache_prefix: str = "", **kwargs):
+    def _optional_dependencies(
+        self, cache_per_user: bool = False, cache_prefix: str = "", swr: bool | int = False, **kwargs
+    ):
         self._cache_per_user = cache_per_user
         self._cache_prefix = cache_prefix
 
+        # stale-while-revalidate, it can be True or the seconds that a stale response can be served
+        self._swr = swr_timeout() if swr is True else int(swr or 0)
+
     def _instance_name(self) -> Optional[str]:
         return "cache"
 
     def _get_encoding(self) -> Optional[str]:
-        # zstd should be the standard if we require more processing power in the future
-        # including the encoding in the params allow to support compression encoding
+        # the responses are stored in the canonical encoding, the other encodings are transcoded on the fly
         encoding = self._request.META.get("HTTP_ACCEPT_ENCODING", "")
-        if "gzip" in encoding and use_gzip():
-            return "gzip"
+        canonical = canonical_encoding()
+        if canonical in encoding:
+            return canonical
 
         elif "br" in encoding or "*" in encoding:
             return "br"
@@ -79,9 +107,8 @@ class CacheExtension(ExtensionBase):
         if lang := self._request.META.get("HTTP_ACCEPT_LANGUAGE"):
             extends["request.headers.accept-language"] = lang
 
-        if encoding := self._get_encoding():
-            extends["request.headers.accept-encoding"] = encoding
-            self._encoding = encoding
+        # the encoding is not part of the key, the same payload is served to every encoding
+        self._encoding = self._get_encoding()
 
         if accept := self._request.META.get("HTTP_ACCEPT"):
             extends["request.headers.accept"] = accept
@@ -106,6 +133,9 @@ class CacheExtension(ExtensionBase):
             params = self._get_params()
             res = self._cache.get(params, encoding=self._encoding)
 
+            if res is None and self._swr:
+                res = self._get_while_revalidating(params)
+
             if res is None:
                 return None
 
@@ -118,6 +148,57 @@ class CacheExtension(ExtensionBase):
             logger.exception("Error while trying to get the cache")
             return None
 
+    def _get_while_revalidating(self, params: dict) -> Optional[tuple]:
+        """
+        Get a response while other worker rebuilds it.
+
+        Only the worker that acquires the lock rebuilds the response, the others serve the stale one or wait for
+        the rebuild instead of running the same query.
+        """
+
+        if self._acquire_rebuild_lock(params):
+            return None
+
+        if res := self._cache.get_stale(params, encoding=self._encoding):
+            return res
+
+        deadline = time.monotonic() + rebuild_timeout()
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+
+            if res := self._cache.get(params, encoding=self._encoding):
+                return res
+
+            # the lock was released without a response, the worker failed, so this one rebuilds it
+            if self._acquire_rebuild_lock(params):
+                return None
+
+        return None
+
+    def _acquire_rebuild_lock(self, params: dict) -> bool:
+        if not self._cache.lock(params, timeout=rebuild_timeout()):
+            return False
+
+        self._rebuild_params = params
+
+        # release_rebuild_locks releases it at the end of the request if the view raises before building the response
+        request = getattr(self._request, "_request", self._request)
+        request.__dict__.setdefault(REBUILDS_ATTR, []).append(self)
+        return True
+
+    def _release_rebuild_lock(self) -> None:
+        if self._rebuild_params is None:
+            return
+
+        params = self._rebuild_params
+        self._rebuild_params = None
+
+        try:
+            self._cache.unlock(params)
+
+        except Exception:
+            logger.exception("Error while trying to release the rebuild lock")
+
     def _get_order_of_response(self) -> int:
         return int(ResponseOrder.CACHE)
 
@@ -141,7 +222,14 @@ class CacheExtension(ExtensionBase):
             timeout = user_timeout()
 
         try:
-            res = self._cache.set(data, format=format, params=params, timeout=timeout, encoding=self._encoding)
+            res = self._cache.set(
+                data,
+                format=format,
+                params=params,
+                timeout=timeout,
+                encoding=self._encoding,
+                stale_timeout=self._swr or None,
+            )
             data = res["content"]
             headers = {
                 **headers,
@@ -151,4 +239,7 @@ class CacheExtension(ExtensionBase):
         except Exception:
             logger.exception("Error while trying to set the cache")
 
+        finally:
+            self._release_rebuild_lock()
+
         return (data, headers)
@@ -15,6 +15,7 @@ import zstandard
 from circuitbreaker import circuit
 from django.core.cache import cache
 from django.db import models
+from django.db.models import Q
 from django.db.models.fields.related_descriptors import (
     ForwardManyToOneDescriptor,
     ForwardOneToOneDescriptor,
@@ -28,9 +29,118 @@ CACHE_DESCRIPTORS: dict[models.Model, Cache] = {}
 CACHE_DEPENDENCIES: set[models.Model] = set()
 
 ENABLE_LIST_OPTIONS = ["true", "1", "yes", "y"]
+# above this number of related instances a dependency is cleared completely instead of by tags
+MAX_TAGGED_INSTANCES = 1000
+# number of keys sent per UNLINK command
+DELETE_BATCH_SIZE = 1000
 IS_DJANGO_REDIS = hasattr(cache, "fake") is False
 
 
+def get_redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def _is_wrong_type(result) -> bool:
+    from redis.exceptions import ResponseError
+
+    return isinstance(result, ResponseError) and str(result).startswith("WRONGTYPE")
+
+
+def _raise_errors(results: list) -> None:
+    for result in results:
+        if isinstance(result, Exception) and not _is_wrong_type(result):
+            raise result
+
+
+def add_to_indexes(indexes: dict[str, set[str]]) -> None:
+    """Add keys to the key indexes, in Redis they are native sets, so it does not need to read the indexes."""
+
+    if not indexes:
+        return
+
+    if IS_DJANGO_REDIS:
+        items = list(indexes.items())
+        with get_redis().pipeline(transaction=False) as pipe:
+            for index_key, keys in items:
+                pipe.sadd(cache.make_key(index_key), *keys)
+
+            results = pipe.execute(raise_on_error=False)
+
+        _raise_errors(results)
+
+        # the previous versions stored the indexes as pickled sets, they are replaced along with the keys they index
+        legacy = {index_key: keys for (index_key, keys), result in zip(items, results) if _is_wrong_type(result)}
+        if legacy:
+            delete_keys(set(legacy) | get_indexed_keys(legacy))
+
+            with get_redis().pipeline(transaction=False) as pipe:
+                for index_key, keys in legacy.items():
+                    pipe.sadd(cache.make_key(index_key), *keys)
+
+                pipe.execute()
+
+        return
+
+    for index_key, keys in indexes.items():
+        index = cache.get(index_key) or set()
+        index.update(keys)
+        cache.set(index_key, index)
+
+
+def get_indexed_keys(index_keys: list[str] | set[str]) -> set[str]:
+    """Get the keys stored in the key indexes."""
+
+    keys = set()
+    if not index_keys:
+        return keys
+
+    if IS_DJANGO_REDIS:
+        index_keys = list(index_keys)
+        with get_redis().pipeline(transaction=False) as pipe:
+            for index_key in index_keys:
+                pipe.smembers(cache.make_key(index_key))
+
+            results = pipe.execute(raise_on_error=False)
+
+        _raise_errors(results)
+
+        for index_key, members in zip(index_keys, results):
+            # an index stored as a pickled set by the previous versions
+            if _is_wrong_type(members):
+                members = cache.get(index_key) or set()
+
+            keys.update(x.decode("utf-8") if isinstance(x, bytes) else x for x in members)
+
+        return keys
+
+    for index_key in index_keys:
+        if index := cache.get(index_key):
+            keys.update(index)
+
+    return keys
+
+
+def delete_keys(keys: set[str]) -> None:
+    """Delete the keys in a pipeline, UNLINK frees the memory in background."""
+
+    if not keys:
+        return
+
+    if IS_DJANGO_REDIS:
+        keys = [cache.make_key(x) for x in keys]
+        with get_redis().pipeline(transaction=False) as pipe:
+            for i in range(0, len(keys), DELETE_BATCH_SIZE):
+                pipe.unlink(*keys[i : i + DELETE_BATCH_SIZE])
+
+            pipe.execute()
+
+        return
+
+    cache.delete_many(keys)
+
+
 @functools.lru_cache(maxsize=1)
 def is_compression_enabled():
     return os.getenv("COMPRESSION", "1").lower() in ENABLE_LIST_OPTIONS
@@ -46,6 +156,69 @@ def use_gzip():
     return os.getenv("USE_GZIP", "0").lower() in ENABLE_LIST_OPTIONS
 
 
+@functools.lru_cache(maxsize=1)
+def canonical_encoding():
+    # every response is stored once with this encoding and transcoded for the clients that do not accept it
+    return "gzip" if use_gzip() else "zstd"
+
+
+# fast levels, the transcoding happens on each cache hit of the clients that do not accept the canonical encoding
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.compress(data)
+
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+    if encoding == "deflate":
+        return zlib.compress(data)
+
+    raise ValueError(f"Encoding {encoding} not supported")
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.decompress(data)
+
+    if encoding == "br":
+        return brotli.decompress(data)
+
+    if encoding == "gzip":
+        return gzip.decompress(data)
+
+    if encoding == "deflate":
+        return zlib.decompress(data)
+
+    raise ValueError(f"Encoding {encoding} not supported")
+
+
+def transcode(res: dict, encoding: Optional[str] = None) -> tuple[bytes, dict]:
+    """Get the content of a cached response in the encoding accepted by the client."""
+
+    headers = dict(res.get("headers", {}))
+    content = res.get("content", None)
+
+    stored_encoding = headers.get("Content-Encoding")
+    if stored_encoding is None or stored_encoding == encoding:
+        return content, headers
+
+    content = decompress(content, stored_encoding)
+    del headers["Content-Encoding"]
+
+    if encoding:
+        content = compress(content, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return content, headers
+
+
 def must_compress(data):
     size = min_compression_size()
     if size == 0:
@@ -116,6 +289,11 @@ class CacheMeta(type):
             cls.many_to_one = many_to_one_forward | reverse_many_to_one
             cls.many_to_many = many_to_many
 
+            # its responses can embed other instances of the model, like translations, which are not tagged
+            cls.is_self_related = any(
+                x.is_relation and x.related_model is model for x in [*model._meta.fields, *model._meta.many_to_many]
+            )
+
             # CACHE_DEPENDENCIES = (CACHE_DEPENDENCIES | one_to_one | reverse_one_to_one | many_to_one |
             #                       reverse_many_to_one | many_to_many)
 
@@ -133,6 +311,21 @@ def serializer(obj):
     raise TypeError("Type not serializable")
 
 
+def get_tags(data) -> tuple[set, bool]:
+    """
+    Get the primary keys of the instance serialized in a response.
+
+    It returns the primary keys found and if the response is a list, a list is any response that could be
+    affected by a change in an instance that it does not include yet, like a new instance matching its filters,
+    so it is not tagged by instance.
+    """
+
+    if isinstance(data, dict) and "id" in data and "results" not in data:
+        return {data["id"]}, False
+
+    return set(), True
+
+
 class Cache(metaclass=CacheMeta):
     _version_prefix: str = ""
     model: models.Model
@@ -140,6 +333,7 @@ class Cache(metaclass=CacheMeta):
     one_to_one: list[models.Model]
     many_to_one: list[models.Model]
     many_to_many: list[models.Model]
+    is_self_related: bool
 
     max_deep: int = 2
     is_dependency: bool = False
@@ -157,6 +351,106 @@ class Cache(metaclass=CacheMeta):
     def _generate_keys_key(cls):
         return f"{cls._version_prefix}{cls.model.__name__}__keys"
 
+    @classmethod
+    def _generate_tag_key(cls, pk):
+        return f"{cls._version_prefix}{cls.model.__name__}__tag__{pk}"
+
+    @classmethod
+    def _generate_lists_key(cls):
+        return f"{cls._version_prefix}{cls.model.__name__}__lists"
+
+    @classmethod
+    def _generate_tags_key(cls):
+        return f"{cls._version_prefix}{cls.model.__name__}__tags"
+
+    @classmethod
+    def _get_dependency(cls, model_cls: models.Model) -> Optional[Cache]:
+        # lazy load the dependency to can clean it
+        if model_cls not in CACHE_DESCRIPTORS and model_cls in CACHE_DEPENDENCIES:
+
+            class DepCache(Cache):
+                model = model_cls
+                is_dependency = True
+
+        return CACHE_DESCRIPTORS.get(model_cls)
+
+    @classmethod
+    def _get_related_pks(cls, model: models.Model, pks: set) -> Optional[set]:
+        """Get the primary keys of the instances of this cache related to the given instances of `model`."""
+
+        lookups = [
+            x.name for x in cls.model._meta.get_fields() if x.is_relation and x.related_model == model and x.name
+        ]
+        if not lookups:
+            return None
+
+        query = Q()
+        for lookup in lookups:
+            query |= Q(**{f"{lookup}__in": pks})
+
+        related = set(
+            cls.model.objects.filter(query).values_list("pk", flat=True).distinct()[: MAX_TAGGED_INSTANCES + 1]
+        )
+        if len(related) > MAX_TAGGED_INSTANCES:
+            return None
+
+        return related
+
+    @classmethod
+    @circuit
+    def invalidate(cls, pks: set, deep=0, max_deep=None, deleted=False, resolved=None) -> set:
+        """
+        Remove the cached responses that include any of the given instances.
+
+        The lists of this model are always removed because a change could make an instance match its filters, the
+        dependencies are invalidated by the instances related to the given ones, if they cannot be resolved, like
+        after a deletion, the dependency is cleared completely. A model related to itself is cleared completely
+        because its responses are only tagged by the top level instance.
+        """
+
+        if max_deep is None:
+            max_deep = cls.max_deep
+
+        if resolved is None:
+            resolved = set()
+
+        if cls.is_self_related:
+            resolved.update(cls.clear(deep=deep, max_deep=max_deep) or set())
+            resolved.add(cls)
+            return resolved
+
+        resolved.add(cls)
+
+        index_keys = {cls._generate_lists_key(), *[cls._generate_tag_key(pk) for pk in pks]}
+        keys_to_delete = index_keys | get_indexed_keys(index_keys)
+
+        if deep < max_deep:
+            for x in cls.one_to_one | cls.many_to_one | cls.many_to_many:
+                dep_cache_cls = cls._get_dependency(x)
+                if dep_cache_cls is None or dep_cache_cls in resolved:
+                    continue
+
+                related_pks = None if deleted else dep_cache_cls._get_related_pks(cls.model, pks)
+                if related_pks is None:
+                    resolved.update(dep_cache_cls.clear(deep=deep + 1, max_deep=max_deep) or set())
+                    resolved.add(dep_cache_cls)
+                    continue
+
+                if related_pks:
+                    dep_cache_cls.invalidate(
+                        related_pks, deep=deep + 1, max_deep=max_deep, deleted=deleted, resolved=resolved
+                    )
+
+                else:
+                    resolved.add(dep_cache_cls)
+                    dep_lists_key = dep_cache_cls._generate_lists_key()
+                    keys_to_delete.add(dep_lists_key)
+                    keys_to_delete.update(get_indexed_keys([dep_lists_key]))
+
+        delete_keys(keys_to_delete)
+
+        return resolved
+
     @classmethod
     @circuit
     def clear(cls, deep=0, max_deep=None) -> set | None:
@@ -171,8 +465,6 @@ class Cache(metaclass=CacheMeta):
         # Use the base key generated by _generate_key and append __keys
         cls_keys_key = cls._generate_keys_key()
         keys_to_delete.add(cls_keys_key)
-        if existing_keys := cache.get(cls_keys_key):
-            keys_to_delete.update(existing_keys)
 
         # Only recurse if max_deep has not been reached
         if deep < max_deep:
@@ -200,15 +492,16 @@ class Cache(metaclass=CacheMeta):
                         resolved = resolved.union(children)
 
         # Collect all keys to delete from resolved dependencies (including dynamic ones)
+        index_keys = set()
         for dep_cls in resolved:
             # Use the base key generated by _generate_key and append __keys
-            dep_keys_key = dep_cls._generate_keys_key()
-            keys_to_delete.add(dep_keys_key)
-            if existing_dep_keys := cache.get(dep_keys_key):
-                keys_to_delete.update(existing_dep_keys)
+            index_keys.add(dep_cls._generate_keys_key())
+            index_keys.add(dep_cls._generate_tags_key())
+            keys_to_delete.add(dep_cls._generate_lists_key())
 
-        if keys_to_delete:
-            cache.delete_many(keys_to_delete)
+        # __tags contains the tag indexes, so every index is read in one pipeline
+        keys_to_delete.update(index_keys | get_indexed_keys(index_keys))
+        delete_keys(keys_to_delete)
 
         # Return the set of resolved cache classes for potential use by callers
         # Only return dependencies resolved *within this call frame* if deep > 0
@@ -218,7 +511,38 @@ class Cache(metaclass=CacheMeta):
     @classmethod
     @circuit
     def keys(cls):
-        return cache.get(cls._generate_keys_key()) or set()
+        return get_indexed_keys([cls._generate_keys_key()])
+
+    @classmethod
+    @circuit
+    def get_stale(cls, data, encoding: Optional[str] = None) -> Optional[tuple]:
+        """Get the previous response, it is kept after invalidations until its soft TTL expires."""
+
+        res = cache.get(cls._generate_key(**data) + "__stale")
+        if res is None or hasattr(res, "get") is False:
+            return None
+
+        return transcode(res, encoding)
+
+    @classmethod
+    @circuit
+    def lock(cls, data, timeout: int = 10) -> bool:
+        """Acquire the lock to rebuild a response, it returns False if other worker is rebuilding it."""
+
+        key = cls._generate_key(**data) + "__lock"
+        if IS_DJANGO_REDIS:
+            return bool(get_redis().set(cache.make_key(key), 1, nx=True, ex=timeout))
+
+        if cache.get(key):
+            return False
+
+        cache.set(key, 1, timeout)
+        return True
+
+    @classmethod
+    @circuit
+    def unlock(cls, data) -> None:
+        cache.delete(cls._generate_key(**data) + "__lock")
 
     @classmethod
     @circuit
@@ -229,11 +553,8 @@ class Cache(metaclass=CacheMeta):
         if data is None or hasattr(data, "get") is False:
             return None
 
-        # Assume new format: dictionary with 'headers' and 'content'
-        headers = data.get("headers", {})
-        content = data.get("content", None)
-
-        return content, headers
+        # the response is stored once, it is transcoded to the encoding accepted by the client
+        return transcode(data, encoding)
 
     @classmethod
     @circuit
@@ -244,12 +565,19 @@ class Cache(metaclass=CacheMeta):
         timeout: int = -1,
         encoding: Optional[str] = None,
         params: Optional[dict] = None,
+        stale_timeout: Optional[int] = None,
     ) -> str:
-        """Set a key value pair on the cache in bytes, it reminds the format and compress the data if needed."""
+        """
+        Set a key value pair on the cache in bytes, it reminds the format and compress the data if needed.
+
+        If `stale_timeout` is provided, a copy is kept out of the indexes to be served while it is rebuilt.
+        """
 
         if params is None:
             params = {}
 
+        tags, is_list = get_tags(data)
+
         key = cls._generate_key(**params)
         res = {
             "headers": {
@@ -268,27 +596,11 @@ class Cache(metaclass=CacheMeta):
         else:
             data = data
 
-        # in kilobytes
-        if (compress := (must_compress(data) and is_compression_enabled())) and use_gzip():
-            res["content"] = gzip.compress(data)
-            res["headers"]["Content-Encoding"] = "gzip"
-
-        elif compress and encoding == "br":
-            res["content"] = brotli.compress(data)
-            res["headers"]["Content-Encoding"] = "br"
-
-        # faster option, it should be the standard in the future
-        elif compress and encoding == "zstd":
-            res["content"] = zstandard.compress(data)
-            res["headers"]["Content-Encoding"] = "zstd"
-
-        elif compress and encoding == "deflate":
-            res["content"] = zlib.compress(data)
-            res["headers"]["Content-Encoding"] = "deflate"
-
-        elif compress and encoding == "gzip":
-            res["content"] = gzip.compress(data)
-            res["headers"]["Content-Encoding"] = "gzip"
+        # in kilobytes, it is stored once in the canonical encoding, not once per encoding accepted
+        if must_compress(data) and is_compression_enabled():
+            stored_encoding = canonical_encoding()
+            res["content"] = compress(data, stored_encoding)
+            res["headers"]["Content-Encoding"] = stored_encoding
 
         else:
             res["content"] = data
@@ -301,9 +613,28 @@ class Cache(metaclass=CacheMeta):
         else:
             cache.set(key, res, timeout)
 
-        cls_keys_key = cls._generate_keys_key()
-        keys = cache.get(cls_keys_key) or set()
-        keys.add(key)
+        if stale_timeout:
+            cache.set(key + "__stale", res, stale_timeout)
+
+        # index the response by the instances it includes to remove it selectively
+        indexes = {cls._generate_keys_key(): {key}}
+        if tags:
+            tag_keys = {cls._generate_tag_key(pk) for pk in tags}
+            indexes[cls._generate_tags_key()] = tag_keys
+            indexes.update({x: {key} for x in tag_keys})
+
+        if is_list:
+            indexes[cls._generate_lists_key()] = {key}
+
+        add_to_indexes(indexes)
+
+        # the raw data is available here, so it avoids decompressing the canonical encoding
+        if "Content-Encoding" in res["headers"] and res["headers"]["Content-Encoding"] != encoding:
+            headers = {k: v for k, v in res["headers"].items() if k != "Content-Encoding"}
+            if encoding:
+                headers["Content-Encoding"] = encoding
+                data = compress(data, encoding)
+
+            return {"headers": headers, "content": data}
 
-        cache.set(cls_keys_key, keys)
         return res
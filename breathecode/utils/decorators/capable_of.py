@@ -1,12 +1,56 @@
-from asgiref.sync import sync_to_async
+import os
+from functools import lru_cache
+from typing import Iterable, Optional, TypedDict
+
 from capyc.rest_framework.exceptions import ValidationException
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django_redis import get_redis_connection
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.views import APIView
 
 from breathecode.utils.exceptions import ProgrammingError
+from breathecode.utils.local_cache import LocalCache
+
+__all__ = [
+    "capable_of",
+    "acapable_of",
+    "get_academy_from_capability",
+    "aget_academy_from_capability",
+    "invalidate_academy_capabilities",
+]
+
+IS_DJANGO_REDIS = hasattr(cache, "fake") is False
+
+# bumped when a role, a capability or the capabilities of a role change, they are shared by many users
+CAPABILITIES_VERSION_KEY = "capable_of:version"
+# bumped when the status of an academy changes, it is carried by the entries of all its members
+ACADEMY_CAPABILITIES_VERSION_KEY = "capable_of:version:academy:{academy_id}"
+CAPABILITIES_CACHE_KEY = "capable_of:{version}:{academy_version}:{user_id}:{academy_id}"
+
+
+class AcademyCapabilities(TypedDict):
+    # it is None when the user is not a member of the academy
+    academy_status: Optional[str]
+    capabilities: list[str]
+
+
+@lru_cache(maxsize=1)
+def get_capabilities_cache_ttl() -> int:
+    return int(os.getenv("CAPABILITIES_CACHE_TTL", "300"))
 
-__all__ = ["capable_of", "acapable_of", "get_academy_from_capability"]
+
+@lru_cache(maxsize=1)
+def get_local_capabilities_cache_ttl() -> int:
+    return int(os.getenv("LOCAL_CAPABILITIES_CACHE_TTL", "5"))
+
+
+@lru_cache(maxsize=1)
+def get_local_capabilities_cache_size() -> int:
+    return int(os.getenv("LOCAL_CAPABILITIES_CACHE_SIZE", "4096"))
+
+
+local_capabilities_cache = LocalCache(get_local_capabilities_cache_ttl, get_local_capabilities_cache_size)
 
 
 def capable_of(capability=None):
@@ -71,7 +115,7 @@ def acapable_of(capability=None):
             except IndexError:
                 raise ProgrammingError("Missing request information, use this decorator with DRF View")
 
-            academy_id = await sync_to_async(get_academy_from_capability)(kwargs, request, capability)
+            academy_id = await aget_academy_from_capability(kwargs, request, capability)
             if academy_id:
                 kwargs["academy_id"] = academy_id
                 # add the new kwargs argument to the context to be used by APIViewExtensions
@@ -83,9 +127,7 @@ def acapable_of(capability=None):
     return decorator
 
 
-def get_academy_from_capability(kwargs, request, capability):
-    from breathecode.authenticate.models import ProfileAcademy
-
+def get_academy_id(kwargs, request) -> str:
     academy_id = None
 
     if (
@@ -114,19 +156,140 @@ def get_academy_from_capability(kwargs, request, capability):
     if isinstance(request.user, AnonymousUser):
         raise PermissionDenied("Invalid user")
 
-    capable = ProfileAcademy.objects.filter(
-        user=request.user.id, academy__id=academy_id, role__capabilities__slug=capability
+    return academy_id
+
+
+def serialize_academy_capabilities(rows: Iterable[tuple[str, Optional[str]]]) -> AcademyCapabilities:
+    academy_status = None
+    capabilities = set()
+
+    for status, capability in rows:
+        academy_status = status
+        if capability:
+            capabilities.add(capability)
+
+    return {"academy_status": academy_status, "capabilities": sorted(capabilities)}
+
+
+def get_capabilities_query(user_id: int, academy_id: int):
+    from breathecode.authenticate.models import ProfileAcademy
+
+    # one row per capability of each role that the user has in the academy
+    return ProfileAcademy.objects.filter(user__id=user_id, academy__id=academy_id).values_list(
+        "academy__status", "role__capabilities__slug"
+    )
+
+
+def get_capabilities_version_keys(academy_id: int) -> list[str]:
+    return [CAPABILITIES_VERSION_KEY, ACADEMY_CAPABILITIES_VERSION_KEY.format(academy_id=academy_id)]
+
+
+def get_capabilities_cache_key(user_id: int, academy_id: int, versions: dict[str, int]) -> str:
+    return CAPABILITIES_CACHE_KEY.format(
+        version=int(versions.get(CAPABILITIES_VERSION_KEY) or 0),
+        academy_version=int(versions.get(ACADEMY_CAPABILITIES_VERSION_KEY.format(academy_id=academy_id)) or 0),
+        user_id=user_id,
+        academy_id=academy_id,
     )
 
-    if capable.count() == 0:
+
+def get_academy_capabilities(user_id: int, academy_id: int) -> AcademyCapabilities:
+    """Get the capabilities of a user in an academy and the status of the academy, they are cached."""
+
+    local_key = (user_id, academy_id)
+    if entry := local_capabilities_cache.get(local_key):
+        return entry
+
+    versions = cache.get_many(get_capabilities_version_keys(academy_id))
+    key = get_capabilities_cache_key(user_id, academy_id, versions)
+
+    entry = cache.get(key)
+    if entry is None:
+        entry = serialize_academy_capabilities(get_capabilities_query(user_id, academy_id))
+        cache.set(key, entry, timeout=get_capabilities_cache_ttl())
+
+    local_capabilities_cache.set(local_key, entry)
+    return entry
+
+
+async def aget_academy_capabilities(user_id: int, academy_id: int) -> AcademyCapabilities:
+    """Async version of `get_academy_capabilities`."""
+
+    local_key = (user_id, academy_id)
+    if entry := local_capabilities_cache.get(local_key):
+        return entry
+
+    versions = await cache.aget_many(get_capabilities_version_keys(academy_id))
+    key = get_capabilities_cache_key(user_id, academy_id, versions)
+
+    entry = await cache.aget(key)
+    if entry is None:
+        entry = serialize_academy_capabilities([x async for x in get_capabilities_query(user_id, academy_id)])
+        await cache.aset(key, entry, timeout=get_capabilities_cache_ttl())
+
+    local_capabilities_cache.set(local_key, entry)
+    return entry
+
+
+def bump_version(key: str) -> None:
+    if IS_DJANGO_REDIS:
+        get_redis_connection("default").incr(cache.make_key(key))
+        return
+
+    cache.set(key, int(cache.get(key) or 0) + 1)
+
+
+def invalidate_academy_capabilities(*pairs: tuple[int, int]) -> None:
+    """Discard the capabilities of some (user_id, academy_id) pairs, call it without pairs to discard all of them."""
+
+    if not pairs:
+        local_capabilities_cache.clear()
+        bump_version(CAPABILITIES_VERSION_KEY)
+        return
+
+    keys = []
+    for user_id, academy_id in pairs:
+        local_capabilities_cache.delete((user_id, academy_id))
+
+        versions = cache.get_many(get_capabilities_version_keys(academy_id))
+        keys.append(get_capabilities_cache_key(user_id, academy_id, versions))
+
+    cache.delete_many(keys)
+
+
+def invalidate_academy_status(academy_id: int) -> None:
+    """Discard the capabilities of every member of an academy, they carry its status."""
+
+    # the local entries cannot be found by academy, but a status change is rare
+    local_capabilities_cache.clear()
+    bump_version(ACADEMY_CAPABILITIES_VERSION_KEY.format(academy_id=academy_id))
+
+
+def check_capability(request, academy_id, capability: str, entry: AcademyCapabilities) -> None:
+    if capability not in entry["capabilities"]:
         raise PermissionDenied(
             f"You (user: {request.user.id}) don't have this capability: {capability} for academy {academy_id}"
         )
 
-    academy = capable.first().academy
-    if academy.status == "DELETED":
+    if entry["academy_status"] == "DELETED":
         raise PermissionDenied("This academy is deleted")
-    if request.get_full_path() != "/v1/admissions/academy/activate" and academy.status == "INACTIVE":
+    if request.get_full_path() != "/v1/admissions/academy/activate" and entry["academy_status"] == "INACTIVE":
         raise PermissionDenied("This academy is not active")
 
+
+def get_academy_from_capability(kwargs, request, capability):
+    academy_id = get_academy_id(kwargs, request)
+
+    entry = get_academy_capabilities(request.user.id, int(academy_id))
+    check_capability(request, academy_id, capability, entry)
+
+    return academy_id
+
+
+async def aget_academy_from_capability(kwargs, request, capability):
+    academy_id = get_academy_id(kwargs, request)
+
+    entry = await aget_academy_capabilities(request.user.id, int(academy_id))
+    check_capability(request, academy_id, capability, entry)
+
     return academy_id
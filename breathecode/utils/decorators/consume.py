@@ -11,7 +11,7 @@ from capyc.core.managers import feature
 from capyc.rest_framework.exceptions import PaymentException, ValidationException
 from django.contrib.auth.models import AnonymousUser
 from django.core.handlers.wsgi import WSGIRequest
-from django.db.models import QuerySet, Sum
+from django.db.models import F, OuterRef, QuerySet, Subquery, Sum
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
@@ -185,14 +185,19 @@ def render_html_error(request, kwargs, service, e):
 
 
 def discount_consumption_sessions(consumables: QuerySet[T]) -> QuerySet[T]:
-    # exclude consumables that is being used in a session.
-    for item in consumables.filter(consumptionsession__status="PENDING").exclude(how_many=0):
-        sum = item.consumptionsession_set.filter(status="PENDING").aggregate(Sum("how_many"))
-
-        if item.how_many - sum["how_many__sum"] == 0:
-            consumables = consumables.exclude(id=item.id)
+    from breathecode.payments.models import ConsumptionSession
+
+    # exclude consumables that is being used in a session, it is evaluated as a subquery of the consumables.
+    pending = (
+        ConsumptionSession.objects.filter(consumable=OuterRef("pk"), status="PENDING")
+        .values("consumable")
+        .annotate(total=Sum("how_many"))
+        .values("total")
+    )
 
-    return consumables
+    return consumables.alias(pending_units=Subquery(pending)).exclude(
+        pending_units__isnull=False, how_many=F("pending_units")
+    )
 
 
 @sync_to_async
@@ -203,6 +208,7 @@ def adiscount_consumption_sessions(consumables: QuerySet[T]) -> QuerySet[T]:
 def consume(service: str, consumer: Optional[Consumer] = None, format: str = "json") -> callable:
     """Check if the current user can access to the resource through of permissions."""
 
+    from breathecode.payments import actions as payments_actions
     from breathecode.payments.models import Consumable, ConsumptionSession
 
     def decorator(function: callable) -> callable:
@@ -252,6 +258,13 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
                 **opts,
             }
 
+        def get_consumables(user: User) -> QuerySet:
+            # the users without units of this service are answered by their balance without querying the consumables
+            if payments_actions.get_consumable_balance(user.id, service) == 0:
+                return Consumable.objects.none()
+
+            return Consumable.list(user=user, service=service)
+
         def wrapper(*args, **kwargs):
             request = validate_and_get_request(service, args)
 
@@ -273,8 +286,7 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
                 if session:
                     return function(*args, **kwargs)
 
-                items = Consumable.list(user=request.user, service=service)
-                context["consumables"] = items
+                context["consumables"] = get_consumables(request.user)
 
                 flag_context = feature.context(context=context, kwargs=kwargs)
                 bypass_consumption = feature.is_enabled("payments.bypass_consumption", flag_context, False)
@@ -290,13 +302,14 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
                 if consumer and context["lifetime"]:
                     context["consumables"] = discount_consumption_sessions(context["consumables"])
 
-                if context["price"] and context["consumables"].count() == 0:
+                consumable = context["consumables"].first() if context["price"] else None
+                if context["price"] and consumable is None:
                     raise PaymentException(
                         f"You do not have enough credits to access this service: {service}",
                         slug="with-consumer-not-enough-consumables",
                     )
 
-                if context["price"] and context["lifetime"] and (consumable := context["consumables"].first()):
+                if context["price"] and context["lifetime"]:
                     session = ConsumptionSession.build_session(request, consumable, context["lifetime"])
 
                 # sync view method
@@ -307,8 +320,10 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
                     session.will_consume(context["price"])
 
                 elif it_will_consume:
-                    item = context["consumables"].first()
-                    consume_service.send_robust(instance=item, sender=item.__class__, how_many=context["price"])
+                    consume_service.send_robust(
+                        instance=consumable, sender=consumable.__class__, how_many=context["price"]
+                    )
+                    payments_actions.decrement_consumable_balance(request.user.id, service, context["price"])
 
                 return response
 
@@ -350,6 +365,10 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
         def async_get_user(request: AsyncRequest) -> User:
             return request.user
 
+        @sync_to_async
+        def aget_consumables(user: User) -> QuerySet:
+            return get_consumables(user)
+
         # TODO: reduce the difference between sync and async handlers
         async def async_wrapper(*args, **kwargs):
             nonlocal consumer
@@ -379,8 +398,7 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
 
                 user = await async_get_user(request)
 
-                items = await Consumable.alist(user=user, service=service)
-                context["consumables"] = items
+                context["consumables"] = await aget_consumables(user)
 
                 flag_context = feature.context(context=context, kwargs=kwargs)
                 bypass_consumption = feature.is_enabled("payments.bypass_consumption", flag_context, False)
@@ -399,13 +417,14 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
                 if consumer and context["lifetime"]:
                     context["consumables"] = await adiscount_consumption_sessions(context["consumables"])
 
-                if context["price"] and await context["consumables"].acount() == 0:
+                consumable = await context["consumables"].afirst() if context["price"] else None
+                if context["price"] and consumable is None:
                     raise PaymentException(
                         f"You do not have enough credits to access this service: {service}",
                         slug="with-consumer-not-enough-consumables",
                     )
 
-                if context["price"] and context["lifetime"] and (consumable := await context["consumables"].afirst()):
+                if context["price"] and context["lifetime"]:
                     session = await ConsumptionSession.abuild_session(request, consumable, context["lifetime"])
 
                 # sync view method
@@ -416,8 +435,12 @@ def consume(service: str, consumer: Optional[Consumer] = None, format: str = "js
                     await session.awill_consume(context["price"])
 
                 elif it_will_consume:
-                    item = await context["consumables"].afirst()
-                    consume_service.send_robust(instance=item, sender=item.__class__, how_many=context["price"])
+                    consume_service.send_robust(
+                        instance=consumable, sender=consumable.__class__, how_many=context["price"]
+                    )
+                    await sync_to_async(payments_actions.decrement_consumable_balance)(
+                        user.id, service, context["price"]
+                    )
 
                 return response
 
@@ -1,37 +1,154 @@
 import asyncio
 import logging
+import os
 import traceback
+from functools import lru_cache
 from typing import Any, Optional
 
 from adrf.requests import AsyncRequest
 from asgiref.sync import sync_to_async
 from capyc.rest_framework.exceptions import PaymentException, ValidationException
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Q
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django_redis import get_redis_connection
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from breathecode.authenticate.models import Permission, User
+from breathecode.utils.local_cache import LocalCache
 
 from ..exceptions import ProgrammingError
 
-__all__ = ["has_permission", "validate_permission"]
+__all__ = [
+    "has_permission",
+    "validate_permission",
+    "avalidate_permission",
+    "invalidate_user_permissions",
+    "invalidate_permissions",
+]
 
 logger = logging.getLogger(__name__)
 
+IS_DJANGO_REDIS = hasattr(cache, "fake") is False
+
+# bumped when the permissions of a group change, they are shared by many users
+PERMISSIONS_VERSION_KEY = "has_permission:version"
+# bumped when the direct permissions or the groups of a user change
+USER_PERMISSIONS_VERSION_KEY = "has_permission:version:{user_id}"
+PERMISSIONS_CACHE_KEY = "has_permission:{version}:{user_version}:{user_id}"
+
+
+@lru_cache(maxsize=1)
+def get_permissions_cache_ttl() -> int:
+    return int(os.getenv("PERMISSIONS_CACHE_TTL", "3600"))
+
+
+@lru_cache(maxsize=1)
+def get_local_permissions_cache_ttl() -> int:
+    return int(os.getenv("LOCAL_PERMISSIONS_CACHE_TTL", "5"))
+
+
+@lru_cache(maxsize=1)
+def get_local_permissions_cache_size() -> int:
+    return int(os.getenv("LOCAL_PERMISSIONS_CACHE_SIZE", "4096"))
+
+
+local_permissions_cache = LocalCache(get_local_permissions_cache_ttl, get_local_permissions_cache_size)
+
+
+def get_permissions_query(user_id: int):
+    # the direct permissions of the user and the ones of its groups
+    return (
+        Permission.objects.filter(Q(user__id=user_id) | Q(group__user__id=user_id))
+        .values_list("codename", flat=True)
+        .distinct()
+    )
+
+
+def get_permissions_cache_key(user_id: int, versions: dict[str, int]) -> str:
+    return PERMISSIONS_CACHE_KEY.format(
+        version=int(versions.get(PERMISSIONS_VERSION_KEY) or 0),
+        user_version=int(versions.get(USER_PERMISSIONS_VERSION_KEY.format(user_id=user_id)) or 0),
+        user_id=user_id,
+    )
+
+
+def get_user_permissions(user_id: int) -> frozenset[str]:
+    """Get the codenames of the effective permissions of a user, they are cached."""
+
+    if (permissions := local_permissions_cache.get(user_id)) is not None:
+        return permissions
+
+    versions = cache.get_many([PERMISSIONS_VERSION_KEY, USER_PERMISSIONS_VERSION_KEY.format(user_id=user_id)])
+    key = get_permissions_cache_key(user_id, versions)
+
+    codenames = cache.get(key)
+    if codenames is None:
+        codenames = sorted(get_permissions_query(user_id))
+        cache.set(key, codenames, timeout=get_permissions_cache_ttl())
+
+    permissions = frozenset(codenames)
+    local_permissions_cache.set(user_id, permissions)
+    return permissions
+
+
+async def aget_user_permissions(user_id: int) -> frozenset[str]:
+    """Async version of `get_user_permissions`."""
+
+    if (permissions := local_permissions_cache.get(user_id)) is not None:
+        return permissions
+
+    versions = await cache.aget_many([PERMISSIONS_VERSION_KEY, USER_PERMISSIONS_VERSION_KEY.format(user_id=user_id)])
+    key = get_permissions_cache_key(user_id, versions)
+
+    codenames = await cache.aget(key)
+    if codenames is None:
+        codenames = sorted([x async for x in get_permissions_query(user_id)])
+        await cache.aset(key, codenames, timeout=get_permissions_cache_ttl())
+
+    permissions = frozenset(codenames)
+    local_permissions_cache.set(user_id, permissions)
+    return permissions
+
+
+def bump_version(key: str) -> None:
+    if IS_DJANGO_REDIS:
+        get_redis_connection("default").incr(cache.make_key(key))
+        return
+
+    cache.set(key, int(cache.get(key) or 0) + 1)
+
+
+def invalidate_user_permissions(*user_ids: int) -> None:
+    """Discard the permissions of some users, it must be called when their permissions or groups change."""
+
+    for user_id in user_ids:
+        local_permissions_cache.delete(user_id)
+        bump_version(USER_PERMISSIONS_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_permissions() -> None:
+    """Discard the permissions of every user, it must be called when the permissions of a group change."""
+
+    local_permissions_cache.clear()
+    bump_version(PERMISSIONS_VERSION_KEY)
+
 
 def validate_permission(user: User, permission: str) -> bool:
-    found = Permission.objects.filter(codename=permission).first()
-    if not found:
+    if not user.id:
         return False
 
-    return found.user_set.filter(id=user.id).exists() or found.group_set.filter(user__id=user.id).exists()
+    return permission in get_user_permissions(user.id)
+
 
+async def avalidate_permission(user: User, permission: str) -> bool:
+    if not user.id:
+        return False
 
-@sync_to_async
-def avalidate_permission(user: User, permission: str) -> bool:
-    return validate_permission(user, permission)
+    return permission in await aget_user_permissions(user.id)
 
 
 # that must be remove from here
@@ -180,9 +297,12 @@ def has_permission(permission: str, format="json") -> callable:
                 response.status_code = 500
                 return response
 
-        @sync_to_async
-        def async_get_user(request: AsyncRequest) -> User:
-            return request.user
+        async def async_get_user(request: AsyncRequest) -> User:
+            # the async views authenticate the request before calling the handler
+            if hasattr(request, "_user"):
+                return request._user
+
+            return await sync_to_async(lambda: request.user)()
 
         async def async_wrapper(*args, **kwargs):
             request = validate_and_get_request(permission, args)
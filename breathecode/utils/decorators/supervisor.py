@@ -2,22 +2,34 @@ import asyncio
 import functools
 import inspect
 from datetime import timedelta
-from typing import Optional
+from typing import Literal, Optional
 
 from asgiref.sync import sync_to_async
 from django.utils import timezone
 
 from breathecode.monitoring.models import Supervisor, SupervisorIssue
 
-__all__ = ["supervisor", "paths"]
+__all__ = ["supervisor", "paths", "costs", "SupervisorCost", "SUPERVISOR_COSTS"]
+
+SupervisorCost = Literal["low", "medium", "high"]
+SUPERVISOR_COSTS: list[SupervisorCost] = ["low", "medium", "high"]
 
 paths = set()
+costs: dict[tuple[str, str], SupervisorCost] = {}
 
 
 def supervisor(
-    fn: Optional[callable] = None, delta: Optional[timedelta] = None, auto: bool = True, raises: bool = False
+    fn: Optional[callable] = None,
+    delta: Optional[timedelta] = None,
+    auto: bool = True,
+    raises: bool = False,
+    cost: SupervisorCost = "low",
 ):
-    """Create a supervisor (automated quality assurance)."""
+    """
+    Create a supervisor (automated quality assurance).
+
+    `cost` declares how expensive a run is, the runner can skip or stagger the expensive ones.
+    """
 
     def create_supervisor(fn: callable, delta: Optional[timedelta] = None, auto: bool = True, raises: bool = False):
 
@@ -114,6 +126,7 @@ def supervisor(
             delta = timedelta(hours=1)
 
         paths.add((fn.__module__, fn.__name__, delta))
+        costs[(fn.__module__, fn.__name__)] = cost
 
         if asyncio.iscoroutinefunction(fn) and inspect.isasyncgenfunction(fn):
             return async_wrapper
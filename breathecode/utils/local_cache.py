@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+__all__ = ["LocalCache"]
+
+
+class LocalCache:
+    """
+    Size bounded LRU that keeps some values of this process for a few seconds.
+
+    The invalidations only reach the process that made them, so its ttl must be shorter than the one of Redis.
+    """
+
+    def __init__(self, get_ttl: Callable[[], int], get_size: Callable[[], int]) -> None:
+        self._get_ttl = get_ttl
+        self._get_size = get_size
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+
+            if item[0] < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ttl = self._get_ttl()
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._get_size():
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -151,6 +151,10 @@ class CachePerUserTestView(CustomTestView):
     extensions = APIViewExtensions(cache=CohortCache, cache_per_user=True, sort="name", paginate=False)
 
 
+class SWRTestView(CustomTestView):
+    extensions = APIViewExtensions(cache=CohortCache, swr=60, sort="name", paginate=False)
+
+
 class CachePrefixTestView(CustomTestView):
     extensions = APIViewExtensions(
         cache=CohortCache, cache_prefix="the-beans-should-not-have-sugar", sort="name", paginate=False
@@ -907,3 +911,124 @@ class ApiViewExtensionsGetIdTestSuite(UtilsTestCase):
         }
         self.assertEqual(cache.get(key1), res)
         self.assertEqual(cache.get(key2), json_data)
+
+
+class ApiViewExtensionsSWRTestSuite(UtilsTestCase):
+    """
+    🔽🔽🔽 Stale-while-revalidate
+    """
+
+    def _get_key(self):
+        return "Cohort__" + urllib.parse.urlencode(
+            sorted(
+                {
+                    "id": 1,
+                    "request.path": "/the-beans-should-not-have-sugar/1",
+                }.items()
+            )
+        )
+
+    def test_swr__get__rebuild_and_keep_a_stale_copy(self):
+        model = self.bc.database.create(cohort=1)
+        key = self._get_key()
+
+        request = APIRequestFactory()
+        request = request.get(f"/the-beans-should-not-have-sugar/1")
+
+        view = SWRTestView.as_view()
+        response = view(request, id=1)
+        expected = GetCohortSerializer(model.cohort, many=False).data
+
+        self.assertEqual(json.loads(response.content.decode("utf-8")), expected)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        res = {
+            "headers": {
+                "Content-Type": "application/json",
+            },
+            "content": serialize_cache_value(expected),
+        }
+        self.assertEqual(cache.get(key), res)
+        self.assertEqual(cache.get(key + "__stale"), res)
+        self.assertEqual(cache.get(key + "__lock"), None)
+
+    def test_swr__get__serve_the_stale_copy_while_other_worker_rebuilds_it(self):
+        self.bc.database.create(cohort=1)
+        key = self._get_key()
+
+        stale = serialize_cache_object({"id": 1, "name": "stale"})
+        cache.set(key + "__stale", stale)
+        cache.set(key + "__lock", 1)
+
+        request = APIRequestFactory()
+        request = request.get(f"/the-beans-should-not-have-sugar/1")
+
+        view = SWRTestView.as_view()
+        response = view(request, id=1)
+
+        self.assertEqual(json.loads(response.content.decode("utf-8")), {"id": 1, "name": "stale"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cache.get(key), None)
+        self.assertEqual(cache.get(key + "__lock"), 1)
+
+    @patch(
+        "breathecode.utils.api_view_extensions.extensions.cache_extension.rebuild_timeout", MagicMock(return_value=1)
+    )
+    def test_swr__get__wait_for_the_rebuild_of_other_worker(self):
+        self.bc.database.create(cohort=1)
+        key = self._get_key()
+        rebuilt = serialize_cache_object({"id": 1, "name": "rebuilt"})
+
+        def rebuild(*args, **kwargs):
+            cache.set(key, rebuilt)
+
+        cache.set(key + "__lock", 1)
+
+        request = APIRequestFactory()
+        request = request.get(f"/the-beans-should-not-have-sugar/1")
+
+        view = SWRTestView.as_view()
+        with patch("time.sleep", MagicMock(side_effect=rebuild)):
+            response = view(request, id=1)
+
+        self.assertEqual(json.loads(response.content.decode("utf-8")), {"id": 1, "name": "rebuilt"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_swr__get__release_the_lock_if_the_view_raises(self):
+        from breathecode.middlewares import release_cache_rebuild_locks_middleware
+
+        key = self._get_key()
+
+        request = APIRequestFactory()
+        request = request.get(f"/the-beans-should-not-have-sugar/1")
+
+        view = SWRTestView.as_view()
+        middleware = release_cache_rebuild_locks_middleware(lambda request: view(request, id=1))
+        response = middleware(request)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(cache.get(key), None)
+        self.assertEqual(cache.get(key + "__lock"), None)
+
+    def test_swr__get__rebuild_it_if_the_other_worker_failed(self):
+        model = self.bc.database.create(cohort=1)
+        key = self._get_key()
+
+        def fail(*args, **kwargs):
+            cache.delete(key + "__lock")
+
+        cache.set(key + "__lock", 1)
+
+        request = APIRequestFactory()
+        request = request.get(f"/the-beans-should-not-have-sugar/1")
+
+        view = SWRTestView.as_view()
+        with patch("time.sleep", MagicMock(side_effect=fail)) as mock:
+            response = view(request, id=1)
+
+        expected = GetCohortSerializer(model.cohort, many=False).data
+
+        self.assertEqual(json.loads(response.content.decode("utf-8")), expected)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(cache.get(key + "__lock"), None)
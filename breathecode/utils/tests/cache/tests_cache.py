@@ -1,7 +1,7 @@
 import gzip
 import json
 import sys
-from unittest.mock import call, patch
+from unittest.mock import MagicMock, call, patch
 
 import brotli
 import pytest
@@ -50,6 +50,13 @@ class DynamicDepModel(models.Model):
         app_label = "tests"
 
 
+class SelfRelatedModel(models.Model):
+    translations = models.ManyToManyField("self", blank=True)
+
+    class Meta:
+        app_label = "tests"
+
+
 # Sample Cache classes
 
 
@@ -69,6 +76,10 @@ class ManyToManyRelatedModelCache(Cache):
     model = ManyToManyRelatedModel
 
 
+class SelfRelatedModelCache(Cache):
+    model = SelfRelatedModel
+
+
 # --- Test CacheMeta --- MOCKED, assuming meta runs on definition
 
 
@@ -214,23 +225,41 @@ def test_set_with_timeout():
             call("SimpleModel__keys", {"some_other_key"}),
             call("SimpleModel__x=y", {"headers": {"Content-Type": "application/json"}, "content": b'{"a": 1}'}, 300),
             call("SimpleModel__keys", {"SimpleModel__x=y"}),
+            call("SimpleModel__lists", {"SimpleModel__x=y"}),
         ]
         # Default timeout for keys set (should not use data timeout)
 
 
+@pytest.fixture
+def reset_compression():
+    from breathecode.utils import cache as bc_cache
+
+    def clear():
+        bc_cache.is_compression_enabled.cache_clear()
+        bc_cache.min_compression_size.cache_clear()
+        bc_cache.use_gzip.cache_clear()
+        bc_cache.canonical_encoding.cache_clear()
+
+    clear()
+    yield clear
+    clear()
+
+
 # Parametrize for different compression scenarios
 @pytest.mark.parametrize(
     "enable_compression, min_size_kb, use_gz, data_size_factor, expected_encoding",
     [
-        (True, 10, False, 5, None),  # Compression enabled, small data -> No compression
+        (True, 10, False, 0, None),  # Compression enabled, small data -> No compression
+        (True, 10, False, 15, "zstd"),  # Compression enabled, large data -> zstd, the canonical encoding
         (True, 10, True, 15, "gzip"),  # Compression enabled, large data, use_gz=True -> gzip
         (True, 0, True, 1, "gzip"),  # Compression enabled, min_size=0 -> gzip
         (False, 10, True, 15, None),  # Compression disabled -> No compression
-        # Add tests for br, zstd, deflate if needed by enabling different env vars or params
     ],
 )
-def test_set_compression(monkeypatch, enable_compression, min_size_kb, use_gz, data_size_factor, expected_encoding):
-    """Test Cache.set() applies compression based on env vars and data size."""
+def test_set_compression(
+    monkeypatch, reset_compression, enable_compression, min_size_kb, use_gz, data_size_factor, expected_encoding
+):
+    """Test Cache.set() stores the data once in the canonical encoding based on env vars and data size."""
     monkeypatch.setenv("COMPRESSION", "1" if enable_compression else "0")
     monkeypatch.setenv("MIN_COMPRESSION_SIZE", str(min_size_kb))
     monkeypatch.setenv("USE_GZIP", "1" if use_gz else "0")
@@ -238,9 +267,7 @@ def test_set_compression(monkeypatch, enable_compression, min_size_kb, use_gz, d
     # Invalidate lru_cache used in cache.py
     from breathecode.utils import cache as bc_cache
 
-    bc_cache.is_compression_enabled.cache_clear()
-    bc_cache.min_compression_size.cache_clear()
-    bc_cache.use_gzip.cache_clear()
+    reset_compression()
 
     params = {"large": True}
     # Create data larger than min_size_kb if needed
@@ -249,23 +276,45 @@ def test_set_compression(monkeypatch, enable_compression, min_size_kb, use_gz, d
     expected_key = SimpleModelCache._generate_key(**params)
 
     # Call set
-    result = SimpleModelCache.set(test_data, format="application/json", params=params)
+    result = SimpleModelCache.set(test_data, format="application/json", params=params, encoding=expected_encoding)
 
     assert result["headers"].get("Content-Encoding") == expected_encoding
 
     # Verify content is actually compressed if expected
     stored_value = cache.get(expected_key)
-    if expected_encoding == "gzip":
-        # Try decompressing to ensure it's valid gzip
-        try:
-            decompressed = gzip.decompress(stored_value["content"])
-            assert decompressed == json.dumps(test_data).encode("utf-8")
-        except gzip.BadGzipFile:
-            pytest.fail("Content has gzip header but is not valid gzip")
+    assert stored_value["headers"].get("Content-Encoding") == expected_encoding
+
+    if expected_encoding:
+        decompressed = bc_cache.decompress(stored_value["content"], expected_encoding)
+        assert decompressed == json.dumps(test_data).encode("utf-8")
+
     else:
         assert stored_value["content"] == json.dumps(test_data).encode("utf-8")
 
 
+@pytest.mark.parametrize("encoding", [None, "zstd", "br", "gzip", "deflate"])
+def test_get_transcodes_the_canonical_encoding(monkeypatch, reset_compression, encoding):
+    """Test Cache.get() serves the same stored response to every encoding."""
+    monkeypatch.setenv("MIN_COMPRESSION_SIZE", "0")
+
+    from breathecode.utils import cache as bc_cache
+
+    reset_compression()
+
+    params = {"id": 1}
+    test_data = {"id": 1, "name": "transcode me"}
+    SimpleModelCache.set(test_data, params=params, encoding="zstd")
+
+    content, headers = SimpleModelCache.get(params, encoding=encoding)
+
+    assert headers.get("Content-Encoding") == encoding
+    if encoding:
+        content = bc_cache.decompress(content, encoding)
+
+    assert content == json.dumps(test_data).encode("utf-8")
+    assert cache.get(SimpleModelCache._generate_key(**params))["headers"]["Content-Encoding"] == "zstd"
+
+
 def test_get_retrieves_stored_data_and_headers():
     """Test Cache.get() retrieves the correct content and headers."""
     test_data = {"name": "retrieve_me", "id": 99}
@@ -353,7 +402,7 @@ def test_clear_with_max_deep_zero():
         SimpleModelCache.clear(max_deep=0)
 
         # Assert delete_many was called with the correct keys
-        mock_delete_many.assert_called_once_with({sm_key, sm_keys_key})
+        mock_delete_many.assert_called_once_with({sm_key, sm_keys_key, "SimpleModel__lists", "SimpleModel__tags"})
 
     # Now verify the state AFTER the (mocked) clear call
     # Since delete_many was mocked, keys won't actually be deleted unless the mock does it.
@@ -392,3 +441,237 @@ def test_clear_with_dynamic_dependency():
     # Verify the keys for the dynamic dependency were also cleared
     assert cache.get(dyn_key) is None
     assert cache.get(dyn_keys_key) is None
+
+
+# --- Test tags --- #
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        ({"id": 1, "name": "x"}, ({1}, False)),
+        ([{"id": 1}, {"id": 2}, {"name": "x"}], (set(), True)),
+        ({"count": 2, "results": [{"id": 3}, {"id": 4}]}, (set(), True)),
+        ({"name": "x"}, (set(), True)),
+        ("<html></html>", (set(), True)),
+    ],
+)
+def test_get_tags(data, expected):
+    """Test get_tags detects the instance serialized and if the response is a list."""
+    from breathecode.utils.cache import get_tags
+
+    assert get_tags(data) == expected
+
+
+def test_set_indexes_response_by_tags():
+    """Test Cache.set() indexes a detail by its instance and a list in the __lists set."""
+    detail_key = SimpleModelCache._generate_key(pk=1)
+    list_key = SimpleModelCache._generate_key(page=1)
+
+    SimpleModelCache.set({"id": 1, "name": "x"}, params={"pk": 1})
+    SimpleModelCache.set([{"id": 1}, {"id": 2}], params={"page": 1})
+
+    assert cache.get("SimpleModel__tag__1") == {detail_key}
+    assert cache.get("SimpleModel__tag__2") is None
+    assert cache.get("SimpleModel__lists") == {list_key}
+    assert SimpleModelCache.keys() == {detail_key, list_key}
+
+
+def test_invalidate_removes_tagged_responses_and_lists():
+    """Test Cache.invalidate() only removes the responses of the instance and the lists."""
+    key1 = SimpleModelCache._generate_key(pk=1)
+    key2 = SimpleModelCache._generate_key(pk=2)
+    list_key = SimpleModelCache._generate_key(page=1)
+
+    SimpleModelCache.set({"id": 1}, params={"pk": 1})
+    SimpleModelCache.set({"id": 2}, params={"pk": 2})
+    SimpleModelCache.set([{"id": 1}, {"id": 2}], params={"page": 1})
+
+    SimpleModelCache.invalidate({1}, max_deep=0)
+
+    assert cache.get(key1) is None
+    assert cache.get(list_key) is None
+    assert cache.get("SimpleModel__tag__1") is None
+    assert cache.get("SimpleModel__lists") is None
+    assert cache.get(key2) is not None
+    assert cache.get("SimpleModel__tag__2") == {key2}
+
+
+def test_invalidate_dependencies_by_related_instances():
+    """Test Cache.invalidate() removes the responses of the related instances of the dependencies."""
+    related_key = OneToOneRelatedModelCache._generate_key(pk=7)
+    unrelated_key = OneToOneRelatedModelCache._generate_key(pk=8)
+    OneToOneRelatedModelCache.set({"id": 7}, params={"pk": 7})
+    OneToOneRelatedModelCache.set({"id": 8}, params={"pk": 8})
+
+    def get_related_pks(cls, model, pks):
+        return {7} if cls is OneToOneRelatedModelCache else set()
+
+    with patch.object(Cache, "_get_related_pks", classmethod(get_related_pks)):
+        SimpleModelCache.invalidate({1}, max_deep=1)
+
+    assert cache.get(related_key) is None
+    assert cache.get(unrelated_key) is not None
+
+
+def test_invalidate_deleted_clears_dependencies():
+    """Test Cache.invalidate(deleted=True) clears the dependencies because their relations are gone."""
+    o2o_key = OneToOneRelatedModelCache._generate_key(pk=7)
+    OneToOneRelatedModelCache.set({"id": 7}, params={"pk": 7})
+
+    with patch.object(Cache, "_get_related_pks") as mock_related_pks:
+        SimpleModelCache.invalidate({1}, max_deep=1, deleted=True)
+
+    assert mock_related_pks.call_count == 0
+    assert cache.get(o2o_key) is None
+    assert cache.get("OneToOneRelatedModel__keys") is None
+
+
+def test_invalidate_clears_the_models_related_to_themselves():
+    """Test Cache.invalidate() clears a model related to itself, its responses can embed other instances."""
+    key1 = SelfRelatedModelCache._generate_key(pk=1)
+    key2 = SelfRelatedModelCache._generate_key(pk=2)
+
+    SelfRelatedModelCache.set({"id": 1, "translations": {"es": "instance-2"}}, params={"pk": 1})
+    SelfRelatedModelCache.set({"id": 2}, params={"pk": 2})
+
+    assert SimpleModelCache.is_self_related is False
+    assert SelfRelatedModelCache.is_self_related is True
+
+    SelfRelatedModelCache.invalidate({2}, max_deep=0)
+
+    assert cache.get(key1) is None
+    assert cache.get(key2) is None
+    assert SelfRelatedModelCache.keys() == set()
+
+
+def test_clear_removes_tag_indexes():
+    """Test Cache.clear() removes the tag indexes listed in __tags."""
+    SimpleModelCache.set({"id": 1}, params={"pk": 1})
+
+    assert cache.get("SimpleModel__tags") == {"SimpleModel__tag__1"}
+
+    SimpleModelCache.clear(max_deep=0)
+
+    assert cache.get("SimpleModel__tag__1") is None
+    assert cache.get("SimpleModel__tags") is None
+
+
+# --- Test stale-while-revalidate --- #
+
+
+def test_set_keeps_a_stale_copy_after_invalidations():
+    """Test Cache.set(stale_timeout=...) keeps a copy that is not removed by invalidations."""
+    params = {"pk": 1}
+    SimpleModelCache.set({"id": 1}, params=params, stale_timeout=60)
+
+    SimpleModelCache.invalidate({1}, max_deep=0)
+
+    assert SimpleModelCache.get(params) is None
+    assert SimpleModelCache.get_stale(params) == (b'{"id": 1}', {"Content-Type": "application/json"})
+
+
+def test_lock_is_acquired_once():
+    """Test Cache.lock() only can be acquired again after Cache.unlock()."""
+    params = {"pk": 1}
+
+    assert SimpleModelCache.lock(params) is True
+    assert SimpleModelCache.lock(params) is False
+
+    SimpleModelCache.unlock(params)
+
+    assert SimpleModelCache.lock(params) is True
+
+
+# --- Test Redis key indexes --- #
+
+
+@pytest.fixture
+def redis_pipe(monkeypatch):
+    from breathecode.utils import cache as bc_cache
+
+    pipe = MagicMock()
+    redis = MagicMock()
+    redis.pipeline.return_value.__enter__.return_value = pipe
+
+    monkeypatch.setattr(bc_cache, "IS_DJANGO_REDIS", True)
+    monkeypatch.setattr(bc_cache, "get_redis", lambda: redis)
+    monkeypatch.setattr(cache, "make_key", lambda key, *args, **kwargs: f":1:{key}", raising=False)
+
+    yield pipe
+
+
+def test_add_to_indexes_with_redis(redis_pipe):
+    """Test add_to_indexes adds the keys to native Redis sets in one pipeline."""
+    from breathecode.utils.cache import add_to_indexes
+
+    redis_pipe.execute.return_value = [1, 1]
+
+    add_to_indexes({"SimpleModel__keys": {"SimpleModel__a=1"}, "SimpleModel__lists": {"SimpleModel__a=1"}})
+
+    assert redis_pipe.sadd.call_args_list == [
+        call(":1:SimpleModel__keys", "SimpleModel__a=1"),
+        call(":1:SimpleModel__lists", "SimpleModel__a=1"),
+    ]
+    assert redis_pipe.execute.call_args_list == [call(raise_on_error=False)]
+
+
+def test_get_indexed_keys_with_redis(redis_pipe):
+    """Test get_indexed_keys reads every Redis set in one pipeline."""
+    from breathecode.utils.cache import get_indexed_keys
+
+    redis_pipe.execute.return_value = [{b"SimpleModel__a=1"}, {b"SimpleModel__a=2", b"SimpleModel__a=1"}]
+
+    assert get_indexed_keys(["SimpleModel__keys", "SimpleModel__lists"]) == {"SimpleModel__a=1", "SimpleModel__a=2"}
+    assert redis_pipe.smembers.call_args_list == [call(":1:SimpleModel__keys"), call(":1:SimpleModel__lists")]
+
+
+def test_add_to_indexes_with_a_legacy_index(redis_pipe, monkeypatch):
+    """Test add_to_indexes replaces an index stored as a pickled set, removing the keys it indexes."""
+    from redis.exceptions import ResponseError
+
+    from breathecode.utils import cache as bc_cache
+
+    wrong_type = ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+    redis_pipe.execute.side_effect = [[wrong_type, 1], [wrong_type], [1], [1]]
+    monkeypatch.setattr(cache, "get", MagicMock(return_value={"SimpleModel__a=0"}))
+
+    bc_cache.add_to_indexes({"SimpleModel__keys": {"SimpleModel__a=1"}, "SimpleModel__lists": {"SimpleModel__a=1"}})
+
+    assert redis_pipe.sadd.call_args_list == [
+        call(":1:SimpleModel__keys", "SimpleModel__a=1"),
+        call(":1:SimpleModel__lists", "SimpleModel__a=1"),
+        call(":1:SimpleModel__keys", "SimpleModel__a=1"),
+    ]
+    assert cache.get.call_args_list == [call("SimpleModel__keys")]
+
+    unlinked = [key for x in redis_pipe.unlink.call_args_list for key in x.args]
+    assert sorted(unlinked) == [":1:SimpleModel__a=0", ":1:SimpleModel__keys"]
+
+
+def test_get_indexed_keys_with_a_legacy_index(redis_pipe, monkeypatch):
+    """Test get_indexed_keys reads an index stored as a pickled set by the previous versions."""
+    from redis.exceptions import ResponseError
+
+    from breathecode.utils.cache import get_indexed_keys
+
+    wrong_type = ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+    redis_pipe.execute.return_value = [wrong_type, {b"SimpleModel__a=2"}]
+    monkeypatch.setattr(cache, "get", MagicMock(return_value={"SimpleModel__a=1"}))
+
+    assert get_indexed_keys(["SimpleModel__keys", "SimpleModel__lists"]) == {"SimpleModel__a=1", "SimpleModel__a=2"}
+    assert cache.get.call_args_list == [call("SimpleModel__keys")]
+
+
+def test_delete_keys_with_redis(redis_pipe, monkeypatch):
+    """Test delete_keys unlinks the keys in batches within one pipeline."""
+    from breathecode.utils import cache as bc_cache
+
+    monkeypatch.setattr(bc_cache, "DELETE_BATCH_SIZE", 2)
+
+    bc_cache.delete_keys({"a", "b", "c"})
+
+    unlinked = [key for x in redis_pipe.unlink.call_args_list for key in x.args]
+    assert sorted(unlinked) == [":1:a", ":1:b", ":1:c"]
+    assert redis_pipe.unlink.call_count == 2
+    assert redis_pipe.execute.call_count == 1
@@ -0,0 +1,133 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from breathecode.authenticate.models import Capability
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+from breathecode.utils.decorators.capable_of import (
+    aget_academy_from_capability,
+    get_academy_from_capability,
+    get_capabilities_cache_key,
+    invalidate_academy_capabilities,
+    invalidate_academy_status,
+    local_capabilities_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+def create_member(bc: Breathecode, **academy):
+    model = bc.database.create(
+        user=1, academy={"status": "ACTIVE", **academy}, role=1, capability="read_student", profile_academy=1
+    )
+    model.role.capabilities.add(Capability.objects.create(slug="crud_student"))
+
+    return model
+
+
+def build_request(user, path="/they-killed-kenny"):
+    request = APIRequestFactory().get(path, headers={"academy": 1})
+    force_authenticate(request, user=user)
+
+    # the decorator gets a drf request
+    return APIView().initialize_request(request)
+
+
+def test_capabilities_are_cached(bc: Breathecode, django_assert_num_queries):
+    model = create_member(bc)
+    request = build_request(model.user)
+
+    with django_assert_num_queries(1):
+        assert get_academy_from_capability({}, request, "read_student") == 1
+
+    with django_assert_num_queries(0):
+        assert get_academy_from_capability({}, request, "crud_student") == 1
+
+        with pytest.raises(PermissionDenied, match="don't have this capability: delete_student for academy 1"):
+            get_academy_from_capability({}, request, "delete_student")
+
+    assert cache.get(get_capabilities_cache_key(1, 1, {})) == {
+        "academy_status": "ACTIVE",
+        "capabilities": ["crud_student", "read_student"],
+    }
+
+    # the entry is shared with the other processes through redis
+    local_capabilities_cache.clear()
+
+    with django_assert_num_queries(0):
+        assert get_academy_from_capability({}, request, "read_student") == 1
+
+
+def test_async_lookup_shares_the_cache(bc: Breathecode, django_assert_num_queries):
+    model = create_member(bc)
+    request = build_request(model.user)
+
+    with django_assert_num_queries(1):
+        assert async_to_sync(aget_academy_from_capability)({}, request, "read_student") == 1
+
+    with django_assert_num_queries(0):
+        assert get_academy_from_capability({}, request, "read_student") == 1
+        assert async_to_sync(aget_academy_from_capability)({}, request, "crud_student") == 1
+
+
+def test_academy_status_is_cached(bc: Breathecode):
+    model = create_member(bc, status="INACTIVE")
+
+    with pytest.raises(PermissionDenied, match="This academy is not active"):
+        get_academy_from_capability({}, build_request(model.user), "read_student")
+
+    request = build_request(model.user, path="/v1/admissions/academy/activate")
+    assert get_academy_from_capability({}, request, "read_student") == 1
+
+
+def test_receivers_invalidate_the_capabilities(bc: Breathecode, enable_signals):
+    enable_signals()
+    model = create_member(bc)
+    request = build_request(model.user)
+
+    assert get_academy_from_capability({}, request, "crud_student") == 1
+
+    model.role.capabilities.remove(Capability.objects.get(slug="crud_student"))
+    with pytest.raises(PermissionDenied, match="don't have this capability: crud_student"):
+        get_academy_from_capability({}, request, "crud_student")
+
+    model.academy.status = "DELETED"
+    model.academy.save()
+    with pytest.raises(PermissionDenied, match="This academy is deleted"):
+        get_academy_from_capability({}, request, "read_student")
+
+    model.academy.status = "ACTIVE"
+    model.academy.save()
+    assert get_academy_from_capability({}, request, "read_student") == 1
+
+    model.profile_academy.delete()
+    with pytest.raises(PermissionDenied, match="don't have this capability: read_student"):
+        get_academy_from_capability({}, request, "read_student")
+
+
+def test_invalidations_bump_a_version(bc: Breathecode, django_assert_num_queries):
+    model = create_member(bc)
+    request = build_request(model.user)
+
+    assert get_academy_from_capability({}, request, "read_student") == 1
+
+    invalidate_academy_capabilities()
+
+    # the entries are not deleted one by one, the new version moves the lookups to a new key
+    assert cache.get(get_capabilities_cache_key(1, 1, {})) is not None
+    with django_assert_num_queries(1):
+        assert get_academy_from_capability({}, request, "read_student") == 1
+
+    invalidate_academy_status(1)
+
+    with django_assert_num_queries(1):
+        assert get_academy_from_capability({}, request, "read_student") == 1
+
+    with django_assert_num_queries(0):
+        assert get_academy_from_capability({}, request, "read_student") == 1
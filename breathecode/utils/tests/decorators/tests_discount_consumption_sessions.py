@@ -0,0 +1,27 @@
+import pytest
+
+from breathecode.payments.models import Consumable
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+from breathecode.utils.decorators import discount_consumption_sessions
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+def test_discount_consumption_sessions(bc: Breathecode, django_assert_num_queries):
+    model = bc.database.create(
+        consumable=[{"how_many": 2}, {"how_many": 2}, {"how_many": 3}],
+        consumption_session=[
+            {"consumable_id": 1, "how_many": 1, "status": "PENDING"},
+            {"consumable_id": 1, "how_many": 1, "status": "PENDING"},
+            {"consumable_id": 2, "how_many": 1, "status": "PENDING"},
+            {"consumable_id": 2, "how_many": 1, "status": "DONE"},
+        ],
+    )
+
+    with django_assert_num_queries(1):
+        consumables = list(discount_consumption_sessions(Consumable.objects.order_by("id")))
+
+    assert consumables == model.consumable[1:]
@@ -0,0 +1,103 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, Group, Permission
+from django.contrib.contenttypes.models import ContentType
+
+from breathecode.tests.mixins.breathecode_mixin.breathecode import Breathecode
+from breathecode.utils.decorators.has_permission import (
+    avalidate_permission,
+    get_user_permissions,
+    invalidate_user_permissions,
+    local_permissions_cache,
+    validate_permission,
+)
+
+
+@pytest.fixture(autouse=True)
+def setup(db):
+    yield
+
+
+def create_permission(codename: str) -> Permission:
+    content_type = ContentType.objects.get_for_model(Group)
+    return Permission.objects.create(codename=codename, name=codename, content_type=content_type)
+
+
+def create_user(bc: Breathecode):
+    model = bc.database.create(user=1, group=1)
+    model.user.user_permissions.add(create_permission("read_kenny"))
+    model.group.permissions.add(create_permission("kill_kenny"))
+    model.user.groups.add(model.group)
+
+    return model
+
+
+def test_permissions_are_cached(bc: Breathecode, django_assert_num_queries):
+    model = create_user(bc)
+
+    with django_assert_num_queries(1):
+        assert validate_permission(model.user, "read_kenny") is True
+
+    with django_assert_num_queries(0):
+        assert validate_permission(model.user, "kill_kenny") is True
+        assert validate_permission(model.user, "save_kenny") is False
+
+    # the entry is shared with the other processes through redis
+    local_permissions_cache.clear()
+
+    with django_assert_num_queries(0):
+        assert get_user_permissions(model.user.id) == {"read_kenny", "kill_kenny"}
+
+    # a new version of the user is built again
+    invalidate_user_permissions(model.user.id)
+    local_permissions_cache.clear()
+
+    with django_assert_num_queries(1):
+        assert get_user_permissions(model.user.id) == {"read_kenny", "kill_kenny"}
+
+
+def test_async_lookup_shares_the_cache(bc: Breathecode, django_assert_num_queries):
+    model = create_user(bc)
+
+    with django_assert_num_queries(1):
+        assert async_to_sync(avalidate_permission)(model.user, "kill_kenny") is True
+
+    with django_assert_num_queries(0):
+        assert validate_permission(model.user, "read_kenny") is True
+        assert async_to_sync(avalidate_permission)(model.user, "save_kenny") is False
+
+
+def test_anonymous_user(db, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        assert validate_permission(AnonymousUser(), "read_kenny") is False
+        assert async_to_sync(avalidate_permission)(AnonymousUser(), "read_kenny") is False
+
+
+def test_receivers_bump_the_versions(bc: Breathecode, enable_signals):
+    enable_signals()
+    model = create_user(bc)
+    other = bc.database.create(user=1).user
+
+    assert get_user_permissions(model.user.id) == {"read_kenny", "kill_kenny"}
+    assert get_user_permissions(other.id) == set()
+
+    # from the group
+    model.group.permissions.add(create_permission("save_kenny"))
+    assert get_user_permissions(model.user.id) == {"read_kenny", "kill_kenny", "save_kenny"}
+
+    model.group.user_set.add(other)
+    assert get_user_permissions(other.id) == {"kill_kenny", "save_kenny"}
+
+    model.group.user_set.clear()
+    assert get_user_permissions(other.id) == set()
+
+    # from the user
+    model.user.groups.add(model.group)
+    model.user.user_permissions.clear()
+    assert get_user_permissions(model.user.id) == {"kill_kenny", "save_kenny"}
+
+    Permission.objects.get(codename="read_kenny").user_set.add(other)
+    assert get_user_permissions(other.id) == {"read_kenny"}
+
+    model.group.delete()
+    assert get_user_permissions(model.user.id) == set()
@@ -0,0 +1,116 @@
+import gzip
+import zlib
+
+import brotli
+import pytest
+import zstandard
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from breathecode import middlewares
+from breathecode.middlewares import CompressResponseMiddleware
+
+DECOMPRESS = {
+    "zstd": lambda x: zstandard.ZstdDecompressor().decompressobj().decompress(x),
+    "deflate": zlib.decompress,
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+}
+
+ACCEPT_ENCODING = {
+    "zstd": "zstd, gzip",
+    "deflate": "deflate, gzip",
+    "gzip": "gzip",
+    "br": "br",
+}
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("breathecode.middlewares.IS_TEST", False)
+    monkeypatch.setattr("breathecode.middlewares.IS_DEV", True)
+
+    for fn in [middlewares.is_compression_enabled, middlewares.min_compression_size, middlewares.use_gzip]:
+        fn.cache_clear()
+
+    yield
+
+    for fn in [middlewares.is_compression_enabled, middlewares.min_compression_size, middlewares.use_gzip]:
+        fn.cache_clear()
+
+
+def get_request(encoding):
+    return RequestFactory().get(
+        "/", HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING[encoding], HTTP_USER_AGENT="PostmanRuntime/7.0.0"
+    )
+
+
+def process(request, response):
+    return CompressResponseMiddleware(lambda request: response).process_response(request, response)
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "deflate", "gzip", "br"])
+def test_compress_content(encoding):
+    content = b'{"id": 1}' * 2000
+    response = process(get_request(encoding), HttpResponse(content, content_type="application/json"))
+
+    assert response["Content-Encoding"] == encoding
+    assert response["Content-Length"] == str(len(response.content))
+    assert response["Vary"] == "Accept-Encoding"
+    assert DECOMPRESS[encoding](response.content) == content
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "deflate", "gzip", "br"])
+def test_compress_streaming_content(encoding):
+    rows = [f"{i},name {i},email{i}@example.com\n".encode() for i in range(5000)]
+    consumed = []
+
+    def generate():
+        for row in rows:
+            consumed.append(row)
+            yield row
+
+    response = process(get_request(encoding), StreamingHttpResponse(generate(), content_type="text/csv"))
+
+    assert response["Content-Encoding"] == encoding
+    assert "Content-Length" not in response
+    assert consumed == []
+
+    assert DECOMPRESS[encoding](b"".join(response.streaming_content)) == b"".join(rows)
+
+
+def test_threshold_uses_the_byte_length():
+    # sys.getsizeof adds the object overhead, so 10200 bytes used to be considered bigger than 10KB
+    content = b"a" * 10200
+    response = process(get_request("gzip"), HttpResponse(content, content_type="application/json"))
+
+    assert "Content-Encoding" not in response
+    assert response.content == content
+
+
+@pytest.mark.parametrize("content_type", ["image/png", "application/zip", "application/pdf"])
+def test_skip_compressed_content_types(content_type):
+    content = b"a" * 20000
+    response = process(get_request("gzip"), HttpResponse(content, content_type=content_type))
+
+    assert "Content-Encoding" not in response
+    assert response.content == content
+
+
+@pytest.mark.parametrize(
+    "content_type, encoding, expected",
+    [
+        ("application/json; charset=utf-8", "zstd", 3),
+        ("text/csv", "zstd", 1),
+        ("text/csv", "gzip", 1),
+        ("image/webp", "gzip", None),
+        ("text/plain", "br", 4),
+    ],
+)
+def test_get_compression_level(content_type, encoding, expected):
+    assert middlewares.get_compression_level(content_type, encoding) == expected
+
+
+def test_reuse_the_zstd_compressor_of_the_thread():
+    assert middlewares.get_zstd_compressor(3) is middlewares.get_zstd_compressor(3)
+    assert middlewares.get_zstd_compressor(3) is not middlewares.get_zstd_compressor(1)
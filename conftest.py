@@ -323,6 +323,19 @@ def sign_jwt_link():
     yield wrapper
 
 
+@pytest.fixture(autouse=True, scope="function")
+def clear_local_caches() -> Generator[None, None, None]:
+    from breathecode.authenticate.authentication import local_token_cache
+    from breathecode.utils.decorators.capable_of import local_capabilities_cache
+    from breathecode.utils.decorators.has_permission import local_permissions_cache
+
+    local_token_cache.clear()
+    local_capabilities_cache.clear()
+    local_permissions_cache.clear()
+
+    yield
+
+
 @pytest.fixture(autouse=True, scope="function")
 def get_app_keys() -> Generator[None, None, None]:
     actions.get_app_keys.cache_clear()